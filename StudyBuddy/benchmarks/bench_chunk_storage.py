@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Compare full-text chunk storage with offset storage (OFFSET_CHUNK_STORAGE):
+on-disk index size and query latency for the same documents and queries.
+
+Embeddings come from a hashing stand-in for the embedding model, so both
+indexes hold identical vectors and only the storage of chunk text differs.
+
+Run with: python benchmarks/bench_chunk_storage.py --documents ./data/documents
+          python benchmarks/bench_chunk_storage.py --synthetic 200
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
+
+import chromadb
+import numpy as np
+
+from config.settings import settings
+from src.database.vector_store import VectorStore
+from src.database.document_store import DOCUMENT_STORE_FILE
+from src.ingestion.document_processor import DocumentProcessor
+from src.retrieval.evaluation import directory_size
+
+class HashingModel:
+    """Deterministic pseudo-embeddings: the same text always gets the same unit vector"""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        vectors = []
+        for text in [texts] if single else texts:
+            seed = int.from_bytes(hashlib.sha1(text.encode('utf-8')).digest()[:8], 'little')
+            vector = np.random.default_rng(seed).normal(size=self.dimension).astype(np.float32)
+            vectors.append(vector / np.linalg.norm(vector))
+        vectors = np.stack(vectors)
+        return vectors[0] if single else vectors
+
+def synthetic_documents(count: int):
+    rng = np.random.default_rng(0)
+    words = ("heap graph vertex edge queue stack pointer recursion pivot partition hash bucket "
+             "tree node balance rotation memo subproblem greedy invariant loop array").split()
+    documents = []
+    for i in range(count):
+        paragraphs = [' '.join(rng.choice(words, size=120)) + '.' for _ in range(40)]
+        text = f"Lecture {i}\n\n" + "\n\n".join(paragraphs)
+        documents.append({'content': text, 'metadata': {
+            'filename': f"lecture{i}.txt", 'file_path': f"lecture{i}.txt", 'file_extension': '.txt',
+            'title': f"Lecture {i}", 'first_line': f"Lecture {i}", 'last_modified': 0.0
+        }})
+    return documents
+
+def measure(documents, offset_storage: bool, model, query_embeddings, top_k: int, directory: str):
+    settings.OFFSET_CHUNK_STORAGE = offset_storage
+    store = VectorStore(client=chromadb.PersistentClient(path=directory), embedding_model=model)
+
+    start = time.perf_counter()
+    chunks = store.add_documents(documents)['chunks_added']
+    ingest_seconds = time.perf_counter() - start
+
+    # One warm-up pass, then the timed one
+    for query_embedding in query_embeddings[:10]:
+        store.search_by_embedding(query_embedding, top_k=top_k)
+    latencies = []
+    for query_embedding in query_embeddings:
+        start = time.perf_counter()
+        store.search_by_embedding(query_embedding, top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+
+    document_store_path = Path(directory) / DOCUMENT_STORE_FILE
+    return {
+        'chunks': chunks,
+        'ingest_seconds': ingest_seconds,
+        'index_bytes': directory_size(directory),
+        'document_store_bytes': document_store_path.stat().st_size if document_store_path.exists() else 0,
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p95_ms': float(np.percentile(latencies, 95) * 1000)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Chunk storage benchmark')
+    parser.add_argument('--documents', type=str, help='Directory of documents (default: synthetic lectures)')
+    parser.add_argument('--synthetic', type=int, default=100, help='Number of synthetic lectures')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=settings.TOP_K_RESULTS)
+    parser.add_argument('--dimension', type=int, default=384)
+    args = parser.parse_args()
+
+    if args.documents:
+        processor = DocumentProcessor()
+        documents = [doc for doc in map(processor.process_file, processor.list_supported_files(Path(args.documents))) if doc]
+    else:
+        documents = synthetic_documents(args.synthetic)
+    if not documents:
+        print("No documents to index")
+        return
+
+    model = HashingModel(args.dimension)
+    rng = np.random.default_rng(1)
+    query_embeddings = [(vector / np.linalg.norm(vector)).tolist() for vector in rng.normal(size=(args.queries, args.dimension))]
+    settings.SIMILARITY_THRESHOLD = -1.0  # Every query returns top_k chunks to read
+
+    print(f"{len(documents)} documents, CHUNK_SIZE={settings.CHUNK_SIZE} CHUNK_OVERLAP={settings.CHUNK_OVERLAP}, "
+          f"compression {'on' if settings.DOCUMENT_STORE_COMPRESSION else 'off'}")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, offset_storage in (('full text', False), ('offsets', True)):
+            results[name] = measure(documents, offset_storage, model, query_embeddings, args.top_k, f"{tmp_dir}/{name}")
+
+    print(f"\n  {'storage':<10} {'chunks':>7} {'index MB':>9} {'text MB':>8} {'ingest s':>9} {'p50 ms':>7} {'p95 ms':>7}")
+    for name, result in results.items():
+        print(f"  {name:<10} {result['chunks']:>7} {result['index_bytes'] / 1e6:>9.2f} "
+              f"{result['document_store_bytes'] / 1e6:>8.2f} {result['ingest_seconds']:>9.1f} "
+              f"{result['p50_ms']:>7.2f} {result['p95_ms']:>7.2f}")
+
+    full, offsets = results['full text'], results['offsets']
+    print(f"\nOn disk: {1 - offsets['index_bytes'] / full['index_bytes']:.1%} smaller with offset storage")
+    print(f"Query latency p50 {offsets['p50_ms'] - full['p50_ms']:+.2f} ms, p95 {offsets['p95_ms'] - full['p95_ms']:+.2f} ms")
+
+if __name__ == "__main__":
+    main()
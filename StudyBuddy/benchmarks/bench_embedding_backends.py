@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Compare the embedding backends (EMBEDDING_BACKEND) on CPU: sentences/sec and
+how closely the ONNX and int8 embeddings agree with the PyTorch ones, both
+per sentence (cosine) and for retrieval (overlap of the 10 nearest chunks).
+
+The model is read from EMBEDDING_MODEL_DIRECTORY (saved there on first run).
+
+Run with: python benchmarks/bench_embedding_backends.py --documents ./data/documents
+          python benchmarks/bench_embedding_backends.py --sentences 2000 --batch-size 32
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+import numpy as np
+
+from config.settings import settings
+from src.database.embedding_backends import (
+    load_embedding_model, is_saved_model, save_model_locally, BACKENDS, BACKEND_TORCH
+)
+from src.ingestion.document_processor import DocumentProcessor
+from src.retrieval.context_compressor import split_sentences
+
+NEIGHBORS = 10
+
+def synthetic_sentences(count: int):
+    rng = np.random.default_rng(0)
+    words = ("a heap keeps the smallest key at the root while quicksort partitions the array around a pivot "
+             "and breadth first search visits every vertex of the graph level by level using a queue").split()
+    return [' '.join(rng.choice(words, size=rng.integers(8, 60))) for _ in range(count)]
+
+def document_sentences(directory: str, count: int):
+    processor = DocumentProcessor()
+    sentences = []
+    for file_path in processor.list_supported_files(Path(directory)):
+        document = processor.process_file(file_path)
+        if document and document.get('content'):
+            sentences.extend(split_sentences(document['content'], min_words=4))
+        if len(sentences) >= count:
+            break
+    return sentences[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description='Embedding backend benchmark')
+    parser.add_argument('--model-dir', type=str, default=settings.EMBEDDING_MODEL_DIRECTORY)
+    parser.add_argument('--documents', type=str, help='Take sentences from these documents (default: synthetic)')
+    parser.add_argument('--sentences', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    args = parser.parse_args()
+
+    sentences = document_sentences(args.documents, args.sentences) if args.documents else synthetic_sentences(args.sentences)
+    if not sentences:
+        print("No sentences to embed")
+        return
+    if not is_saved_model(args.model_dir):
+        save_model_locally(args.model_dir)
+
+    backends = [BACKEND_TORCH] + [backend for backend in args.backends if backend != BACKEND_TORCH]
+    print(f"{len(sentences)} sentences, batch size {args.batch_size}, model {args.model_dir}\n")
+    print(f"  {'backend':<10} {'load s':>7} {'sent/s':>8} {'speedup':>8} {'mean cos':>9} {'min cos':>8} {f'top-{NEIGHBORS}':>7}")
+
+    reference = None
+    for backend in backends:
+        start = time.perf_counter()
+        model = load_embedding_model(backend, args.model_dir)
+        load_seconds = time.perf_counter() - start
+        model.encode(sentences[:args.batch_size], batch_size=args.batch_size)  # Warm-up
+
+        start = time.perf_counter()
+        embeddings = np.asarray(model.encode(sentences, batch_size=args.batch_size), dtype=np.float32)
+        rate = len(sentences) / (time.perf_counter() - start)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+        if reference is None:
+            reference = {'rate': rate, 'embeddings': embeddings}
+            reference['neighbors'] = np.argsort(-embeddings @ embeddings.T, axis=1)[:, 1:NEIGHBORS + 1]
+
+        cosines = np.sum(embeddings * reference['embeddings'], axis=1)
+        neighbors = np.argsort(-embeddings @ embeddings.T, axis=1)[:, 1:NEIGHBORS + 1]
+        overlap = np.mean([
+            len(set(ours) & set(theirs)) / NEIGHBORS for ours, theirs in zip(neighbors, reference['neighbors'])
+        ])
+        print(f"  {backend:<10} {load_seconds:>7.1f} {rate:>8.1f} {rate / reference['rate']:>7.2f}x "
+              f"{cosines.mean():>9.5f} {cosines.min():>8.5f} {overlap:>7.1%}")
+
+    print(f"\nCosine and top-{NEIGHBORS} neighbour overlap are against the {BACKEND_TORCH} embeddings; "
+          "an index built with one backend can be searched with another when they stay close to 1")
+
+if __name__ == "__main__":
+    main()
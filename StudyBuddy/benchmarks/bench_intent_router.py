@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Measure intent routing accuracy and overhead on a labeled set of messages.
+
+Run with: python benchmarks/bench_intent_router.py [--embedding]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.retrieval.intent_router import IntentRouter, SMALL_TALK_PHRASES, INTENT_SMALL_TALK, INTENT_KNOWLEDGE
+
+S, K = INTENT_SMALL_TALK, INTENT_KNOWLEDGE
+
+LABELED_MESSAGES = [
+    ("hi", S), ("Hello!", S), ("hey there", S), ("good morning", S), ("Good evening, StudyBuddy", S),
+    ("how are you?", S), ("how are you doing today", S), ("thanks!", S), ("thank you so much", S),
+    ("Thanks a lot", S), ("who are you?", S), ("what is your name", S), ("halo", S), ("hai kak", S),
+    ("apa kabar?", S), ("selamat pagi", S), ("terima kasih banyak", S), ("good night", S),
+    ("hello hello", S), ("hey buddy", S),
+    ("nice to meet you", S), ("see you later", S), ("you are awesome", S), ("bye", S),
+    ("What is this algorithm's complexity?", K), ("Explain the history of sorting algorithms", K),
+    ("Is this graph bipartite?", K), ("which data structure is used here", K),
+    ("hi, can you explain how quicksort partitions the array?", K),
+    ("thanks, now what is the difference between BFS and DFS?", K),
+    ("hello, summarize chapter 3 of the lecture notes", K),
+    ("what is a hash table", K), ("explain dynamic programming with an example", K),
+    ("how does merge sort work", K), ("What does the syllabus say about the final exam?", K),
+    ("compare arrays and linked lists", K), ("what is the time complexity of heap sort", K),
+    ("jelaskan algoritma dijkstra", K), ("apa itu rekursi?", K), ("Thinking about recursion, what is the base case?", K),
+    ("show me the highlights of the graph theory lecture", K), ("what is the height of a balanced tree", K),
+    ("why is shell sort faster than insertion sort", K), ("which chapter covers hashing", K),
+    ("How are you supposed to pick a pivot?", K), ("what is your name for the variable in the pseudocode", K),
+]
+
+def legacy_route(message: str) -> str:
+    """The substring check previously done inside GeminiClient.generate_response"""
+    lowered = message.strip().lower()
+    return S if any(phrase in lowered for phrase in SMALL_TALK_PHRASES) else K
+
+def evaluate(name: str, route, repeat: int):
+    correct = 0
+    mistakes = []
+    for message, label in LABELED_MESSAGES:
+        predicted = route(message)
+        if predicted == label:
+            correct += 1
+        else:
+            mistakes.append((message, label, predicted))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message, _ in LABELED_MESSAGES:
+            route(message)
+    per_message_us = (time.perf_counter() - start) / (repeat * len(LABELED_MESSAGES)) * 1e6
+
+    print(f"  {name:<28} accuracy {correct / len(LABELED_MESSAGES):6.1%}   {per_message_us:9.1f} us/message")
+    for message, label, predicted in mistakes:
+        print(f"      {label:>10} -> {predicted:<10} {message!r}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Intent router benchmark')
+    parser.add_argument('--embedding', action='store_true', help='Also evaluate the embedding classifier')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"Labeled set: {len(LABELED_MESSAGES)} messages")
+    evaluate("legacy substring", legacy_route, args.repeat)
+
+    router = IntentRouter()
+    evaluate("word-boundary matcher", lambda message: router.route(message)['intent'], args.repeat)
+
+    if args.embedding:
+        from src.database.embedding_backends import load_embedding_model
+        from config.settings import settings
+
+        embedding_router = IntentRouter(embedding_model=load_embedding_model())
+        embedding_router.route("warm up")
+        evaluate(
+            "matcher + embedding",
+            lambda message: embedding_router.route(message)['intent'],
+            max(args.repeat // 20, 1)
+        )
+
+if __name__ == "__main__":
+    main()
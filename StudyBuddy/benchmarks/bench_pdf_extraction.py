@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Compare PDF extraction strategies on a large synthetic PDF.
+
+Run with: python benchmarks/bench_pdf_extraction.py --pages 500
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import PyPDF2
+
+from config.settings import settings
+from src.ingestion.document_processor import DocumentProcessor
+from src.utils.text_processing import chunk_text, chunk_text_stream
+
+def build_synthetic_pdf(path: Path, num_pages: int, lines_per_page: int = 45):
+    """Write a plain text PDF by hand so the benchmark has no extra dependencies"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages object, filled in once page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+
+    for page in range(num_pages):
+        lines = [
+            f"Page {page + 1} line {line}: sorting algorithms compare and swap elements in arrays."
+            for line in range(lines_per_page)
+        ]
+        text_ops = "".join(f"({line}) Tj T* " for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 40 800 Td {text_ops}ET".encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % num_pages
+
+    with open(path, 'wb') as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset))
+
+def legacy_extract(file_path: Path) -> str:
+    """The previous implementation, kept here as the baseline"""
+    text = ""
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page in pdf_reader.pages:
+            text += page.extract_text() + "\n"
+    return text
+
+def time_call(label: str, func, repeat: int):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<32} {best:8.2f}s")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF extraction benchmark')
+    parser.add_argument('--pages', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # Without the extraction cache, so repeated runs extract again
+    processor = DocumentProcessor(use_cache=False)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = Path(tmp_dir) / "synthetic.pdf"
+        build_synthetic_pdf(pdf_path, args.pages)
+        print(f"Synthetic PDF: {args.pages} pages, {pdf_path.stat().st_size / 1e6:.1f} MB")
+
+        legacy_text = time_call("legacy (text +=)", lambda: legacy_extract(pdf_path), args.repeat)
+
+        settings.PDF_PARALLEL_WORKERS = 0
+        streamed_text = time_call("streamed pages", lambda: processor._extract_from_pdf(pdf_path), args.repeat)
+        time_call(
+            "streamed + clean (whole text)",
+            lambda: processor._extract_sections(pdf_path),
+            args.repeat
+        )
+
+        settings.PDF_PARALLEL_WORKERS = args.workers
+        settings.PDF_PARALLEL_PAGE_THRESHOLD = 1
+        parallel_text = time_call(
+            f"page-range parallel ({args.workers} procs)",
+            lambda: processor._extract_from_pdf(pdf_path),
+            args.repeat
+        )
+
+        # All strategies must agree on the extracted text
+        assert legacy_text == streamed_text + "\n"
+        assert streamed_text == parallel_text
+
+        # What the vector store waits for before it can embed anything: the whole
+        # document was extracted and tokenized first, a streamed one only its first pages
+        settings.PDF_PARALLEL_WORKERS = 0
+
+        def first_chunk_of_whole_text():
+            text, _ = processor._extract_sections(pdf_path)
+            return chunk_text(text, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)[0]
+
+        def first_chunk_streamed():
+            doc = processor.process_file(pdf_path)
+            return next(chunk_text_stream(doc['content_stream'](), settings.CHUNK_SIZE, settings.CHUNK_OVERLAP))
+
+        whole_chunk = time_call("first chunk (whole text)", first_chunk_of_whole_text, args.repeat)
+        streamed_chunk = time_call("first chunk (streamed)", first_chunk_streamed, args.repeat)
+        assert whole_chunk['text'] == streamed_chunk['text']
+
+        def all_chunks_streamed():
+            doc = processor.process_file(pdf_path)
+            return list(chunk_text_stream(doc['content_stream'](), settings.CHUNK_SIZE, settings.CHUNK_OVERLAP))
+
+        time_call("all chunks (whole text)", lambda: chunk_text(processor._extract_sections(pdf_path)[0],
+                                                                settings.CHUNK_SIZE, settings.CHUNK_OVERLAP), args.repeat)
+        time_call("all chunks (streamed)", all_chunks_streamed, args.repeat)
+
+if __name__ == "__main__":
+    main()
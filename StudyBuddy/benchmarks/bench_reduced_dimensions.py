@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Index the same documents at reduced embedding dimensions (EMBEDDING_REDUCTION)
+and report, per dimension and method, recall@k against exact full-dimension
+search, on-disk index size and query latency, with and without rescoring the
+candidates at full dimension.
+
+Chunks are embedded once with the configured embedding model and reused for
+every index. Queries are sentences from the documents, or the questions of a
+labeled question file.
+
+Run with: python benchmarks/bench_reduced_dimensions.py --documents ./data/documents
+          python benchmarks/bench_reduced_dimensions.py --documents ./data/documents --dimensions 64 128 --top-k 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+import chromadb
+import numpy as np
+
+from config.settings import settings
+from src.database.vector_store import VectorStore
+from src.database.embedding_backends import load_embedding_model
+from src.database.dimension_reduction import FULL_EMBEDDINGS_FILE, REDUCTION_NONE, REDUCTION_PCA, REDUCTION_TRUNCATE
+from src.database.index_tuning import exact_top_k, recall_at_k
+from src.ingestion.document_processor import DocumentProcessor
+from src.retrieval.context_compressor import split_sentences
+from src.retrieval.evaluation import CachingEmbeddingModel, directory_size, load_labeled_questions
+
+def chunk_key(metadata):
+    return metadata['filename'], metadata['chunk_index']
+
+def build_store(documents, model, directory: str, method: str, dimension: int) -> VectorStore:
+    settings.EMBEDDING_REDUCTION = method
+    settings.REDUCED_EMBEDDING_DIMENSION = dimension
+    settings.RESCORE_FULL_DIMENSION = method != REDUCTION_NONE
+    store = VectorStore(client=chromadb.PersistentClient(path=directory), embedding_model=model)
+    store.add_documents(documents)
+    return store
+
+def measure(store: VectorStore, query_embeddings, expected, positions, top_k: int, rescore: bool):
+    settings.RESCORE_FULL_DIMENSION = rescore
+    for query_embedding in query_embeddings[:10]:  # Warm-up
+        store.search_by_embedding(query_embedding, top_k=top_k)
+
+    latencies, found = [], []
+    for query_embedding in query_embeddings:
+        start = time.perf_counter()
+        results = store.search_by_embedding(query_embedding, top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+        found.append([positions[chunk_key(result['metadata'])] for result in results])
+    return {
+        'recall': recall_at_k(found, expected),
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p95_ms': float(np.percentile(latencies, 95) * 1000)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Reduced embedding dimension benchmark')
+    parser.add_argument('--documents', type=str, default=settings.DOCUMENTS_DIRECTORY)
+    parser.add_argument('--questions', type=str, help='Labeled question file to take queries from')
+    parser.add_argument('--queries', type=int, default=200, help='Number of document sentences used as queries')
+    parser.add_argument('--dimensions', type=int, nargs='+', default=[64, 128, 192, 384])
+    parser.add_argument('--methods', nargs='+', choices=[REDUCTION_PCA, REDUCTION_TRUNCATE],
+                        default=[REDUCTION_PCA, REDUCTION_TRUNCATE])
+    parser.add_argument('--top-k', type=int, default=settings.TOP_K_RESULTS)
+    args = parser.parse_args()
+
+    processor = DocumentProcessor()
+    documents = [doc for doc in map(processor.process_file, processor.list_supported_files(Path(args.documents))) if doc]
+    if not documents:
+        print(f"No documents in {args.documents}")
+        return
+    if args.questions:
+        queries = [question['question'] for question in load_labeled_questions(args.questions)]
+    else:
+        sentences = [sentence for doc in documents for sentence in split_sentences(doc['content'], min_words=6)]
+        rng = np.random.default_rng(0)
+        queries = [sentences[i] for i in rng.permutation(len(sentences))[:args.queries]]
+
+    model = CachingEmbeddingModel(load_embedding_model())
+    full_dimension = model.get_sentence_embedding_dimension()
+    query_embeddings = np.asarray(model.encode(queries), dtype=np.float32)
+    settings.SIMILARITY_THRESHOLD = -1.0  # Recall counts every returned chunk
+    saved_pca_samples = settings.PCA_FIT_SAMPLES
+
+    print(f"{len(documents)} documents, {len(queries)} queries, top-{args.top_k}, "
+          f"{settings.EMBEDDING_MODEL} ({full_dimension} dims)\n")
+    print(f"  {'method':<9} {'dims':>5} {'rescore':>8} {'recall':>7} {'index MB':>9} {'full MB':>8} {'p50 ms':>7} {'p95 ms':>7}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        full_store = build_store(documents, model, f"{tmp_dir}/full", REDUCTION_NONE, full_dimension)
+        stored = full_store.collection.get(include=['metadatas', 'embeddings'])
+        positions = {chunk_key(metadata): i for i, metadata in enumerate(stored['metadatas'])}
+        # Ground truth: exact cosine search over the full-dimension embeddings
+        expected = exact_top_k(np.asarray(stored['embeddings'], dtype=np.float32), query_embeddings, args.top_k)
+        queries_list = query_embeddings.tolist()
+        settings.PCA_FIT_SAMPLES = max(saved_pca_samples, len(positions))  # Fit on the whole corpus
+
+        configurations = [(REDUCTION_NONE, full_dimension, full_store, f"{tmp_dir}/full")]
+        for method in args.methods:
+            for dimension in args.dimensions:
+                if dimension >= full_dimension:
+                    continue
+                directory = f"{tmp_dir}/{method}-{dimension}"
+                configurations.append((method, dimension, build_store(documents, model, directory, method, dimension), directory))
+
+        for method, dimension, store, directory in configurations:
+            full_bytes = os.path.getsize(os.path.join(directory, FULL_EMBEDDINGS_FILE)) \
+                if os.path.exists(os.path.join(directory, FULL_EMBEDDINGS_FILE)) else 0
+            index_bytes = directory_size(directory) - full_bytes
+            for rescore in ((False, True) if method != REDUCTION_NONE else (False,)):
+                result = measure(store, queries_list, expected, positions, args.top_k, rescore)
+                print(f"  {method:<9} {dimension:>5} {'yes' if rescore else 'no':>8} {result['recall']:>7.1%} "
+                      f"{index_bytes / 1e6:>9.2f} {full_bytes / 1e6 if rescore else 0:>8.2f} "
+                      f"{result['p50_ms']:>7.2f} {result['p95_ms']:>7.2f}")
+
+    print(f"\nRecall is the share of the exact full-dimension top-{args.top_k} found; 'full MB' is the extra "
+          "storage of full embeddings that rescoring needs (RESCORE_FULL_DIMENSION)")
+
+if __name__ == "__main__":
+    main()
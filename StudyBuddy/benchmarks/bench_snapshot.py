@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Time index snapshot export and import against a synthetic collection.
+
+Run with: python benchmarks/bench_snapshot.py --chunks 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
+
+import chromadb
+import numpy as np
+
+from src.database.vector_store import VectorStore
+from src.database.snapshot import export_index, import_index, verify_snapshot
+
+class FixedDimensionModel:
+    """Only the dimension is needed; snapshots never embed anything"""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+def build_collection(store: VectorStore, num_chunks: int, dimension: int):
+    rng = np.random.default_rng(0)
+    batch_size = 5000
+    for start in range(0, num_chunks, batch_size):
+        end = min(start + batch_size, num_chunks)
+        store.collection.add(
+            ids=[f"chunk-{i}" for i in range(start, end)],
+            documents=[f"Chunk {i}: " + "dynamic programming stores subproblem results. " * 15 for i in range(start, end)],
+            metadatas=[{'filename': f"lecture{i % 200}.pdf", 'chunk_index': i, 'token_count': 180} for i in range(start, end)],
+            embeddings=rng.normal(size=(end - start, dimension)).astype(np.float32).tolist()
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description='Index snapshot benchmark')
+    parser.add_argument('--chunks', type=int, default=100000)
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--dtype', choices=['float32', 'float16'], default='float32')
+    args = parser.parse_args()
+
+    model = FixedDimensionModel(args.dimension)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = VectorStore(client=chromadb.PersistentClient(path=f"{tmp_dir}/source"), embedding_model=model)
+        start = time.perf_counter()
+        build_collection(source, args.chunks, args.dimension)
+        print(f"Built source collection: {args.chunks} chunks in {time.perf_counter() - start:.1f}s")
+
+        snapshot_path = f"{tmp_dir}/snapshot"
+        exported = export_index(source, snapshot_path, dtype=args.dtype)
+        print(f"  {'export':<12} {exported['seconds']:8.2f}s  {exported['snapshot_bytes'] / 1e6:.1f} MB ({args.dtype})")
+
+        start = time.perf_counter()
+        assert verify_snapshot(snapshot_path)['valid']
+        print(f"  {'verify':<12} {time.perf_counter() - start:8.2f}s")
+
+        target = VectorStore(client=chromadb.PersistentClient(path=f"{tmp_dir}/target"), embedding_model=model)
+        imported = import_index(target, snapshot_path, verify=False)
+        assert imported['success'], imported['error']
+        print(f"  {'import':<12} {imported['seconds']:8.2f}s  ({args.chunks / imported['seconds']:.0f} chunks/s)")
+
+if __name__ == "__main__":
+    main()
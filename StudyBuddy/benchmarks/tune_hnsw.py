@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tune HNSW parameters on the current index: recall@k against exact search and
+query latency for every combination in the grid.
+
+Run with: python benchmarks/tune_hnsw.py --k 5 --m 8 16 32 --search-ef 10 32 64 128
+Use real questions with --queries questions.txt (one per line).
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
+
+import numpy as np
+
+from config.settings import settings
+from src.database.sharded_store import create_vector_store
+from src.database.index_tuning import (
+    load_stored_embeddings, split_queries, evaluate_hnsw_grid, recommend_parameters
+)
+
+def main():
+    parser = argparse.ArgumentParser(description='HNSW parameter tuning')
+    parser.add_argument('--k', type=int, default=settings.TOP_K_RESULTS)
+    parser.add_argument('--m', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--construction-ef', type=int, nargs='+', default=[64, 100, 200])
+    parser.add_argument('--search-ef', type=int, nargs='+', default=[10, 20, 40, 80, 160])
+    parser.add_argument('--num-queries', type=int, default=500,
+                        help='Stored chunks held out as queries when --queries is not given')
+    parser.add_argument('--queries', type=str, help='File with one question per line')
+    parser.add_argument('--target-recall', type=float, default=0.95)
+    args = parser.parse_args()
+
+    vector_store = create_vector_store()
+    embeddings = load_stored_embeddings(vector_store)
+    if len(embeddings) < 2:
+        print("The index is empty; ingest some documents first")
+        return
+
+    if args.queries:
+        questions = [line.strip() for line in open(args.queries, encoding='utf-8') if line.strip()]
+        corpus = embeddings
+        queries = np.asarray(vector_store.embedding_model.encode(questions), dtype=np.float32)
+    else:
+        corpus, queries = split_queries(embeddings, args.num_queries)
+
+    print(f"Corpus: {len(corpus)} vectors, {len(queries)} queries, recall@{args.k}")
+    print(f"Current settings: M={settings.HNSW_M} construction_ef={settings.HNSW_CONSTRUCTION_EF} "
+          f"search_ef={settings.HNSW_SEARCH_EF}\n")
+
+    results = evaluate_hnsw_grid(
+        corpus, queries, k=args.k,
+        m_values=args.m,
+        construction_ef_values=args.construction_ef,
+        search_ef_values=args.search_ef
+    )
+
+    print(f"  {'M':>4} {'constr_ef':>10} {'search_ef':>10} {'recall':>8} {'p50 ms':>8} {'p95 ms':>8} {'build s':>8}")
+    for result in results:
+        print(
+            f"  {result['M']:>4} {result['construction_ef']:>10} {result['search_ef']:>10} "
+            f"{result['recall']:>8.3f} {result['p50_ms']:>8.3f} {result['p95_ms']:>8.3f} {result['build_seconds']:>8.2f}"
+        )
+
+    best = recommend_parameters(results, args.target_recall)
+    print(f"\nRecommended (fastest p95 with recall >= {args.target_recall}):")
+    print(f"  HNSW_M={best['M']}")
+    print(f"  HNSW_CONSTRUCTION_EF={best['construction_ef']}")
+    print(f"  HNSW_SEARCH_EF={best['search_ef']}")
+    print("Apply with: python main.py --rebuild-index")
+
+if __name__ == "__main__":
+    main()
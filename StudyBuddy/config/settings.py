@@ -11,25 +11,113 @@ class Settings:
     # Database settings
     CHROMA_PERSIST_DIRECTORY: str = os.getenv("CHROMA_PERSIST_DIRECTORY", "./data/embeddings")
     COLLECTION_NAME: str = os.getenv("COLLECTION_NAME", "knowledge_base")
+    # Seconds a writer waits for another process to finish writing to the index
+    INDEX_WRITE_LOCK_TIMEOUT: float = float(os.getenv("INDEX_WRITE_LOCK_TIMEOUT", "600"))
+    
+    # Chunk storage settings (offsets: each document's text is stored once, chunks keep only offsets into it)
+    OFFSET_CHUNK_STORAGE: bool = os.getenv("OFFSET_CHUNK_STORAGE", "false").lower() == "true"
+    DOCUMENT_STORE_COMPRESSION: bool = os.getenv("DOCUMENT_STORE_COMPRESSION", "true").lower() == "true"
+    DOCUMENT_STORE_CACHE_BLOCKS: int = int(os.getenv("DOCUMENT_STORE_CACHE_BLOCKS", "64"))
+    
+    # HNSW index settings (changing them requires main.py --rebuild-index)
+    HNSW_M: int = int(os.getenv("HNSW_M", "16"))
+    HNSW_CONSTRUCTION_EF: int = int(os.getenv("HNSW_CONSTRUCTION_EF", "100"))
+    HNSW_SEARCH_EF: int = int(os.getenv("HNSW_SEARCH_EF", "10"))
+    
+    # Embedding dimension settings (apply to new or cleared collections)
+    # none, pca (projection fitted on the first PCA_FIT_SAMPLES chunks) or truncate
+    EMBEDDING_REDUCTION: str = os.getenv("EMBEDDING_REDUCTION", "none")
+    REDUCED_EMBEDDING_DIMENSION: int = int(os.getenv("REDUCED_EMBEDDING_DIMENSION", "128"))
+    PCA_FIT_SAMPLES: int = int(os.getenv("PCA_FIT_SAMPLES", "2000"))
+    RESCORE_FULL_DIMENSION: bool = os.getenv("RESCORE_FULL_DIMENSION", "true").lower() == "true"
+    RESCORE_CANDIDATE_FACTOR: int = int(os.getenv("RESCORE_CANDIDATE_FACTOR", "4"))
+    
+    # Sharding settings
+    SHARDING_ENABLED: bool = os.getenv("SHARDING_ENABLED", "false").lower() == "true"
+    MAX_OPEN_SHARDS: int = int(os.getenv("MAX_OPEN_SHARDS", "8"))
+    SHARD_SEARCH_WORKERS: int = int(os.getenv("SHARD_SEARCH_WORKERS", "4"))
     
     # Model settings
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    # torch, onnx or onnx-int8; the ONNX backends run a local copy of EMBEDDING_MODEL
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")
+    EMBEDDING_MODEL_DIRECTORY: str = os.getenv("EMBEDDING_MODEL_DIRECTORY", "./data/models/embedding")
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
     MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "8192"))
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.7"))
     
+    # Prompt caching settings (the system prompt is sent once as Gemini cached content)
+    PROMPT_CACHE_ENABLED: bool = os.getenv("PROMPT_CACHE_ENABLED", "false").lower() == "true"
+    PROMPT_CACHE_TTL_SECONDS: float = float(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600"))
+    PROMPT_CACHE_RETRY_SECONDS: float = float(os.getenv("PROMPT_CACHE_RETRY_SECONDS", "600"))
+    # Smallest prompt the model caches; 0 looks it up by GEMINI_MODEL
+    PROMPT_CACHE_MIN_TOKENS: int = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "0"))
+    
     # Retrieval settings
     TOP_K_RESULTS: int = int(os.getenv("TOP_K_RESULTS", "5"))
     SIMILARITY_THRESHOLD: float = float(os.getenv("SIMILARITY_THRESHOLD", "0.7"))
     
+    # Context compression settings (keep only the relevant sentences of retrieved chunks)
+    CONTEXT_COMPRESSION_ENABLED: bool = os.getenv("CONTEXT_COMPRESSION_ENABLED", "false").lower() == "true"
+    CONTEXT_COMPRESSION_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_COMPRESSION_TOKEN_BUDGET", "1000"))
+    CONTEXT_COMPRESSION_NEIGHBORS: int = int(os.getenv("CONTEXT_COMPRESSION_NEIGHBORS", "1"))
+    
+    # Intent routing settings (small talk skips retrieval)
+    INTENT_ROUTER_ENABLED: bool = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+    INTENT_EMBEDDING_CLASSIFIER: bool = os.getenv("INTENT_EMBEDDING_CLASSIFIER", "false").lower() == "true"
+    INTENT_MIN_SIMILARITY: float = float(os.getenv("INTENT_MIN_SIMILARITY", "0.5"))
+    
+    # Deadline settings (0 = wait for the LLM however long it takes)
+    QUERY_DEADLINE_SECONDS: float = float(os.getenv("QUERY_DEADLINE_SECONDS", "0"))
+    FALLBACK_MAX_SENTENCES: int = int(os.getenv("FALLBACK_MAX_SENTENCES", "3"))
+    CACHE_LATE_ANSWERS: bool = os.getenv("CACHE_LATE_ANSWERS", "true").lower() == "true"
+    
     # Document settings
     DOCUMENTS_DIRECTORY: str = os.getenv("DOCUMENTS_DIRECTORY", "./data/documents")
     CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "1000"))
     CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "200"))
+    LARGE_FILE_THRESHOLD_MB: float = float(os.getenv("LARGE_FILE_THRESHOLD_MB", "20"))
+    STREAM_BLOCK_KB: int = int(os.getenv("STREAM_BLOCK_KB", "256"))
+    PDF_PARALLEL_WORKERS: int = int(os.getenv("PDF_PARALLEL_WORKERS", "0"))
+    PDF_PARALLEL_PAGE_THRESHOLD: int = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", "200"))
+    
+    # Deduplication settings
+    DEDUPLICATION_ENABLED: bool = os.getenv("DEDUPLICATION_ENABLED", "true").lower() == "true"
+    DEDUP_MAX_HAMMING_DISTANCE: int = int(os.getenv("DEDUP_MAX_HAMMING_DISTANCE", "3"))
+    
+    # Extraction cache settings
+    EXTRACTION_CACHE_ENABLED: bool = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+    EXTRACTION_CACHE_DIRECTORY: str = os.getenv("EXTRACTION_CACHE_DIRECTORY", "./data/cache/extraction")
+    EXTRACTION_CACHE_MAX_MB: float = float(os.getenv("EXTRACTION_CACHE_MAX_MB", "500"))
+    
+    # Embedding cache settings (re-indexing unchanged chunk text skips the embedding model)
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_DIRECTORY: str = os.getenv("EMBEDDING_CACHE_DIRECTORY", "./data/cache/embeddings")
+    EMBEDDING_CACHE_MAX_MB: float = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))
+    
+    # Model migration settings (main.py --migrate-model re-embeds in the background)
+    MIGRATION_BATCH_SIZE: int = int(os.getenv("MIGRATION_BATCH_SIZE", "64"))
+    MIGRATION_PAUSE_SECONDS: float = float(os.getenv("MIGRATION_PAUSE_SECONDS", "0.5"))
+    
+    # Background job settings
+    JOBS_DIRECTORY: str = os.getenv("JOBS_DIRECTORY", "./data/jobs")
+    INGEST_MAX_ATTEMPTS: int = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+    WATCH_POLL_INTERVAL: float = float(os.getenv("WATCH_POLL_INTERVAL", "2.0"))
+    WATCH_DEBOUNCE_SECONDS: float = float(os.getenv("WATCH_DEBOUNCE_SECONDS", "5.0"))
+    
+    # Profiling settings (main.py --profile)
+    PROFILE_DIRECTORY: str = os.getenv("PROFILE_DIRECTORY", "./data/profiles")
+    PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+    PROFILE_TOP_FUNCTIONS: int = int(os.getenv("PROFILE_TOP_FUNCTIONS", "15"))
+    
+    # Warm-up settings (the web app loads models and clients in the background at start-up)
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
     
     # UI settings
     APP_TITLE: str = os.getenv("APP_TITLE", "Study Buddy")
     APP_DESCRIPTION: str = os.getenv("APP_DESCRIPTION", "Your personal study assistant about Programming and Algorithms.")
+    # Chat messages rendered per rerun; "Load earlier messages" shows this many more
+    CHAT_WINDOW_SIZE: int = int(os.getenv("CHAT_WINDOW_SIZE", "20"))
     
     def validate_required_keys(self):
         if not self.GEMINI_API_KEY:
@@ -9,7 +9,9 @@ Or use the Streamlit UI: streamlit run src/ui/streamlit_app.py
 import argparse
 import sys
 import os
+import time
 import warnings
+from contextlib import contextmanager, ExitStack
 from pathlib import Path
 
 # Set environment variables before importing anything else
@@ -25,18 +27,240 @@ warnings.filterwarnings("ignore", message=".*telemetry.*")
 sys.path.append(str(Path(__file__).parent / 'src'))
 
 from src.rag_pipeline import RAGPipeline
+from src.database.sharded_store import create_vector_store
+from src.database.vector_store import VectorStore
+from src.database.model_migration import ModelMigration, STATE_COMPLETED, STATE_FAILED
+from src.database.snapshot import export_index, import_index
+from src.ingestion.directory_watcher import DirectoryWatcher, initial_changes
+from src.ingestion.job_queue import load_job_states, request_job_cancellation, describe_job, JOB_COMPLETED
+from src.utils.profiling import Profiler, COLLAPSED_FILE
 from config.settings import settings
 
+def show_jobs():
+    jobs = load_job_states()
+    if not jobs:
+        print("📭 No ingestion jobs recorded")
+        return
+    
+    print("🛠️ Ingestion Jobs:")
+    for state in jobs[:10]:
+        print(f"   [{state['job_id']}] {state['documents_path']}")
+        print(f"      {describe_job(state)}")
+        if state.get('current_file'):
+            print(f"      Current file: {state['current_file']}")
+
+def run_ingestion_job(rag: RAGPipeline, documents_path: str, resume: bool = False):
+    submitted = rag.submit_ingestion_job(documents_path, resume=resume)
+    if not submitted['success']:
+        print(f"❌ Error: {submitted['error']}")
+        return
+    
+    job_id = submitted['job_id']
+    print(f"🛠️ Job {job_id} started (press Ctrl+C to cancel)")
+    
+    try:
+        while True:
+            job = rag.job_queue.wait(job_id, timeout=1.0)
+            state = job.to_dict()
+            print(f"\r   {describe_job(state)}".ljust(100), end='', flush=True)
+            if job.is_finished():
+                break
+    except KeyboardInterrupt:
+        print("\n⏹️ Cancelling after the current file (continue later with --resume)...")
+        rag.cancel_ingestion_job(job_id)
+        job = rag.job_queue.wait(job_id)
+        state = job.to_dict()
+    print()
+    
+    for filename in state.get('quarantined', []):
+        print(f"☣️ Quarantined (failed repeatedly, skipped until it changes): {filename}")
+    
+    if state['status'] == JOB_COMPLETED:
+        processed = state['files_done'] - state['files_failed'] - state.get('files_skipped', 0)
+        print(f"✅ Successfully processed {processed} documents")
+        if state.get('files_skipped'):
+            print(f"⏭️ Skipped {state['files_skipped']} documents finished by the previous run")
+        print(f"📊 Total chunks in knowledge base: {rag.vector_store.get_collection_stats()['total_chunks']}")
+    else:
+        print(f"❌ Job {state['status']}: {state.get('error') or 'stopped before completion'}")
+
+def report_changes(changes, result):
+    summary = ", ".join(f"{len(paths)} {kind}" for kind, paths in changes.items() if paths)
+    if result['success']:
+        print(f"🔄 {summary} -> indexed {result['documents_processed']}, removed {result['documents_removed']}")
+        for filename in result['failed']:
+            print(f"   ⚠️ Could not process {filename}")
+    else:
+        print(f"❌ Error re-indexing ({summary}): {result['error']}")
+
+def run_watch_mode(rag: RAGPipeline, documents_path: str):
+    watcher = DirectoryWatcher(
+        Path(documents_path),
+        rag.document_processor.supported_formats,
+        debounce_seconds=settings.WATCH_DEBOUNCE_SECONDS
+    )
+    
+    # Catch up with anything that changed while the watcher was not running
+    changes = initial_changes(watcher, rag.vector_store.get_indexed_files())
+    if any(changes.values()):
+        report_changes(changes, rag.apply_file_changes(changes))
+    
+    print(f"👀 Watching {documents_path} for changes (press Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(settings.WATCH_POLL_INTERVAL)
+            changes = watcher.poll()
+            if changes:
+                report_changes(changes, rag.apply_file_changes(changes))
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+
+def run_index_snapshot(export_path: str = None, import_path: str = None, dtype: str = "float32"):
+    # Snapshots only touch the vector store, so the Gemini client is not needed
+    try:
+        vector_store = create_vector_store()
+    except Exception as e:
+        print(f"❌ Error initializing vector store: {e}")
+        return
+    
+    if export_path:
+        print(f"📦 Exporting index to: {export_path}")
+        result = export_index(vector_store, export_path, dtype=dtype)
+        if result['success']:
+            print(f"✅ Exported {result['chunks_exported']} chunks "
+                  f"({result['snapshot_bytes'] / 1e6:.1f} MB, {dtype}) in {result['seconds']:.1f}s")
+        else:
+            print(f"❌ Error: {result['error']}")
+    else:
+        print(f"📥 Importing index from: {import_path}")
+        result = import_index(vector_store, import_path)
+        if result['success']:
+            print(f"✅ Imported {result['chunks_imported']} chunks in {result['seconds']:.1f}s")
+        else:
+            print(f"❌ Error: {result['error']}")
+
+def run_rebuild_index():
+    print(f"🏗️ Rebuilding index with M={settings.HNSW_M}, construction_ef={settings.HNSW_CONSTRUCTION_EF}, "
+          f"search_ef={settings.HNSW_SEARCH_EF}")
+    try:
+        result = create_vector_store().rebuild_collection()
+    except Exception as e:
+        print(f"❌ Error rebuilding index: {e}")
+        return
+    print(f"✅ Rebuilt {result['chunks_copied']} chunks from stored embeddings in {result['seconds']:.1f}s")
+
+def run_model_migration(model_name: str):
+    vector_store = create_vector_store()
+    if not isinstance(vector_store, VectorStore):
+        print("❌ Model migration does not support sharded stores yet; clear and re-ingest with the new EMBEDDING_MODEL")
+        return
+    
+    print(f"🔁 Re-embedding {vector_store.collection_name} with {model_name} "
+          f"({settings.MIGRATION_BATCH_SIZE} chunks per batch); queries keep using the current model until it is done")
+    migration = ModelMigration(vector_store, model_name).start()
+    try:
+        while not migration.wait(timeout=5):
+            status = migration.status()
+            print(f"   {status['chunks_embedded'] + status['chunks_skipped']}/{status['chunks_total']} chunks "
+                  f"({status['seconds']:.0f}s)")
+    except KeyboardInterrupt:
+        print("\n⏹️ Stopping after the current batch; run the same command again to resume")
+        migration.cancel()
+        migration.wait()
+    
+    status = migration.status()
+    if status['state'] == STATE_COMPLETED:
+        print(f"✅ Switched to {model_name}: {status['chunks_embedded']} chunks embedded, "
+              f"{status['chunks_skipped']} reused, in {status['seconds']:.1f}s")
+        print(f"💡 Set EMBEDDING_MODEL={model_name} so new processes load it directly")
+    elif status['state'] == STATE_FAILED:
+        print(f"❌ Error migrating to {model_name}: {status['error']}")
+
+@contextmanager
+def profiled(profile_directory: str, command: str, rag: RAGPipeline = None):
+    """Profile the command into a new run directory when --profile is given"""
+    if not profile_directory:
+        yield
+        return
+    
+    run_directory = Path(profile_directory) / f"{time.strftime('%Y%m%d-%H%M%S')}-{command}"
+    with ExitStack() as stack:
+        if rag is not None:
+            profiler = stack.enter_context(rag.profile(str(run_directory)))
+        else:
+            # Commands that do not use the pipeline are profiled as one stage
+            profiler = stack.enter_context(Profiler(str(run_directory)))
+            stack.enter_context(profiler.stage(command))
+        yield
+    
+    print(f"\n🔬 Profile written to {run_directory} (summary.txt, one .prof per stage, {COLLAPSED_FILE} for flamegraphs)")
+    print("   Slowest of our functions (cumulative):")
+    for function in profiler.hot_functions(project_only=True, limit=10):
+        print(f"   {function['cumulative_seconds']:8.3f}s  {function['function']}")
+
 def main():
     parser = argparse.ArgumentParser(description='Personal Knowledge Assistant')
     parser.add_argument('--ui', action='store_true', help='Launch Streamlit UI')
     parser.add_argument('--ingest', type=str, help='Ingest documents from directory')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted --ingest of the same directory where it stopped')
     parser.add_argument('--query', type=str, help='Ask a question')
+    parser.add_argument('--shard', action='append', metavar='NAME',
+                        help='Limit --query to a shard (repeatable; requires SHARDING_ENABLED)')
+    parser.add_argument('--file', action='append', metavar='FILENAME',
+                        help='Limit --query to an indexed file (repeatable)')
+    parser.add_argument('--file-type', action='append', metavar='EXT',
+                        help='Limit --query to a file type such as pdf (repeatable)')
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                        help='Answer --query within this many seconds, extracting from sources if the LLM is late')
     parser.add_argument('--clear', action='store_true', help='Clear knowledge base')
     parser.add_argument('--stats', action='store_true', help='Show knowledge base stats')
+    parser.add_argument('--watch', nargs='?', const=settings.DOCUMENTS_DIRECTORY, metavar='DIRECTORY',
+                        help='Watch a directory and re-index changed files (default: DOCUMENTS_DIRECTORY)')
+    parser.add_argument('--jobs', action='store_true', help='Show background ingestion jobs')
+    parser.add_argument('--cancel-job', type=str, metavar='JOB_ID', help='Cancel a running ingestion job')
+    parser.add_argument('--export-index', type=str, metavar='PATH', help='Write an index snapshot to a directory')
+    parser.add_argument('--import-index', type=str, metavar='PATH',
+                        help='Replace the index with a snapshot (verifies checksums, no re-embedding)')
+    parser.add_argument('--rebuild-index', action='store_true',
+                        help='Re-create the index with the HNSW_* settings from stored embeddings')
+    parser.add_argument('--migrate-model', type=str, metavar='MODEL',
+                        help='Re-embed the index with another embedding model in the background, then switch to it')
+    parser.add_argument('--snapshot-dtype', choices=['float32', 'float16'], default='float32',
+                        help='Embedding precision for --export-index (default: float32)')
+    parser.add_argument('--profile', nargs='?', const=settings.PROFILE_DIRECTORY, metavar='DIRECTORY',
+                        help='Profile --ingest, --query, --watch or an index command per pipeline stage '
+                             '(default: PROFILE_DIRECTORY)')
     
     args = parser.parse_args()
     
+    # Job inspection only reads persisted state, so it does not need the pipeline
+    if args.jobs:
+        show_jobs()
+        return
+    
+    if args.cancel_job:
+        if request_job_cancellation(args.cancel_job):
+            print(f"⏹️ Cancellation requested for job {args.cancel_job}")
+        else:
+            print(f"❌ Job {args.cancel_job} not found or already finished")
+        return
+    
+    if args.rebuild_index:
+        with profiled(args.profile, 'rebuild-index'):
+            run_rebuild_index()
+        return
+    
+    if args.migrate_model:
+        with profiled(args.profile, 'migrate-model'):
+            run_model_migration(args.migrate_model)
+        return
+    
+    if args.export_index or args.import_index:
+        with profiled(args.profile, 'export-index' if args.export_index else 'import-index'):
+            run_index_snapshot(args.export_index, args.import_index, args.snapshot_dtype)
+        return
+    
     # Check for required API key
     try:
         settings.validate_required_keys()
@@ -62,26 +286,46 @@ def main():
         print(f"❌ Error initializing RAG pipeline: {e}")
         return
     
+    profiling = ExitStack()
+    command = 'ingest' if args.ingest else 'watch' if args.watch else 'query' if args.query else None
+    if args.profile and command:
+        profiling.enter_context(profiled(args.profile, command, rag))
+    elif args.profile:
+        print("⚠️ --profile only applies to --ingest, --query, --watch and the index commands")
+    
     if args.ingest:
         print(f"📂 Ingesting documents from: {args.ingest}")
-        result = rag.ingest_documents(args.ingest)
-        
-        if result['success']:
-            print(f"✅ Successfully processed {result['documents_processed']} documents")
-            print(f"📊 Total chunks in knowledge base: {result['stats']['total_chunks']}")
-        else:
-            print(f"❌ Error: {result['error']}")
+        run_ingestion_job(rag, args.ingest, resume=args.resume)
+    
+    elif args.watch:
+        run_watch_mode(rag, args.watch)
     
     elif args.query:
+        if args.shard and not settings.SHARDING_ENABLED:
+            print("⚠️ --shard is ignored unless SHARDING_ENABLED=true")
+            args.shard = None
+        
         print(f"🤔 Question: {args.query}")
         print("🔍 Searching knowledge base...")
         
-        result = rag.query(args.query)
+        filters = {}
+        if args.file:
+            filters['filenames'] = args.file
+        if args.file_type:
+            filters['file_extensions'] = args.file_type
+        
+        result = rag.query(args.query, shards=args.shard, filters=filters or None, deadline_seconds=args.deadline)
         
         if result['success']:
+            if result.get('fallback'):
+                print(f"\n⏱️ No LLM answer after {result['elapsed_seconds']:.1f}s ({result['fallback_reason']}); showing extracted passages")
             print(f"\n💡 Answer: {result['answer']}")
             if result.get('sources'):
                 print(f"\n📚 Sources: {', '.join(result['sources'])}")
+            if result.get('compression'):
+                compression = result['compression']
+                print(f"🗜️ Context: {compression['original_tokens']} → {compression['compressed_tokens']} tokens "
+                      f"({compression['compression_ratio']:.1f}x, {compression['tokens_saved']} saved)")
         else:
             print(f"❌ Error: {result['error']}")
     
@@ -103,8 +347,20 @@ def main():
             print(f"   Total chunks: {stats.get('total_chunks', 0)}")
             print(f"   Collection: {stats.get('collection_name', 'N/A')}")
             print(f"   Embedding model: {stats.get('embedding_model', 'N/A')}")
+            if stats.get('index_parameters'):
+                parameters = ", ".join(f"{key[5:]}={value}" for key, value in stats['index_parameters'].items())
+                print(f"   Index: {parameters}")
+            if stats.get('embedding_cache'):
+                cache = stats['embedding_cache']
+                print(f"   Embedding cache: {cache['entries']} of {cache['capacity']} embeddings "
+                      f"({cache['size_bytes'] / 1024 / 1024:.1f} MB)")
             print(f"   Total files: {result['total_files']}")
             
+            if stats.get('shards'):
+                print("\n🗂️ Shards:")
+                for shard, count in stats['shards'].items():
+                    print(f"   • {shard}: {count} chunks")
+            
             if result['files']:
                 print("\n📄 Indexed files:")
                 for file in result['files'][:10]:
@@ -119,10 +375,23 @@ def main():
         print("\nUsage:")
         print("  python main.py --ui                    # Launch web interface")
         print("  python main.py --ingest ./documents    # Ingest documents")
+        print("  python main.py --ingest ./documents --resume  # Continue an interrupted ingest")
         print("  python main.py --query 'your question' # Ask a question")
+        print("  python main.py --query '...' --shard algorithms  # Ask within one course")
+        print("  python main.py --query '...' --file notes.pdf    # Ask within one file")
+        print("  python main.py --query '...' --deadline 5        # Answer within 5 seconds")
         print("  python main.py --stats                 # Show stats")
+        print("  python main.py --jobs                  # Show ingestion jobs")
+        print("  python main.py --watch                 # Re-index documents as they change")
+        print("  python main.py --export-index ./snap   # Export index snapshot")
+        print("  python main.py --import-index ./snap   # Load index snapshot")
+        print("  python main.py --rebuild-index         # Apply new HNSW_* settings")
+        print("  python main.py --migrate-model all-mpnet-base-v2  # Switch embedding models without downtime")
         print("  python main.py --clear                 # Clear knowledge base")
+        print("  python main.py --query '...' --profile # Profile a command per pipeline stage")
         print("\n💡 For the best experience, use: python main.py --ui")
+    
+    profiling.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
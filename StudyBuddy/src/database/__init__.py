@@ -1,3 +1,9 @@
 from .vector_store import VectorStore
+from .sharded_store import ShardedVectorStore, create_vector_store
+from .index_coordination import IndexCoordinator
+from .document_store import DocumentStore
+from .dimension_reduction import EmbeddingProjection
+from .embedding_cache import EmbeddingCache
+from .model_migration import ModelMigration
 
-__all__ = ['VectorStore']
\ No newline at end of file
+__all__ = ['VectorStore', 'ShardedVectorStore', 'create_vector_store', 'IndexCoordinator', 'DocumentStore', 'EmbeddingProjection', 'EmbeddingCache', 'ModelMigration']
\ No newline at end of file
@@ -2,6 +2,13 @@ import os
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 
+# reload_persisted_segments and release_vector_segment reset private SegmentManager state as laid
+# out in this release (the requirements.txt pin); other releases may keep it differently
+SEGMENT_INTERNALS_CHROMADB_VERSION = "0.5.18"
+
+def segment_internals_supported() -> bool:
+    return chromadb.__version__ == SEGMENT_INTERNALS_CHROMADB_VERSION
+
 def get_chroma_client(persist_directory: str):
     """Get a ChromaDB client with proper configuration to avoid telemetry issues"""
     
@@ -29,4 +36,64 @@ def get_chroma_client(persist_directory: str):
             return client
         except Exception as e2:
             print(f"ChromaDB initialization error: {e2}")
-            raise e2
\ No newline at end of file
+            raise e2
+
+def reload_persisted_segments(client):
+    """Drop the client's loaded index segments so the next access reads them from disk.
+
+    Chroma loads a collection's HNSW segment once per process and only sees
+    writes made through that process; another process writing to the same
+    directory goes unnoticed. Stopping the instances closes their files without
+    persisting anything. (The manager's reset_state would also wipe the data
+    when allow_reset is on, so it is not used here.)
+    
+    This relies on Chroma internals, so it raises RuntimeError on any chromadb
+    version other than SEGMENT_INTERNALS_CHROMADB_VERSION rather than leave the
+    process on a stale index it could write over.
+    """
+    if not segment_internals_supported():
+        raise RuntimeError(
+            f"Another process has written to the index, but reloading it is only supported on "
+            f"chromadb {SEGMENT_INTERNALS_CHROMADB_VERSION} (installed: {chromadb.__version__}). "
+            f"Install chromadb=={SEGMENT_INTERNALS_CHROMADB_VERSION} or run a single process per "
+            f"CHROMA_PERSIST_DIRECTORY, and restart this one."
+        )
+    
+    from chromadb.segment import SegmentManager
+    
+    manager = client._system.instance(SegmentManager)
+    with manager._lock:
+        for instance in manager._instances.values():
+            instance.stop()
+        manager._instances = {}
+        for cache in manager.segment_cache.values():
+            cache.reset()
+        file_handles = getattr(manager, '_vector_instances_file_handle_cache', None)
+        if file_handles is not None:
+            file_handles.cache.clear()
+
+def release_vector_segment(client, collection_id) -> bool:
+    """Unload a collection's HNSW segment and close its files; the next query loads it again.
+
+    Only the vector segment is released: it holds the index in memory and
+    keeps file handles open, while the metadata segment is a view of the
+    shared SQLite database. Returns False, leaving the segment loaded, on
+    chromadb versions other than SEGMENT_INTERNALS_CHROMADB_VERSION.
+    """
+    if not segment_internals_supported():
+        return False
+    
+    from chromadb.segment import SegmentManager
+    from chromadb.types import SegmentScope
+    
+    manager = client._system.instance(SegmentManager)
+    with manager._lock:
+        segment = manager.segment_cache[SegmentScope.VECTOR].pop(collection_id)
+        if segment is not None:
+            instance = manager._instances.pop(segment['id'], None)
+            if instance is not None:
+                instance.stop()
+        file_handles = getattr(manager, '_vector_instances_file_handle_cache', None)
+        if file_handles is not None:
+            file_handles.cache.pop(collection_id, None)
+    return True
@@ -0,0 +1,207 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+
+REDUCTION_NONE = "none"
+REDUCTION_PCA = "pca"
+REDUCTION_TRUNCATE = "truncate"
+REDUCTIONS = (REDUCTION_NONE, REDUCTION_PCA, REDUCTION_TRUNCATE)
+
+# Recorded in the collection metadata, so a collection keeps the reduction it was built with
+REDUCTION_KEY = "embedding:reduction"
+DIMENSION_KEY = "embedding:dimension"
+
+PROJECTION_DIRECTORY = "projections"
+FULL_EMBEDDINGS_FILE = "full_embeddings.sqlite3"
+
+def reduction_metadata(method: Optional[str] = None, dimension: Optional[int] = None) -> Dict[str, Any]:
+    """Collection metadata for the embedding reduction, defaulting to the configured one"""
+    method = (method or settings.EMBEDDING_REDUCTION).lower()
+    if method not in REDUCTIONS:
+        raise ValueError(f"Unknown EMBEDDING_REDUCTION {method!r}; use one of {', '.join(REDUCTIONS)}")
+    if method == REDUCTION_NONE:
+        return {}
+    return {REDUCTION_KEY: method, DIMENSION_KEY: dimension or settings.REDUCED_EMBEDDING_DIMENSION}
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.clip(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12, None)
+
+class EmbeddingProjection:
+    """Maps full-width embeddings to ``dimension`` dimensions for a smaller, faster index.
+
+    ``fit_pca`` keeps the ``dimension`` principal directions of the corpus
+    embeddings; ``truncation`` keeps the first ``dimension`` coordinates.
+    Projected vectors are re-normalized, so cosine distance in the index
+    still ranks by angle in the reduced space. ``samples`` is the number of
+    embeddings a PCA was fitted on (None when unknown or for truncation).
+    """
+
+    def __init__(
+        self,
+        method: str,
+        dimension: int,
+        full_dimension: int,
+        components: Optional[np.ndarray] = None,
+        samples: Optional[int] = None
+    ):
+        self.method = method
+        self.dimension = dimension
+        self.full_dimension = full_dimension
+        self.components = components
+        self.samples = samples
+
+    @classmethod
+    def fit_pca(cls, embeddings: np.ndarray, dimension: int) -> "EmbeddingProjection":
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        # Not centred: the uncentred directions best preserve the dot products that
+        # cosine search ranks by, while centring would rank by a different similarity
+        _, _, components = np.linalg.svd(embeddings, full_matrices=False)
+        components = components[:dimension]
+        if len(components) < dimension:
+            # Fewer samples than dimensions: the missing directions stay zero
+            padding = np.zeros((dimension - len(components), embeddings.shape[1]), dtype=np.float32)
+            components = np.vstack([components, padding])
+        return cls(REDUCTION_PCA, dimension, embeddings.shape[1], components.astype(np.float32), len(embeddings))
+
+    @classmethod
+    def truncation(cls, full_dimension: int, dimension: int) -> "EmbeddingProjection":
+        return cls(REDUCTION_TRUNCATE, dimension, full_dimension)
+
+    def transform(self, embeddings) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.method == REDUCTION_PCA:
+            reduced = embeddings @ self.components.T
+        else:
+            reduced = embeddings[..., :self.dimension]
+        return _normalize(reduced).astype(np.float32)
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            'method': np.array(self.method),
+            'dimension': np.array(self.dimension),
+            'full_dimension': np.array(self.full_dimension)
+        }
+        if self.method == REDUCTION_PCA:
+            arrays['components'] = self.components
+        if self.samples is not None:
+            arrays['samples'] = np.array(self.samples)
+        tmp_path = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["EmbeddingProjection"]:
+        if not path.exists():
+            return None
+        with np.load(path) as arrays:
+            method = str(arrays['method'])
+            return cls(
+                method,
+                int(arrays['dimension']),
+                int(arrays['full_dimension']),
+                arrays['components'] if method == REDUCTION_PCA else None,
+                int(arrays['samples']) if 'samples' in arrays else None
+            )
+
+class FullEmbeddingStore:
+    """Full-width embeddings of chunks indexed at a reduced dimension, for rescoring.
+
+    Stored as float16 in a SQLite file next to the index; that precision is
+    plenty for re-ranking a handful of candidates.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                collection TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (collection, chunk_id)
+            )
+        """)
+        self._connection.commit()
+
+    def put(self, collection: str, chunk_ids: List[str], embeddings: np.ndarray):
+        vectors = np.asarray(embeddings, dtype=np.float16)
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                [(collection, chunk_id, vector.tobytes()) for chunk_id, vector in zip(chunk_ids, vectors)]
+            )
+            self._connection.commit()
+
+    def get(self, collection: str, chunk_ids: List[str]) -> Dict[str, np.ndarray]:
+        if not chunk_ids:
+            return {}
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT chunk_id, vector FROM embeddings WHERE collection = ? "
+                f"AND chunk_id IN ({','.join('?' * len(chunk_ids))})",
+                [collection] + list(chunk_ids)
+            ).fetchall()
+        return {chunk_id: np.frombuffer(vector, dtype=np.float16).astype(np.float32) for chunk_id, vector in rows}
+
+    def count(self, collection: str) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM embeddings WHERE collection = ?", (collection,)
+            ).fetchone()[0]
+
+    def all(self, collection: str) -> Tuple[List[str], np.ndarray]:
+        """Every chunk id of a collection and its embedding, as one array"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT chunk_id, vector FROM embeddings WHERE collection = ? ORDER BY chunk_id", (collection,)
+            ).fetchall()
+        if not rows:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        return [chunk_id for chunk_id, _ in rows], np.stack([
+            np.frombuffer(vector, dtype=np.float16) for _, vector in rows
+        ]).astype(np.float32)
+
+    def rename(self, collection: str, new_name: str):
+        with self._lock:
+            self._connection.execute("UPDATE embeddings SET collection = ? WHERE collection = ?", (new_name, collection))
+            self._connection.commit()
+
+    def delete(self, collection: str, chunk_ids: Optional[List[str]] = None):
+        """Delete some chunks of a collection, or all of them"""
+        with self._lock:
+            if chunk_ids is None:
+                self._connection.execute("DELETE FROM embeddings WHERE collection = ?", (collection,))
+            else:
+                self._connection.executemany(
+                    "DELETE FROM embeddings WHERE collection = ? AND chunk_id = ?",
+                    [(collection, chunk_id) for chunk_id in chunk_ids]
+                )
+            self._connection.commit()
+
+_full_embedding_stores: Dict[str, FullEmbeddingStore] = {}
+_full_embedding_stores_lock = threading.Lock()
+
+def persist_directory(client) -> Optional[str]:
+    client_settings = client.get_settings()
+    if not client_settings.is_persistent or not client_settings.persist_directory:
+        return None
+    return os.path.realpath(client_settings.persist_directory)
+
+def projection_path(directory: str, collection_name: str) -> Path:
+    return Path(directory) / PROJECTION_DIRECTORY / f"{collection_name}.npz"
+
+def get_full_embedding_store(directory: str) -> FullEmbeddingStore:
+    """The process-wide full-embedding store of a persist directory"""
+    with _full_embedding_stores_lock:
+        if directory not in _full_embedding_stores:
+            _full_embedding_stores[directory] = FullEmbeddingStore(os.path.join(directory, FULL_EMBEDDINGS_FILE))
+        return _full_embedding_stores[directory]
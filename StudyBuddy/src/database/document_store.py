@@ -0,0 +1,243 @@
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from config.settings import settings
+
+DOCUMENT_STORE_FILE = "documents.sqlite3"
+# Documents are split into blocks so a chunk only decompresses the text around it
+BLOCK_CHARS = 64 * 1024
+
+class DocumentWriter:
+    """Appends the text of one document to the store block by block"""
+
+    def __init__(self, store: "DocumentStore", doc_id: str, collection: str):
+        self.store = store
+        self.doc_id = doc_id
+        self.collection = collection
+        self.length = 0
+        self._block = 0
+        self._written = 0
+        self._buffer: List[str] = []
+        self._buffered = 0
+
+    def write(self, text: str):
+        self._buffer.append(text)
+        self._buffered += len(text)
+        self.length += len(text)
+        while self._buffered >= BLOCK_CHARS:
+            pending = ''.join(self._buffer)
+            self._write_block(pending[:BLOCK_CHARS])
+            rest = pending[BLOCK_CHARS:]
+            self._buffer, self._buffered = ([rest] if rest else []), len(rest)
+
+    def flush(self):
+        """Store the text written so far, so chunks pointing into it can be read"""
+        if self._buffered:
+            self._write_block(''.join(self._buffer))
+            self._buffer, self._buffered = [], 0
+
+    def close(self, metadata: Optional[Dict[str, Any]] = None):
+        self.flush()
+        self.store._finish_document(self, metadata or {})
+
+    def _write_block(self, text: str):
+        self.store._put_block(self.doc_id, self._block, self._written, text)
+        self._block += 1
+        self._written += len(text)
+
+class DocumentStore:
+    """Cleaned text of every document, stored once, that chunks point into by offsets.
+
+    With ``OFFSET_CHUNK_STORAGE`` the vector store keeps only a document id and
+    character offsets per chunk instead of its text, so the overlap between
+    neighbouring chunks is not stored twice. Text is kept in blocks of
+    ``BLOCK_CHARS`` characters (zlib-compressed with ``compress``) in a SQLite
+    file next to the index; recently read blocks are cached decompressed.
+    Per-document fields that every chunk used to repeat (title, first line)
+    are stored once with the document, along with the collection and file it
+    belongs to so deleting a file or clearing a collection removes its text.
+
+    A document id always names the same text (a stable id comes from the file
+    fingerprint), so cached blocks never go stale.
+    """
+
+    def __init__(self, path: str, compress: Optional[bool] = None, cache_blocks: Optional[int] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.compress = settings.DOCUMENT_STORE_COMPRESSION if compress is None else compress
+        self.cache_blocks = max(1, cache_blocks or settings.DOCUMENT_STORE_CACHE_BLOCKS)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS blocks (
+                doc_id TEXT NOT NULL,
+                block INTEGER NOT NULL,
+                start_char INTEGER NOT NULL,
+                end_char INTEGER NOT NULL,
+                compressed INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (doc_id, block)
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id TEXT PRIMARY KEY,
+                collection TEXT NOT NULL,
+                filename TEXT,
+                length INTEGER NOT NULL,
+                title TEXT,
+                first_line TEXT
+            );
+            CREATE INDEX IF NOT EXISTS documents_by_file ON documents (collection, filename);
+        """)
+        self._connection.commit()
+        self._cache: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+        self._writers: Dict[str, DocumentWriter] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def open_document(self, doc_id: str, collection: str) -> DocumentWriter:
+        writer = DocumentWriter(self, doc_id, collection)
+        with self._lock:
+            self._writers[doc_id] = writer
+        return writer
+
+    def put(self, doc_id: str, collection: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        writer = self.open_document(doc_id, collection)
+        writer.write(text)
+        writer.close(metadata)
+
+    def flush_pending(self):
+        """Store the buffered text of documents still being written"""
+        with self._lock:
+            writers = list(self._writers.values())
+        for writer in writers:
+            writer.flush()
+
+    def _put_block(self, doc_id: str, block: int, start_char: int, text: str):
+        data = text.encode('utf-8')
+        if self.compress:
+            data = zlib.compress(data, 6)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?, ?)",
+                (doc_id, block, start_char, start_char + len(text), int(self.compress), data)
+            )
+            self._connection.commit()
+
+    def _finish_document(self, writer: DocumentWriter, metadata: Dict[str, Any]):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                (writer.doc_id, writer.collection, metadata.get('filename'), writer.length,
+                 metadata.get('title'), metadata.get('first_line'))
+            )
+            self._connection.commit()
+            self._writers.pop(writer.doc_id, None)
+
+    def _block_text(self, doc_id: str, block: int, compressed: int, data: bytes) -> str:
+        text = (zlib.decompress(data) if compressed else data).decode('utf-8')
+        self._cache[(doc_id, block)] = text
+        while len(self._cache) > self.cache_blocks:
+            self._cache.popitem(last=False)
+        return text
+
+    def get_text(self, doc_id: str, start_char: int, end_char: int) -> Optional[str]:
+        """Characters ``start_char:end_char`` of a document, or None if it is not stored"""
+        with self._lock:
+            spans = self._connection.execute(
+                "SELECT block, start_char FROM blocks WHERE doc_id = ? AND end_char > ? AND start_char < ? "
+                "ORDER BY block",
+                (doc_id, start_char, max(end_char, start_char + 1))
+            ).fetchall()
+            if not spans:
+                return None
+
+            pieces = []
+            for block, block_start in spans:
+                text = self._cache.get((doc_id, block))
+                if text is None:
+                    self.cache_misses += 1
+                    compressed, data = self._connection.execute(
+                        "SELECT compressed, data FROM blocks WHERE doc_id = ? AND block = ?", (doc_id, block)
+                    ).fetchone()
+                    text = self._block_text(doc_id, block, compressed, data)
+                else:
+                    self.cache_hits += 1
+                    self._cache.move_to_end((doc_id, block))
+                pieces.append(text[max(start_char - block_start, 0):max(end_char - block_start, 0)])
+        return ''.join(pieces)
+
+    def get_metadata(self, doc_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Title and first line stored with each document"""
+        doc_ids = list(set(doc_ids))
+        if not doc_ids:
+            return {}
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT doc_id, title, first_line FROM documents WHERE doc_id IN ({','.join('?' * len(doc_ids))})",
+                doc_ids
+            ).fetchall()
+        return {
+            doc_id: {key: value for key, value in (('title', title), ('first_line', first_line)) if value is not None}
+            for doc_id, title, first_line in rows
+        }
+
+    def document_ids(self, collection: str, filename: Optional[str] = None) -> List[str]:
+        """Documents stored for a collection, or for one file of it"""
+        query, parameters = "SELECT doc_id FROM documents WHERE collection = ?", [collection]
+        if filename is not None:
+            query += " AND filename = ?"
+            parameters.append(filename)
+        with self._lock:
+            return [row[0] for row in self._connection.execute(query, parameters).fetchall()]
+
+    def delete(self, doc_ids: Iterable[str]):
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return
+        with self._lock:
+            for table in ('blocks', 'documents'):
+                self._connection.executemany(f"DELETE FROM {table} WHERE doc_id = ?", [(doc_id,) for doc_id in doc_ids])
+            self._connection.commit()
+            removed = set(doc_ids)
+            for key in [key for key in self._cache if key[0] in removed]:
+                del self._cache[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            documents, characters = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents"
+            ).fetchone()
+            stored_bytes = self._connection.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM blocks").fetchone()[0]
+        return {
+            'documents': documents,
+            'characters': characters,
+            'stored_bytes': stored_bytes,
+            'file_bytes': self.path.stat().st_size if self.path.exists() else 0
+        }
+
+_stores: Dict[str, DocumentStore] = {}
+_stores_lock = threading.Lock()
+
+def get_document_store(client, create: bool = True) -> Optional[DocumentStore]:
+    """The process-wide document store in the client's persist directory.
+
+    None for an in-memory client, and with ``create=False`` also when no
+    document has been stored in that directory yet.
+    """
+    client_settings = client.get_settings()
+    if not client_settings.is_persistent or not client_settings.persist_directory:
+        return None
+
+    key = os.path.realpath(client_settings.persist_directory)
+    with _stores_lock:
+        if key not in _stores:
+            if not create and not os.path.exists(os.path.join(key, DOCUMENT_STORE_FILE)):
+                return None
+            _stores[key] = DocumentStore(os.path.join(key, DOCUMENT_STORE_FILE))
+        return _stores[key]
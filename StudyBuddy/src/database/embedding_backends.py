@@ -0,0 +1,275 @@
+import importlib.util
+import inspect
+import json
+import re
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+
+from config.settings import settings
+
+BACKEND_TORCH = "torch"
+BACKEND_ONNX = "onnx"
+BACKEND_ONNX_INT8 = "onnx-int8"
+BACKENDS = (BACKEND_TORCH, BACKEND_ONNX, BACKEND_ONNX_INT8)
+
+# Exports live next to the saved model: <model directory>/onnx/model.onnx
+ONNX_DIRECTORY = "onnx"
+ONNX_FILE = "model.onnx"
+ONNX_INT8_FILE = "model_int8.onnx"
+ONNX_OPSET = 17
+
+# Written by save_model_locally, so a saved copy is not mistaken for another model
+SOURCE_MODEL_FILE = "source_model.json"
+
+# Recorded in the collection metadata: the model and width of the vectors it was embedded with
+MODEL_KEY = "embedding:model"
+MODEL_DIMENSION_KEY = "embedding:model_dimension"
+
+TRANSFORMER_MODULE = "sentence_transformers.models.Transformer"
+POOLING_MODULE = "sentence_transformers.models.Pooling"
+NORMALIZE_MODULE = "sentence_transformers.models.Normalize"
+
+def is_saved_model(model_directory: Optional[str], model_name: Optional[str] = None) -> bool:
+    """Whether the directory holds a saved model, and with ``model_name`` whether it is that model"""
+    if not model_directory or not (Path(model_directory) / "modules.json").exists():
+        return False
+    source_path = Path(model_directory) / SOURCE_MODEL_FILE
+    if model_name is None or not source_path.exists():
+        return True  # Saved before the source model was recorded
+    return json.loads(source_path.read_text(encoding='utf-8')).get('model') == model_name
+
+def save_model_locally(model_directory: str, model_name: Optional[str] = None) -> Path:
+    """Download the embedding model once and save it for offline use"""
+    from sentence_transformers import SentenceTransformer
+
+    model_name = model_name or settings.EMBEDDING_MODEL
+    model_directory = Path(model_directory)
+    SentenceTransformer(model_name, device='cpu').save(str(model_directory))
+    (model_directory / SOURCE_MODEL_FILE).write_text(json.dumps({'model': model_name}), encoding='utf-8')
+    print(f"Saved {model_name} to {model_directory}")
+    return model_directory
+
+def model_directory_for(model_name: str) -> str:
+    """Where the local copy of a model is kept: EMBEDDING_MODEL_DIRECTORY for the configured
+    model, a directory next to it named after the model for any other"""
+    if model_name == settings.EMBEDDING_MODEL:
+        return settings.EMBEDDING_MODEL_DIRECTORY
+    return str(Path(settings.EMBEDDING_MODEL_DIRECTORY).parent / re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name))
+
+def onnx_model_path(model_directory: str, quantized: bool = False) -> Path:
+    return Path(model_directory) / ONNX_DIRECTORY / (ONNX_INT8_FILE if quantized else ONNX_FILE)
+
+def require_onnx_packages(export: bool = True):
+    """Raise ImportError naming the missing packages before anything is downloaded or exported"""
+    packages = ['onnxruntime'] + (['onnx'] if export else [])
+    missing = [package for package in packages if importlib.util.find_spec(package) is None]
+    if missing:
+        raise ImportError(
+            f"The ONNX embedding backends need {' and '.join(missing)}; install them with "
+            f"`pip install -r requirements.txt` or set EMBEDDING_BACKEND={BACKEND_TORCH}"
+        )
+
+def export_onnx_model(model_directory: str, quantize: bool = True) -> Dict[str, Path]:
+    """Export the transformer of a saved sentence-transformers model to ONNX.
+
+    Only the transformer is exported; tokenization, pooling and normalization
+    are read from the saved model's configuration by ``OnnxEmbeddingModel``.
+    With ``quantize`` an int8 copy with dynamically quantized weights is
+    written as well. Needs torch and the ``onnx`` package, once.
+    """
+    require_onnx_packages()
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(str(model_directory), device='cpu')
+    transformer = model[0].auto_model.eval()
+    sample = model[0].tokenizer(["An example sentence", "Another one"], padding=True, return_tensors='pt')
+    # Passed positionally, so in the order of the transformer's forward() arguments
+    parameters = list(inspect.signature(transformer.forward).parameters)
+    input_names = sorted(sample.keys(), key=parameters.index)
+
+    paths = {BACKEND_ONNX: onnx_model_path(model_directory)}
+    paths[BACKEND_ONNX].parent.mkdir(parents=True, exist_ok=True)
+    export_options = {}
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        export_options['dynamo'] = False  # The TorchScript exporter handles dynamic batch and sequence sizes
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            str(paths[BACKEND_ONNX]),
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes={name: {0: 'batch', 1: 'sequence'} for name in input_names + ['last_hidden_state']},
+            opset_version=ONNX_OPSET,
+            **export_options
+        )
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        paths[BACKEND_ONNX_INT8] = onnx_model_path(model_directory, quantized=True)
+        quantize_dynamic(str(paths[BACKEND_ONNX]), str(paths[BACKEND_ONNX_INT8]), weight_type=QuantType.QInt8)
+    print(f"Exported ONNX embedding model to {paths[BACKEND_ONNX].parent}")
+    return paths
+
+class OnnxEmbeddingModel:
+    """Sentence embeddings from an ONNX export of a sentence-transformers model.
+
+    Uses the saved model's own tokenizer, maximum sequence length, pooling and
+    normalization, so vectors match the PyTorch model up to numerical
+    precision (and int8 rounding for the quantized graph). Runs on
+    onnxruntime and the ``tokenizers`` library without importing torch.
+    ``encode`` accepts the arguments the code base passes to
+    SentenceTransformer.encode.
+    """
+
+    def __init__(self, model_directory: str, quantized: bool = False):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_directory = Path(model_directory)
+        self.quantized = quantized
+        modules = json.loads((self.model_directory / "modules.json").read_text(encoding='utf-8'))
+        module_paths = {module['type']: self.model_directory / module['path'] for module in modules}
+        if TRANSFORMER_MODULE not in module_paths or POOLING_MODULE not in module_paths:
+            raise ValueError(f"{model_directory} is not a transformer + pooling sentence-transformers model")
+
+        transformer_path = module_paths[TRANSFORMER_MODULE]
+        transformer_config = json.loads((transformer_path / "sentence_bert_config.json").read_text(encoding='utf-8'))
+        pooling_config = json.loads((module_paths[POOLING_MODULE] / "config.json").read_text(encoding='utf-8'))
+        self.pooling_mode = next(
+            (mode for mode in ('cls_token', 'max_tokens', 'mean_tokens') if pooling_config.get(f"pooling_mode_{mode}")),
+            None
+        )
+        if self.pooling_mode is None:
+            raise ValueError(f"Unsupported pooling in {model_directory}: {pooling_config}")
+        self.normalize = NORMALIZE_MODULE in module_paths
+        self.dimension = pooling_config['word_embedding_dimension']
+
+        self.tokenizer = Tokenizer.from_file(str(transformer_path / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=transformer_config.get('max_seq_length') or 512)
+        special_tokens_path = transformer_path / "special_tokens_map.json"
+        pad_token = "[PAD]"
+        if special_tokens_path.exists():
+            pad_token = json.loads(special_tokens_path.read_text(encoding='utf-8')).get('pad_token', pad_token)
+            if isinstance(pad_token, dict):
+                pad_token = pad_token['content']
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            str(onnx_model_path(model_directory, quantized)), options, providers=['CPUExecutionProvider']
+        )
+        self.input_names = [graph_input.name for graph_input in self.session.get_inputs()]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _embed_batch(self, sentences: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(sentences)
+        features = {
+            'input_ids': np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            'attention_mask': np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+            'token_type_ids': np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+        }
+        token_embeddings = self.session.run(None, {name: features[name] for name in self.input_names})[0]
+
+        mask = features['attention_mask'][:, :, None].astype(np.float32)
+        if self.pooling_mode == 'cls_token':
+            return token_embeddings[:, 0]
+        if self.pooling_mode == 'max_tokens':
+            return np.where(mask > 0, token_embeddings, -1e9).max(axis=1)
+        return (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        **kwargs
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+        if not sentences:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        # Like SentenceTransformer, batch sentences of similar length to pad less
+        order = np.argsort([-len(sentence) for sentence in sentences], kind='stable')
+        embeddings = np.empty((len(sentences), self.dimension), dtype=np.float32)
+        for start in range(0, len(sentences), batch_size):
+            batch = order[start:start + batch_size]
+            embeddings[batch] = self._embed_batch([sentences[i] for i in batch])
+
+        if self.normalize or normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
+
+def embedding_model_id(backend: Optional[str] = None, model_name: Optional[str] = None) -> str:
+    """Names the vectors a backend produces: the model name, plus the backend unless it is torch"""
+    backend = (backend or settings.EMBEDDING_BACKEND).lower()
+    model_name = model_name or settings.EMBEDDING_MODEL
+    return model_name if backend == BACKEND_TORCH else f"{model_name}:{backend}"
+
+def load_embedding_model(
+    backend: Optional[str] = None,
+    model_directory: Optional[str] = None,
+    model_name: Optional[str] = None
+):
+    """The embedding model for the configured EMBEDDING_BACKEND.
+
+    ``torch`` is SentenceTransformer as before. ``onnx`` and ``onnx-int8`` run
+    an ONNX export of the same model, made on first use. The ONNX backends
+    need a local copy of the model (see ``model_directory_for``); if it is
+    missing, the model is downloaded and saved there once, after which no
+    network access is needed. ``model_name`` defaults to EMBEDDING_MODEL.
+
+    The model's ``embedding_model_name`` attribute is the name collections
+    record; ``embedding_model_id`` also names the backend, whose vectors
+    differ slightly, and keys the embedding cache.
+    """
+    backend = (backend or settings.EMBEDDING_BACKEND).lower()
+    model_name = model_name or settings.EMBEDDING_MODEL
+    model_directory = model_directory or model_directory_for(model_name)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}; use one of {', '.join(BACKENDS)}")
+
+    if backend == BACKEND_TORCH:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_directory if is_saved_model(model_directory, model_name) else model_name)
+    else:
+        if not model_directory:
+            raise ValueError(f"EMBEDDING_BACKEND={backend} needs EMBEDDING_MODEL_DIRECTORY")
+        quantized = backend == BACKEND_ONNX_INT8
+        exported = onnx_model_path(model_directory, quantized).exists()
+        require_onnx_packages(export=not exported)
+        if not is_saved_model(model_directory, model_name):
+            save_model_locally(model_directory, model_name)
+        if not exported:
+            export_onnx_model(model_directory, quantize=quantized)
+        model = OnnxEmbeddingModel(model_directory, quantized=quantized)
+
+    model.embedding_model_name = model_name
+    model.embedding_model_id = embedding_model_id(backend, model_name)
+    return model
+
+_models: Dict[str, Any] = {}
+_models_lock = threading.Lock()
+
+def get_embedding_model(model_name: str):
+    """A process-wide instance of a model, for collections embedded with another model than EMBEDDING_MODEL"""
+    with _models_lock:
+        if model_name not in _models:
+            _models[model_name] = load_embedding_model(model_name=model_name)
+        return _models[model_name]
+
+def model_metadata(model) -> Dict[str, Any]:
+    """Collection metadata recording the model, when it is known, and the width of its vectors"""
+    metadata = {MODEL_DIMENSION_KEY: model.get_sentence_embedding_dimension()}
+    if getattr(model, 'embedding_model_name', None):
+        metadata[MODEL_KEY] = model.embedding_model_name
+    return metadata
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+
+import numpy as np
+
+from config.settings import settings
+
+KEY_BYTES = 16
+# Share of the slots freed at once when the cache is full, least recently used first
+EVICT_FRACTION = 0.1
+
+VECTORS_FILE = "vectors.npy"
+KEYS_FILE = "keys.npy"
+LAST_USED_FILE = "last_used.npy"
+MODEL_FILE = "model.json"
+
+def normalize_text(text: str) -> str:
+    """Unicode- and whitespace-normalized text, so re-extracted chunks that only differ in spacing hit"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+def cache_key(model_id: str, text: str) -> bytes:
+    return hashlib.blake2b(f"{model_id}\0{normalize_text(text)}".encode('utf-8'), digest_size=KEY_BYTES).digest()
+
+class EmbeddingCache:
+    """Persistent content-addressed cache of chunk embeddings for one model.
+
+    Vectors live in a memory-mapped float32 array sized for ``max_size_mb``,
+    next to an array of the key in each slot and its last use. The key of a
+    text is a hash of the model id and the normalized text; the in-memory
+    hash index maps keys to slots and is rebuilt from the key array on open.
+    A slot's stored key is checked on every read, so an entry evicted by
+    another process is a miss, never a wrong vector. When every slot is
+    taken, the least recently used tenth is freed.
+    """
+
+    def __init__(self, directory: str, model_id: str, dimension: int, max_size_mb: Optional[float] = None):
+        self.directory = Path(directory)
+        self.model_id = model_id
+        self.dimension = dimension
+        max_size_mb = max_size_mb if max_size_mb is not None else settings.EMBEDDING_CACHE_MAX_MB
+        slot_bytes = dimension * 4 + KEY_BYTES + 8
+        self.capacity = max(int(max_size_mb * 1024 * 1024 // slot_bytes), 1)
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        shapes = {
+            VECTORS_FILE: ((self.capacity, self.dimension), np.float32),
+            KEYS_FILE: ((self.capacity, KEY_BYTES), np.uint8),
+            LAST_USED_FILE: ((self.capacity,), np.float64)
+        }
+        arrays = {}
+        try:
+            for name, (shape, dtype) in shapes.items():
+                array = np.lib.format.open_memmap(self.directory / name, mode='r+')
+                if array.shape != shape or array.dtype != dtype:
+                    raise ValueError(f"{name} has shape {array.shape}, expected {shape}")
+                arrays[name] = array
+        except (OSError, ValueError) as e:
+            if (self.directory / KEYS_FILE).exists():
+                print(f"Starting a new embedding cache in {self.directory} ({e})")
+            # Files are sized up front; they stay sparse until slots are written on most filesystems
+            arrays = {
+                name: np.lib.format.open_memmap(self.directory / name, mode='w+', dtype=dtype, shape=shape)
+                for name, (shape, dtype) in shapes.items()
+            }
+            (self.directory / MODEL_FILE).write_text(
+                json.dumps({'model': self.model_id, 'dimension': self.dimension}), encoding='utf-8'
+            )
+
+        self._vectors = arrays[VECTORS_FILE]
+        self._keys = arrays[KEYS_FILE]
+        self._last_used = arrays[LAST_USED_FILE]
+        used = self._keys.any(axis=1)
+        self._slots: Dict[bytes, int] = {self._keys[slot].tobytes(): int(slot) for slot in np.flatnonzero(used)}
+        self._free: List[int] = np.flatnonzero(~used)[::-1].tolist()
+
+    def _lookup(self, key: bytes) -> Optional[int]:
+        slot = self._slots.get(key)
+        if slot is not None and self._keys[slot].tobytes() != key:
+            del self._slots[key]  # Reused by another process
+            return None
+        return slot
+
+    def _evict(self):
+        count = max(int(self.capacity * EVICT_FRACTION), 1)
+        for slot in np.argpartition(self._last_used, count - 1)[:count]:
+            self._slots.pop(self._keys[slot].tobytes(), None)
+            self._keys[slot] = 0
+            self._free.append(int(slot))
+
+    def get(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached embedding of each text, or None"""
+        keys = [cache_key(self.model_id, text) for text in texts]
+        now = time.time()
+        with self._lock:
+            vectors = []
+            for key in keys:
+                slot = self._lookup(key)
+                if slot is None:
+                    vectors.append(None)
+                    continue
+                vectors.append(np.array(self._vectors[slot]))
+                self._last_used[slot] = now
+            found = sum(vector is not None for vector in vectors)
+            self.hits += found
+            self.misses += len(keys) - found
+        return vectors
+
+    def put(self, texts: List[str], embeddings: np.ndarray):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        now = time.time()
+        with self._lock:
+            for text, vector in zip(texts, embeddings):
+                key = cache_key(self.model_id, text)
+                slot = self._lookup(key)
+                if slot is None:
+                    if not self._free:
+                        self._evict()
+                    slot = self._free.pop()
+                    self._slots[key] = slot
+                # The key goes in last: a reader that sees it also sees the vector
+                self._vectors[slot] = vector
+                self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                self._last_used[slot] = now
+            for array in (self._vectors, self._keys, self._last_used):
+                array.flush()
+
+    def encode(self, texts: List[str], encode: Callable[[List[str]], Any]) -> np.ndarray:
+        """Embeddings of ``texts``; only texts missing from the cache are passed to ``encode``"""
+        cached = self.get(texts)
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        missing: Dict[str, List[int]] = {}
+        for i, (text, vector) in enumerate(zip(texts, cached)):
+            if vector is None:
+                missing.setdefault(text, []).append(i)
+            else:
+                embeddings[i] = vector
+
+        if missing:
+            missing_texts = list(missing)
+            vectors = np.asarray(encode(missing_texts), dtype=np.float32)
+            for text, vector in zip(missing_texts, vectors):
+                embeddings[missing[text]] = vector
+            self.put(missing_texts, vectors)
+        return embeddings
+
+    def clear(self):
+        with self._lock:
+            self._keys[:] = 0
+            self._keys.flush()
+            self._slots.clear()
+            self._free = list(range(self.capacity - 1, -1, -1))
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        entries = len(self._slots)
+        return {
+            'model': self.model_id,
+            'entries': entries,
+            'capacity': self.capacity,
+            'size_bytes': entries * (self.dimension * 4 + KEY_BYTES + 8),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+_embedding_caches: Dict[str, EmbeddingCache] = {}
+_embedding_caches_lock = threading.Lock()
+
+def get_embedding_cache(model_id: str, dimension: int, directory: Optional[str] = None) -> EmbeddingCache:
+    """The process-wide embedding cache of a model, in a subdirectory of EMBEDDING_CACHE_DIRECTORY"""
+    model_directory = os.path.join(
+        os.path.realpath(directory or settings.EMBEDDING_CACHE_DIRECTORY),
+        f"{hashlib.sha1(model_id.encode('utf-8')).hexdigest()[:16]}-{dimension}"
+    )
+    with _embedding_caches_lock:
+        if model_directory not in _embedding_caches:
+            _embedding_caches[model_directory] = EmbeddingCache(model_directory, model_id, dimension)
+        return _embedding_caches[model_directory]
@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from config.settings import settings
+from src.database.chroma_config import reload_persisted_segments, release_vector_segment
+
+LOCK_FILE = ".writer.lock"
+GENERATION_FILE = ".generation"
+LOCK_POLL_SECONDS = 0.05
+
+def _try_lock(lock_file):
+    """Take an exclusive lock on the open file without blocking; raises OSError if it is held"""
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+
+def _unlock(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+class IndexCoordinator:
+    """Single-writer coordination of one Chroma persist directory across processes.
+
+    Writers take an exclusive lock on ``.writer.lock``, so only one process
+    (the CLI, a Streamlit session, the directory watcher...) changes the index
+    at a time, and bump the number in ``.generation`` when they are done.
+    Readers compare that number with the generation they last saw and, when
+    another process has written since, drop their loaded index segments so
+    the next query reads the new ones from disk. Checking costs one small file
+    read per query.
+
+    Within a process the write lock is reentrant, and a reload waits until the
+    queries already running in other threads have finished. Neither context
+    may be entered from inside the other on the same thread. Collections can
+    also be unloaded (``release``), which likewise waits until no query or
+    write in the process is running.
+    """
+
+    def __init__(self, persist_directory: str, lock_timeout: Optional[float] = None):
+        self.directory = Path(persist_directory)
+        self.lock_path = self.directory / LOCK_FILE
+        self.generation_path = self.directory / GENERATION_FILE
+        self.lock_timeout = settings.INDEX_WRITE_LOCK_TIMEOUT if lock_timeout is None else lock_timeout
+
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._lock_file = None
+        self._condition = threading.Condition()
+        self._active_reads = 0
+        self._seen_generation = self.read_generation()
+        self.reloads = 0
+        self._pending_releases: Set = set()
+        self.released = 0
+
+    def read_generation(self) -> int:
+        try:
+            return int(self.generation_path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return 0
+
+    def _write_generation(self, generation: int):
+        # Written next to the target and renamed over it, so readers never see a partial number
+        temp_path = self.directory / f"{GENERATION_FILE}.{os.getpid()}.tmp"
+        temp_path.write_text(str(generation), encoding='utf-8')
+        os.replace(temp_path, self.generation_path)
+
+    def _sync(self, client):
+        """Reload the index if another process has written to it; caller holds the condition"""
+        while True:
+            generation = self.read_generation()
+            if generation == self._seen_generation:
+                return
+            if self._active_reads == 0:
+                break
+            self._condition.wait()
+
+        reload_persisted_segments(client)
+        self._seen_generation = generation
+        self.reloads += 1
+
+    def release(self, client, collection_id):
+        """Unload a collection's vector segment now, or once the running queries and writes finish"""
+        with self._condition:
+            self._pending_releases.add(collection_id)
+            self._release_pending(client)
+
+    def _release_pending(self, client):
+        """Caller holds the condition; a writer always passes through it before writing"""
+        if not self._pending_releases or self._active_reads or self._write_depth:
+            return
+        for collection_id in self._pending_releases:
+            if release_vector_segment(client, collection_id):
+                self.released += 1
+        self._pending_releases.clear()
+
+    @contextmanager
+    def reading(self, client):
+        """Run a query against the latest generation of the index"""
+        with self._condition:
+            self._sync(client)
+            self._active_reads += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active_reads -= 1
+                self._release_pending(client)
+                self._condition.notify_all()
+
+    @contextmanager
+    def writing(self, client):
+        """Hold the directory's writer lock; raises TimeoutError after ``lock_timeout`` seconds"""
+        with self._write_lock:
+            if self._write_depth == 0:
+                self._acquire_file_lock()
+            self._write_depth += 1
+            try:
+                if self._write_depth == 1:
+                    # Writing on top of a stale segment would persist it over the other process's writes
+                    with self._condition:
+                        self._sync(client)
+                yield
+            finally:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    try:
+                        # Bumped even after a failed write, which may have stored part of a batch
+                        with self._condition:
+                            generation = self.read_generation() + 1
+                            self._write_generation(generation)
+                            self._seen_generation = generation
+                            self._release_pending(client)
+                    finally:
+                        self._release_file_lock()
+
+    def _acquire_file_lock(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.lock_path, 'a+')
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                _try_lock(lock_file)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    lock_file.close()
+                    raise TimeoutError(
+                        f"Another process has held the write lock on {self.directory} for over {self.lock_timeout}s"
+                    )
+                time.sleep(LOCK_POLL_SECONDS)
+        self._lock_file = lock_file
+
+    def _release_file_lock(self):
+        lock_file, self._lock_file = self._lock_file, None
+        try:
+            _unlock(lock_file)
+        finally:
+            lock_file.close()
+
+
+_coordinators: Dict[str, IndexCoordinator] = {}
+_coordinators_lock = threading.Lock()
+
+def get_coordinator(client) -> Optional[IndexCoordinator]:
+    """The process-wide coordinator of the client's persist directory, or None for an in-memory client"""
+    client_settings = client.get_settings()
+    if not client_settings.is_persistent or not client_settings.persist_directory:
+        return None
+
+    # Chroma shares one system per directory within a process, so the coordinator is shared too
+    key = os.path.realpath(client_settings.persist_directory)
+    with _coordinators_lock:
+        if key not in _coordinators:
+            _coordinators[key] = IndexCoordinator(key)
+        return _coordinators[key]
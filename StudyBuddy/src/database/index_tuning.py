@@ -0,0 +1,117 @@
+import itertools
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+import hnswlib
+import numpy as np
+
+PAGE_SIZE = 5000
+
+def load_stored_embeddings(vector_store) -> np.ndarray:
+    """All stored embeddings of a store (every shard for a sharded one) as float32 rows"""
+    if hasattr(vector_store, 'list_shards'):
+        collections = [vector_store.get_shard(shard).collection for shard in vector_store.list_shards()]
+    else:
+        vector_store._refresh_collection()
+        collections = [vector_store.collection]
+
+    pages = []
+    for collection in collections:
+        offset = 0
+        while True:
+            page = collection.get(limit=PAGE_SIZE, offset=offset, include=['embeddings'])
+            if not page['ids']:
+                break
+            pages.append(np.asarray(page['embeddings'], dtype=np.float32))
+            offset += len(page['ids'])
+
+    if not pages:
+        return np.zeros((0, vector_store.embedding_model.get_sentence_embedding_dimension()), dtype=np.float32)
+    return np.vstack(pages)
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def split_queries(embeddings: np.ndarray, num_queries: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Hold out stored chunks as queries so no query trivially finds itself"""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(embeddings))
+    num_queries = min(num_queries, max(len(embeddings) // 10, 1))
+    return embeddings[order[num_queries:]], embeddings[order[:num_queries]]
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force cosine top-k ids, the ground truth for recall"""
+    corpus = _normalize(corpus)
+    queries = _normalize(queries)
+    k = min(k, len(corpus))
+
+    neighbours = np.empty((len(queries), k), dtype=np.int64)
+    for start in range(0, len(queries), 256):
+        scores = queries[start:start + 256] @ corpus.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        neighbours[start:start + 256] = np.take_along_axis(top, order, axis=1)
+    return neighbours
+
+def recall_at_k(found: np.ndarray, expected: np.ndarray) -> float:
+    hits = sum(len(set(row_found) & set(row_expected)) for row_found, row_expected in zip(found, expected))
+    return hits / expected.size if expected.size else 0.0
+
+def evaluate_hnsw_grid(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    k: int = 5,
+    m_values: List[int] = (16,),
+    construction_ef_values: List[int] = (100,),
+    search_ef_values: List[int] = (10,),
+    num_threads: int = 1
+) -> List[Dict[str, Any]]:
+    """Measure recall@k against brute force and per-query latency for each parameter combination.
+
+    Uses hnswlib directly, the library behind Chroma's vector index, so one
+    build per (M, construction_ef) pair covers every search_ef value.
+    """
+    expected = exact_top_k(corpus, queries, k)
+    k = expected.shape[1]
+    results = []
+
+    for m, construction_ef in itertools.product(m_values, construction_ef_values):
+        build_start = time.perf_counter()
+        index = hnswlib.Index(space='cosine', dim=corpus.shape[1])
+        index.init_index(max_elements=len(corpus), ef_construction=construction_ef, M=m)
+        index.set_num_threads(num_threads)
+        index.add_items(corpus, np.arange(len(corpus)))
+        build_seconds = time.perf_counter() - build_start
+
+        for search_ef in search_ef_values:
+            # hnswlib needs ef >= k to return k neighbours
+            index.set_ef(max(search_ef, k))
+            latencies = []
+            found = np.empty_like(expected)
+            for i, query in enumerate(queries):
+                query_start = time.perf_counter()
+                labels, _ = index.knn_query(query, k=k)
+                latencies.append(time.perf_counter() - query_start)
+                found[i] = labels[0]
+
+            results.append({
+                'M': m,
+                'construction_ef': construction_ef,
+                'search_ef': search_ef,
+                'recall': recall_at_k(found, expected),
+                'p50_ms': float(np.percentile(latencies, 50) * 1000),
+                'p95_ms': float(np.percentile(latencies, 95) * 1000),
+                'build_seconds': build_seconds
+            })
+
+    return results
+
+def recommend_parameters(results: List[Dict[str, Any]], target_recall: float = 0.95) -> Optional[Dict[str, Any]]:
+    """Fastest combination (by p95) that reaches the target recall, else the most accurate one"""
+    if not results:
+        return None
+    good_enough = [result for result in results if result['recall'] >= target_recall]
+    if good_enough:
+        return min(good_enough, key=lambda result: (result['p95_ms'], result['build_seconds']))
+    return max(results, key=lambda result: (result['recall'], -result['p95_ms']))
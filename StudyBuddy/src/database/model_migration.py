@@ -0,0 +1,216 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from config.settings import settings
+from src.database.vector_store import VectorStore, REBUILD_PAGE_SIZE
+from src.database.embedding_backends import get_embedding_model, MODEL_KEY
+from src.database.dimension_reduction import REDUCTION_PCA
+
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_COMPLETED = "completed"
+STATE_CANCELLED = "cancelled"
+STATE_FAILED = "failed"
+
+def migration_collection_name(collection_name: str) -> str:
+    """The side collection a collection is re-embedded into (Chroma names are at most 63 characters)"""
+    return f"{collection_name[:52]}-migration"
+
+def chunk_fingerprint(document: Optional[str], metadata: Optional[Dict[str, Any]]) -> str:
+    return hashlib.sha1(json.dumps([document, metadata or {}], sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+class ModelMigration:
+    """Re-embeds a collection with another embedding model, then switches to it.
+
+    Chunk texts are read back from the collection (or from the document store,
+    for chunks stored as offsets) and embedded with the new model into a side
+    collection, MIGRATION_BATCH_SIZE chunks at a time with a pause of
+    MIGRATION_PAUSE_SECONDS in between, so ingestion and queries keep most of
+    the CPU. Searches use the old collection all along. A last pass under the
+    writer lock copies chunks added or changed meanwhile, drops deleted ones
+    and renames the side collection over the old one; stores in other
+    processes see the model it records and switch on their next search.
+
+    A cancelled or interrupted migration resumes where it stopped: chunks
+    already in the side collection with unchanged text and metadata are not
+    embedded again.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        model_name: str,
+        embedding_model=None,
+        batch_size: Optional[int] = None,
+        pause_seconds: Optional[float] = None
+    ):
+        self.source = vector_store
+        self.model_name = model_name
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size or settings.MIGRATION_BATCH_SIZE
+        self.pause_seconds = pause_seconds if pause_seconds is not None else settings.MIGRATION_PAUSE_SECONDS
+
+        self.state = STATE_PENDING
+        self.chunks_total = 0
+        self.chunks_embedded = 0
+        self.chunks_skipped = 0
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._source_ids = set()
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started: Optional[float] = None
+
+    def start(self) -> "ModelMigration":
+        """Run the migration in a background thread"""
+        self._thread = threading.Thread(target=self.run, name="model-migration", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stop after the current batch; the old collection stays in use"""
+        self._cancel.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a started migration; True once it has finished"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.state not in (STATE_PENDING, STATE_RUNNING)
+
+    def status(self) -> Dict[str, Any]:
+        seconds = self.seconds
+        if seconds is None and self._started is not None:
+            seconds = time.perf_counter() - self._started
+        return {
+            'state': self.state,
+            'model': self.model_name,
+            'chunks_total': self.chunks_total,
+            'chunks_embedded': self.chunks_embedded,
+            'chunks_skipped': self.chunks_skipped,
+            'seconds': seconds,
+            'error': self.error
+        }
+
+    def run(self) -> Dict[str, Any]:
+        """Migrate in the calling thread and return the final status"""
+        self.state = STATE_RUNNING
+        self._started = time.perf_counter()
+        try:
+            self._migrate()
+        except Exception as e:
+            self.error = str(e)
+            self.state = STATE_FAILED
+            print(f"Model migration to {self.model_name} failed: {e}")
+        else:
+            self.state = STATE_CANCELLED if self._cancel.is_set() else STATE_COMPLETED
+        self.seconds = time.perf_counter() - self._started
+        return self.status()
+
+    def _migrate(self):
+        source = self.source
+        source._refresh_collection()
+        if getattr(source.embedding_model, 'embedding_model_name', None) == self.model_name:
+            print(f"{source.collection_name} is already embedded with {self.model_name}")
+            return
+
+        model = self.embedding_model or get_embedding_model(self.model_name)
+        target_name = migration_collection_name(source.collection_name)
+        try:
+            leftover = source.client.get_collection(name=target_name)
+        except Exception:
+            leftover = None
+        if leftover is not None and (leftover.metadata or {}).get(MODEL_KEY) != getattr(model, 'embedding_model_name', None):
+            source.client.delete_collection(name=target_name)  # From a migration to another model
+        target = VectorStore(
+            collection_name=target_name,
+            client=source.client,
+            embedding_model=model,
+            collection_metadata=source.index_parameters()
+        )
+        copied = self._stored_fingerprints(target)
+
+        self._copy_pass(target, copied)
+        if self._cancel.is_set():
+            print(f"Model migration cancelled; {len(copied)} chunks are kept in {target_name} for the next run")
+            return
+
+        # Writers wait from here on, so nothing changes between the last copy and the switch
+        with source._writing():
+            self._copy_pass(target, copied, final=True)
+            stale = [chunk_id for chunk_id in copied if chunk_id not in self._source_ids]
+            if stale:
+                target.collection.delete(ids=stale)
+                full_embeddings = target._full_embedding_store()
+                if full_embeddings is not None:
+                    full_embeddings.delete(target_name, stale)
+                for chunk_id in stale:
+                    del copied[chunk_id]
+            if target.collection.count() != source.collection.count():
+                raise RuntimeError(f"Copied {target.collection.count()} of {source.collection.count()} chunks")
+            previous = getattr(source.embedding_model, 'embedding_model_name', None) or "the previous model"
+            source.replace_collection(target)
+        print(f"{source.collection_name} now uses {self.model_name} ({self.chunks_total} chunks, was {previous})")
+
+    @staticmethod
+    def _stored_fingerprints(store: VectorStore) -> Dict[str, str]:
+        fingerprints = {}
+        offset = 0
+        while True:
+            page = store.collection.get(limit=REBUILD_PAGE_SIZE, offset=offset, include=['documents', 'metadatas'])
+            if not page['ids']:
+                return fingerprints
+            for chunk_id, document, metadata in zip(page['ids'], page['documents'], page['metadatas']):
+                fingerprints[chunk_id] = chunk_fingerprint(document, metadata)
+            offset += len(page['ids'])
+
+    def _copy_pass(self, target: VectorStore, copied: Dict[str, str], final: bool = False):
+        """Embed every source chunk missing from ``copied`` or changed since it was copied"""
+        source = self.source
+        source._refresh_collection()
+        self._source_ids = set()
+        self.chunks_total = source.collection.count()
+        # A PCA projection is fitted on one larger first batch, as in add_documents
+        fitting = target._reduction() is not None and target._reduction()[0] == REDUCTION_PCA \
+            and target._get_projection() is None
+        offset = 0
+        while final or not self._cancel.is_set():
+            limit = max(self.batch_size, settings.PCA_FIT_SAMPLES) if fitting else self.batch_size
+            with source._reading():
+                page = source.collection.get(limit=limit, offset=offset, include=['documents', 'metadatas'])
+            if not page['ids']:
+                break
+            offset += len(page['ids'])
+            self._source_ids.update(page['ids'])
+
+            changed = []
+            for i, (chunk_id, document, metadata) in enumerate(zip(page['ids'], page['documents'], page['metadatas'])):
+                fingerprint = chunk_fingerprint(document, metadata)
+                if copied.get(chunk_id) == fingerprint:
+                    continue
+                changed.append((i, fingerprint))
+            if not final:
+                self.chunks_skipped += len(page['ids']) - len(changed)
+            if not changed:
+                continue
+
+            positions = [i for i, _ in changed]
+            ids = [page['ids'][i] for i in positions]
+            documents = [page['documents'][i] for i in positions]
+            metadatas = [page['metadatas'][i] for i in positions]
+            # Chunks stored as offsets are read back; their metadata is copied as stored
+            texts = source.materialize(documents, [dict(metadata) for metadata in metadatas])
+            target.add_chunks(ids, documents, metadatas, [text or '' for text in texts])
+            for chunk_id, (_, fingerprint) in zip(ids, changed):
+                copied[chunk_id] = fingerprint
+            self.chunks_embedded += len(ids)
+            fitting = False
+
+            if not final and self.pause_seconds:
+                self._cancel.wait(self.pause_seconds)
+
+def run_model_migration(vector_store: VectorStore, model_name: str, **kwargs) -> Dict[str, Any]:
+    """Migrate ``vector_store`` to ``model_name`` in the calling thread"""
+    return ModelMigration(vector_store, model_name, **kwargs).run()
@@ -0,0 +1,353 @@
+import hashlib
+import heapq
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable
+
+import chromadb
+
+from config.settings import settings
+from src.database.chroma_config import get_chroma_client, segment_internals_supported, SEGMENT_INTERNALS_CHROMADB_VERSION
+from src.database.index_coordination import get_coordinator
+from src.database.embedding_backends import load_embedding_model
+from src.database.vector_store import VectorStore, build_search_filters
+
+# Documents that are not in a course subdirectory go to the original collection
+DEFAULT_SHARD = "default"
+
+_UNSAFE_NAME_CHARS = re.compile(r'[^a-zA-Z0-9_-]+')
+
+def shard_collection_name(shard: str) -> str:
+    """Map a shard name to a valid Chroma collection name (3-63 chars, alphanumeric ends)"""
+    if shard == DEFAULT_SHARD:
+        return settings.COLLECTION_NAME
+
+    slug = _UNSAFE_NAME_CHARS.sub('-', shard.lower()).strip('-_')[:32] or "shard"
+    # The digest keeps "Data Structures" and "data-structures" in separate collections
+    digest = hashlib.blake2b(shard.encode('utf-8'), digest_size=4).hexdigest()
+    return f"{settings.COLLECTION_NAME[:20]}-{slug}-{digest}"
+
+class ShardedVectorStore:
+    """Vector store split into one Chroma collection per shard (e.g. per course).
+
+    Documents are routed to shards at ingestion, searches fan out to the
+    requested shards in parallel and merge the top-k by similarity. Shards are
+    opened lazily and at most ``max_open_shards`` stay open; the least
+    recently used one is closed, dropping its deduplication index and
+    unloading its HNSW segment from the shared client once no query or write
+    is running. Each shard deduplicates its own chunks only, so text repeated
+    across courses is stored once per shard.
+    """
+
+    def __init__(
+        self,
+        max_open_shards: Optional[int] = None,
+        search_workers: Optional[int] = None,
+        documents_root: Optional[str] = None,
+        client=None,
+        embedding_model=None
+    ):
+        if client is not None:
+            self.client = client
+        else:
+            try:
+                self.client = get_chroma_client(settings.CHROMA_PERSIST_DIRECTORY)
+            except Exception as e:
+                print(f"ChromaDB initialization warning (continuing anyway): {e}")
+                self.client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY)
+
+        self.embedding_model = embedding_model or load_embedding_model()
+        # Shared with the shards, which all live in the same directory
+        self.coordinator = get_coordinator(self.client)
+        self.max_open_shards = max(1, max_open_shards or settings.MAX_OPEN_SHARDS)
+        self.documents_root = Path(documents_root or settings.DOCUMENTS_DIRECTORY).resolve()
+
+        self._open_shards: "OrderedDict[str, VectorStore]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, search_workers or settings.SHARD_SEARCH_WORKERS),
+            thread_name_prefix="shard-search"
+        )
+        self.shards_opened = 0
+        self.shards_closed = 0
+        if not segment_internals_supported():
+            print(
+                f"chromadb {chromadb.__version__} is not {SEGMENT_INTERNALS_CHROMADB_VERSION}: closed shards keep "
+                "their index loaded, so MAX_OPEN_SHARDS does not bound memory or open files"
+            )
+
+    def _writing(self):
+        return self.coordinator.writing(self.client) if self.coordinator else nullcontext()
+
+    def _reading(self):
+        return self.coordinator.reading(self.client) if self.coordinator else nullcontext()
+
+    def _open_shard(self, shard: str) -> VectorStore:
+        return VectorStore(
+            collection_name=shard_collection_name(shard),
+            client=self.client,
+            embedding_model=self.embedding_model,
+            collection_metadata={'shard': shard}
+        )
+
+    def get_shard(self, shard: str, create: bool = True) -> Optional[VectorStore]:
+        """Return an open store for ``shard``; with ``create=False`` missing shards give None"""
+        store, evicted = self._get_shard(shard, create)
+        self._release(evicted)
+        return store
+
+    def _get_shard(self, shard: str, create: bool):
+        """The open store for ``shard`` and the stores closed to make room for it"""
+        with self._lock:
+            store = self._open_shards.get(shard)
+            if store is not None:
+                self._open_shards.move_to_end(shard)
+                return store, []
+
+        if not create:
+            try:
+                self.client.get_collection(name=shard_collection_name(shard))
+            except Exception:
+                return None, []
+
+        store = self._open_shard(shard)
+        with self._lock:
+            # Another thread may have opened it in the meantime
+            store = self._open_shards.setdefault(shard, store)
+            self._open_shards.move_to_end(shard)
+            self.shards_opened += 1
+            evicted = []
+            while len(self._open_shards) > self.max_open_shards:
+                evicted.append(self._open_shards.popitem(last=False)[1])
+                self.shards_closed += 1
+        return store, evicted
+
+    def _release(self, stores: List[VectorStore]):
+        """Unload closed shards' segments from the shared client unless they were reopened meanwhile.
+
+        A released shard is read from disk again when it is next opened.
+        """
+        if self.coordinator is None or not stores:
+            return
+        with self._lock:
+            open_ids = {store.collection.id for store in self._open_shards.values()}
+        for store in stores:
+            if store.collection.id not in open_ids:
+                self.coordinator.release(self.client, store.collection.id)
+
+    def close_shard(self, shard: str, release: bool = True):
+        """Close an open shard; ``release=False`` keeps its segments loaded (e.g. to delete them)"""
+        with self._lock:
+            store = self._open_shards.pop(shard, None)
+            if store is not None:
+                self.shards_closed += 1
+        if store is not None and release:
+            self._release([store])
+
+    def open_shards(self) -> List[str]:
+        """Open shards, least recently used first"""
+        with self._lock:
+            return list(self._open_shards)
+
+    def list_shards(self) -> List[str]:
+        prefix = f"{settings.COLLECTION_NAME[:20]}-"
+        shards = set()
+
+        for collection in self.client.list_collections():
+            # Chroma 0.5 returns collections, newer versions return names
+            name = getattr(collection, 'name', collection)
+            if name == settings.COLLECTION_NAME:
+                shards.add(DEFAULT_SHARD)
+            elif name.startswith(prefix):
+                metadata = getattr(collection, 'metadata', None)
+                if metadata is None:
+                    metadata = self.client.get_collection(name=name).metadata
+                if metadata and 'shard' in metadata:
+                    shards.add(metadata['shard'])
+
+        return sorted(shards)
+
+    def route(self, document: Dict[str, Any]) -> str:
+        """Pick the shard for a processed document.
+
+        An explicit ``shard`` in the metadata wins; otherwise files under
+        DOCUMENTS_DIRECTORY go to the shard named after their top-level
+        subdirectory, and files elsewhere to the shard named after their folder.
+        """
+        metadata = document['metadata']
+        if metadata.get('shard'):
+            return metadata['shard']
+
+        file_path = metadata.get('file_path')
+        if not file_path:
+            return DEFAULT_SHARD
+
+        file_path = Path(file_path).resolve()
+        try:
+            relative = file_path.relative_to(self.documents_root)
+        except ValueError:
+            return file_path.parent.name or DEFAULT_SHARD
+        return relative.parts[0] if len(relative.parts) > 1 else DEFAULT_SHARD
+
+    def add_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        progress_callback: Optional[Callable[[int], None]] = None,
+        checkpoint_callback: Optional[Callable[[Dict[str, int]], None]] = None
+    ) -> Dict[str, Any]:
+        routed: Dict[str, List[Dict[str, Any]]] = {}
+        for doc in documents:
+            shard = self.route(doc)
+            routed.setdefault(shard, []).append({**doc, 'metadata': {**doc['metadata'], 'shard': shard}})
+
+        result = {'documents_added': 0, 'chunks_added': 0, 'shards': {}}
+        chunks_before = 0
+
+        for shard, shard_documents in routed.items():
+            def on_progress(chunks_done: int, offset=chunks_before):
+                if progress_callback:
+                    progress_callback(offset + chunks_done)
+
+            shard_result = self.get_shard(shard).add_documents(
+                shard_documents, progress_callback=on_progress, checkpoint_callback=checkpoint_callback
+            )
+            chunks_before += shard_result['chunks_added']
+
+            result['documents_added'] += shard_result['documents_added']
+            result['chunks_added'] += shard_result['chunks_added']
+            result['shards'][shard] = shard_result['chunks_added']
+            if 'deduplication' in shard_result:
+                totals = result.setdefault('deduplication', {})
+                for key, value in shard_result['deduplication'].items():
+                    totals[key] = totals.get(key, 0) + value
+
+        return result
+
+    def search(
+        self,
+        query: str,
+        top_k: int = None,
+        shards: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search the given shards (all by default) in parallel and merge the best ``top_k``"""
+        if top_k is None:
+            top_k = settings.TOP_K_RESULTS
+        build_search_filters(filters)  # Reject bad filters before fanning out
+
+        stores = []
+        # Shards closed to open later ones are still searched; they are released afterwards
+        evicted = []
+        for shard in (shards or self.list_shards()):
+            store, closed = self._get_shard(shard, create=False)
+            evicted.extend(closed)
+            if store is not None:
+                stores.append((shard, store))
+        if not stores:
+            self._release(evicted)
+            return []
+
+        # Encode once; every shard is queried with the same vector
+        query_embedding = self.embedding_model.encode(query).tolist()
+        futures = [
+            (shard, self._executor.submit(store.search_by_embedding, query_embedding, top_k, filters))
+            for shard, store in stores
+        ]
+
+        candidates = []
+        for shard, future in futures:
+            try:
+                shard_results = future.result()
+            except Exception as e:
+                print(f"Warning: Search failed for shard {shard}: {e}")
+                continue
+            for result in shard_results:
+                result['shard'] = shard
+                candidates.append(result)
+
+        self._release(evicted)
+
+        merged = heapq.nlargest(top_k, candidates, key=lambda result: result['similarity_score'])
+        for rank, result in enumerate(merged, start=1):
+            result['rank'] = rank
+        return merged
+
+    def get_collection_stats(self) -> Dict[str, Any]:
+        shard_counts = {}
+        for shard in self.list_shards():
+            try:
+                shard_counts[shard] = self.client.get_collection(name=shard_collection_name(shard)).count()
+            except Exception as e:
+                print(f"Warning: Could not get stats for shard {shard}: {e}")
+                shard_counts[shard] = 0
+
+        return {
+            'total_chunks': sum(shard_counts.values()),
+            'collection_name': settings.COLLECTION_NAME,
+            'embedding_model': settings.EMBEDDING_MODEL,
+            'shards': shard_counts,
+            'open_shards': len(self.open_shards())
+        }
+
+    def rebuild_collection(
+        self,
+        m: Optional[int] = None,
+        construction_ef: Optional[int] = None,
+        search_ef: Optional[int] = None,
+        shards: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Rebuild the HNSW index of each shard with new parameters"""
+        result = {'chunks_copied': 0, 'seconds': 0.0, 'shards': {}}
+        for shard in (shards or self.list_shards()):
+            shard_result = self.get_shard(shard).rebuild_collection(m, construction_ef, search_ef)
+            result['chunks_copied'] += shard_result['chunks_copied']
+            result['seconds'] += shard_result['seconds']
+            result['shards'][shard] = shard_result['chunks_copied']
+            result['index_parameters'] = shard_result['index_parameters']
+        return result
+
+    def clear_collection(self, shards: Optional[List[str]] = None):
+        for shard in (shards or self.list_shards()):
+            # Chroma only deletes the index files of segments it has loaded
+            self.close_shard(shard, release=False)
+            if shard == DEFAULT_SHARD:
+                self.get_shard(shard).clear_collection()
+                continue
+            try:
+                with self._writing():
+                    self.client.delete_collection(name=shard_collection_name(shard))
+            except Exception:
+                pass  # Collection might not exist
+        print("Shards cleared successfully")
+
+    def delete_by_filename(self, filename: str, shards: Optional[List[str]] = None):
+        for shard in (shards or self.list_shards()):
+            store = self.get_shard(shard, create=False)
+            if store is not None:
+                store.delete_by_filename(filename)
+
+    def list_files(self, shards: Optional[List[str]] = None) -> List[str]:
+        filenames = set()
+        for shard in (shards or self.list_shards()):
+            store = self.get_shard(shard, create=False)
+            if store is not None:
+                filenames.update(store.list_files())
+        return sorted(filenames)
+
+    def get_indexed_files(self) -> Dict[str, float]:
+        indexed = {}
+        for shard in self.list_shards():
+            store = self.get_shard(shard, create=False)
+            if store is not None:
+                indexed.update(store.get_indexed_files())
+        return indexed
+
+def create_vector_store(client=None, embedding_model=None):
+    """The store configured in settings: sharded per course, or the single collection"""
+    if settings.SHARDING_ENABLED:
+        return ShardedVectorStore(client=client, embedding_model=embedding_model)
+    return VectorStore(client=client, embedding_model=embedding_model)
@@ -0,0 +1,348 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from src.database.dimension_reduction import REDUCTION_KEY
+from src.database.embedding_backends import MODEL_KEY, MODEL_DIMENSION_KEY
+from src.database.vector_store import VectorStore
+
+SNAPSHOT_FORMAT = "studybuddy-index"
+SNAPSHOT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.jsonl.gz"
+
+EXPORT_PAGE_SIZE = 5000
+
+def _file_checksum(path: Path) -> Dict[str, Any]:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return {'sha256': digest.hexdigest(), 'bytes': path.stat().st_size}
+
+def _store_collections(vector_store) -> List[Tuple[Optional[str], Any]]:
+    """(shard, collection) pairs to export; shard is None for a single-collection store"""
+    if hasattr(vector_store, 'list_shards'):
+        return [(shard, vector_store.get_shard(shard).collection) for shard in vector_store.list_shards()]
+    vector_store._refresh_collection()
+    return [(None, vector_store.collection)]
+
+def _recorded_model(collection, embedding_model) -> Tuple[str, int]:
+    """(model, dimension) a collection was embedded with, as recorded on it.
+
+    Collections from before the model was recorded (or without one) fall back
+    to the store's model.
+    """
+    metadata = getattr(collection, 'metadata', None) or {}
+    name = metadata.get(MODEL_KEY) or getattr(embedding_model, 'embedding_model_name', None) or settings.EMBEDDING_MODEL
+    dimension = metadata.get(MODEL_DIMENSION_KEY) or embedding_model.get_sentence_embedding_dimension()
+    return name, int(dimension)
+
+def _store_model(vector_store, collections) -> Tuple[str, int]:
+    """The model every collection of the store records; ValueError when shards disagree"""
+    models = {_recorded_model(collection, vector_store.embedding_model) for _, collection in collections}
+    if len(models) > 1:
+        raise ValueError(
+            "Shards are embedded with different models: "
+            + ", ".join(f"{name} ({dimension} dims)" for name, dimension in sorted(models))
+        )
+    return models.pop() if models else _recorded_model(None, vector_store.embedding_model)
+
+def _model_mismatch(manifest: Dict[str, Any], model: Tuple[str, int]) -> Optional[str]:
+    if (manifest['embedding_model'], manifest['dimension']) == model:
+        return None
+    return (
+        f"Snapshot was built with {manifest['embedding_model']} ({manifest['dimension']} dims), "
+        f"but this store uses {model[0]} ({model[1]} dims)"
+    )
+
+def export_index(vector_store, snapshot_path: str, dtype: str = "float32") -> Dict[str, Any]:
+    """Write every chunk, its metadata and its embedding to a snapshot directory.
+
+    Embeddings go into one contiguous ``.npy`` array (float32 or float16) and
+    texts/metadata into gzip JSON lines in the same row order. The manifest
+    records the model and dimension the collections were embedded with and a
+    SHA-256 checksum of each file.
+    """
+    if dtype not in ("float32", "float16"):
+        return {'success': False, 'error': f"Unsupported dtype {dtype}", 'chunks_exported': 0}
+
+    start = time.perf_counter()
+    snapshot_dir = Path(snapshot_path)
+    try:
+        snapshot_dir.mkdir(parents=True, exist_ok=True)
+        collections = _store_collections(vector_store)
+        if any(REDUCTION_KEY in (collection.metadata or {}) for _, collection in collections):
+            # The vectors are only meaningful together with the collection's projection
+            return {'success': False, 'error': "Snapshots of reduced-dimension collections are not supported", 'chunks_exported': 0}
+        total = sum(collection.count() for _, collection in collections)
+        # Recorded on the collection: after --migrate-model, EMBEDDING_MODEL may still name the old model
+        model_name, dimension = _store_model(vector_store, collections)
+
+        embeddings = np.lib.format.open_memmap(
+            snapshot_dir / EMBEDDINGS_FILE, mode='w+', dtype=np.dtype(dtype), shape=(total, dimension)
+        )
+        shard_counts = {}
+        row = 0
+
+        # Stored embeddings come from the index segments, which may be stale if another process wrote
+        with vector_store._reading(), gzip.open(snapshot_dir / CHUNKS_FILE, 'wt', encoding='utf-8', compresslevel=6) as chunks_file:
+            for shard, collection in collections:
+                # Chunks stored as offsets are exported with their text
+                reader = vector_store.get_shard(shard) if shard is not None else vector_store
+                offset = 0
+                while True:
+                    page = collection.get(
+                        limit=EXPORT_PAGE_SIZE,
+                        offset=offset,
+                        include=['documents', 'metadatas', 'embeddings']
+                    )
+                    if not page['ids']:
+                        break
+                    # Chunks added after count() was taken are left for the next export
+                    page_size = min(len(page['ids']), total - row)
+                    if page_size <= 0:
+                        break
+
+                    embeddings[row:row + page_size] = np.asarray(page['embeddings'][:page_size], dtype=np.float32)
+                    documents = reader.materialize(page['documents'][:page_size], page['metadatas'][:page_size])
+                    for i in range(page_size):
+                        chunks_file.write(json.dumps({
+                            'id': page['ids'][i],
+                            'shard': shard,
+                            'document': documents[i],
+                            'metadata': page['metadatas'][i]
+                        }) + "\n")
+
+                    row += page_size
+                    offset += len(page['ids'])
+                    if shard is not None:
+                        shard_counts[shard] = shard_counts.get(shard, 0) + page_size
+
+        embeddings.flush()
+        del embeddings
+
+        manifest = {
+            'format': SNAPSHOT_FORMAT,
+            'version': SNAPSHOT_VERSION,
+            'created_at': time.time(),
+            'collection_name': settings.COLLECTION_NAME,
+            'embedding_model': model_name,
+            'dimension': dimension,
+            'dtype': dtype,
+            'chunk_count': row,
+            'shards': shard_counts or None,
+            'files': {
+                EMBEDDINGS_FILE: _file_checksum(snapshot_dir / EMBEDDINGS_FILE),
+                CHUNKS_FILE: _file_checksum(snapshot_dir / CHUNKS_FILE)
+            }
+        }
+        # The manifest is written last, so a snapshot without one is incomplete
+        tmp_manifest = snapshot_dir / (MANIFEST_FILE + ".tmp")
+        with open(tmp_manifest, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_manifest, snapshot_dir / MANIFEST_FILE)
+
+    except Exception as e:
+        return {'success': False, 'error': str(e), 'chunks_exported': 0}
+
+    return {
+        'success': True,
+        'error': None,
+        'chunks_exported': row,
+        'snapshot_bytes': sum(entry['bytes'] for entry in manifest['files'].values()),
+        'seconds': time.perf_counter() - start
+    }
+
+def verify_snapshot(snapshot_path: str) -> Dict[str, Any]:
+    """Check the manifest, format version and file checksums of a snapshot"""
+    snapshot_dir = Path(snapshot_path)
+    errors = []
+
+    try:
+        with open(snapshot_dir / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        return {'valid': False, 'errors': [f"Cannot read manifest: {e}"], 'manifest': None}
+
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        errors.append(f"Not an index snapshot (format {manifest.get('format')!r})")
+    elif manifest.get('version', 0) > SNAPSHOT_VERSION:
+        errors.append(f"Snapshot version {manifest['version']} is newer than supported version {SNAPSHOT_VERSION}")
+
+    for filename, expected in manifest.get('files', {}).items():
+        path = snapshot_dir / filename
+        if not path.exists():
+            errors.append(f"Missing file {filename}")
+            continue
+        actual = _file_checksum(path)
+        if actual != expected:
+            errors.append(f"Checksum mismatch for {filename}")
+
+    return {'valid': not errors, 'errors': errors, 'manifest': manifest}
+
+def _iter_snapshot_batches(snapshot_dir: Path, batch_size: int):
+    batch = []
+    with gzip.open(snapshot_dir / CHUNKS_FILE, 'rt', encoding='utf-8') as chunks_file:
+        for line in chunks_file:
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def import_collection_name(collection_name: str) -> str:
+    """The side collection a snapshot is loaded into before it replaces ``collection_name``"""
+    return f"{collection_name[:55]}-import"
+
+def _side_store(store: VectorStore, manifest: Dict[str, Any]) -> VectorStore:
+    name = import_collection_name(store.collection_name)
+    try:
+        store.client.delete_collection(name=name)
+    except Exception:
+        pass  # Left over from an interrupted import, if anything
+    # Labelled with the model the snapshot's vectors come from (checked to be the store's)
+    return VectorStore(
+        collection_name=name,
+        client=store.client,
+        embedding_model=store.embedding_model,
+        collection_metadata={
+            **store.collection_metadata,
+            MODEL_KEY: manifest['embedding_model'],
+            MODEL_DIMENSION_KEY: manifest['dimension']
+        }
+    )
+
+def import_index(vector_store, snapshot_path: str, verify: bool = True, replace: bool = True) -> Dict[str, Any]:
+    """Bulk-load a snapshot into the store without re-embedding anything.
+
+    With ``replace`` the store ends up identical to the exported one: the
+    snapshot is loaded into side collections that replace the existing ones
+    only once every chunk is in, so a failed import leaves the index as it was.
+    """
+    start = time.perf_counter()
+    snapshot_dir = Path(snapshot_path)
+
+    if verify:
+        verification = verify_snapshot(snapshot_path)
+        if not verification['valid']:
+            return {'success': False, 'error': "; ".join(verification['errors']), 'chunks_imported': 0}
+        manifest = verification['manifest']
+    else:
+        try:
+            with open(snapshot_dir / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            return {'success': False, 'error': f"Cannot read manifest: {e}", 'chunks_imported': 0}
+
+    # Vectors from another model would silently return nonsense at query time. Compared with
+    # the model recorded on the target collections, which may differ from EMBEDDING_MODEL
+    try:
+        mismatch = _model_mismatch(manifest, _store_model(vector_store, _store_collections(vector_store)))
+    except ValueError as e:
+        mismatch = str(e)
+    if mismatch:
+        return {'success': False, 'error': mismatch, 'chunks_imported': 0}
+
+    sharded = hasattr(vector_store, 'get_shard')
+    # Shard (None for a single-collection store) -> (store, store the rows are added to)
+    targets: Dict[Optional[str], Tuple[VectorStore, VectorStore]] = {}
+
+    def target(shard: Optional[str]) -> VectorStore:
+        if shard not in targets:
+            store = vector_store.get_shard(shard) if sharded else vector_store
+            if not replace:
+                store._refresh_collection()
+            # A shard the snapshot creates gets the configured model, which may not be the snapshot's
+            mismatch = _model_mismatch(manifest, _recorded_model(store.collection, store.embedding_model))
+            if mismatch:
+                raise ValueError(mismatch)
+            targets[shard] = (store, _side_store(store, manifest) if replace else store)
+        return targets[shard][1]
+
+    def drop_side_stores():
+        for _, side in targets.values():
+            try:
+                side.client.delete_collection(name=side.collection_name)
+            except Exception:
+                pass
+
+    row = 0
+    try:
+        embeddings = np.load(snapshot_dir / EMBEDDINGS_FILE, mmap_mode='r')
+        batch_size = min(vector_store.client.get_max_batch_size(), 20000)
+        for batch in _iter_snapshot_batches(snapshot_dir, batch_size):
+            batch_embeddings = np.asarray(embeddings[row:row + len(batch)], dtype=np.float32)
+
+            # Rows of a sharded snapshot go back to their shard; everything else
+            # lands in the target store's (default) collection
+            groups: Dict[Optional[str], List[int]] = {}
+            for i, chunk in enumerate(batch):
+                shard = chunk.get('shard') if sharded else None
+                if sharded and shard is None:
+                    shard = vector_store.route({'metadata': chunk['metadata']})
+                groups.setdefault(shard, []).append(i)
+
+            with vector_store._writing():
+                for shard, positions in groups.items():
+                    target(shard).collection.add(
+                        ids=[batch[i]['id'] for i in positions],
+                        documents=[batch[i]['document'] for i in positions],
+                        metadatas=[batch[i]['metadata'] for i in positions],
+                        embeddings=batch_embeddings[positions].tolist()
+                    )
+            row += len(batch)
+
+        if row != manifest['chunk_count']:
+            if replace:
+                drop_side_stores()
+            return {
+                'success': False,
+                'error': f"Snapshot has {row} chunks but the manifest lists {manifest['chunk_count']}",
+                'chunks_imported': 0 if replace else row
+            }
+
+        if replace:
+            with vector_store._writing():
+                for store, side in targets.values():
+                    store.replace_collection(side)
+                    # Chunks stored as offsets went with the old collection
+                    if store.document_store is not None:
+                        store.document_store.delete(store.document_store.document_ids(store.collection_name))
+                # Everything the snapshot has no rows for is emptied
+                if sharded:
+                    missing = [shard for shard in vector_store.list_shards() if shard not in targets]
+                    if missing:
+                        vector_store.clear_collection(shards=missing)
+                elif not targets:
+                    vector_store.clear_collection()
+
+        # Imported chunks carry their dedup signatures; reload them on the next ingest.
+        # Closed shards load theirs when reopened anyway.
+        stores = [vector_store.get_shard(shard) for shard in vector_store.open_shards()] if sharded else [vector_store]
+        for store in stores:
+            if store.deduplicator is not None:
+                store.deduplicator.clear()
+                store._dedup_index_loaded = False
+
+    except Exception as e:
+        if replace:
+            drop_side_stores()
+        return {'success': False, 'error': str(e), 'chunks_imported': 0 if replace else row}
+
+    return {
+        'success': True,
+        'error': None,
+        'chunks_imported': row,
+        'seconds': time.perf_counter() - start
+    }
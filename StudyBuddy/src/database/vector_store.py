@@ -1,41 +1,167 @@
 import chromadb
 from chromadb.config import Settings as ChromaSettings
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from datetime import datetime
+import json
+import time
 import uuid
 import numpy as np
 import os
+from contextlib import nullcontext
 
 import src.utils.text_processing as text_utils
 from config.settings import settings
 from src.database.chroma_config import get_chroma_client
+from src.database.index_coordination import get_coordinator
+from src.database.document_store import get_document_store
+from src.database.embedding_backends import (
+    load_embedding_model, get_embedding_model, model_metadata, MODEL_KEY, MODEL_DIMENSION_KEY
+)
+from src.database.embedding_cache import get_embedding_cache
+from src.database.dimension_reduction import (
+    EmbeddingProjection, reduction_metadata, projection_path, persist_directory, get_full_embedding_store,
+    REDUCTION_KEY, DIMENSION_KEY, REDUCTION_NONE, REDUCTION_PCA, REDUCTION_TRUNCATE, FULL_EMBEDDINGS_FILE
+)
+from src.ingestion.deduplication import ChunkDeduplicator
+
+REBUILD_PAGE_SIZE = 5000
+# Per-document fields kept once in the document store instead of on every chunk
+DOCUMENT_LEVEL_FIELDS = ('title', 'first_line')
+# With offset storage, ``contains`` is checked on the read-back text of this many times top_k candidates
+CONTAINS_CANDIDATE_FACTOR = 5
+
+def hnsw_metadata(
+    m: Optional[int] = None,
+    construction_ef: Optional[int] = None,
+    search_ef: Optional[int] = None
+) -> Dict[str, Any]:
+    """Collection metadata for the HNSW index, defaulting to the configured parameters"""
+    return {
+        "hnsw:space": "cosine",
+        "hnsw:M": m or settings.HNSW_M,
+        "hnsw:construction_ef": construction_ef or settings.HNSW_CONSTRUCTION_EF,
+        "hnsw:search_ef": search_ef or settings.HNSW_SEARCH_EF
+    }
+
+def _timestamp(value) -> float:
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+def build_search_filters(filters: Optional[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Translate search filters into Chroma ``where`` / ``where_document`` clauses.
+    
+    Supported keys: ``filenames``, ``file_extensions`` (".pdf" or "pdf"),
+    ``modified_after`` / ``modified_before`` (Unix time or datetime) and
+    ``contains`` (text the chunk must include). Filenames match the file a
+    chunk is stored under, not extra sources of a deduplicated chunk.
+    """
+    if not filters:
+        return None, None
+    
+    conditions = []
+    if filters.get('filenames'):
+        conditions.append({'filename': {'$in': list(filters['filenames'])}})
+    if filters.get('file_extensions'):
+        extensions = [ext.lower() if ext.startswith('.') else f".{ext.lower()}" for ext in filters['file_extensions']]
+        conditions.append({'file_extension': {'$in': extensions}})
+    if filters.get('modified_after') is not None:
+        conditions.append({'last_modified': {'$gte': _timestamp(filters['modified_after'])}})
+    if filters.get('modified_before') is not None:
+        conditions.append({'last_modified': {'$lte': _timestamp(filters['modified_before'])}})
+    
+    unknown = set(filters) - {'filenames', 'file_extensions', 'modified_after', 'modified_before', 'contains'}
+    if unknown:
+        raise ValueError(f"Unsupported search filters: {', '.join(sorted(unknown))}")
+    
+    # Chroma wants a bare condition for one clause and $and for several
+    where = None
+    if len(conditions) == 1:
+        where = conditions[0]
+    elif conditions:
+        where = {'$and': conditions}
+    
+    where_document = {'$contains': filters['contains']} if filters.get('contains') else None
+    return where, where_document
 
 class VectorStore:
-    def __init__(self):
+    def __init__(
+        self,
+        collection_name: Optional[str] = None,
+        client=None,
+        embedding_model=None,
+        collection_metadata: Optional[Dict[str, Any]] = None
+    ):
         # Set environment variable to disable telemetry
         os.environ["ANONYMIZED_TELEMETRY"] = "False"
         
-        try:
-            self.client = get_chroma_client(settings.CHROMA_PERSIST_DIRECTORY)
-        except Exception as e:
-            print(f"ChromaDB initialization warning (continuing anyway): {e}")
-            # Fallback to basic client
-            self.client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY)
+        # Shards share one client and embedding model instead of loading their own
+        if client is not None:
+            self.client = client
+        else:
+            try:
+                self.client = get_chroma_client(settings.CHROMA_PERSIST_DIRECTORY)
+            except Exception as e:
+                print(f"ChromaDB initialization warning (continuing anyway): {e}")
+                # Fallback to basic client
+                self.client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY)
         
-        self.embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL)
+        self.embedding_model = None
+        self.embedding_cache = None
+        self.collection_metadata = {**hnsw_metadata(), **reduction_metadata(), **(collection_metadata or {})}
+        self._set_embedding_model(embedding_model or load_embedding_model())
+        # Other processes may write to the same directory; see IndexCoordinator
+        self.coordinator = get_coordinator(self.client)
         
-        self.collection_name = settings.COLLECTION_NAME
+        # Also opened without offset storage, for chunks stored as offsets earlier
+        self.document_store = get_document_store(self.client, create=settings.OFFSET_CHUNK_STORAGE)
+        self.offset_storage = settings.OFFSET_CHUNK_STORAGE and self.document_store is not None
+        if settings.OFFSET_CHUNK_STORAGE and not self.offset_storage:
+            print("Offset chunk storage needs a persistent client; storing chunk text instead")
+        
+        self.collection_name = collection_name or settings.COLLECTION_NAME
         self.collection = self._get_or_create_collection()
+        # Detected here rather than as unrelated search results later
+        self._follow_collection_model()
+        self._check_index_dimension()
+        
+        # A collection keeps the embedding reduction it was created with
+        self.persist_directory = persist_directory(self.client)
+        self.projection = None
+        self._projection_mtime = None
+        if self._reduction() != self._configured_reduction():
+            print(
+                f"Collection {self.collection_name} was built with embedding reduction {self._reduction() or REDUCTION_NONE}; "
+                "clear and re-index it to use EMBEDDING_REDUCTION"
+            )
+        
+        self.deduplicator = None
+        if settings.DEDUPLICATION_ENABLED:
+            self.deduplicator = ChunkDeduplicator(max_distance=settings.DEDUP_MAX_HAMMING_DISTANCE)
+        self._dedup_index_loaded = False
+        self._dedup_index_reloads = 0
+    
+    def _writing(self):
+        """Hold the index writer lock shared with other processes"""
+        return self.coordinator.writing(self.client) if self.coordinator else nullcontext()
+    
+    def _reading(self):
+        """Pick up index generations written by other processes before reading"""
+        return self.coordinator.reading(self.client) if self.coordinator else nullcontext()
     
     def _get_or_create_collection(self):
         """Get or create a collection, ensuring it exists"""
         try:
             return self.client.get_collection(name=self.collection_name)
         except Exception:
-            return self.client.create_collection(
-                name=self.collection_name,
-                metadata={"hnsw:space": "cosine"}
-            )
+            pass
+        # Under the writer lock, so a collection another process is swapping in is waited for, not re-created
+        with self._writing():
+            try:
+                return self.client.get_collection(name=self.collection_name)
+            except Exception:
+                return self.client.create_collection(
+                    name=self.collection_name,
+                    metadata=self.collection_metadata
+                )
     
     def _refresh_collection(self):
         """Refresh collection reference to avoid stale references"""
@@ -43,78 +169,600 @@ class VectorStore:
             self.collection = self.client.get_collection(name=self.collection_name)
         except Exception:
             self.collection = self._get_or_create_collection()
+        self._follow_collection_model()
+    
+    def _set_embedding_model(self, embedding_model):
+        self.embedding_model = embedding_model
+        self.collection_metadata = {
+            **{key: value for key, value in self.collection_metadata.items() if key not in (MODEL_KEY, MODEL_DIMENSION_KEY)},
+            **model_metadata(embedding_model)
+        }
+        # Only models that say which vectors they produce can share cached embeddings
+        self.embedding_cache = None
+        model_id = getattr(embedding_model, 'embedding_model_id', None)
+        if settings.EMBEDDING_CACHE_ENABLED and model_id:
+            self.embedding_cache = get_embedding_cache(model_id, embedding_model.get_sentence_embedding_dimension())
+    
+    def _follow_collection_model(self):
+        """Embed queries and chunks with the model the collection was built with.
+        
+        After another process migrated the collection to a new model, or when
+        EMBEDDING_MODEL was changed without migrating it, the configured model's
+        vectors would not match the stored ones.
+        """
+        recorded = (getattr(self.collection, 'metadata', None) or {}).get(MODEL_KEY)
+        current = getattr(self.embedding_model, 'embedding_model_name', None)
+        if recorded is None or current is None or recorded == current:
+            return
+        print(
+            f"Collection {self.collection_name} is embedded with {recorded}, not {current}; using {recorded} for it "
+            f"(set EMBEDDING_MODEL={recorded}, or switch the collection with main.py --migrate-model {current})"
+        )
+        self._set_embedding_model(get_embedding_model(recorded))
+    
+    def _check_index_dimension(self):
+        """Warn when a collection that does not record its model has vectors of another width"""
+        metadata = getattr(self.collection, 'metadata', None) or {}
+        if MODEL_KEY in metadata:
+            return
+        expected = self.embedding_model.get_sentence_embedding_dimension()
+        dimension = metadata.get(MODEL_DIMENSION_KEY)
+        if dimension is None and REDUCTION_KEY not in metadata:
+            # Collections from before the model was recorded: look at a stored vector
+            stored = self.collection.get(limit=1, include=['embeddings'])['embeddings']
+            dimension = len(stored[0]) if stored is not None and len(stored) else None
+        if dimension is not None and dimension != expected:
+            print(
+                f"❌ Collection {self.collection_name} holds {dimension}-dimension vectors, but "
+                f"{settings.EMBEDDING_MODEL} produces {expected}: it was built with another model. "
+                "Set EMBEDDING_MODEL back, or clear the knowledge base and ingest again"
+            )
+    
+    def _configured_reduction(self) -> Optional[Tuple[str, int]]:
+        metadata = self.collection_metadata
+        return (metadata[REDUCTION_KEY], metadata[DIMENSION_KEY]) if REDUCTION_KEY in metadata else None
+    
+    def _reduction(self) -> Optional[Tuple[str, int]]:
+        """(method, dimension) of a collection indexed at reduced dimension, None at full dimension"""
+        metadata = getattr(self.collection, 'metadata', None) or {}
+        if metadata.get(REDUCTION_KEY, REDUCTION_NONE) == REDUCTION_NONE:
+            return None
+        return metadata[REDUCTION_KEY], int(metadata[DIMENSION_KEY])
+    
+    def _get_projection(self) -> Optional[EmbeddingProjection]:
+        """The collection's projection; None at full dimension or before its PCA is fitted"""
+        reduction = self._reduction()
+        if reduction is None:
+            return None
+        method, dimension = reduction
+        if method == REDUCTION_TRUNCATE:
+            if self.projection is None or self.projection.dimension != dimension:
+                full_dimension = self.embedding_model.get_sentence_embedding_dimension()
+                self.projection = EmbeddingProjection.truncation(full_dimension, dimension)
+            return self.projection
+        if self.persist_directory is None:
+            return self.projection  # Fitted by this process and kept in memory only
+        
+        # Another process may have fitted it, or re-fitted it after clearing the collection
+        path = projection_path(self.persist_directory, self.collection_name)
+        mtime = path.stat().st_mtime_ns if path.exists() else None
+        if mtime != self._projection_mtime:
+            self.projection = EmbeddingProjection.load(path) if mtime is not None else None
+            self._projection_mtime = mtime
+        return self.projection
+    
+    def _pca_fit_samples(self) -> int:
+        """Chunks a final PCA is fitted on; fewer than the dimension would leave directions unused"""
+        return max(settings.PCA_FIT_SAMPLES, self._reduction()[1])
+    
+    def _refitting_projection(self) -> bool:
+        """Whether the PCA still has to be fitted, or was fitted on too few chunks and will be again"""
+        reduction = self._reduction()
+        if reduction is None or reduction[0] != REDUCTION_PCA:
+            return False
+        projection = self._get_projection()
+        return projection is None or (projection.samples is not None and projection.samples < self._pca_fit_samples())
+    
+    def _fit_projection(self, embeddings: np.ndarray, full_embeddings=None) -> EmbeddingProjection:
+        """Fit the PCA on every chunk kept in ``full_embeddings``, or on ``embeddings`` without them"""
+        _, dimension = self._reduction()
+        if full_embeddings is not None:
+            ids, embeddings = full_embeddings.all(self.collection_name)
+        note = ""
+        if len(embeddings) < self._pca_fit_samples():
+            if full_embeddings is not None:
+                note = "; it is fitted again as more chunks are added"
+            else:
+                print(
+                    f"Fitting PCA on only {len(embeddings)} chunks for {dimension} dimensions; "
+                    "clear and re-index once more documents are added for a better projection"
+                )
+        self.projection = EmbeddingProjection.fit_pca(embeddings, dimension)
+        if self.persist_directory is not None:
+            path = projection_path(self.persist_directory, self.collection_name)
+            self.projection.save(path)
+            self._projection_mtime = path.stat().st_mtime_ns
+        print(f"Fitted a {dimension}-dimension PCA projection on {len(embeddings)} chunks{note}")
+        
+        if full_embeddings is not None:
+            # Chunks indexed with an earlier fit are projected again with this one
+            for start in range(0, len(ids), REBUILD_PAGE_SIZE):
+                page_ids = ids[start:start + REBUILD_PAGE_SIZE]
+                stored = set(self.collection.get(ids=page_ids, include=[])['ids'])
+                positions = [i for i, chunk_id in enumerate(page_ids, start=start) if chunk_id in stored]
+                if positions:
+                    self.collection.update(
+                        ids=[ids[i] for i in positions],
+                        embeddings=self.projection.transform(embeddings[positions]).tolist()
+                    )
+            if not settings.RESCORE_FULL_DIMENSION and not self._refitting_projection():
+                full_embeddings.delete(self.collection_name)  # Only kept for fitting
+        return self.projection
     
-    def add_documents(self, documents: List[Dict[str, Any]]):
+    def _full_embedding_store(self):
+        """Where full embeddings are kept: for rescoring, and to refit a PCA fitted on too few chunks"""
+        if self.persist_directory is None or self._reduction() is None:
+            return None
+        if not settings.RESCORE_FULL_DIMENSION and not self._refitting_projection():
+            return None
+        return get_full_embedding_store(self.persist_directory)
+    
+    def _rescoring(self) -> bool:
+        return settings.RESCORE_FULL_DIMENSION and self._full_embedding_store() is not None
+    
+    def _index_embeddings(self, embeddings: np.ndarray, chunk_ids: List[str]) -> np.ndarray:
+        """Embeddings as they go into the index; call while holding the writer lock.
+        
+        A PCA fitted on fewer than ``_pca_fit_samples`` chunks is fitted again,
+        on all chunks so far, each time their number has doubled and once it
+        reaches that many, instead of staying rank-deficient for good.
+        """
+        if self._reduction() is None:
+            return embeddings
+        full_embeddings = self._full_embedding_store()
+        if full_embeddings is not None:
+            full_embeddings.put(self.collection_name, chunk_ids, embeddings)
+        
+        projection = self._get_projection()
+        if projection is None:
+            projection = self._fit_projection(embeddings, full_embeddings)
+        elif full_embeddings is not None and self._refitting_projection():
+            samples = full_embeddings.count(self.collection_name)
+            if samples >= min(2 * projection.samples, self._pca_fit_samples()):
+                projection = self._fit_projection(embeddings, full_embeddings)
+        return projection.transform(embeddings)
+    
+    def _rescore(self, query_embedding: np.ndarray, ids: List[str], candidates: List[Tuple]) -> List[Tuple]:
+        """Re-rank (document, metadata, distance) candidates by full-dimension cosine distance"""
+        full_embeddings = self._full_embedding_store().get(self.collection_name, ids)
+        if len(full_embeddings) < len(ids):
+            return candidates  # Chunks indexed without full embeddings keep the reduced ranking
+        vectors = np.stack([full_embeddings[chunk_id] for chunk_id in ids])
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        query_embedding = query_embedding / max(float(np.linalg.norm(query_embedding)), 1e-12)
+        distances = 1 - vectors @ query_embedding
+        return [
+            (candidates[i][0], candidates[i][1], float(distances[i]))
+            for i in np.argsort(distances, kind='stable')
+        ]
+    
+    def _encode_chunks(self, texts: List[str]) -> np.ndarray:
+        """Embeddings of chunk texts; with the embedding cache only uncached texts reach the model"""
+        if self.embedding_cache is None:
+            return np.asarray(self.embedding_model.encode(texts), dtype=np.float32)
+        return self.embedding_cache.encode(texts, self.embedding_model.encode)
+    
+    def add_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        progress_callback: Optional[Callable[[int], None]] = None,
+        checkpoint_callback: Optional[Callable[[Dict[str, int]], None]] = None
+    ) -> Dict[str, Any]:
+        """Chunk, embed and store documents; ``progress_callback`` gets the running chunk count.
+        
+        A document with a ``chunk_id_prefix`` gets stable chunk ids, so storing it
+        again overwrites instead of duplicating, and its first ``resume_from_chunk``
+        chunks are skipped. After each stored batch ``checkpoint_callback`` gets
+        the number of chunks handled so far per file path.
+        """
         self._refresh_collection()  # Ensure we have a valid collection reference
+        with self._reading():
+            self._ensure_dedup_index()
+        if self.deduplicator is not None:
+            self.deduplicator.reset_stats()
+        
+        batch_size = 100
+        batch_chunks = []
+        batch_metadatas = []
+        batch_ids = []
+        batch_positions = {}
+        stored_duplicate_sources = {}
+        chunks_handled = {}
+        chunks_added = 0
+        encode_seconds = 0.0
+        # Re-storing a stable id must replace the earlier copy
+        upsert = any('chunk_id_prefix' in doc for doc in documents)
+        cache_lookups = (self.embedding_cache.hits, self.embedding_cache.misses) if self.embedding_cache else None
+        # A PCA projection is fitted on one larger first batch
+        fitting_projection = self._reduction() is not None and self._get_projection() is None
+        
+        def flush():
+            nonlocal chunks_added, encode_seconds, fitting_projection
+            if not batch_chunks:
+                return
+            
+            encode_start = time.perf_counter()
+            embeddings = self._encode_chunks(batch_chunks)
+            encode_seconds += time.perf_counter() - encode_start
+            
+            # The lock is taken per batch, so readers and other writers get in between
+            with self._writing():
+                if self.offset_storage:
+                    # Chunks only point into the document text, which must be stored first
+                    self.document_store.flush_pending()
+                self._refresh_collection()
+                embeddings = self._index_embeddings(embeddings, batch_ids)
+                fitting_projection = False
+                write = self.collection.upsert if upsert else self.collection.add
+                write(
+                    documents=None if self.offset_storage else batch_chunks,
+                    embeddings=embeddings.tolist(),
+                    metadatas=batch_metadatas,
+                    ids=batch_ids
+                )
+                chunks_added += len(batch_chunks)
+                batch_chunks.clear()
+                batch_metadatas.clear()
+                batch_ids.clear()
+                batch_positions.clear()
+                if stored_duplicate_sources:
+                    self._add_duplicate_sources(stored_duplicate_sources)
+                    stored_duplicate_sources.clear()
+            
+            if progress_callback:
+                progress_callback(chunks_added)
+            if checkpoint_callback:
+                checkpoint_callback(dict(chunks_handled))
+        
+        # Embed and add to ChromaDB in batches as chunks are produced, so a
+        # streamed document never has to be held in memory all at once
+        try:
+            for chunk_id, chunk_text, chunk_metadata in self._iter_document_chunks(documents):
+                chunks_handled[chunk_metadata.get('file_path', chunk_metadata['filename'])] = chunk_metadata['chunk_index'] + 1
+                
+                if self.deduplicator is not None:
+                    duplicate_of, signature_metadata = self.deduplicator.check(chunk_id, chunk_text)
+                    if duplicate_of == chunk_id:
+                        # Stored by an interrupted run under the same stable id
+                        continue
+                    if duplicate_of is not None:
+                        # Store the text once; remember this file as another source of it
+                        if duplicate_of in batch_positions:
+                            self._merge_sources(batch_metadatas[batch_positions[duplicate_of]], chunk_metadata)
+                        else:
+                            stored_duplicate_sources.setdefault(duplicate_of, []).append(chunk_metadata)
+                        continue
+                    
+                    chunk_metadata.update(signature_metadata)
+                    chunk_metadata['source_files'] = json.dumps({chunk_metadata['filename']: self._source_entry(chunk_metadata)})
+                    chunk_metadata['duplicate_count'] = 1
+                
+                batch_positions[chunk_id] = len(batch_chunks)
+                batch_chunks.append(chunk_text)
+                batch_metadatas.append(chunk_metadata)
+                batch_ids.append(chunk_id)
+                
+                if len(batch_chunks) >= (settings.PCA_FIT_SAMPLES if fitting_projection else batch_size):
+                    flush()
+            flush()
+        except Exception:
+            # Chunks of the unwritten batch were registered when checked; forget them, or a
+            # retry would skip them as duplicates of chunks that were never stored
+            if self.deduplicator is not None:
+                self.deduplicator.remove(batch_ids)
+            raise
+        
+        if stored_duplicate_sources:
+            with self._writing():
+                self._add_duplicate_sources(stored_duplicate_sources)
+        if checkpoint_callback:
+            checkpoint_callback(dict(chunks_handled))
+        
+        print(f"Added {chunks_added} chunks from {len(documents)} documents")
         
-        all_chunks = []
-        all_embeddings = []
-        all_metadatas = []
-        all_ids = []
+        result = {
+            'documents_added': len(documents),
+            'chunks_added': chunks_added
+        }
+        if self.embedding_cache is not None:
+            hits = self.embedding_cache.hits - cache_lookups[0]
+            misses = self.embedding_cache.misses - cache_lookups[1]
+            result['embedding_cache'] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0
+            }
+            if hits:
+                print(f"Reused {hits} of {hits + misses} chunk embeddings from the embedding cache")
+        if self.deduplicator is not None:
+            result['deduplication'] = self._dedup_report(chunks_added, encode_seconds)
+            if result['deduplication']['duplicates_skipped']:
+                report = result['deduplication']
+                print(
+                    f"Skipped {report['duplicates_skipped']} duplicate chunks "
+                    f"({report['exact_duplicates']} exact, {report['near_duplicates']} near): "
+                    f"saved ~{report['bytes_saved'] / 1024:.1f} KB and ~{report['embedding_seconds_saved']:.1f}s of embedding"
+                )
+        return result
+    
+    def add_chunks(
+        self,
+        ids: List[str],
+        documents: List[Optional[str]],
+        metadatas: List[Dict[str, Any]],
+        texts: List[str]
+    ):
+        """Embed ``texts`` and store them under the given ids, as copied from another collection.
+        
+        ``documents`` are what Chroma stores: None for chunks stored as offsets.
+        """
+        embeddings = self._encode_chunks(texts)
+        with self._writing():
+            self._refresh_collection()
+            embeddings = self._index_embeddings(embeddings, ids)
+            for stored_text in (True, False):
+                positions = [i for i, document in enumerate(documents) if (document is not None) == stored_text]
+                if positions:
+                    self.collection.upsert(
+                        ids=[ids[i] for i in positions],
+                        documents=[documents[i] for i in positions] if stored_text else None,
+                        embeddings=embeddings[positions].tolist(),
+                        metadatas=[metadatas[i] for i in positions]
+                    )
+    
+    def replace_collection(self, replacement: "VectorStore"):
+        """Swap in another store's collection under this store's name, with its model.
+        
+        Call while holding the writer lock. Files kept per collection (the
+        projection, full embeddings for rescoring) move with it.
+        """
+        self.client.delete_collection(name=self.collection_name)
+        replacement.collection.modify(name=self.collection_name)
+        if self.persist_directory is not None:
+            path = projection_path(self.persist_directory, self.collection_name)
+            path.unlink(missing_ok=True)
+            replacement_path = projection_path(self.persist_directory, replacement.collection_name)
+            if replacement_path.exists():
+                os.replace(replacement_path, path)
+            if os.path.exists(os.path.join(self.persist_directory, FULL_EMBEDDINGS_FILE)):
+                full_embeddings = get_full_embedding_store(self.persist_directory)
+                full_embeddings.delete(self.collection_name)
+                full_embeddings.rename(replacement.collection_name, self.collection_name)
+        self.projection = None
+        self._projection_mtime = None
+        self._set_embedding_model(replacement.embedding_model)
+        self.collection = self.client.get_collection(name=self.collection_name)
+    
+    def _dedup_report(self, chunks_added: int, encode_seconds: float) -> Dict[str, Any]:
+        stats = self.deduplicator.stats
+        skipped = stats['exact_duplicates'] + stats['near_duplicates']
+        seconds_per_chunk = encode_seconds / chunks_added if chunks_added else 0.0
+        vector_bytes = self.embedding_model.get_sentence_embedding_dimension() * 4 if skipped else 0
+        
+        return {
+            'duplicates_skipped': skipped,
+            'exact_duplicates': stats['exact_duplicates'],
+            'near_duplicates': stats['near_duplicates'],
+            'chars_saved': stats['chars_saved'],
+            # Stored text plus one float32 vector per skipped chunk
+            'bytes_saved': stats['chars_saved'] + skipped * vector_bytes,
+            'embedding_seconds_saved': skipped * seconds_per_chunk
+        }
+    
+    @staticmethod
+    def _source_entry(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        return {'file_path': metadata.get('file_path', ''), 'last_modified': metadata.get('last_modified', 0.0)}
+    
+    def _merge_sources(self, target_metadata: Dict[str, Any], duplicate_metadata: Dict[str, Any]):
+        sources = json.loads(target_metadata.get('source_files', '{}'))
+        sources[duplicate_metadata['filename']] = self._source_entry(duplicate_metadata)
+        target_metadata['source_files'] = json.dumps(sources)
+        target_metadata['duplicate_count'] = len(sources)
+    
+    def _add_duplicate_sources(self, duplicate_sources: Dict[str, List[Dict[str, Any]]]):
+        ids = list(duplicate_sources)
+        existing = self.collection.get(ids=ids, include=['metadatas'])
         
+        updated_ids, updated_metadatas = [], []
+        for chunk_id, metadata in zip(existing['ids'], existing['metadatas']):
+            for duplicate_metadata in duplicate_sources[chunk_id]:
+                self._merge_sources(metadata, duplicate_metadata)
+            updated_ids.append(chunk_id)
+            updated_metadatas.append(metadata)
+        
+        if updated_ids:
+            self.collection.update(ids=updated_ids, metadatas=updated_metadatas)
+    
+    def _ensure_dedup_index(self):
+        """Load signatures of already stored chunks so duplicates are found across runs"""
+        if self.deduplicator is None:
+            return
+        if self.coordinator is not None and self.coordinator.reloads != self._dedup_index_reloads:
+            # Another process has written since the signatures were loaded
+            self.deduplicator.clear()
+            self._dedup_index_loaded = False
+        if self._dedup_index_loaded:
+            return
+        
+        try:
+            results = self.collection.get(include=['metadatas'])
+        except Exception as e:
+            print(f"Warning: Could not load deduplication index: {e}")
+            return
+        
+        for chunk_id, metadata in zip(results['ids'], results['metadatas']):
+            if metadata and 'content_fingerprint' in metadata and 'simhash' in metadata:
+                self.deduplicator.register(chunk_id, metadata['content_fingerprint'], int(metadata['simhash'], 16))
+        self._dedup_index_loaded = True
+        if self.coordinator is not None:
+            self._dedup_index_reloads = self.coordinator.reloads
+    
+    def _iter_document_chunks(self, documents: List[Dict[str, Any]]):
+        """Yield (chunk_id, text, metadata) for every chunk still to be stored"""
         for doc in documents:
-            content = doc['content']
             metadata = doc['metadata']
+            sections = doc.get('sections')
+            id_prefix = doc.get('chunk_id_prefix')
+            resume_from = doc.get('resume_from_chunk', 0)
             
-            chunks = text_utils.chunk_text(
-                content, 
-                chunk_size=settings.CHUNK_SIZE, 
-                chunk_overlap=settings.CHUNK_OVERLAP
-            )
+            document_writer = None
+            chunk_metadata_base = metadata
+            if self.offset_storage:
+                document_writer = self.document_store.open_document(id_prefix or uuid.uuid4().hex, self.collection_name)
+                chunk_metadata_base = {
+                    **{key: value for key, value in metadata.items() if key not in DOCUMENT_LEVEL_FIELDS},
+                    'doc_id': document_writer.doc_id
+                }
+            
+            if 'content_stream' in doc:
+                pieces = doc['content_stream']()
+                if document_writer is not None:
+                    pieces = self._write_through(pieces, document_writer, metadata)
+                chunks = text_utils.chunk_text_stream(
+                    pieces,
+                    chunk_size=settings.CHUNK_SIZE,
+                    chunk_overlap=settings.CHUNK_OVERLAP
+                )
+                total_chunks = None
+            else:
+                if document_writer is not None:
+                    document_writer.write(doc['content'])
+                    document_writer.close(metadata)
+                chunks = text_utils.chunk_text(
+                    doc['content'], 
+                    chunk_size=settings.CHUNK_SIZE, 
+                    chunk_overlap=settings.CHUNK_OVERLAP
+                )
+                total_chunks = len(chunks)
             
             for i, chunk in enumerate(chunks):
-                chunk_id = str(uuid.uuid4())
-                chunk_text = chunk['text']
+                if i < resume_from:
+                    continue
                 
                 chunk_metadata = {
-                    **metadata,
+                    **chunk_metadata_base,
                     'chunk_index': i,
-                    'total_chunks': len(chunks),
                     'token_count': chunk['token_count']
                 }
+                if document_writer is not None:
+                    chunk_metadata['start_char'] = chunk['start_char']
+                    chunk_metadata['end_char'] = chunk['end_char']
+                if total_chunks is not None:
+                    chunk_metadata['total_chunks'] = total_chunks
                 
-                # Create embedding
-                embedding = self.embedding_model.encode(chunk_text).tolist()
+                # Page (PDF) or section (DOCX) numbers for citations
+                if sections:
+                    page_start, page_end = text_utils.locate_sections(
+                        sections, chunk['start_char'], chunk['end_char']
+                    )
+                    chunk_metadata['page_start'] = page_start
+                    chunk_metadata['page_end'] = page_end
                 
-                all_chunks.append(chunk_text)
-                all_embeddings.append(embedding)
-                all_metadatas.append(chunk_metadata)
-                all_ids.append(chunk_id)
+                chunk_id = f"{id_prefix}-{i:06d}" if id_prefix else str(uuid.uuid4())
+                yield chunk_id, chunk['text'], chunk_metadata
+    
+    @staticmethod
+    def _write_through(pieces, document_writer, metadata: Dict[str, Any]):
+        """Pass a streamed document's pieces on to the chunker while storing them"""
+        for piece in pieces:
+            document_writer.write(piece)
+            yield piece
+        document_writer.close(metadata)
+    
+    def materialize(self, documents: List[Optional[str]], metadatas: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Chunk texts, reading those stored as offsets back from the document store.
         
-        # Add to ChromaDB in batches
-        batch_size = 100
-        for i in range(0, len(all_chunks), batch_size):
-            batch_end = min(i + batch_size, len(all_chunks))
-            
-            self.collection.add(
-                documents=all_chunks[i:batch_end],
-                embeddings=all_embeddings[i:batch_end],
-                metadatas=all_metadatas[i:batch_end],
-                ids=all_ids[i:batch_end]
-            )
+        Metadata of such chunks gets its document-level fields (title, first line)
+        back, so callers see the same chunks as with full-text storage.
+        """
+        offset_chunks = [
+            i for i, (doc, metadata) in enumerate(zip(documents, metadatas))
+            if doc is None and metadata and 'doc_id' in metadata
+        ]
+        if not offset_chunks:
+            return list(documents)
         
-        print(f"Added {len(all_chunks)} chunks from {len(documents)} documents")
+        if self.document_store is None:
+            return list(documents)
+        
+        texts = list(documents)
+        document_fields = self.document_store.get_metadata(metadatas[i]['doc_id'] for i in offset_chunks)
+        for i in offset_chunks:
+            metadata = metadatas[i]
+            texts[i] = self.document_store.get_text(metadata['doc_id'], metadata['start_char'], metadata['end_char'])
+            for key, value in document_fields.get(metadata['doc_id'], {}).items():
+                metadata.setdefault(key, value)
+        return texts
+    
+    def search(self, query: str, top_k: int = None, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Nearest chunks to ``query``; ``filters`` (see build_search_filters) are applied inside Chroma"""
+        self._refresh_collection()  # Picks up a model switch before the query is encoded
+        query_embedding = self.embedding_model.encode(query).tolist()
+        return self.search_by_embedding(query_embedding, top_k=top_k, filters=filters)
     
-    def search(self, query: str, top_k: int = None) -> List[Dict[str, Any]]:
+    def search_by_embedding(
+        self,
+        query_embedding: List[float],
+        top_k: int = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search with an already encoded query, so fan-out searches encode it only once"""
         self._refresh_collection()  # Ensure we have a valid collection reference
         
         if top_k is None:
             top_k = settings.TOP_K_RESULTS
         
-        query_embedding = self.embedding_model.encode(query).tolist()
+        where, where_document = build_search_filters(filters)
+        n_results = top_k
+        contains = None
+        if where_document is not None and self.document_store is not None:
+            # Chunks stored as offsets have no text in Chroma to match against
+            contains = where_document['$contains']
+            where_document = None
+            n_results = top_k * CONTAINS_CANDIDATE_FACTOR
         
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            include=['documents', 'metadatas', 'distances']
-        )
+        full_query = None
+        if self._reduction() is not None:
+            projection = self._get_projection()
+            if projection is None:
+                return []  # Nothing indexed yet
+            if self._rescoring():
+                full_query = np.asarray(query_embedding, dtype=np.float32)
+                n_results *= settings.RESCORE_CANDIDATE_FACTOR
+            query_embedding = projection.transform(query_embedding).tolist()
+        
+        with self._reading():
+            results = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                where=where,
+                where_document=where_document,
+                include=['documents', 'metadatas', 'distances']
+            )
+            candidates = list(zip(results['documents'][0], results['metadatas'][0], results['distances'][0]))
+            if full_query is not None:
+                candidates = self._rescore(full_query, results['ids'][0], candidates)
+            if contains is None:
+                candidates = candidates[:top_k]
+            # Text is read only for the chunks actually returned
+            documents = self.materialize([doc for doc, _, _ in candidates], [metadata for _, metadata, _ in candidates])
+        
+        candidates = [(doc, metadata, distance) for doc, (_, metadata, distance) in zip(documents, candidates)]
+        if contains is not None:
+            candidates = [candidate for candidate in candidates if candidate[0] and contains in candidate[0]][:top_k]
         
         search_results = []
-        for i, (doc, metadata, distance) in enumerate(zip(
-            results['documents'][0],
-            results['metadatas'][0], 
-            results['distances'][0]
-        )):
+        for i, (doc, metadata, distance) in enumerate(candidates):
             similarity_score = 1 - distance  # Convert distance to similarity
             
             if similarity_score >= settings.SIMILARITY_THRESHOLD:
@@ -136,35 +784,194 @@ class VectorStore:
             # If collection doesn't exist, return zero stats
             print(f"Warning: Could not get collection stats: {e}")
             count = 0
-        return {
+        stats = {
             'total_chunks': count,
-            'collection_name': settings.COLLECTION_NAME,
-            'embedding_model': settings.EMBEDDING_MODEL
+            'collection_name': self.collection_name,
+            'embedding_model': settings.EMBEDDING_MODEL,
+            'index_parameters': self.index_parameters()
         }
+        if self.document_store is not None:
+            stats['document_store'] = self.document_store.stats()
+        if self.embedding_cache is not None:
+            stats['embedding_cache'] = self.embedding_cache.get_stats()
+        if self._reduction() is not None:
+            method, dimension = self._reduction()
+            stats['embedding_reduction'] = {
+                'method': method,
+                'dimension': dimension,
+                'fitted': self._get_projection() is not None,
+                'fit_samples': getattr(self._get_projection(), 'samples', None),
+                'rescoring': self._rescoring()
+            }
+        return stats
     
-    def clear_collection(self):
-        try:
-            self.client.delete_collection(name=self.collection_name)
-        except Exception:
-            pass  # Collection might not exist
+    def index_parameters(self) -> Dict[str, Any]:
+        """HNSW parameters the collection was actually created with"""
+        metadata = getattr(self.collection, 'metadata', None) or {}
+        return {key: value for key, value in metadata.items() if key.startswith('hnsw:')}
+    
+    def rebuild_collection(
+        self,
+        m: Optional[int] = None,
+        construction_ef: Optional[int] = None,
+        search_ef: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Re-create the collection with new HNSW parameters from the stored embeddings.
         
-        self.collection = self.client.create_collection(
-            name=self.collection_name,
-            metadata={"hnsw:space": "cosine"}
-        )
-        print("Collection cleared successfully")
+        Chunks are copied into a temporary collection that replaces the old one
+        only once the copy is complete, so a failed rebuild leaves the index as it was.
+        """
+        with self._writing():
+            self._refresh_collection()  # Ensure we have a valid collection reference
+            start = time.perf_counter()
+            
+            metadata = {
+                **(self.collection.metadata or {}),
+                **hnsw_metadata(m, construction_ef, search_ef)
+            }
+            temp_name = f"{self.collection_name[:54]}-rebuild"
+            try:
+                self.client.delete_collection(name=temp_name)
+            except Exception:
+                pass  # Left over from an interrupted rebuild, if anything
+            temp_collection = self.client.create_collection(name=temp_name, metadata=metadata)
+            
+            try:
+                expected = self.collection.count()
+                offset = 0
+                while True:
+                    page = self.collection.get(
+                        limit=REBUILD_PAGE_SIZE,
+                        offset=offset,
+                        include=['documents', 'metadatas', 'embeddings']
+                    )
+                    if not page['ids']:
+                        break
+                    temp_collection.add(
+                        ids=page['ids'],
+                        documents=page['documents'],
+                        metadatas=page['metadatas'],
+                        embeddings=np.asarray(page['embeddings'], dtype=np.float32).tolist()
+                    )
+                    offset += len(page['ids'])
+                
+                if temp_collection.count() != expected:
+                    raise RuntimeError(f"Copied {temp_collection.count()} of {expected} chunks")
+            except Exception:
+                self.client.delete_collection(name=temp_name)
+                raise
+            
+            self.client.delete_collection(name=self.collection_name)
+            temp_collection.modify(name=self.collection_name)
+            self.collection_metadata = metadata
+            self.collection = self.client.get_collection(name=self.collection_name)
+            
+            print(f"Rebuilt {self.collection_name} ({expected} chunks) in {time.perf_counter() - start:.1f}s")
+            return {
+                'chunks_copied': expected,
+                'index_parameters': self.index_parameters(),
+                'seconds': time.perf_counter() - start
+            }
+    
+    def clear_collection(self):
+        with self._writing():
+            try:
+                self.client.delete_collection(name=self.collection_name)
+            except Exception:
+                pass  # Collection might not exist
+            
+            if self.document_store is not None:
+                self.document_store.delete(self.document_store.document_ids(self.collection_name))
+            # The projection is fitted again on the next ingest, with the current settings
+            if self.persist_directory is not None:
+                projection_path(self.persist_directory, self.collection_name).unlink(missing_ok=True)
+                if os.path.exists(os.path.join(self.persist_directory, FULL_EMBEDDINGS_FILE)):
+                    get_full_embedding_store(self.persist_directory).delete(self.collection_name)
+            self.projection = None
+            self._projection_mtime = None
+            
+            self.collection = self.client.create_collection(
+                name=self.collection_name,
+                metadata=self.collection_metadata
+            )
+            if self.deduplicator is not None:
+                self.deduplicator.clear()
+                self._dedup_index_loaded = True
+            print("Collection cleared successfully")
     
     def delete_by_filename(self, filename: str):
-        self._refresh_collection()  # Ensure we have a valid collection reference
-        
-        results = self.collection.get(
-            where={"filename": filename},
-            include=['ids']
-        )
+        with self._writing():
+            self._refresh_collection()  # Ensure we have a valid collection reference
+            
+            results = self.collection.get(
+                where={"filename": filename},
+                include=['metadatas']
+            )
+            
+            delete_ids = []
+            updated_ids, updated_metadatas = [], []
+            for chunk_id, metadata in zip(results['ids'], results['metadatas']):
+                sources = json.loads(metadata.get('source_files', '{}'))
+                sources.pop(filename, None)
+                if not sources:
+                    delete_ids.append(chunk_id)
+                    continue
+                
+                # Another file shares this chunk: hand it over instead of deleting it
+                new_owner = sorted(sources)[0]
+                metadata.update({
+                    'filename': new_owner,
+                    'file_path': sources[new_owner]['file_path'],
+                    'last_modified': sources[new_owner]['last_modified'],
+                    'source_files': json.dumps(sources),
+                    'duplicate_count': len(sources)
+                })
+                updated_ids.append(chunk_id)
+                updated_metadatas.append(metadata)
+            
+            # Chunks owned by other files that list this file as an extra source
+            if self.deduplicator is not None:
+                shared = self.collection.get(
+                    where={"duplicate_count": {"$gt": 1}},
+                    include=['metadatas']
+                )
+                for chunk_id, metadata in zip(shared['ids'], shared['metadatas']):
+                    sources = json.loads(metadata.get('source_files', '{}'))
+                    if metadata.get('filename') == filename or filename not in sources:
+                        continue
+                    sources.pop(filename)
+                    metadata['source_files'] = json.dumps(sources)
+                    metadata['duplicate_count'] = len(sources)
+                    updated_ids.append(chunk_id)
+                    updated_metadatas.append(metadata)
+            
+            if updated_ids:
+                self.collection.update(ids=updated_ids, metadatas=updated_metadatas)
+            
+            if delete_ids:
+                self.collection.delete(ids=delete_ids)
+                if self.deduplicator is not None:
+                    self.deduplicator.remove(delete_ids)
+                if self._full_embedding_store() is not None:
+                    self._full_embedding_store().delete(self.collection_name, delete_ids)
+                print(f"Deleted {len(delete_ids)} chunks from {filename}")
+            
+            self._delete_unreferenced_documents(
+                {metadata['doc_id'] for metadata in results['metadatas'] if 'doc_id' in metadata}, filename
+            )
+    
+    def _delete_unreferenced_documents(self, doc_ids, filename: str):
+        """Drop stored document text of ``filename`` that no remaining chunk points into"""
+        if self.document_store is None:
+            return
         
-        if results['ids']:
-            self.collection.delete(ids=results['ids'])
-            print(f"Deleted {len(results['ids'])} chunks from {filename}")
+        # A chunk handed over to another file still points into this file's text
+        candidates = set(doc_ids) | set(self.document_store.document_ids(self.collection_name, filename))
+        unreferenced = [
+            doc_id for doc_id in candidates
+            if not self.collection.get(where={'doc_id': doc_id}, limit=1, include=[])['ids']
+        ]
+        self.document_store.delete(unreferenced)
     
     def list_files(self) -> List[str]:
         self._refresh_collection()  # Ensure we have a valid collection reference
@@ -179,5 +986,29 @@ class VectorStore:
         for metadata in results['metadatas']:
             if 'filename' in metadata:
                 filenames.add(metadata['filename'])
+            # Files whose chunks were all duplicates only appear as extra sources
+            if metadata.get('duplicate_count', 1) > 1:
+                filenames.update(json.loads(metadata['source_files']))
+        
+        return sorted(list(filenames))
+    
+    def get_indexed_files(self) -> Dict[str, float]:
+        """Map the path of each indexed file to the last_modified time recorded at ingestion"""
+        self._refresh_collection()  # Ensure we have a valid collection reference
+        
+        try:
+            results = self.collection.get(include=['metadatas'])
+        except Exception as e:
+            print(f"Warning: Could not list files: {e}")
+            return {}
+        
+        indexed = {}
+        for metadata in results['metadatas']:
+            if metadata.get('file_path'):
+                indexed[metadata['file_path']] = metadata.get('last_modified', 0.0)
+            if metadata.get('duplicate_count', 1) > 1:
+                for entry in json.loads(metadata['source_files']).values():
+                    if entry.get('file_path'):
+                        indexed.setdefault(entry['file_path'], entry['last_modified'])
         
-        return sorted(list(filenames))
\ No newline at end of file
+        return indexed
\ No newline at end of file
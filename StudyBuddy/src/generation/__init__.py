@@ -1,3 +1,4 @@
-from .llm_client import GeminiClient
+from .llm_client import GeminiClient, PromptPrefixCache
+from .deadline import DeadlineGenerator, LateAnswerCache, extractive_answer
 
-__all__ = ['GeminiClient']
\ No newline at end of file
+__all__ = ['GeminiClient', 'PromptPrefixCache', 'DeadlineGenerator', 'LateAnswerCache', 'extractive_answer']
\ No newline at end of file
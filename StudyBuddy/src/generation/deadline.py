@@ -0,0 +1,199 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Optional, Callable
+
+import numpy as np
+
+from src.retrieval.context_compressor import split_sentences
+from config.settings import settings
+
+FALLBACK_DEADLINE = 'deadline'
+FALLBACK_LLM_ERROR = 'llm_error'
+
+FALLBACK_HEADERS = {
+    FALLBACK_DEADLINE: "The assistant is taking longer than expected, so here are the most relevant passages from your documents:",
+    FALLBACK_LLM_ERROR: "The assistant is unavailable right now, so here are the most relevant passages from your documents:"
+}
+
+# Fragments shorter than this cannot answer anything on their own
+MIN_SENTENCE_WORDS = 4
+
+def extractive_answer(
+    question: str,
+    results: List[Dict[str, Any]],
+    embedding_model,
+    max_sentences: Optional[int] = None,
+    format_citation: Optional[Callable[[Dict[str, Any]], str]] = None,
+    header: str = FALLBACK_HEADERS[FALLBACK_DEADLINE]
+) -> Dict[str, Any]:
+    """Answer from the retrieved chunks alone: the sentences closest to the question, with sources"""
+    max_sentences = max_sentences or settings.FALLBACK_MAX_SENTENCES
+    format_citation = format_citation or (lambda result: result.get('source', result['metadata'].get('filename', 'unknown')))
+
+    candidates = []
+    seen = set()
+    for result in results:
+        citation = format_citation(result)
+        for sentence in split_sentences(result['content'], min_words=MIN_SENTENCE_WORDS):
+            if sentence.lower() in seen:
+                continue
+            seen.add(sentence.lower())
+            candidates.append((sentence, citation))
+
+    if not candidates:
+        return {'answer': '', 'sentences': [], 'sources': []}
+
+    # Question and sentences in one batched encode; normalized so the dot product is the cosine
+    embeddings = np.asarray(embedding_model.encode([question] + [sentence for sentence, _ in candidates]), dtype=np.float32)
+    embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    scores = embeddings[1:] @ embeddings[0]
+
+    best = np.argsort(-scores, kind='stable')[:max_sentences]
+    sentences = [
+        {'text': candidates[i][0], 'source': candidates[i][1], 'score': float(scores[i])}
+        for i in best
+    ]
+    lines = [f"- {sentence['text']} [Source: {sentence['source']}]" for sentence in sentences]
+    sources = list(dict.fromkeys(sentence['source'] for sentence in sentences))
+    return {
+        'answer': header + "\n\n" + "\n".join(lines),
+        'sentences': sentences,
+        'sources': sources
+    }
+
+class LateAnswerCache:
+    """Bounded LRU of LLM answers that arrived after their deadline, keyed by question and context"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(question: str, context: str) -> str:
+        normalized = ' '.join(question.lower().split())
+        return hashlib.sha256(f"{normalized}\x00{context}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, response_data: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = response_data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class DeadlineGenerator:
+    """Runs LLM generation against a deadline, falling back to an extractive answer.
+
+    Generation runs on a small thread pool so the caller can stop waiting when
+    the deadline passes. The request itself cannot be cancelled; when it
+    eventually succeeds its answer is kept in a LateAnswerCache and served
+    the next time the same question arrives with the same context.
+    """
+
+    def __init__(
+        self,
+        llm_client,
+        embedding_model,
+        cache_late_answers: Optional[bool] = None,
+        max_workers: int = 4,
+        format_citation: Optional[Callable[[Dict[str, Any]], str]] = None
+    ):
+        self.llm_client = llm_client
+        self.embedding_model = embedding_model
+        self.cache_late_answers = settings.CACHE_LATE_ANSWERS if cache_late_answers is None else cache_late_answers
+        self.format_citation = format_citation
+        self.late_answers = LateAnswerCache()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-deadline")
+
+    def generate(
+        self,
+        question: str,
+        context_data: Dict[str, Any],
+        conversation_history: Optional[List[Dict[str, str]]],
+        deadline: float
+    ) -> Dict[str, Any]:
+        """Return generate_response's dict plus 'fallback', 'fallback_reason' and 'cached'.
+
+        `deadline` is an absolute time.monotonic() value.
+        """
+        key = LateAnswerCache.make_key(question, context_data['context'])
+        cached = self.late_answers.get(key)
+        if cached is not None:
+            return {**cached, 'fallback': False, 'fallback_reason': None, 'cached': True}
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            # Retrieval used up the budget; do not even start the request
+            return self._fallback(question, context_data, FALLBACK_DEADLINE)
+
+        future = self._executor.submit(
+            self.llm_client.generate_response, question, context_data['context'], conversation_history
+        )
+        try:
+            response_data = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            if self.cache_late_answers:
+                future.add_done_callback(lambda done: self._store_late_answer(key, done))
+            return self._fallback(question, context_data, FALLBACK_DEADLINE)
+
+        if not response_data['success']:
+            return self._fallback(question, context_data, FALLBACK_LLM_ERROR, response_data['error'])
+        return {**response_data, 'fallback': False, 'fallback_reason': None, 'cached': False}
+
+    def _store_late_answer(self, key: str, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        response_data = future.result()
+        if response_data['success']:
+            self.late_answers.put(key, response_data)
+
+    def _fallback(
+        self,
+        question: str,
+        context_data: Dict[str, Any],
+        reason: str,
+        error: Optional[str] = None
+    ) -> Dict[str, Any]:
+        extract = extractive_answer(
+            question,
+            context_data.get('results', []),
+            self.embedding_model,
+            format_citation=self.format_citation,
+            header=FALLBACK_HEADERS[reason]
+        )
+        if not extract['sentences']:
+            return {
+                'response': "I couldn't produce an answer in time. Please try again.",
+                'success': False,
+                'error': error or "Generation exceeded the deadline",
+                'usage': None,
+                'fallback': True,
+                'fallback_reason': reason,
+                'cached': False
+            }
+        return {
+            'response': extract['answer'],
+            'success': True,
+            'error': error,
+            'usage': None,
+            'fallback': True,
+            'fallback_reason': reason,
+            'cached': False,
+            'extracted_sentences': extract['sentences']
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -1,17 +1,196 @@
+import datetime
+import threading
+import time
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from google.generativeai import caching
 from typing import Dict, Any, Optional, List
 from config.settings import settings
 
-class GeminiClient:
-    def __init__(self):
-        settings.validate_required_keys()
+# The TTL of the cached system prompt is extended once less than this share of it is left
+PROMPT_CACHE_REFRESH_FRACTION = 0.2
+
+# Smallest prompt each model family caches (Gemini context caching docs), longest prefix first
+PROMPT_CACHE_MIN_TOKENS_BY_MODEL = [
+    ("gemini-2.5-flash", 1024),
+    ("gemini-2.5-pro", 4096),
+    ("gemini-2.0", 4096),
+    ("gemini-1.5", 32768),
+]
+PROMPT_CACHE_DEFAULT_MIN_TOKENS = 4096
+
+def min_cached_tokens(model_name: str) -> int:
+    """PROMPT_CACHE_MIN_TOKENS, or the documented minimum for ``model_name``"""
+    if settings.PROMPT_CACHE_MIN_TOKENS:
+        return settings.PROMPT_CACHE_MIN_TOKENS
+    name = model_name.split('/')[-1]
+    for prefix, min_tokens in PROMPT_CACHE_MIN_TOKENS_BY_MODEL:
+        if name.startswith(prefix):
+            return min_tokens
+    return PROMPT_CACHE_DEFAULT_MIN_TOKENS
+
+def _is_permanent_error(error: Exception) -> bool:
+    """Request errors (unsupported model, prompt too small) fail the same way on every retry; rate limits do not"""
+    return isinstance(error, google_exceptions.ClientError) and not isinstance(error, google_exceptions.TooManyRequests)
+
+class GeminiBackend:
+    """The google-generativeai calls GeminiClient makes; tests pass a local stub instead"""
+    
+    def __init__(self, model_name: Optional[str] = None):
         genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        self.model_name = model_name or settings.GEMINI_MODEL
+    
+    def model(self):
+        return genai.GenerativeModel(self.model_name)
+    
+    def count_tokens(self, text: str) -> int:
+        return self.model().count_tokens(text).total_tokens
+    
+    def create_cached_content(self, system_prompt: str, ttl_seconds: float):
+        return caching.CachedContent.create(
+            model=self.model_name,
+            display_name="studybuddy-system-prompt",
+            system_instruction=system_prompt,
+            ttl=datetime.timedelta(seconds=ttl_seconds)
+        )
+    
+    def extend_cached_content(self, cached_content, ttl_seconds: float):
+        cached_content.update(ttl=datetime.timedelta(seconds=ttl_seconds))
+    
+    def cached_model(self, cached_content):
+        return genai.GenerativeModel.from_cached_content(cached_content)
+
+class PromptPrefixCache:
+    """The system prompt registered once as cached content on the Gemini side.
+    
+    Requests through ``model()`` send only their own part; the cached prefix
+    is billed at the cached-token rate and not processed again. The content
+    lives for PROMPT_CACHE_TTL_SECONDS and its TTL is extended when a request
+    finds it close to expiry, so it stays alive while the app is in use.
+    
+    Caching only engages when the prompt has at least the model's minimum
+    number of cached tokens, checked with one ``count_tokens`` call before
+    anything is created. Every token covers at least one byte of UTF-8, so a
+    prompt with fewer bytes than the minimum is turned down without that call.
+    A prompt below the minimum, or an API error that would repeat
+    on every attempt (a model without caching, an unversioned Gemini 1.5 name),
+    turns caching off for good and ``model()`` returns None. After other
+    failures it returns None until PROMPT_CACHE_RETRY_SECONDS have passed.
+    """
+    
+    def __init__(
+        self,
+        backend,
+        system_prompt: str,
+        ttl_seconds: Optional[float] = None,
+        retry_seconds: Optional[float] = None,
+        min_tokens: Optional[int] = None
+    ):
+        self.backend = backend
+        self.system_prompt = system_prompt
+        self.ttl_seconds = ttl_seconds or settings.PROMPT_CACHE_TTL_SECONDS
+        self.retry_seconds = retry_seconds if retry_seconds is not None else settings.PROMPT_CACHE_RETRY_SECONDS
+        self.min_tokens = min_tokens or min_cached_tokens(getattr(backend, 'model_name', settings.GEMINI_MODEL))
+        self.disabled_reason: Optional[str] = None
+        self._size_checked = False
+        self._cached_content = None
+        self._model = None
+        self._expires_at = 0.0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+    
+    def _disable(self, reason: str):
+        self.disabled_reason = reason
+        print(f"Prompt caching disabled, sending the full prompt: {reason}")
+    
+    def _check_size(self) -> bool:
+        """Whether the prompt is large enough to cache; False also while it could not be counted"""
+        prompt_bytes = len(self.system_prompt.encode('utf-8'))
+        if prompt_bytes < self.min_tokens:
+            self._disable(f"the system prompt has {prompt_bytes} bytes, too short for the {self.min_tokens} tokens the model caches")
+            return False
+        try:
+            tokens = self.backend.count_tokens(self.system_prompt)
+        except Exception as e:
+            if _is_permanent_error(e):
+                self._disable(str(e))
+            else:
+                print(f"Could not count the system prompt tokens (retrying in {self.retry_seconds:.0f}s): {e}")
+                self._retry_at = time.time() + self.retry_seconds
+            return False
+        self._size_checked = True
+        if tokens < self.min_tokens:
+            self._disable(f"the system prompt has {tokens} tokens, below the {self.min_tokens} the model caches")
+            return False
+        return True
+    
+    def model(self):
+        """A model whose requests start with the cached system prompt, or None"""
+        now = time.time()
+        with self._lock:
+            if self._model is not None and now >= self._expires_at:
+                self._model = None  # Expired on the server already
+            if self._model is None:
+                if self.disabled_reason is not None or now < self._retry_at:
+                    return None
+                if not self._size_checked and not self._check_size():
+                    return None
+                try:
+                    self._cached_content = self.backend.create_cached_content(self.system_prompt, self.ttl_seconds)
+                    self._model = self.backend.cached_model(self._cached_content)
+                except Exception as e:
+                    if _is_permanent_error(e):
+                        self._disable(str(e))
+                    else:
+                        print(f"Prompt caching unavailable, sending the full prompt (retrying in {self.retry_seconds:.0f}s): {e}")
+                        self._retry_at = now + self.retry_seconds
+                    return None
+                self._expires_at = now + self.ttl_seconds
+            elif self._expires_at - now < self.ttl_seconds * PROMPT_CACHE_REFRESH_FRACTION:
+                try:
+                    self.backend.extend_cached_content(self._cached_content, self.ttl_seconds)
+                    self._expires_at = now + self.ttl_seconds
+                except Exception as e:
+                    print(f"Could not extend the cached system prompt (it is re-created once expired): {e}")
+            return self._model
+    
+    def invalidate(self):
+        """Drop the cached content after a request with it failed; it is re-created after the retry delay"""
+        with self._lock:
+            self._model = None
+            self._cached_content = None
+            self._retry_at = time.time() + self.retry_seconds
+
+def _usage(response, cached: bool = False) -> Dict[str, Any]:
+    """Token counts of a response; with a cached prefix, prompt tokens are split into cached and uncached"""
+    usage_metadata = getattr(response, 'usage_metadata', None)
+    if usage_metadata is None:
+        return {'prompt_tokens': None, 'cached_prompt_tokens': None, 'uncached_prompt_tokens': None,
+                'completion_tokens': None, 'total_tokens': None}
+    prompt_tokens = usage_metadata.prompt_token_count
+    cached_tokens = (getattr(usage_metadata, 'cached_content_token_count', 0) or 0) if cached else 0
+    return {
+        'prompt_tokens': prompt_tokens,
+        'cached_prompt_tokens': cached_tokens,
+        'uncached_prompt_tokens': prompt_tokens - cached_tokens if prompt_tokens is not None else None,
+        'completion_tokens': usage_metadata.candidates_token_count,
+        'total_tokens': usage_metadata.total_token_count,
+    }
+
+class GeminiClient:
+    def __init__(self, backend=None):
+        if backend is None:
+            settings.validate_required_keys()
+            backend = GeminiBackend()
+        self.backend = backend
+        self.model = backend.model()
         
         self.generation_config = genai.GenerationConfig(
             temperature=settings.TEMPERATURE,
             max_output_tokens=settings.MAX_TOKENS,
         )
+        # The system prompt is the same on every RAG request, so it is sent once as cached content
+        self.prompt_cache = PromptPrefixCache(backend, self._create_system_prompt()) if settings.PROMPT_CACHE_ENABLED else None
     
     def generate_response(
         self, 
@@ -22,53 +201,49 @@ class GeminiClient:
         system_prompt = self._create_system_prompt()
         user_prompt = self._create_user_prompt(query, context, conversation_history)
 
-        # List of general greetings and life questions
-        general_greetings = [
-            "hello", "hi", "hey", "halo", "hai", "how are you", "apa kabar", "selamat pagi", "selamat siang", "selamat sore", "selamat malam",
-            "good morning", "good afternoon", "good evening", "good night", "thanks", "thank you", "terima kasih", "who are you", "what is your name"
-        ]
-        # Lowercase query for matching
-        query_lower = query.strip().lower()
-
-        # If query is a general greeting/life question, answer it directly using only the query (no RAG/context)
-        if any(greet in query_lower for greet in general_greetings):
-            try:
+        try:
+            cached_model = self.prompt_cache.model() if self.prompt_cache is not None else None
+            response = None
+            if cached_model is not None:
+                try:
+                    # Only the per-request part; the system prompt is the cached prefix
+                    response = cached_model.generate_content(user_prompt, generation_config=self.generation_config)
+                except Exception as e:
+                    # Deleted or expired on the server early; this request goes without it
+                    print(f"Cached system prompt failed, sending the full prompt: {e}")
+                    self.prompt_cache.invalidate()
+            used_cache = response is not None
+            if response is None:
                 response = self.model.generate_content(
-                    query,
+                    f"{system_prompt}\n\n{user_prompt}",
                     generation_config=self.generation_config
                 )
-                return {
-                    'response': response.text,
-                    'success': True,
-                    'error': None,
-                    'usage': {
-                        'prompt_tokens': response.usage_metadata.prompt_token_count if hasattr(response, 'usage_metadata') else None,
-                        'completion_tokens': response.usage_metadata.candidates_token_count if hasattr(response, 'usage_metadata') else None,
-                        'total_tokens': response.usage_metadata.total_token_count if hasattr(response, 'usage_metadata') else None,
-                    }
-                }
-            except Exception as e:
-                return {
-                    'response': f"I apologize, but I encountered an error while processing your request: {str(e)}",
-                    'success': False,
-                    'error': str(e),
-                    'usage': None
-                }
-        # Otherwise, use RAG (system/user prompt and context)
+            return {
+                'response': response.text,
+                'success': True,
+                'error': None,
+                'usage': _usage(response, cached=used_cache)
+            }
+        except Exception as e:
+            return {
+                'response': f"I apologize, but I encountered an error while processing your request: {str(e)}",
+                'success': False,
+                'error': str(e),
+                'usage': None
+            }
+    
+    def generate_small_talk_response(self, query: str) -> Dict[str, Any]:
+        """Answer greetings and life questions directly from the query (no RAG/context)"""
         try:
             response = self.model.generate_content(
-                f"{system_prompt}\n\n{user_prompt}",
+                query,
                 generation_config=self.generation_config
             )
             return {
                 'response': response.text,
                 'success': True,
                 'error': None,
-                'usage': {
-                    'prompt_tokens': response.usage_metadata.prompt_token_count if hasattr(response, 'usage_metadata') else None,
-                    'completion_tokens': response.usage_metadata.candidates_token_count if hasattr(response, 'usage_metadata') else None,
-                    'total_tokens': response.usage_metadata.total_token_count if hasattr(response, 'usage_metadata') else None,
-                }
+                'usage': _usage(response)
             }
         except Exception as e:
             return {
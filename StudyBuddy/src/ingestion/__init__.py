@@ -1,3 +1,6 @@
 from .document_processor import DocumentProcessor
+from .directory_watcher import DirectoryWatcher
+from .job_queue import IngestionJob, IngestionJobQueue
+from .ingest_journal import IngestJournal
 
-__all__ = ['DocumentProcessor']
\ No newline at end of file
+__all__ = ['DocumentProcessor', 'DirectoryWatcher', 'IngestionJob', 'IngestionJobQueue', 'IngestJournal']
\ No newline at end of file
@@ -0,0 +1,146 @@
+import hashlib
+import re
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r'\w+')
+
+SIMHASH_BITS = 64
+# Narrower bands would put most chunks in the same buckets, so lookups compare against nearly all of them
+MIN_BAND_BITS = 8
+MAX_HAMMING_DISTANCE = SIMHASH_BITS // MIN_BAND_BITS - 1
+
+def normalize_chunk_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def exact_fingerprint(text: str) -> str:
+    return hashlib.blake2b(normalize_chunk_text(text).encode('utf-8'), digest_size=16).hexdigest()
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles; similar texts differ in only a few bits"""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return 0
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little') for s in shingles],
+        dtype=np.uint64
+    )
+    # One row of 64 bits per shingle; a bit is set when most shingles set it
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    majority = bits.sum(axis=0) * 2 > len(shingles)
+    return int(np.packbits(majority, bitorder='little').view(np.uint64)[0])
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+def band_layout(max_distance: int) -> List[Tuple[int, int]]:
+    """(shift, width) of the bands signatures are bucketed by.
+
+    Signatures within ``max_distance`` bits of each other differ in at most
+    that many of the ``max_distance + 1`` bands, so they share at least one.
+    """
+    if not 0 <= max_distance <= MAX_HAMMING_DISTANCE:
+        raise ValueError(
+            f"DEDUP_MAX_HAMMING_DISTANCE must be between 0 and {MAX_HAMMING_DISTANCE}, got {max_distance}"
+        )
+    count = max_distance + 1
+    widths = [SIMHASH_BITS // count + (1 if band < SIMHASH_BITS % count else 0) for band in range(count)]
+    shifts = [sum(widths[:band]) for band in range(count)]
+    return list(zip(shifts, widths))
+
+def _bands(signature: int, layout: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    return [(band, (signature >> shift) & ((1 << width) - 1)) for band, (shift, width) in enumerate(layout)]
+
+class ChunkDeduplicator:
+    """Finds exact and near-duplicate chunks across a collection (each shard of a sharded store separately).
+
+    Exact duplicates are matched on a hash of the normalized text; near
+    duplicates on SimHash signatures within ``max_distance`` bits, looked up
+    through banded buckets instead of comparing against every chunk. There
+    are ``max_distance + 1`` bands, enough for every such pair to share one.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        self._band_layout = band_layout(max_distance)
+        self._lock = threading.Lock()
+        self._exact: Dict[str, str] = {}
+        self._signatures: Dict[str, int] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._buckets: Dict[Tuple[int, int], List[str]] = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            'chunks_checked': 0,
+            'exact_duplicates': 0,
+            'near_duplicates': 0,
+            'chars_saved': 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def register(self, chunk_id: str, fingerprint: str, signature: int):
+        with self._lock:
+            self._exact.setdefault(fingerprint, chunk_id)
+            self._signatures[chunk_id] = signature
+            self._fingerprints[chunk_id] = fingerprint
+            for band in _bands(signature, self._band_layout):
+                self._buckets.setdefault(band, []).append(chunk_id)
+
+    def remove(self, chunk_ids: List[str]):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                signature = self._signatures.pop(chunk_id, None)
+                fingerprint = self._fingerprints.pop(chunk_id, None)
+                if signature is None:
+                    continue
+                if fingerprint is not None and self._exact.get(fingerprint) == chunk_id:
+                    del self._exact[fingerprint]
+                for band in _bands(signature, self._band_layout):
+                    bucket = self._buckets.get(band)
+                    if bucket and chunk_id in bucket:
+                        bucket.remove(chunk_id)
+
+    def clear(self):
+        with self._lock:
+            self._exact.clear()
+            self._signatures.clear()
+            self._fingerprints.clear()
+            self._buckets.clear()
+
+    def check(self, chunk_id: str, text: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Return (id of the chunk this duplicates or None, signature metadata).
+
+        Unique chunks are registered under ``chunk_id`` so later chunks can match them.
+        """
+        fingerprint = exact_fingerprint(text)
+        signature = simhash(text)
+        signature_metadata = {'content_fingerprint': fingerprint, 'simhash': f"{signature:016x}"}
+
+        with self._lock:
+            self.stats['chunks_checked'] += 1
+
+            duplicate_of = self._exact.get(fingerprint)
+            if duplicate_of is not None:
+                self.stats['exact_duplicates'] += 1
+                self.stats['chars_saved'] += len(text)
+                return duplicate_of, signature_metadata
+
+            for band in _bands(signature, self._band_layout):
+                for candidate in self._buckets.get(band, []):
+                    if hamming_distance(signature, self._signatures[candidate]) <= self.max_distance:
+                        self.stats['near_duplicates'] += 1
+                        self.stats['chars_saved'] += len(text)
+                        return candidate, signature_metadata
+
+        self.register(chunk_id, fingerprint, signature)
+        return None, signature_metadata
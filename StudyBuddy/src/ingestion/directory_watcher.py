@@ -0,0 +1,137 @@
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# (mtime_ns, size) is enough to spot changes without reading file contents
+FileState = Tuple[int, int]
+
+class DirectoryWatcher:
+    """Polls a directory with cheap stat() snapshots and reports settled changes.
+
+    Changes are only reported once the directory has been quiet for
+    ``debounce_seconds``, so a burst of copies (e.g. a folder of slides being
+    dropped in) is delivered as one batch instead of one re-index per file.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        supported_formats: Set[str],
+        debounce_seconds: float = 3.0,
+        max_wait_seconds: Optional[float] = None
+    ):
+        self.directory = Path(directory)
+        self.supported_formats = supported_formats
+        self.debounce_seconds = debounce_seconds
+        # Never hold back changes forever if files keep changing
+        self.max_wait_seconds = max_wait_seconds if max_wait_seconds is not None else debounce_seconds * 10
+
+        self._committed: Dict[str, FileState] = {}
+        self._last_seen: Dict[str, FileState] = {}
+        self._last_change_at: Optional[float] = None
+        self._first_pending_at: Optional[float] = None
+
+    def snapshot(self) -> Dict[str, FileState]:
+        state = {}
+        if not self.directory.exists():
+            return state
+
+        stack = [str(self.directory)]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.name.startswith('.'):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in self.supported_formats:
+                            stat = entry.stat()
+                            state[entry.path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                continue  # Directory removed while scanning
+
+        return state
+
+    def set_baseline(self, state: Optional[Dict[str, FileState]] = None):
+        """Treat the given (or current) snapshot as already indexed"""
+        self._committed = dict(state if state is not None else self.snapshot())
+        self._last_seen = dict(self._committed)
+        self._last_change_at = None
+        self._first_pending_at = None
+
+    def poll(self, now: Optional[float] = None) -> Optional[Dict[str, List[Path]]]:
+        """Take a snapshot and return a batch of changes once they have settled"""
+        now = now if now is not None else time.monotonic()
+        current = self.snapshot()
+
+        if current != self._last_seen:
+            self._last_seen = current
+            self._last_change_at = now
+
+        changes = self._diff(self._committed, current)
+        if not any(changes.values()):
+            self._first_pending_at = None
+            return None
+
+        if self._first_pending_at is None:
+            self._first_pending_at = now
+
+        quiet_for = now - (self._last_change_at if self._last_change_at is not None else now)
+        waited_for = now - self._first_pending_at
+        if quiet_for < self.debounce_seconds and waited_for < self.max_wait_seconds:
+            return None
+
+        self._committed = current
+        self._first_pending_at = None
+        return changes
+
+    @staticmethod
+    def _diff(old: Dict[str, FileState], new: Dict[str, FileState]) -> Dict[str, List[Path]]:
+        added = [Path(path) for path in new if path not in old]
+        deleted = [Path(path) for path in old if path not in new]
+        modified = [Path(path) for path, state in new.items() if path in old and old[path] != state]
+
+        return {
+            'added': sorted(added),
+            'modified': sorted(modified),
+            'deleted': sorted(deleted)
+        }
+
+def initial_changes(watcher: DirectoryWatcher, indexed_files: Dict[str, float]) -> Dict[str, List[Path]]:
+    """Compare the directory against what the index already holds.
+
+    ``indexed_files`` maps file path to the ``last_modified`` stored with its
+    chunks. Both sides are compared by absolute path, and only indexed files
+    under the watched directory can be reported as deleted, so files ingested
+    from elsewhere (other folders, Streamlit uploads) are left alone.
+    """
+    current = watcher.snapshot()
+    watcher.set_baseline(current)
+
+    root = os.path.abspath(watcher.directory)
+    indexed = {}
+    for path, last_modified in indexed_files.items():
+        path = os.path.abspath(path)
+        if os.path.commonpath([root, path]) == root:
+            indexed[path] = last_modified
+
+    added, modified = [], []
+    seen = set()
+    for path, (mtime_ns, _) in current.items():
+        key = os.path.abspath(path)
+        seen.add(key)
+        if key not in indexed:
+            added.append(Path(path))
+        elif abs(mtime_ns / 1e9 - indexed[key]) > 1e-3:
+            modified.append(Path(path))
+
+    deleted = [Path(path) for path in indexed if path not in seen]
+
+    return {
+        'added': sorted(added),
+        'modified': sorted(modified),
+        'deleted': sorted(deleted)
+    }
@@ -1,17 +1,73 @@
 import os
 import json
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 import PyPDF2
 from docx import Document
 import markdown
 from bs4 import BeautifulSoup
 
 import src.utils.text_processing as text_utils
+from config.settings import settings
+from src.ingestion.extraction_cache import ExtractionCache, EXTRACTOR_VERSION
 
-class DocumentProcessor:
+def _extract_pdf_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """Extract pages [start, end) in a worker process"""
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [pdf_reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+class _StreamingHTMLTextExtractor(HTMLParser):
+    """Incremental HTML to text conversion that keeps block-level structure as line breaks"""
+    
+    SKIPPED_TAGS = {'script', 'style', 'noscript', 'template', 'head'}
+    PARAGRAPH_TAGS = {'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section', 'article', 'blockquote', 'pre', 'table'}
+    LINE_TAGS = {'br', 'div', 'li', 'tr', 'dt', 'dd'}
+    
     def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pieces: List[str] = []
+        self._skip_depth = 0
+    
+    def _break_for(self, tag: str):
+        if tag in self.PARAGRAPH_TAGS:
+            self.pieces.append("\n\n")
+        elif tag in self.LINE_TAGS:
+            self.pieces.append("\n")
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+        self._break_for(tag)
+    
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        self._break_for(tag)
+    
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.pieces.append(data)
+    
+    def drain(self) -> str:
+        text = "".join(self.pieces)
+        self.pieces = []
+        return text
+
+class DocumentProcessor:
+    # Formats whose text is extracted page by page (PDF) or section by section (DOCX)
+    SECTIONED_FORMATS = {'.pdf', '.docx'}
+    # Formats that are read, cleaned and chunked incrementally once they exceed LARGE_FILE_THRESHOLD_MB
+    STREAMED_FORMATS = {'.txt', '.html'}
+    
+    def __init__(self, use_cache: Optional[bool] = None, cache_directory: Optional[str] = None):
         self.supported_formats = {'.txt', '.md', '.pdf', '.docx', '.html'}
+        
+        if use_cache is None:
+            use_cache = settings.EXTRACTION_CACHE_ENABLED
+        self.extraction_cache = ExtractionCache(cache_directory) if use_cache else None
     
     def process_file(self, file_path: Path) -> Optional[Dict[str, Any]]:
         if not file_path.exists():
@@ -23,28 +79,217 @@ class DocumentProcessor:
             print(f"Unsupported file format: {file_extension}")
             return None
         
+        if self._should_stream(file_path):
+            return self._process_large_file(file_path)
+        
         try:
-            text_content = self._extract_text(file_path)
-            if not text_content:
+            content_hash = None
+            cache_key = None
+            cached = None
+            if self.extraction_cache is not None:
+                content_hash = self.extraction_cache.hash_file(file_path)
+                # The extension is part of the key: identical bytes parse differently as .md and .txt
+                cache_key = f"{content_hash}-{file_extension.lstrip('.')}"
+                cached = self.extraction_cache.get(cache_key)
+            
+            if cached is not None:
+                # Same bytes were parsed before: skip extraction and cleaning entirely
+                cleaned_text = cached['content']
+                sections = cached.get('sections')
+            elif file_extension in self.SECTIONED_FORMATS:
+                return self._process_sectioned_file(file_path, content_hash, cache_key)
+            else:
+                cleaned_text, sections = self._extract_cleaned(file_path)
+                if self.extraction_cache is not None:
+                    self.extraction_cache.put(cache_key, {
+                        'extractor_version': EXTRACTOR_VERSION,
+                        'file_extension': file_extension,
+                        'content': cleaned_text,
+                        'sections': sections
+                    })
+            
+            if not cleaned_text:
                 return None
             
-            cleaned_text = text_utils.clean_text(text_content)
             metadata = text_utils.extract_metadata_from_text(cleaned_text, file_path.name)
+            if content_hash:
+                metadata['content_hash'] = content_hash
             
-            return {
+            processed_doc = {
                 'content': cleaned_text,
-                'metadata': {
-                    **metadata,
-                    'file_path': str(file_path),
-                    'file_extension': file_extension,
-                    'file_size': file_path.stat().st_size,
-                    'last_modified': file_path.stat().st_mtime
-                }
+                'metadata': self._file_metadata(file_path, metadata)
             }
+            if sections:
+                processed_doc['sections'] = sections
+            
+            return processed_doc
         except Exception as e:
             print(f"Error processing {file_path}: {str(e)}")
             return None
     
+    def _file_metadata(self, file_path: Path, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **metadata,
+            'file_path': str(file_path),
+            'file_extension': file_path.suffix.lower(),
+            'file_size': file_path.stat().st_size,
+            'last_modified': file_path.stat().st_mtime
+        }
+    
+    def _process_sectioned_file(
+        self,
+        file_path: Path,
+        content_hash: Optional[str] = None,
+        cache_key: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Describe a PDF/DOCX whose pages are cleaned and chunked as they are extracted.
+        
+        Like a large text file, the document has a ``content_stream`` instead of
+        ``content``, so chunking and embedding start with the first page. Its
+        ``sections`` list fills in as the stream is consumed, always ahead of the
+        chunks that fall in them. Once the stream is exhausted the text goes into
+        the extraction cache, so re-indexing the same bytes skips extraction.
+        """
+        # Serially: closing a parallel extraction early would still wait for every page range
+        first_piece = next(self.iter_cleaned_sections(file_path, [], parallel=False), None)
+        if not first_piece:
+            return None
+        
+        metadata = text_utils.extract_metadata_from_text(first_piece, file_path.name)
+        # Counts would need the whole document before the first chunk
+        metadata.pop('word_count', None)
+        metadata.pop('char_count', None)
+        if content_hash:
+            metadata['content_hash'] = content_hash
+        
+        sections: List[Dict[str, int]] = []
+        
+        def content_stream() -> Iterator[str]:
+            sections.clear()
+            parts = [] if cache_key is not None else None
+            for piece in self.iter_cleaned_sections(file_path, sections):
+                if parts is not None:
+                    parts.append(piece)
+                yield piece
+            if parts is not None:
+                self.extraction_cache.put(cache_key, {
+                    'extractor_version': EXTRACTOR_VERSION,
+                    'file_extension': file_path.suffix.lower(),
+                    'content': "".join(parts),
+                    'sections': list(sections)
+                })
+        
+        return {
+            'content': None,
+            'content_stream': content_stream,
+            'sections': sections,
+            'metadata': {**self._file_metadata(file_path, metadata), 'streamed': True}
+        }
+    
+    def _should_stream(self, file_path: Path) -> bool:
+        threshold = settings.LARGE_FILE_THRESHOLD_MB * 1024 * 1024
+        return file_path.suffix.lower() in self.STREAMED_FORMATS and file_path.stat().st_size >= threshold
+    
+    def _process_large_file(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Describe a large text/HTML file without reading it into memory.
+        
+        The returned document has a ``content_stream`` factory instead of ``content``;
+        the vector store chunks and embeds it piece by piece.
+        """
+        try:
+            first_piece = next(self.iter_cleaned_text(file_path), None)
+            if not first_piece:
+                return None
+            
+            metadata = text_utils.extract_metadata_from_text(first_piece, file_path.name)
+            # Counts would need a full extra pass over the file
+            metadata.pop('word_count', None)
+            metadata.pop('char_count', None)
+            
+            return {
+                'content': None,
+                'content_stream': lambda: self.iter_cleaned_text(file_path),
+                'metadata': {**self._file_metadata(file_path, metadata), 'streamed': True}
+            }
+        except Exception as e:
+            print(f"Error processing {file_path}: {str(e)}")
+            return None
+    
+    def iter_cleaned_text(self, file_path: Path) -> Iterator[str]:
+        """Read, extract and clean a text or HTML file incrementally"""
+        block_chars = settings.STREAM_BLOCK_KB * 1024
+        
+        if file_path.suffix.lower() == '.html':
+            raw_pieces = self._iter_html_text(file_path, block_chars)
+        else:
+            raw_pieces = self._iter_file_blocks(file_path, block_chars)
+        
+        return text_utils.clean_text_stream(raw_pieces, max_buffer_chars=block_chars)
+    
+    @staticmethod
+    def _iter_file_blocks(file_path: Path, block_chars: int) -> Iterator[str]:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
+            for block in iter(lambda: file.read(block_chars), ''):
+                yield block
+    
+    def _iter_html_text(self, file_path: Path, block_chars: int) -> Iterator[str]:
+        parser = _StreamingHTMLTextExtractor()
+        for block in self._iter_file_blocks(file_path, block_chars):
+            parser.feed(block)
+            text = parser.drain()
+            if text:
+                yield text
+        parser.close()
+        text = parser.drain()
+        if text:
+            yield text
+    
+    def _extract_cleaned(self, file_path: Path) -> Tuple[str, Optional[List[Dict[str, int]]]]:
+        if file_path.suffix.lower() in self.SECTIONED_FORMATS:
+            return self._extract_sections(file_path)
+        
+        text_content = self._extract_text(file_path)
+        return (text_utils.clean_text(text_content) if text_content else ""), None
+    
+    def _extract_sections(self, file_path: Path) -> Tuple[str, List[Dict[str, int]]]:
+        sections = []
+        return "".join(self.iter_cleaned_sections(file_path, sections)), sections
+    
+    def iter_cleaned_sections(self, file_path: Path, sections: List[Dict[str, int]], parallel: bool = True) -> Iterator[str]:
+        """Clean each page/section as it is extracted and record where it lands in the text.
+        
+        Pieces after the first start with the newline that joins them, so they
+        concatenate to the document text. Each section is appended to ``sections``
+        before its piece is yielded; the offsets let chunks carry page numbers
+        for citations.
+        """
+        position = 0
+        for number, text in self.iter_sections(file_path, parallel):
+            cleaned = text_utils.clean_text(text)
+            if not cleaned:
+                continue
+            if position:
+                position += 1
+                cleaned = "\n" + cleaned
+                sections.append({'page': number, 'start_char': position, 'end_char': position + len(cleaned) - 1})
+            else:
+                sections.append({'page': number, 'start_char': 0, 'end_char': len(cleaned)})
+            position = sections[-1]['end_char']
+            yield cleaned
+    
+    def iter_sections(self, file_path: Path, parallel: bool = True) -> Iterator[Tuple[int, str]]:
+        """Yield (page or section number, raw text) pairs without building the whole document"""
+        file_extension = file_path.suffix.lower()
+        
+        if file_extension == '.pdf':
+            yield from self._iter_pdf_pages(file_path, parallel)
+        elif file_extension == '.docx':
+            yield from self._iter_docx_sections(file_path)
+        else:
+            text = self._extract_text(file_path)
+            if text:
+                yield 1, text
+    
     def _extract_text(self, file_path: Path) -> str:
         file_extension = file_path.suffix.lower()
         
@@ -73,19 +318,56 @@ class DocumentProcessor:
             return soup.get_text()
     
     def _extract_from_pdf(self, file_path: Path) -> str:
-        text = ""
+        return "\n".join(text for _, text in self._iter_pdf_pages(file_path))
+    
+    def _iter_pdf_pages(self, file_path: Path, parallel: bool = True) -> Iterator[Tuple[int, str]]:
         with open(file_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        return text
+            num_pages = len(pdf_reader.pages)
+            
+            workers = settings.PDF_PARALLEL_WORKERS if parallel else 0
+            if workers <= 1 or num_pages < settings.PDF_PARALLEL_PAGE_THRESHOLD:
+                for page_number, page in enumerate(pdf_reader.pages, start=1):
+                    yield page_number, page.extract_text() or ""
+                return
+        
+        yield from self._iter_pdf_pages_parallel(file_path, num_pages, workers)
+    
+    def _iter_pdf_pages_parallel(self, file_path: Path, num_pages: int, workers: int) -> Iterator[Tuple[int, str]]:
+        """Split very large PDFs into page ranges extracted by separate processes"""
+        # Several ranges per worker keeps them busy when some pages are much denser than others
+        range_size = max(1, -(-num_pages // (workers * 4)))
+        ranges = [(start, min(start + range_size, num_pages)) for start in range(0, num_pages, range_size)]
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_extract_pdf_page_range, str(file_path), start, end)
+                for start, end in ranges
+            ]
+            # Consume in order so pages are yielded as soon as their range is done
+            for (start, _), future in zip(ranges, futures):
+                for offset, text in enumerate(future.result()):
+                    yield start + offset + 1, text
     
     def _extract_from_docx(self, file_path: Path) -> str:
+        return "\n".join(text for _, text in self._iter_docx_sections(file_path))
+    
+    def _iter_docx_sections(self, file_path: Path) -> Iterator[Tuple[int, str]]:
+        """Yield the document split at headings; DOCX has no reliable page numbers"""
         doc = Document(file_path)
-        text = ""
+        section_number = 1
+        paragraphs = []
+        
         for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
+            style_name = paragraph.style.name if paragraph.style is not None else ""
+            if style_name.startswith('Heading') and paragraphs:
+                yield section_number, "\n".join(paragraphs)
+                section_number += 1
+                paragraphs = []
+            paragraphs.append(paragraph.text)
+        
+        if paragraphs:
+            yield section_number, "\n".join(paragraphs)
     
     def _extract_from_html(self, file_path: Path) -> str:
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
@@ -93,23 +375,31 @@ class DocumentProcessor:
             soup = BeautifulSoup(html_content, 'html.parser')
             return soup.get_text()
     
-    def process_directory(self, directory_path: Path) -> List[Dict[str, Any]]:
-        documents = []
+    def list_supported_files(self, directory_path: Path) -> List[Path]:
+        files = []
         
         if not directory_path.exists():
             print(f"Directory not found: {directory_path}")
-            return documents
+            return files
         
-        for file_path in directory_path.rglob('*'):
+        for file_path in sorted(directory_path.rglob('*')):
             if file_path.is_file() and not file_path.name.startswith('.'):
                 # Skip hidden files and files without extensions
                 if file_path.suffix.lower() in self.supported_formats:
-                    processed_doc = self.process_file(file_path)
-                    if processed_doc:
-                        documents.append(processed_doc)
+                    files.append(file_path)
                 else:
                     print(f"Skipping unsupported file: {file_path.name}")
         
+        return files
+    
+    def process_directory(self, directory_path: Path) -> List[Dict[str, Any]]:
+        documents = []
+        
+        for file_path in self.list_supported_files(directory_path):
+            processed_doc = self.process_file(file_path)
+            if processed_doc:
+                documents.append(processed_doc)
+        
         return documents
     
     def save_processed_documents(self, documents: List[Dict[str, Any]], output_path: Path):
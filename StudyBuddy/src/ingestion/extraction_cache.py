@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from config.settings import settings
+
+# Bump whenever extraction or cleaning changes its output so stale entries are ignored
+EXTRACTOR_VERSION = "2"
+
+class ExtractionCache:
+    """On-disk cache of cleaned document text keyed by file content hash.
+
+    Keys are built from ``hash_file`` so renamed or moved files still hit.
+    Entries are gzip-compressed JSON files. Reading an entry refreshes its
+    modification time, and the least recently used entries are evicted once
+    the cache grows past ``max_size_mb``.
+    """
+
+    def __init__(self, cache_directory: Optional[str] = None, max_size_mb: Optional[float] = None):
+        self.cache_directory = Path(cache_directory or settings.EXTRACTION_CACHE_DIRECTORY)
+        max_size_mb = max_size_mb if max_size_mb is not None else settings.EXTRACTION_CACHE_MAX_MB
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_size: Optional[int] = None
+
+    @staticmethod
+    def hash_file(file_path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _entry_path(self, cache_key: str) -> Path:
+        return self.cache_directory / cache_key[:2] / f"{cache_key}-v{EXTRACTOR_VERSION}.json.gz"
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        entry_path = self._entry_path(cache_key)
+        try:
+            with gzip.open(entry_path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(entry_path)  # Mark as recently used
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, cache_key: str, entry: Dict[str, Any]):
+        entry_path = self._entry_path(cache_key)
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = entry_path.with_name(entry_path.name + f".{os.getpid()}.tmp")
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            print(f"Warning: Could not write extraction cache entry: {e}")
+            return
+
+        with self._lock:
+            if self._total_size is not None:
+                self._total_size += entry_path.stat().st_size
+        self._evict_if_needed()
+
+    def _entries(self):
+        if not self.cache_directory.exists():
+            return []
+        return [path for path in self.cache_directory.glob('*/*.json.gz') if path.is_file()]
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._total_size is None:
+                self._total_size = sum(path.stat().st_size for path in self._entries())
+            if self._total_size <= self.max_size_bytes:
+                return
+
+            entries = sorted(self._entries(), key=lambda path: path.stat().st_mtime)
+            # Evict down to 90% so we do not rescan the directory on every write
+            target = self.max_size_bytes * 0.9
+            for path in entries:
+                if self._total_size <= target:
+                    break
+                try:
+                    size = path.stat().st_size
+                    path.unlink()
+                    self._total_size -= size
+                except OSError:
+                    continue
+
+    def clear(self):
+        with self._lock:
+            for path in self._entries():
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+            self._total_size = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(entries),
+            'size_bytes': sum(path.stat().st_size for path in entries),
+            'max_size_bytes': self.max_size_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+
+from config.settings import settings
+
+FILE_IN_PROGRESS = 'in_progress'
+FILE_DONE = 'done'
+FILE_FAILED = 'failed'
+FILE_QUARANTINED = 'quarantined'
+
+class IngestJournal:
+    """Append-only checkpoint log of one directory's ingestion.
+
+    Every record is a JSON line, flushed and fsynced before ingestion moves
+    on, so after a crash the journal says exactly which files finished and how
+    many chunks of the interrupted file were stored. A torn last line from a
+    crash mid-write is ignored. A file is identified by its path relative to
+    the directory plus a size/mtime fingerprint; editing a file starts it over.
+    """
+
+    def __init__(self, documents_path: str, journal_directory: Optional[str] = None):
+        self.documents_path = Path(documents_path).resolve()
+        key = hashlib.sha1(str(self.documents_path).encode('utf-8')).hexdigest()[:16]
+        journal_directory = Path(journal_directory) if journal_directory else Path(settings.JOBS_DIRECTORY) / 'journals'
+        self.path = journal_directory / f"{key}.jsonl"
+
+        self.chunking: Optional[List[int]] = None
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(record)
+
+    def _apply(self, record: Dict[str, Any]):
+        event = record['event']
+        if event == 'start':
+            self.chunking = record['chunking']
+            return
+
+        state = self.files.get(record['file'])
+        if state is None or state['fingerprint'] != record['fingerprint']:
+            state = {'fingerprint': record['fingerprint'], 'status': None, 'attempts': 0, 'chunks_committed': 0, 'error': None}
+            self.files[record['file']] = state
+
+        if event == 'file_started':
+            state['status'] = FILE_IN_PROGRESS
+            state['attempts'] += 1
+        elif event == 'file_interrupted':
+            # Stopped on purpose (Ctrl-C); does not count towards quarantine
+            state['attempts'] -= 1
+        elif event == 'batch':
+            state['chunks_committed'] = record['chunks']
+        elif event == 'file_done':
+            state['status'] = FILE_DONE
+            state['chunks_committed'] = record['chunks']
+        elif event == 'file_failed':
+            state['status'] = FILE_FAILED
+            state['error'] = record['error']
+        elif event == 'quarantined':
+            state['status'] = FILE_QUARANTINED
+            state['error'] = record['error']
+
+    def _append(self, record: Dict[str, Any]):
+        self._apply(record)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({**record, 'time': time.time()}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start(self, chunk_size: int, chunk_overlap: int, resume: bool):
+        """Begin a run; without ``resume`` earlier progress is forgotten"""
+        if not resume:
+            self.files = {}
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+        self._append({'event': 'start', 'chunking': [chunk_size, chunk_overlap], 'resume': resume})
+
+    def can_resume(self, chunk_size: int, chunk_overlap: int) -> bool:
+        """Chunk positions in the journal are only valid for the chunking they were made with"""
+        return self.chunking is None or self.chunking == [chunk_size, chunk_overlap]
+
+    def relative_name(self, file_path: Path) -> str:
+        return Path(file_path).resolve().relative_to(self.documents_path).as_posix()
+
+    @staticmethod
+    def fingerprint(file_path: Path) -> str:
+        stat = Path(file_path).stat()
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def state(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Journal state of the file as it is now on disk, or None if it is new or changed"""
+        state = self.files.get(self.relative_name(file_path))
+        if state is None or state['fingerprint'] != self.fingerprint(file_path):
+            return None
+        return state
+
+    def chunk_id_prefix(self, file_path: Path) -> str:
+        identity = f"{self.relative_name(file_path)}\x00{self.fingerprint(file_path)}"
+        return hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]
+
+    def _record(self, event: str, file_path: Path, **fields):
+        self._append({
+            'event': event,
+            'file': self.relative_name(file_path),
+            'fingerprint': self.fingerprint(file_path),
+            **fields
+        })
+
+    def file_started(self, file_path: Path):
+        self._record('file_started', file_path)
+
+    def batch_committed(self, file_path: Path, chunks: int):
+        self._record('batch', file_path, chunks=chunks)
+
+    def file_done(self, file_path: Path, chunks: int):
+        self._record('file_done', file_path, chunks=chunks)
+
+    def file_interrupted(self, file_path: Path):
+        self._record('file_interrupted', file_path)
+
+    def file_failed(self, file_path: Path, error: str):
+        self._record('file_failed', file_path, error=error)
+
+    def quarantine(self, file_path: Path, error: str):
+        self._record('quarantined', file_path, error=error)
+
+    def quarantined_files(self) -> List[str]:
+        return sorted(name for name, state in self.files.items() if state['status'] == FILE_QUARANTINED)
+
+
+def ingest_file_checkpointed(
+    journal: IngestJournal,
+    document_processor,
+    vector_store,
+    file_path: Path,
+    replace_existing: bool = False,
+    progress_callback: Optional[Callable[[int], None]] = None
+) -> Dict[str, Any]:
+    """Ingest one file, recording every stored batch in ``journal``.
+
+    Returns {'status', 'skipped', 'chunks_added', 'error'}. Finished files are
+    skipped, a partly stored file continues after its last recorded batch, and
+    a file that has used up INGEST_MAX_ATTEMPTS is quarantined instead.
+    """
+    state = journal.state(file_path)
+    if state and state['status'] in (FILE_DONE, FILE_QUARANTINED):
+        return {'status': state['status'], 'skipped': True, 'chunks_added': 0, 'error': None}
+    if state and state['attempts'] >= settings.INGEST_MAX_ATTEMPTS:
+        # Failed or took the process down every time; leave it alone until it changes
+        error = state['error'] or "Interrupted during every attempt"
+        journal.quarantine(file_path, error)
+        print(f"⚠️ Quarantined {file_path.name} after {state['attempts']} failed attempts: {error}")
+        return {'status': FILE_QUARANTINED, 'skipped': True, 'chunks_added': 0, 'error': error}
+
+    resume_from = state['chunks_committed'] if state else 0
+    previous = journal.files.get(journal.relative_name(file_path))
+    if resume_from == 0 and (replace_existing or (previous and previous['chunks_committed'])):
+        # Chunks of an older version of the file would otherwise stay behind
+        vector_store.delete_by_filename(file_path.name)
+
+    handled = resume_from
+
+    def on_checkpoint(chunks_handled: Dict[str, int]):
+        nonlocal handled
+        handled = chunks_handled.get(str(file_path), handled)
+        journal.batch_committed(file_path, handled)
+
+    journal.file_started(file_path)
+    try:
+        processed_doc = document_processor.process_file(file_path)
+        if not processed_doc:
+            raise ValueError("No text could be extracted")
+
+        processed_doc['chunk_id_prefix'] = journal.chunk_id_prefix(file_path)
+        processed_doc['resume_from_chunk'] = resume_from
+        result = vector_store.add_documents(
+            [processed_doc], progress_callback=progress_callback, checkpoint_callback=on_checkpoint
+        )
+    except KeyboardInterrupt:
+        journal.file_interrupted(file_path)
+        raise
+    except Exception as e:
+        journal.file_failed(file_path, str(e))
+        print(f"Failed to ingest {file_path.name}: {e}")
+        return {'status': FILE_FAILED, 'skipped': False, 'chunks_added': 0, 'error': str(e)}
+
+    journal.file_done(file_path, handled)
+    return {'status': FILE_DONE, 'skipped': False, 'chunks_added': result['chunks_added'], 'error': None}
@@ -0,0 +1,356 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from src.ingestion.ingest_journal import IngestJournal, ingest_file_checkpointed, FILE_DONE
+from config.settings import settings
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+FINISHED_STATES = {JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED}
+
+class IngestionJob:
+    """State and progress of one background ingestion run"""
+
+    def __init__(
+        self,
+        documents_path: str,
+        replace_existing: bool = False,
+        jobs_directory: Optional[str] = None,
+        resume: bool = False
+    ):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.documents_path = str(documents_path)
+        self.replace_existing = replace_existing
+        self.resume = resume
+        self.jobs_directory = Path(jobs_directory or settings.JOBS_DIRECTORY)
+
+        self.status = JOB_QUEUED
+        self.error: Optional[str] = None
+        self.current_file: Optional[str] = None
+
+        self.files_total = 0
+        self.files_done = 0
+        self.files_failed = 0
+        self.files_skipped = 0
+        self.quarantined: List[str] = []
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.chunks_done = 0
+
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self._cancel_event = threading.Event()
+        self._last_saved = 0.0
+
+    @property
+    def cancel_file(self) -> Path:
+        return self.jobs_directory / f"{self.job_id}.cancel"
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def is_cancel_requested(self) -> bool:
+        # A cancel file lets other processes (e.g. the CLI) cancel this job
+        if not self._cancel_event.is_set() and self.cancel_file.exists():
+            self._cancel_event.set()
+        return self._cancel_event.is_set()
+
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def progress(self) -> Dict[str, Any]:
+        end_time = self.finished_at or time.time()
+        elapsed = (end_time - self.started_at) if self.started_at else 0.0
+
+        files_per_second = self.files_done / elapsed if elapsed > 0 else 0.0
+        chunks_per_second = self.chunks_done / elapsed if elapsed > 0 else 0.0
+
+        # Estimate from bytes rather than files so one large PDF does not skew the ETA
+        eta_seconds = None
+        if self.status == JOB_RUNNING and self.bytes_done > 0 and elapsed > 0:
+            bytes_per_second = self.bytes_done / elapsed
+            eta_seconds = (self.bytes_total - self.bytes_done) / bytes_per_second
+
+        fraction = self.bytes_done / self.bytes_total if self.bytes_total else 0.0
+        if self.status == JOB_COMPLETED:
+            fraction = 1.0
+
+        return {
+            'fraction': min(fraction, 1.0),
+            'elapsed_seconds': elapsed,
+            'eta_seconds': eta_seconds,
+            'files_per_second': files_per_second,
+            'chunks_per_second': chunks_per_second
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'documents_path': self.documents_path,
+            'replace_existing': self.replace_existing,
+            'resume': self.resume,
+            'status': self.status,
+            'error': self.error,
+            'current_file': self.current_file,
+            'files_total': self.files_total,
+            'files_done': self.files_done,
+            'files_failed': self.files_failed,
+            'files_skipped': self.files_skipped,
+            'quarantined': self.quarantined,
+            'bytes_total': self.bytes_total,
+            'bytes_done': self.bytes_done,
+            'chunks_done': self.chunks_done,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'progress': self.progress()
+        }
+
+    def save(self, force: bool = False):
+        """Persist job state so other processes can report on it"""
+        now = time.time()
+        if not force and now - self._last_saved < 0.5:
+            return
+        self._last_saved = now
+
+        try:
+            self.jobs_directory.mkdir(parents=True, exist_ok=True)
+            job_file = self.jobs_directory / f"{self.job_id}.json"
+            tmp_file = job_file.with_suffix('.json.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(tmp_file, job_file)
+        except OSError as e:
+            print(f"Warning: Could not save job state for {self.job_id}: {e}")
+
+class IngestionJobQueue:
+    """Runs ingestion jobs one at a time on a background worker thread.
+
+    Queries can keep using the existing index while a job runs; each file is
+    swapped in as soon as it has been embedded.
+    """
+
+    def __init__(self, document_processor, vector_store, jobs_directory: Optional[str] = None):
+        self.document_processor = document_processor
+        self.vector_store = vector_store
+        self.jobs_directory = jobs_directory or settings.JOBS_DIRECTORY
+
+        self._queue: "queue.Queue[IngestionJob]" = queue.Queue()
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, documents_path: str, replace_existing: bool = False, resume: bool = False) -> IngestionJob:
+        job = IngestionJob(
+            documents_path, replace_existing=replace_existing, jobs_directory=self.jobs_directory, resume=resume
+        )
+
+        with self._lock:
+            self._jobs[job.job_id] = job
+        job.save(force=True)
+
+        self._queue.put(job)
+        self._ensure_worker()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[IngestionJob]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get_job(job_id)
+        if job is None or job.is_finished():
+            return False
+        job.cancel()
+        return True
+
+    def has_active_jobs(self) -> bool:
+        return any(not job.is_finished() for job in self.list_jobs())
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, poll_interval: float = 0.2) -> Optional[IngestionJob]:
+        job = self.get_job(job_id)
+        deadline = time.time() + timeout if timeout is not None else None
+
+        while job is not None and not job.is_finished():
+            if deadline is not None and time.time() >= deadline:
+                break
+            time.sleep(poll_interval)
+
+        return job
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._worker_loop, name="ingestion-worker", daemon=True)
+                self._worker.start()
+
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job.is_cancel_requested():
+                    job.status = JOB_CANCELLED
+                    job.finished_at = time.time()
+                else:
+                    self._run_job(job)
+            finally:
+                job.save(force=True)
+                self._queue.task_done()
+
+    def _run_job(self, job: IngestionJob):
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+
+        try:
+            documents_path = Path(job.documents_path)
+            if not documents_path.exists():
+                raise FileNotFoundError(f"Directory {documents_path} does not exist")
+
+            # Every stored batch is journaled so an interrupted run can be resumed
+            journal = IngestJournal(str(documents_path), Path(self.jobs_directory) / 'journals')
+            if job.resume and not journal.can_resume(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP):
+                raise ValueError("CHUNK_SIZE or CHUNK_OVERLAP changed since the interrupted run; ingest without resuming")
+            journal.start(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, resume=job.resume)
+
+            files = self.document_processor.list_supported_files(documents_path)
+            job.files_total = len(files)
+            job.bytes_total = sum(file_path.stat().st_size for file_path in files)
+            job.save(force=True)
+
+            seen_filenames = set()
+
+            for file_path in files:
+                # Cancellation takes effect between files so no file is left half-indexed
+                if job.is_cancel_requested():
+                    job.status = JOB_CANCELLED
+                    break
+
+                job.current_file = file_path.name
+                seen_filenames.add(file_path.name)
+                self._ingest_file(job, journal, file_path)
+
+                job.files_done += 1
+                job.bytes_done += file_path.stat().st_size
+                job.save()
+
+            job.quarantined = journal.quarantined_files()
+            if job.status == JOB_RUNNING:
+                if job.replace_existing:
+                    # Drop files that were removed from the directory since the last run
+                    for filename in self.vector_store.list_files():
+                        if filename not in seen_filenames:
+                            self.vector_store.delete_by_filename(filename)
+                job.status = JOB_COMPLETED
+
+        except Exception as e:
+            job.status = JOB_FAILED
+            job.error = str(e)
+            print(f"Ingestion job {job.job_id} failed: {e}")
+
+        finally:
+            job.current_file = None
+            job.finished_at = time.time()
+            try:
+                job.cancel_file.unlink()
+            except OSError:
+                pass
+
+    def _ingest_file(self, job: IngestionJob, journal: IngestJournal, file_path: Path):
+        chunks_before = job.chunks_done
+
+        def on_progress(chunks_done: int):
+            job.chunks_done = chunks_before + chunks_done
+            job.save()
+
+        outcome = ingest_file_checkpointed(
+            journal,
+            self.document_processor,
+            self.vector_store,
+            file_path,
+            replace_existing=job.replace_existing,
+            progress_callback=on_progress
+        )
+        if outcome['skipped'] and outcome['status'] == FILE_DONE:
+            job.files_skipped += 1
+        elif outcome['status'] != FILE_DONE:
+            job.files_failed += 1
+
+def load_job_states(jobs_directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Read persisted job states, newest first"""
+    jobs_path = Path(jobs_directory or settings.JOBS_DIRECTORY)
+    if not jobs_path.exists():
+        return []
+
+    states = []
+    for job_file in jobs_path.glob('*.json'):
+        try:
+            with open(job_file, 'r', encoding='utf-8') as f:
+                states.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+    return sorted(states, key=lambda state: state.get('created_at', 0), reverse=True)
+
+def request_job_cancellation(job_id: str, jobs_directory: Optional[str] = None) -> bool:
+    """Ask a job running in another process to stop at the next file boundary"""
+    jobs_path = Path(jobs_directory or settings.JOBS_DIRECTORY)
+    job_file = jobs_path / f"{job_id}.json"
+    if not job_file.exists():
+        return False
+
+    with open(job_file, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('status') in FINISHED_STATES:
+        return False
+
+    (jobs_path / f"{job_id}.cancel").touch()
+    return True
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--"
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
+
+def describe_job(state: Dict[str, Any]) -> str:
+    """One-line human readable summary of a job state dict"""
+    progress = state.get('progress', {})
+    summary = (
+        f"{state['status']}: {state['files_done']}/{state['files_total']} files, "
+        f"{state['chunks_done']} chunks"
+    )
+    if state.get('files_skipped'):
+        summary += f", {state['files_skipped']} already done"
+    if state['status'] == JOB_RUNNING:
+        summary += (
+            f" ({progress.get('fraction', 0) * 100:.0f}%, "
+            f"{progress.get('chunks_per_second', 0):.1f} chunks/s, "
+            f"ETA {format_duration(progress.get('eta_seconds'))})"
+        )
+    elif progress.get('elapsed_seconds'):
+        summary += f" in {format_duration(progress['elapsed_seconds'])}"
+    if state.get('error'):
+        summary += f" - {state['error']}"
+    return summary
@@ -1,20 +1,39 @@
+import time
+from contextlib import contextmanager
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 
 from src.ingestion.document_processor import DocumentProcessor
-from src.database.vector_store import VectorStore
+from src.ingestion.job_queue import IngestionJobQueue
+from src.ingestion.ingest_journal import IngestJournal, ingest_file_checkpointed, FILE_DONE
+from src.database.sharded_store import create_vector_store
 from src.retrieval.retriever import Retriever
+from src.retrieval.intent_router import create_intent_router, INTENT_SMALL_TALK
 from src.generation.llm_client import GeminiClient
+from src.generation.deadline import DeadlineGenerator
+from src.utils.profiling import Profiler
 from config.settings import settings
 
 class RAGPipeline:
     def __init__(self):
         self.document_processor = DocumentProcessor()
-        self.vector_store = VectorStore()
-        self.retriever = Retriever()
+        self.vector_store = create_vector_store()
+        self.retriever = Retriever(self.vector_store)
         self.llm_client = GeminiClient()
+        self.job_queue = IngestionJobQueue(self.document_processor, self.vector_store)
+        self.intent_router = create_intent_router(self.vector_store)
+        self.deadline_generator = DeadlineGenerator(
+            self.llm_client, self.vector_store.embedding_model, format_citation=Retriever._format_citation
+        )
     
-    def ingest_documents(self, documents_path: str) -> Dict[str, Any]:
+    def ingest_documents(self, documents_path: str, resume: bool = False) -> Dict[str, Any]:
+        """Ingest a directory file by file, checkpointing progress in an IngestJournal.
+        
+        With ``resume`` files finished by an interrupted run are skipped and a
+        partly stored file continues after its last stored batch. Chunk ids are
+        stable, so a batch stored just before a crash is overwritten rather than
+        duplicated. Files that failed INGEST_MAX_ATTEMPTS times are quarantined.
+        """
         documents_path = Path(documents_path)
         
         if not documents_path.exists():
@@ -25,23 +44,41 @@ class RAGPipeline:
             }
         
         try:
-            # Process documents
-            documents = self.document_processor.process_directory(documents_path)
-            
-            if not documents:
+            journal = IngestJournal(str(documents_path))
+            if resume and not journal.can_resume(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP):
                 return {
                     'success': False,
-                    'error': "No supported documents found",
+                    'error': "CHUNK_SIZE or CHUNK_OVERLAP changed since the interrupted run; clear the knowledge base and ingest again",
                     'documents_processed': 0
                 }
+            journal.start(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, resume=resume)
             
-            # Add to vector store
-            self.vector_store.add_documents(documents)
+            summary = {'documents_processed': 0, 'files_skipped': 0, 'files_failed': [], 'chunks_added': 0}
+            for file_path in self.document_processor.list_supported_files(documents_path):
+                outcome = ingest_file_checkpointed(journal, self.document_processor, self.vector_store, file_path)
+                if outcome['skipped']:
+                    # Finished by an earlier run, or quarantined (reported below)
+                    if outcome['status'] == FILE_DONE:
+                        summary['files_skipped'] += 1
+                elif outcome['status'] == FILE_DONE:
+                    summary['documents_processed'] += 1
+                    summary['chunks_added'] += outcome['chunks_added']
+                else:
+                    summary['files_failed'].append(file_path.name)
+            
+            if not summary['documents_processed'] and not summary['files_skipped']:
+                return {
+                    'success': False,
+                    'error': "No supported documents found",
+                    'documents_processed': 0,
+                    'quarantined': journal.quarantined_files()
+                }
             
             return {
                 'success': True,
                 'error': None,
-                'documents_processed': len(documents),
+                **summary,
+                'quarantined': journal.quarantined_files(),
                 'stats': self.vector_store.get_collection_stats()
             }
         
@@ -52,15 +89,69 @@ class RAGPipeline:
                 'documents_processed': 0
             }
     
+    def submit_ingestion_job(
+        self,
+        documents_path: str,
+        replace_existing: bool = False,
+        resume: bool = False
+    ) -> Dict[str, Any]:
+        """Queue a directory for ingestion on the background worker and return immediately"""
+        documents_path = Path(documents_path)
+        
+        if not documents_path.exists():
+            return {
+                'success': False,
+                'error': f"Directory {documents_path} does not exist",
+                'job_id': None
+            }
+        
+        job = self.job_queue.submit(str(documents_path), replace_existing=replace_existing, resume=resume)
+        return {
+            'success': True,
+            'error': None,
+            'job_id': job.job_id
+        }
+    
+    def get_ingestion_jobs(self) -> List[Dict[str, Any]]:
+        return [job.to_dict() for job in self.job_queue.list_jobs()]
+    
+    def cancel_ingestion_job(self, job_id: str) -> Dict[str, Any]:
+        cancelled = self.job_queue.cancel(job_id)
+        return {
+            'success': cancelled,
+            'error': None if cancelled else f"Job {job_id} is not running",
+            'job_id': job_id
+        }
+    
     def query(
         self, 
         question: str, 
         conversation_history: Optional[List[Dict[str, str]]] = None,
-        include_sources: bool = True
+        include_sources: bool = True,
+        shards: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        deadline_seconds: Optional[float] = None
     ) -> Dict[str, Any]:
+        """Answer a question from the knowledge base.
+
+        With a deadline (argument or QUERY_DEADLINE_SECONDS) retrieval and
+        generation share the budget; if the LLM has not answered when it runs
+        out, the answer is extracted from the retrieved chunks and flagged
+        with 'fallback': True.
+        """
+        if deadline_seconds is None:
+            deadline_seconds = settings.QUERY_DEADLINE_SECONDS
+        started = time.monotonic()
+        
         try:
+            # Step 0: Small talk is answered directly, without a knowledge base search
+            if self.intent_router is not None:
+                route = self.intent_router.route(question)
+                if route['intent'] == INTENT_SMALL_TALK:
+                    return self._answer_small_talk(question, route, include_sources)
+            
             # Step 1: Retrieve relevant context
-            context_data = self.retriever.get_context_for_query(question)
+            context_data = self.retriever.get_context_for_query(question, shards=shards, filters=filters)
             
             if not context_data['context'].strip():
                 return {
@@ -71,12 +162,20 @@ class RAGPipeline:
                     'error': None
                 }
             
-            # Step 2: Generate response using LLM
-            response_data = self.llm_client.generate_response(
-                question, 
-                context_data['context'], 
-                conversation_history
-            )
+            # Step 2: Generate response using LLM, within the remaining budget if there is one
+            if deadline_seconds > 0:
+                response_data = self.deadline_generator.generate(
+                    question,
+                    context_data,
+                    conversation_history,
+                    deadline=started + deadline_seconds
+                )
+            else:
+                response_data = self.llm_client.generate_response(
+                    question, 
+                    context_data['context'], 
+                    conversation_history
+                )
             
             result = {
                 'answer': response_data['response'],
@@ -85,12 +184,21 @@ class RAGPipeline:
                 'usage': response_data['usage']
             }
             
+            if deadline_seconds > 0:
+                result.update({
+                    'fallback': response_data['fallback'],
+                    'fallback_reason': response_data['fallback_reason'],
+                    'cached': response_data['cached'],
+                    'elapsed_seconds': time.monotonic() - started
+                })
+            
             if include_sources:
                 result.update({
                     'sources': context_data['sources'],
                     'context_used': context_data['context'],
                     'num_chunks_used': context_data['num_chunks'],
-                    'context_length': context_data['context_length']
+                    'context_length': context_data['context_length'],
+                    'compression': context_data.get('compression')
                 })
             
             return result
@@ -105,6 +213,24 @@ class RAGPipeline:
                 'usage': None
             }
     
+    def _answer_small_talk(self, question: str, route: Dict[str, Any], include_sources: bool) -> Dict[str, Any]:
+        response_data = self.llm_client.generate_small_talk_response(question)
+        result = {
+            'answer': response_data['response'],
+            'success': response_data['success'],
+            'error': response_data['error'],
+            'usage': response_data['usage'],
+            'intent': route['intent']
+        }
+        if include_sources:
+            result.update({
+                'sources': [],
+                'context_used': '',
+                'num_chunks_used': 0,
+                'context_length': 0
+            })
+        return result
+    
     def add_single_document(self, file_path: str) -> Dict[str, Any]:
         file_path = Path(file_path)
         
@@ -134,6 +260,47 @@ class RAGPipeline:
                 'filename': file_path.name
             }
     
+    def apply_file_changes(self, changes: Dict[str, List[Path]]) -> Dict[str, Any]:
+        """Re-index added/modified files and drop deleted ones in a single batch"""
+        try:
+            documents = []
+            failed = []
+            replaced = []
+            modified = set(changes.get('modified', []))
+            for file_path in changes.get('added', []) + changes.get('modified', []):
+                processed_doc = self.document_processor.process_file(Path(file_path))
+                if processed_doc:
+                    documents.append(processed_doc)
+                    if file_path in modified:
+                        replaced.append(file_path)
+                else:
+                    failed.append(Path(file_path).name)
+            
+            # Extract first so a file only loses its old chunks once the new text is ready;
+            # a modified file that could not be extracted keeps them
+            for file_path in replaced + changes.get('deleted', []):
+                self.vector_store.delete_by_filename(Path(file_path).name)
+            
+            # One call so all changed files share batched embedding requests
+            if documents:
+                self.vector_store.add_documents(documents)
+            
+            return {
+                'success': True,
+                'error': None,
+                'documents_processed': len(documents),
+                'documents_removed': len(changes.get('deleted', [])),
+                'failed': failed
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'documents_processed': 0,
+                'documents_removed': 0,
+                'failed': []
+            }
+    
     def remove_document(self, filename: str) -> Dict[str, Any]:
         try:
             self.vector_store.delete_by_filename(filename)
@@ -185,9 +352,15 @@ class RAGPipeline:
                 'message': "Failed to clear knowledge base"
             }
     
-    def search_knowledge_base(self, query: str, top_k: int = 5) -> Dict[str, Any]:
+    def search_knowledge_base(
+        self,
+        query: str,
+        top_k: int = 5,
+        shards: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         try:
-            results = self.retriever.retrieve_with_reranking(query, top_k)
+            results = self.retriever.retrieve_with_reranking(query, top_k, shards=shards, filters=filters)
             
             return {
                 'success': True,
@@ -202,4 +375,36 @@ class RAGPipeline:
                 'results': [],
                 'query': query,
                 'total_results': 0
-            }
\ No newline at end of file
+            }
+    
+    @contextmanager
+    def profile(self, output_dir: Optional[str] = None, **profiler_options):
+        """Profile the pipeline calls made inside the block, split into stages.
+        
+        Top-level calls (``query``, ``ingest_documents``, ``apply_file_changes``)
+        and the stages they go through (extraction, indexing, routing,
+        retrieval, generation) each get their own CPU and allocation profile,
+        also when they run on the ingestion job thread. Reports are written to
+        ``output_dir`` on exit, if given::
+        
+            with rag.profile("profiles/slow-query") as profiler:
+                rag.query("What is a heap?")
+            print(profiler.summary())
+        """
+        profiler = Profiler(output_dir, **profiler_options)
+        stages = [
+            (self, 'query', 'query'),
+            (self, 'ingest_documents', 'ingest'),
+            (self, 'apply_file_changes', 'reindex'),
+            (self.document_processor, 'process_file', 'extraction'),
+            (self.vector_store, 'add_documents', 'indexing'),
+            (self.retriever, 'get_context_for_query', 'retrieval'),
+            (self.llm_client, 'generate_response', 'generation'),
+        ]
+        if self.intent_router is not None:
+            stages.append((self.intent_router, 'route', 'routing'))
+        for obj, method_name, stage in stages:
+            profiler.instrument(obj, method_name, stage)
+        
+        with profiler:
+            yield profiler
\ No newline at end of file
@@ -1,3 +1,5 @@
 from .retriever import Retriever
+from .intent_router import IntentRouter
+from .context_compressor import ContextCompressor
 
-__all__ = ['Retriever']
\ No newline at end of file
+__all__ = ['Retriever', 'IntentRouter', 'ContextCompressor']
\ No newline at end of file
@@ -0,0 +1,104 @@
+import re
+from typing import List, Dict, Any, Optional, Callable
+
+import numpy as np
+
+from src.utils.text_processing import count_tokens
+from config.settings import settings
+
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+
+GAP_MARKER = " ... "
+
+def split_sentences(text: str, min_words: int = 1) -> List[str]:
+    """Split chunk text into whitespace-normalized sentences with at least ``min_words`` words"""
+    sentences = []
+    for sentence in _SENTENCE_BOUNDARY.split(text):
+        sentence = ' '.join(sentence.split())
+        if sentence and len(sentence.split()) >= min_words:
+            sentences.append(sentence)
+    return sentences
+
+class ContextCompressor:
+    """Keeps only the sentences of the retrieved chunks that matter for the query.
+
+    All sentences are scored against the query in one batched encode. The best
+    ones are taken in score order, each with up to ``neighbors`` sentences on
+    either side for coherence, until ``token_budget`` is reached. Kept sentences
+    stay in document order inside their chunk; gaps are marked with "...".
+    """
+
+    def __init__(
+        self,
+        embedding_model,
+        token_budget: Optional[int] = None,
+        neighbors: Optional[int] = None,
+        token_counter: Optional[Callable[[str], int]] = None
+    ):
+        self.embedding_model = embedding_model
+        self.token_budget = token_budget or settings.CONTEXT_COMPRESSION_TOKEN_BUDGET
+        self.neighbors = settings.CONTEXT_COMPRESSION_NEIGHBORS if neighbors is None else neighbors
+        self.count_tokens = token_counter or count_tokens
+
+    def compress(self, query: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Return {'results', 'original_tokens', 'compressed_tokens', 'tokens_saved', 'compression_ratio'}"""
+        chunk_sentences = [split_sentences(result['content']) for result in results]
+        # (chunk, position) of every sentence, in the order they are encoded
+        positions = [(chunk, index) for chunk, sentences in enumerate(chunk_sentences) for index in range(len(sentences))]
+        original_tokens = sum(self.count_tokens(result['content']) for result in results)
+
+        if not positions:
+            return self._report(results, original_tokens, original_tokens)
+
+        texts = [chunk_sentences[chunk][index] for chunk, index in positions]
+        embeddings = np.asarray(self.embedding_model.encode([query] + texts), dtype=np.float32)
+        embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        scores = embeddings[1:] @ embeddings[0]
+
+        costs = {position: self.count_tokens(text) for position, text in zip(positions, texts)}
+        selected = set()
+        used = 0
+        for best in np.argsort(-scores, kind='stable'):
+            chunk, index = positions[best]
+            if (chunk, index) in selected:
+                continue
+            lowest = max(index - self.neighbors, 0)
+            highest = min(index + self.neighbors, len(chunk_sentences[chunk]) - 1)
+            window = [(chunk, i) for i in range(lowest, highest + 1) if (chunk, i) not in selected]
+            # Without room for the neighbours, the sentence alone may still fit
+            for group in (window, [(chunk, index)]):
+                cost = sum(costs[position] for position in group)
+                if used + cost <= self.token_budget:
+                    selected.update(group)
+                    used += cost
+                    break
+            if used >= self.token_budget:
+                break
+
+        if not selected:
+            # Not even one sentence fits the budget; better to send the chunks as they are
+            return self._report(results, original_tokens, original_tokens)
+
+        compressed = []
+        for chunk, result in enumerate(results):
+            kept = sorted(index for selected_chunk, index in selected if selected_chunk == chunk)
+            if not kept:
+                continue
+            pieces = [chunk_sentences[chunk][kept[0]]]
+            for previous, index in zip(kept, kept[1:]):
+                separator = ' ' if index == previous + 1 else GAP_MARKER
+                pieces.append(separator + chunk_sentences[chunk][index])
+            compressed.append({**result, 'content': ''.join(pieces)})
+
+        compressed_tokens = sum(self.count_tokens(result['content']) for result in compressed)
+        return self._report(compressed, original_tokens, compressed_tokens)
+
+    @staticmethod
+    def _report(results: List[Dict[str, Any]], original_tokens: int, compressed_tokens: int) -> Dict[str, Any]:
+        return {
+            'results': results,
+            'original_tokens': original_tokens,
+            'compressed_tokens': compressed_tokens,
+            'tokens_saved': original_tokens - compressed_tokens,
+            'compression_ratio': original_tokens / compressed_tokens if compressed_tokens else 1.0
+        }
@@ -0,0 +1,199 @@
+import hashlib
+import itertools
+import json
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Callable
+
+import chromadb
+import numpy as np
+
+from config.settings import settings
+from src.database.vector_store import VectorStore
+
+EVAL_COLLECTION = "retrieval-eval"
+
+def load_labeled_questions(path: str) -> List[Dict[str, Any]]:
+    """Read {"question": ..., "relevant_files": [...]} objects from a JSON list or JSON lines"""
+    text = Path(path).read_text(encoding='utf-8').strip()
+    questions = json.loads(text) if text.startswith('[') else [json.loads(line) for line in text.splitlines() if line.strip()]
+    for question in questions:
+        if not question.get('question') or not question.get('relevant_files'):
+            raise ValueError(f"Each entry needs a question and relevant_files: {question}")
+    return questions
+
+class CachingEmbeddingModel:
+    """Embedding model wrapper that embeds each distinct text only once.
+
+    Configurations of a sweep share most of their chunk texts (and all their
+    questions), so only chunks that are new to the sweep reach the model.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._vectors: Dict[str, np.ndarray] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        keys = [hashlib.sha1(text.encode('utf-8')).hexdigest() for text in batch]
+
+        missing = {key: text for key, text in zip(keys, batch) if key not in self._vectors}
+        if missing:
+            vectors = np.asarray(self.model.encode(list(missing.values()), **kwargs), dtype=np.float32)
+            self._vectors.update(zip(missing, vectors))
+        self.misses += len(missing)
+        self.hits += len(batch) - len(missing)
+
+        vectors = np.stack([self._vectors[key] for key in keys])
+        return vectors[0] if single else vectors
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+def result_files(result: Dict[str, Any]) -> List[str]:
+    """Files a search result counts for, including other sources of a deduplicated chunk"""
+    metadata = result['metadata']
+    files = [metadata.get('filename')]
+    if metadata.get('duplicate_count', 1) > 1:
+        files += [name for name in json.loads(metadata.get('source_files', '{}')) if name not in files]
+    return files
+
+def score_ranking(ranked_results: List[Dict[str, Any]], relevant_files: Iterable[str]) -> Dict[str, float]:
+    """Recall of the relevant files within the results, and reciprocal rank of the first relevant chunk"""
+    relevant = set(relevant_files)
+    found = set()
+    first_rank = None
+    for rank, result in enumerate(ranked_results, start=1):
+        matched = relevant.intersection(result_files(result))
+        if matched and first_rank is None:
+            first_rank = rank
+        found |= matched
+    return {
+        'recall': len(found) / len(relevant) if relevant else 0.0,
+        'reciprocal_rank': 1.0 / first_rank if first_rank else 0.0
+    }
+
+def pareto_front(
+    results: List[Dict[str, Any]],
+    maximize: Iterable[str] = ('recall', 'mrr'),
+    minimize: Iterable[str] = ('p95_ms', 'index_bytes')
+) -> List[Dict[str, Any]]:
+    """Configurations no other configuration beats on every objective"""
+    maximize, minimize = list(maximize), list(minimize)
+
+    def dominates(a, b):
+        at_least_as_good = all(a[key] >= b[key] for key in maximize) and all(a[key] <= b[key] for key in minimize)
+        better = any(a[key] > b[key] for key in maximize) or any(a[key] < b[key] for key in minimize)
+        return at_least_as_good and better
+
+    return [result for result in results if not any(dominates(other, result) for other in results)]
+
+def recommend_configuration(results: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Among the Pareto front, the best recall, then MRR, then the fastest"""
+    front = pareto_front(results)
+    if not front:
+        return None
+    return max(front, key=lambda result: (result['recall'], result['mrr'], -result['p95_ms'], -result['index_bytes']))
+
+def directory_size(path: str) -> int:
+    return sum(file.stat().st_size for file in Path(path).rglob('*') if file.is_file())
+
+@contextmanager
+def _sweep_settings(chunk_size: int, chunk_overlap: int):
+    """Chunk with the configuration under test; thresholds are applied to the raw results instead"""
+    saved = (settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, settings.SIMILARITY_THRESHOLD)
+    settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, settings.SIMILARITY_THRESHOLD = chunk_size, chunk_overlap, -1.0
+    try:
+        yield
+    finally:
+        settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, settings.SIMILARITY_THRESHOLD = saved
+
+def evaluate_retrieval_grid(
+    documents: List[Dict[str, Any]],
+    questions: List[Dict[str, Any]],
+    embedding_model,
+    chunk_sizes: List[int],
+    chunk_overlaps: List[int],
+    top_k_values: List[int],
+    thresholds: List[float],
+    work_directory: Optional[str] = None,
+    progress_callback: Optional[Callable[[str], None]] = None
+) -> List[Dict[str, Any]]:
+    """Measure retrieval quality and cost for every combination of the settings.
+
+    ``documents`` are processed documents (DocumentProcessor.process_file) and
+    each question lists the files that answer it. Every (chunk size, overlap)
+    pair is ingested into its own temporary index, which is deleted afterwards;
+    top-k and threshold only change the query, so they reuse that index. Chunk
+    texts that an earlier configuration already embedded are not embedded
+    again, so ``ingest_seconds`` understates a cold ingest; ``embedded_chunks``
+    says how many chunks actually went through the model.
+    """
+    model = embedding_model if isinstance(embedding_model, CachingEmbeddingModel) else CachingEmbeddingModel(embedding_model)
+    query_embeddings = model.encode([question['question'] for question in questions])
+    results = []
+
+    for chunk_size, chunk_overlap in itertools.product(chunk_sizes, chunk_overlaps):
+        if chunk_overlap >= chunk_size:
+            continue
+        if progress_callback:
+            progress_callback(f"Ingesting with CHUNK_SIZE={chunk_size} CHUNK_OVERLAP={chunk_overlap}")
+
+        index_directory = tempfile.mkdtemp(prefix="studybuddy-eval-", dir=work_directory)
+        try:
+            with _sweep_settings(chunk_size, chunk_overlap):
+                store = VectorStore(
+                    collection_name=EVAL_COLLECTION,
+                    client=chromadb.PersistentClient(path=index_directory),
+                    embedding_model=model
+                )
+                misses_before = model.misses
+                ingest_start = time.perf_counter()
+                chunks = store.add_documents(documents)['chunks_added']
+                ingest_seconds = time.perf_counter() - ingest_start
+                index_bytes = directory_size(index_directory)
+
+                for top_k in top_k_values:
+                    rankings, latencies = [], []
+                    for query_embedding in query_embeddings:
+                        query_start = time.perf_counter()
+                        rankings.append(store.search_by_embedding(query_embedding.tolist(), top_k=top_k))
+                        latencies.append(time.perf_counter() - query_start)
+
+                    for threshold in thresholds:
+                        scores = [
+                            score_ranking(
+                                [result for result in ranked if result['similarity_score'] >= threshold],
+                                question['relevant_files']
+                            )
+                            for ranked, question in zip(rankings, questions)
+                        ]
+                        results.append({
+                            'chunk_size': chunk_size,
+                            'chunk_overlap': chunk_overlap,
+                            'top_k': top_k,
+                            'threshold': threshold,
+                            'recall': float(np.mean([score['recall'] for score in scores])),
+                            'mrr': float(np.mean([score['reciprocal_rank'] for score in scores])),
+                            # Questions that got no chunk above the threshold at all
+                            'empty_rate': float(np.mean([
+                                not any(result['similarity_score'] >= threshold for result in ranked)
+                                for ranked in rankings
+                            ])),
+                            'chunks': chunks,
+                            'index_bytes': index_bytes,
+                            'ingest_seconds': ingest_seconds,
+                            'embedded_chunks': model.misses - misses_before,
+                            'p50_ms': float(np.percentile(latencies, 50) * 1000),
+                            'p95_ms': float(np.percentile(latencies, 95) * 1000)
+                        })
+        finally:
+            shutil.rmtree(index_directory, ignore_errors=True)
+
+    return results
@@ -0,0 +1,122 @@
+import re
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from config.settings import settings
+
+INTENT_SMALL_TALK = 'small_talk'
+INTENT_KNOWLEDGE = 'knowledge'
+
+# Greetings and life questions that can be answered without the knowledge base
+SMALL_TALK_PHRASES = [
+    "hello", "hi", "hey", "halo", "hai", "how are you", "apa kabar", "selamat pagi", "selamat siang",
+    "selamat sore", "selamat malam", "good morning", "good afternoon", "good evening", "good night",
+    "thanks", "thank you", "terima kasih", "who are you", "what is your name"
+]
+
+# Words that may accompany a greeting without turning it into a question
+FILLER_WORDS = {
+    "there", "buddy", "studybuddy", "so", "much", "very", "again", "lot", "a", "all", "everyone",
+    "today", "doing", "ok", "okay", "yes", "nice", "great", "kak", "ya", "banyak", "sir", "maam"
+}
+
+# Example utterances for the optional embedding classifier
+SMALL_TALK_PROTOTYPES = [
+    "hello", "hi there", "good morning", "how are you doing", "thank you so much", "thanks for the help",
+    "who are you", "what is your name", "nice to meet you", "see you later", "bye", "you are awesome",
+    "apa kabar", "terima kasih banyak", "selamat pagi"
+]
+KNOWLEDGE_PROTOTYPES = [
+    "what is the time complexity of quicksort", "explain binary search", "how does dijkstra's algorithm work",
+    "summarize the lecture notes on recursion", "what is a hash table", "compare bfs and dfs",
+    "give an example of dynamic programming", "what does the document say about linked lists",
+    "jelaskan algoritma sorting", "apa itu struktur data"
+]
+
+_WORD = re.compile(r'\w+')
+
+def _compile_phrases(phrases: List[str]) -> "re.Pattern":
+    # Longest first so "thank you" wins over a shorter overlapping phrase
+    alternatives = sorted((re.escape(phrase).replace(r'\ ', r'\s+') for phrase in phrases), key=len, reverse=True)
+    return re.compile(r'\b(?:' + '|'.join(alternatives) + r')\b', re.IGNORECASE)
+
+class IntentRouter:
+    """Classifies a message as small talk or a knowledge question before retrieval.
+
+    Messages made only of greeting phrases (plus a few filler words) are small
+    talk. Phrases only count on word boundaries, so "hi" does not match
+    "this" or "history". Short messages the phrase matcher does not settle can
+    be passed to a nearest-prototype classifier over sentence embeddings.
+    Everything else goes to retrieval.
+    """
+
+    def __init__(
+        self,
+        phrases: Optional[List[str]] = None,
+        embedding_model=None,
+        max_extra_words: int = 1,
+        short_message_words: int = 6,
+        min_similarity: Optional[float] = None
+    ):
+        self.pattern = _compile_phrases(phrases or SMALL_TALK_PHRASES)
+        self.max_extra_words = max_extra_words
+        self.short_message_words = short_message_words
+        self.min_similarity = min_similarity if min_similarity is not None else settings.INTENT_MIN_SIMILARITY
+
+        self.embedding_model = embedding_model
+        self._prototype_embeddings = None
+        self._prototype_intents: List[str] = []
+
+    def _load_prototypes(self):
+        if self._prototype_embeddings is not None:
+            return
+        texts = SMALL_TALK_PROTOTYPES + KNOWLEDGE_PROTOTYPES
+        # One batched encode, normalized so a dot product is the cosine similarity
+        embeddings = np.asarray(self.embedding_model.encode(texts), dtype=np.float32)
+        self._prototype_embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        self._prototype_intents = (
+            [INTENT_SMALL_TALK] * len(SMALL_TALK_PROTOTYPES) + [INTENT_KNOWLEDGE] * len(KNOWLEDGE_PROTOTYPES)
+        )
+
+    def _classify_by_embedding(self, query: str) -> Dict[str, Any]:
+        self._load_prototypes()
+        embedding = np.asarray(self.embedding_model.encode(query), dtype=np.float32)
+        embedding = embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+
+        similarities = self._prototype_embeddings @ embedding
+        best = int(np.argmax(similarities))
+        score = float(similarities[best])
+        if score < self.min_similarity:
+            return {'intent': INTENT_KNOWLEDGE, 'method': 'embedding', 'score': score}
+        return {'intent': self._prototype_intents[best], 'method': 'embedding', 'score': score}
+
+    def route(self, query: str) -> Dict[str, Any]:
+        """Return {'intent', 'method', 'score'} for a user message"""
+        words = _WORD.findall(query.lower())
+        if not words:
+            return {'intent': INTENT_SMALL_TALK, 'method': 'lexical', 'score': 1.0}
+
+        matched = self.pattern.search(query) is not None
+        if matched:
+            remaining = [word for word in _WORD.findall(self.pattern.sub(' ', query.lower())) if word not in FILLER_WORDS]
+            if len(remaining) <= self.max_extra_words:
+                return {'intent': INTENT_SMALL_TALK, 'method': 'lexical', 'score': 1.0}
+
+        # Long messages are questions; only short ones are worth an embedding
+        if self.embedding_model is not None and len(words) <= self.short_message_words:
+            return self._classify_by_embedding(query)
+
+        return {'intent': INTENT_KNOWLEDGE, 'method': 'lexical', 'score': 0.0}
+
+    def is_small_talk(self, query: str) -> bool:
+        return self.route(query)['intent'] == INTENT_SMALL_TALK
+
+def create_intent_router(vector_store=None) -> Optional[IntentRouter]:
+    """The router configured in settings, reusing the store's embedding model if the classifier is on"""
+    if not settings.INTENT_ROUTER_ENABLED:
+        return None
+    embedding_model = None
+    if settings.INTENT_EMBEDDING_CLASSIFIER and vector_store is not None:
+        embedding_model = vector_store.embedding_model
+    return IntentRouter(embedding_model=embedding_model)
@@ -1,16 +1,31 @@
 from typing import List, Dict, Any, Optional
-from src.database.vector_store import VectorStore
+from src.database.sharded_store import create_vector_store
+from src.retrieval.context_compressor import ContextCompressor
 from config.settings import settings
 
 class Retriever:
-    def __init__(self):
-        self.vector_store = VectorStore()
+    def __init__(self, vector_store=None, compressor: Optional[ContextCompressor] = None):
+        self.vector_store = vector_store or create_vector_store()
+        if compressor is None and settings.CONTEXT_COMPRESSION_ENABLED:
+            compressor = ContextCompressor(self.vector_store.embedding_model)
+        self.compressor = compressor
     
-    def retrieve(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+    def retrieve(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        shards: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search the knowledge base; ``filters`` restrict it by file, file type or date"""
         if top_k is None:
             top_k = settings.TOP_K_RESULTS
         
-        results = self.vector_store.search(query, top_k=top_k)
+        # Only sharded stores can restrict a search to some shards
+        if shards:
+            results = self.vector_store.search(query, top_k=top_k, shards=shards, filters=filters)
+        else:
+            results = self.vector_store.search(query, top_k=top_k, filters=filters)
         
         # Post-process results
         processed_results = []
@@ -25,8 +40,16 @@ class Retriever:
         
         return processed_results
     
-    def retrieve_with_reranking(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
-        initial_results = self.retrieve(query, top_k=(top_k or settings.TOP_K_RESULTS) * 2)
+    def retrieve_with_reranking(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        shards: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        initial_results = self.retrieve(
+            query, top_k=(top_k or settings.TOP_K_RESULTS) * 2, shards=shards, filters=filters
+        )
         
         # Simple reranking based on query term overlap
         query_terms = set(query.lower().split())
@@ -42,31 +65,47 @@ class Retriever:
         reranked_results = sorted(initial_results, key=lambda x: x['combined_score'], reverse=True)
         return reranked_results[:top_k or settings.TOP_K_RESULTS]
     
-    def get_context_for_query(self, query: str, max_context_length: int = 4000) -> Dict[str, Any]:
-        results = self.retrieve_with_reranking(query)
+    def get_context_for_query(
+        self,
+        query: str,
+        max_context_length: int = 4000,
+        shards: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        results = self.retrieve_with_reranking(query, shards=shards, filters=filters)
+        
+        # Optionally cut each chunk down to its relevant sentences before packing
+        compression = None
+        if self.compressor is not None and results:
+            compression = self.compressor.compress(query, results)
+            results = compression.pop('results')
         
         context_parts = []
+        used_results = []
         total_length = 0
         sources = set()
         
         for i, result in enumerate(results):
             content = result['content']
             source = result['source']
+            citation = self._format_citation(result)
             
-            # Add source information
-            formatted_content = f"[Source: {source}]\n{content}\n"
+            # Add source information, with pages when the document has them
+            formatted_content = f"[Source: {citation}]\n{content}\n"
             
             if total_length + len(formatted_content) <= max_context_length:
                 context_parts.append(formatted_content)
+                used_results.append(result)
                 total_length += len(formatted_content)
                 sources.add(source)
             else:
                 # Try to fit partial content
-                remaining_space = max_context_length - total_length - len(f"[Source: {source}]\n") - 50
+                remaining_space = max_context_length - total_length - len(f"[Source: {citation}]\n") - 50
                 if remaining_space > 100:
                     truncated_content = content[:remaining_space] + "..."
-                    formatted_content = f"[Source: {source}]\n{truncated_content}\n"
+                    formatted_content = f"[Source: {citation}]\n{truncated_content}\n"
                     context_parts.append(formatted_content)
+                    used_results.append({**result, 'content': truncated_content})
                     total_length += len(formatted_content)  # Fix: Update total_length
                     sources.add(source)
                 break
@@ -75,8 +114,22 @@ class Retriever:
             'context': '\n---\n'.join(context_parts),
             'sources': list(sources),
             'num_chunks': len(context_parts),
-            'context_length': total_length
+            'context_length': total_length,
+            'results': used_results,
+            'compression': compression
         }
     
+    @staticmethod
+    def _format_citation(result: Dict[str, Any]) -> str:
+        metadata = result.get('metadata', {})
+        page_start = metadata.get('page_start')
+        if page_start is None:
+            return result['source']
+        
+        label = "p." if metadata.get('file_extension') == '.pdf' else "section"
+        page_end = metadata.get('page_end', page_start)
+        pages = f"{page_start}" if page_end == page_start else f"{page_start}-{page_end}"
+        return f"{result['source']}, {label} {pages}"
+    
     def get_stats(self) -> Dict[str, Any]:
         return self.vector_store.get_collection_stats()
\ No newline at end of file
@@ -0,0 +1,53 @@
+from typing import Dict, Any, List, Optional
+
+import streamlit as st
+
+from config.settings import settings
+
+# Session state key of how many of the latest messages are shown
+CHAT_WINDOW_KEY = "chat_window"
+# Turns of earlier conversation the LLM prompt includes (see GeminiClient._create_user_prompt)
+HISTORY_TURNS = 3
+
+def message_html(message: Dict[str, Any]) -> str:
+    """The message's HTML with its sources, built on first render and kept on the message"""
+    html = message.get('html')
+    if html is None:
+        role_class = "user-message" if message["role"] == "user" else "assistant-message"
+        parts = [f'<div class="{role_class}">{message["content"]}</div>']
+        if message.get("sources"):
+            parts.append(f'<div class="source-info">Sources: {", ".join(message["sources"])}</div>')
+        html = message['html'] = "\n\n".join(parts)
+    return html
+
+def render_message(message: Dict[str, Any]):
+    with st.chat_message(message["role"]):
+        st.markdown(message_html(message), unsafe_allow_html=True)
+
+def render_chat_history(messages: List[Dict[str, Any]], window: Optional[int] = None):
+    """Render the latest messages; earlier ones stay behind a "load earlier" button.
+
+    Each rerun renders at most the window (CHAT_WINDOW_SIZE messages, plus as
+    many again per click), so its cost does not grow with the session.
+    """
+    window = window or settings.CHAT_WINDOW_SIZE
+    shown = st.session_state.get(CHAT_WINDOW_KEY, window)
+    hidden = max(len(messages) - shown, 0)
+    if hidden:
+        if st.button(f"⬆️ Load earlier messages ({hidden} hidden)", key="load_earlier_messages"):
+            st.session_state[CHAT_WINDOW_KEY] = shown + window
+            st.rerun()
+    for message in messages[hidden:]:
+        render_message(message)
+
+def reset_chat_window():
+    st.session_state.pop(CHAT_WINDOW_KEY, None)
+
+def recent_conversation(messages: List[Dict[str, Any]], turns: int = HISTORY_TURNS) -> List[Dict[str, str]]:
+    """The last ``turns`` user/assistant pairs before the current question, without walking the whole session"""
+    recent = messages[-(2 * turns + 1):]
+    return [
+        {"user": message["content"], "assistant": recent[i + 1]["content"]}
+        for i, message in enumerate(recent[:-1])
+        if message["role"] == "user"
+    ]
@@ -1,6 +1,7 @@
 import streamlit as st
 import os
 import sys
+import time
 import warnings
 from pathlib import Path
 
@@ -21,10 +22,11 @@ if str(project_root) not in sys.path:
 # print(f"Python path: {sys.path[:3]}...")  # Print first 3 items
 
 try:
+    # Modules that load torch, Chroma or Gemini are imported once the warm-up has loaded them
     from src.ingestion.document_processor import DocumentProcessor
-    from src.database.vector_store import VectorStore
-    from src.retrieval.retriever import Retriever
-    from src.generation.llm_client import GeminiClient
+    from src.ingestion.job_queue import IngestionJobQueue, describe_job, format_duration, JOB_RUNNING, JOB_QUEUED
+    from src.warmup import start_pipeline_warmup, STATE_READY, STATE_FAILED
+    from src.ui.chat_view import render_chat_history, render_message, message_html, reset_chat_window, recent_conversation
     from config.settings import settings
     # print("✅ All imports successful!")  # Remove debug print
 except ImportError as e:
@@ -33,6 +35,9 @@ except ImportError as e:
     st.error(f"Python path: {sys.path}")
     raise
 
+# Shared by every session of this process; loads in the background while the page renders
+warmup = start_pipeline_warmup()
+
 # Page configuration
 st.set_page_config(
     page_title=settings.APP_TITLE,
@@ -81,30 +86,93 @@ if 'llm_client' not in st.session_state:
     st.session_state.llm_client = None
 if 'vector_store' not in st.session_state:
     st.session_state.vector_store = None
+if 'job_queue' not in st.session_state:
+    st.session_state.job_queue = None
+if 'intent_router' not in st.session_state:
+    st.session_state.intent_router = None
+if 'deadline_generator' not in st.session_state:
+    st.session_state.deadline_generator = None
+
+def wait_for(component: str, message: str):
+    """A warmed-up component, with a spinner only if it is still loading"""
+    if warmup.is_ready(component):
+        return warmup.get(component)
+    with st.spinner(message):
+        return warmup.get(component)
 
-def initialize_components():
-    """Initialize RAG components"""
+def initialize_store():
+    """Initialize the components that need the knowledge base, waiting for it if it is still loading"""
     try:
         if st.session_state.vector_store is None:
-            with st.spinner("Initializing vector store..."):
-                st.session_state.vector_store = VectorStore()
+            st.session_state.vector_store = wait_for('vector_store', "Loading the knowledge base...")
         
         if st.session_state.retriever is None:
-            with st.spinner("Initializing retriever..."):
-                st.session_state.retriever = Retriever()
+            from src.retrieval.retriever import Retriever
+            st.session_state.retriever = Retriever(st.session_state.vector_store)
         
-        if st.session_state.llm_client is None:
-            with st.spinner("Initializing Gemini client..."):
-                st.session_state.llm_client = GeminiClient()
+        if st.session_state.job_queue is None:
+            st.session_state.job_queue = IngestionJobQueue(DocumentProcessor(), st.session_state.vector_store)
         
         return True
     except Exception as e:
         st.error(f"Error initializing components: {str(e)}")
         return False
 
+def initialize_llm():
+    """Initialize the Gemini client, waiting for it if it is still loading"""
+    try:
+        if st.session_state.llm_client is None:
+            st.session_state.llm_client = wait_for('llm_client', "Connecting to Gemini...")
+        return True
+    except Exception as e:
+        st.error(f"Error initializing components: {str(e)}")
+        return False
+
+def initialize_intent_router():
+    """The router needs the knowledge base's embedding model only for its embedding classifier"""
+    from src.retrieval.intent_router import create_intent_router
+    if st.session_state.intent_router is None:
+        if settings.INTENT_EMBEDDING_CLASSIFIER and not initialize_store():
+            return None
+        st.session_state.intent_router = create_intent_router(st.session_state.vector_store)
+    return st.session_state.intent_router
+
+def initialize_deadline_generator():
+    if st.session_state.deadline_generator is None:
+        from src.generation.deadline import DeadlineGenerator
+        from src.retrieval.retriever import Retriever
+        st.session_state.deadline_generator = DeadlineGenerator(
+            st.session_state.llm_client,
+            st.session_state.vector_store.embedding_model,
+            format_citation=Retriever._format_citation
+        )
+    return st.session_state.deadline_generator
+
+def render_warmup_status():
+    """Show which components are still loading in the background"""
+    if warmup.all_ready():
+        return
+    
+    labels = {
+        'embedding_model': "Embedding model",
+        'chroma_client': "Database",
+        'vector_store': "Knowledge base",
+        'llm_client': "Gemini client"
+    }
+    st.subheader("Starting Up")
+    for component, state in warmup.status().items():
+        seconds = f" ({state['seconds']:.1f}s)" if state['seconds'] is not None else ""
+        if state['state'] == STATE_READY:
+            st.caption(f"✅ {labels.get(component, component)} ready{seconds}")
+        elif state['state'] == STATE_FAILED:
+            st.caption(f"❌ {labels.get(component, component)} failed: {state['error']}")
+        else:
+            st.caption(f"⏳ {labels.get(component, component)} loading{seconds}")
+    if st.button("🔄 Refresh", key="refresh_warmup", use_container_width=True):
+        st.rerun()
+
 def process_documents():
-    """Process and index documents"""
-    doc_processor = DocumentProcessor()
+    """Queue the documents directory for background indexing"""
     documents_path = Path(settings.DOCUMENTS_DIRECTORY)
     
     if not documents_path.exists():
@@ -113,18 +181,43 @@ def process_documents():
         st.info("Please add your documents to this directory and click 'Process Documents' again.")
         return
     
-    with st.spinner("Processing documents..."):
-        documents = doc_processor.process_directory(documents_path)
-        
-        if not documents:
-            st.warning("No documents found to process. Please add documents to the documents directory.")
-            return
-        
-        # Clear existing collection and add new documents
-        st.session_state.vector_store.clear_collection()
-        st.session_state.vector_store.add_documents(documents)
+    if st.session_state.job_queue.has_active_jobs():
+        st.warning("An indexing job is already running. You can keep chatting while it finishes.")
+        return
+    
+    # Replace each file's chunks as it is re-indexed instead of clearing the
+    # collection up front, so questions can still be answered during the job
+    job = st.session_state.job_queue.submit(str(documents_path), replace_existing=True)
+    st.success(f"Started indexing job {job.job_id}. You can keep chatting while it runs.")
+
+def render_job_status():
+    """Show progress of background indexing jobs in the sidebar"""
+    jobs = st.session_state.job_queue.list_jobs() if st.session_state.job_queue else []
+    if not jobs:
+        return
+    
+    st.subheader("Indexing Jobs")
+    for job in jobs[:3]:
+        state = job.to_dict()
+        progress = state['progress']
         
-        st.success(f"Successfully processed and indexed {len(documents)} documents!")
+        if state['status'] in (JOB_RUNNING, JOB_QUEUED):
+            st.progress(progress['fraction'], text=f"{state['files_done']}/{state['files_total']} files")
+            st.caption(
+                f"{state['chunks_done']} chunks · {progress['chunks_per_second']:.1f} chunks/s · "
+                f"ETA {format_duration(progress['eta_seconds'])}"
+            )
+            if state['current_file']:
+                st.caption(f"Processing {state['current_file']}")
+            
+            col1, col2 = st.columns(2)
+            if col1.button("🔄 Refresh", key=f"refresh_{job.job_id}", use_container_width=True):
+                st.rerun()
+            if col2.button("⏹️ Cancel", key=f"cancel_{job.job_id}", use_container_width=True):
+                st.session_state.job_queue.cancel(job.job_id)
+                st.rerun()
+        else:
+            st.caption(f"Job {job.job_id} {describe_job(state)}")
 
 def main():
     st.title("🧠 " + settings.APP_TITLE)
@@ -142,9 +235,12 @@ def main():
         
         # Document processing
         if st.button("📤 Process Documents", use_container_width=True):
-            if initialize_components():
+            if initialize_store():
                 process_documents()
         
+        render_warmup_status()
+        render_job_status()
+        
         # Upload files
         st.subheader("Upload Files")
         uploaded_files = st.file_uploader(
@@ -168,12 +264,24 @@ def main():
         
         # Knowledge base stats
         st.header("📊 Knowledge Base Stats")
-        if initialize_components():
+        if not warmup.is_ready('vector_store') and st.session_state.vector_store is None:
+            # Stats are not worth waiting for; they appear once the knowledge base has loaded
+            st.info("Loading the knowledge base... You can already upload files and ask questions.")
+        elif initialize_store():
             try:
                 stats = st.session_state.retriever.get_stats()
                 st.metric("Total Chunks", stats.get('total_chunks', 0))
                 st.metric("Collection", stats.get('collection_name', 'N/A'))
                 
+                # Sharded knowledge bases can be searched one course at a time
+                if stats.get('shards'):
+                    st.multiselect(
+                        "Search in",
+                        options=sorted(stats['shards']),
+                        key="selected_shards",
+                        help="Leave empty to search all courses"
+                    )
+                
                 # List files in knowledge base
                 files = st.session_state.vector_store.list_files()
                 if files:
@@ -182,6 +290,13 @@ def main():
                         st.text(f"📄 {file}")
                     if len(files) > 10:
                         st.text(f"... and {len(files) - 10} more")
+                    
+                    st.multiselect(
+                        "Search within files",
+                        options=files,
+                        key="selected_files",
+                        help="Leave empty to search every file"
+                    )
                 else:
                     st.info("No files indexed yet. Upload and process documents to get started!")
             except Exception as e:
@@ -193,68 +308,91 @@ def main():
         # Clear conversation
         if st.button("🗑️ Clear Conversation", use_container_width=True):
             st.session_state.messages = []
+            reset_chat_window()
             st.rerun()
     
-    # Initialize components
-    if not initialize_components():
-        return
-    
     # Main chat interface
     st.header("💬 Chat with your Knowledge Base")
     
-    # Display chat messages
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-                role_class = "user-message" if message["role"] == "user" else "assistant-message"
-                st.markdown(f'<div class="{role_class}">{message["content"]}</div>', unsafe_allow_html=True)
-                if "sources" in message:
-                    st.markdown(f'<div class="source-info">Sources: {", ".join(message["sources"])}</div>', 
-                           unsafe_allow_html=True)
+    # Display the latest chat messages; earlier ones load on demand
+    render_chat_history(st.session_state.messages)
     
     # Chat input
     if prompt := st.chat_input("Ask a question about your knowledge base..."):
         # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        user_message = {"role": "user", "content": prompt}
+        st.session_state.messages.append(user_message)
         
         # Display user message
-        with st.chat_message("user"):
-                st.markdown(f'<div class="user-message">{prompt}</div>', unsafe_allow_html=True)
+        render_message(user_message)
         
         # Generate and display assistant response
         with st.chat_message("assistant"):
             with st.spinner("Searching knowledge base and generating response..."):
-                # Retrieve relevant context
-                context_data = st.session_state.retriever.get_context_for_query(prompt)
-                context = context_data['context']
-                sources = context_data['sources']
+                started = time.monotonic()
+                intent_router = initialize_intent_router()
+                route = intent_router.route(prompt) if intent_router else None
                 
-                if not context.strip():
-                    response = "I couldn't find any relevant information in your knowledge base to answer this question. Please make sure you have uploaded and processed relevant documents."
+                from src.retrieval.intent_router import INTENT_SMALL_TALK
+                if route and route['intent'] == INTENT_SMALL_TALK:
+                    # Greetings are answered directly, without searching the knowledge base
+                    if not initialize_llm():
+                        return
+                    response = st.session_state.llm_client.generate_small_talk_response(prompt)['response']
                     sources = []
                 else:
-                    # Generate response using LLM
-                    conversation_history = [
-                        {"user": msg["content"], "assistant": st.session_state.messages[i+1]["content"]} 
-                        for i, msg in enumerate(st.session_state.messages[:-1]) 
-                        if msg["role"] == "user" and i+1 < len(st.session_state.messages)
-                    ]
-                    
-                    result = st.session_state.llm_client.generate_response(
-                        prompt, context, conversation_history
+                    if not initialize_store():
+                        return
+                    # Retrieve relevant context
+                    selected_files = st.session_state.get('selected_files')
+                    context_data = st.session_state.retriever.get_context_for_query(
+                        prompt,
+                        shards=st.session_state.get('selected_shards') or None,
+                        filters={'filenames': selected_files} if selected_files else None
                     )
-                    response = result['response']
-                
-                # Display response
-                    st.markdown(f'<div class="assistant-message">{response}</div>', unsafe_allow_html=True)
+                    context = context_data['context']
+                    sources = context_data['sources']
+                    
+                    compression = context_data.get('compression')
+                    if compression and compression['tokens_saved'] > 0:
+                        st.caption(
+                            f"🗜️ Context compressed {compression['compression_ratio']:.1f}x "
+                            f"({compression['tokens_saved']} prompt tokens saved)"
+                        )
+                    
+                    if not context.strip():
+                        response = "I couldn't find any relevant information in your knowledge base to answer this question. Please make sure you have uploaded and processed relevant documents."
+                        sources = []
+                    elif not initialize_llm():
+                        return
+                    else:
+                        # Generate response using LLM
+                        conversation_history = recent_conversation(st.session_state.messages)
+                        
+                        if settings.QUERY_DEADLINE_SECONDS > 0:
+                            # Past the deadline the answer is extracted from the retrieved chunks
+                            result = initialize_deadline_generator().generate(
+                                prompt,
+                                context_data,
+                                conversation_history,
+                                deadline=started + settings.QUERY_DEADLINE_SECONDS
+                            )
+                            if result['fallback']:
+                                st.caption("⏱️ The model did not answer in time; showing the closest passages instead.")
+                        else:
+                            result = st.session_state.llm_client.generate_response(
+                                prompt, context, conversation_history
+                            )
+                        response = result['response']
                 
+                assistant_message = {"role": "assistant", "content": response}
                 if sources:
-                    st.markdown(f'<div class="source-info">Sources: {", ".join(sources)}</div>', 
-                               unsafe_allow_html=True)
+                    assistant_message["sources"] = sources
+                
+                # Display response
+                st.markdown(message_html(assistant_message), unsafe_allow_html=True)
         
         # Add assistant message to chat history
-        assistant_message = {"role": "assistant", "content": response}
-        if sources:
-            assistant_message["sources"] = sources
         st.session_state.messages.append(assistant_message)
 
 if __name__ == "__main__":
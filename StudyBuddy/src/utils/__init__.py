@@ -1,3 +1,4 @@
 from .text_processing import chunk_text, clean_text, extract_metadata_from_text
+from .profiling import Profiler
 
-__all__ = ['chunk_text', 'clean_text', 'extract_metadata_from_text']
\ No newline at end of file
+__all__ = ['chunk_text', 'clean_text', 'extract_metadata_from_text', 'Profiler']
\ No newline at end of file
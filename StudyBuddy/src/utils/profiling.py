@@ -0,0 +1,299 @@
+import cProfile
+import functools
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from config.settings import settings
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+COLLAPSED_FILE = "profile.collapsed"
+SUMMARY_FILE = "summary.txt"
+
+_UNSAFE_FILE_CHARS = re.compile(r'[^a-zA-Z0-9_-]+')
+# Frames of the profiler itself are left out of sampled stacks
+_OWN_FILES = {__file__, tracemalloc.__file__, sys.modules['contextlib'].__file__}
+
+def _is_project_file(filename: str) -> bool:
+    path = Path(filename)
+    return path.is_absolute() and PROJECT_ROOT in path.parents and 'site-packages' not in path.parts
+
+def _location(filename: str, line: int) -> str:
+    path = Path(filename)
+    return f"{path.relative_to(PROJECT_ROOT) if _is_project_file(filename) else path.name}:{line}"
+
+def _function_label(filename: str, line: int, name: str) -> str:
+    if filename == '~':
+        return name  # Built-in, e.g. <method 'encode' of ...>
+    return f"{name} ({_location(filename, line)})"
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', Path(code.co_filename).stem)
+    # Collapsed stacks use ';' between frames and ' ' before the count
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}".replace(';', ':').replace(' ', '_')
+
+class Profiler:
+    """CPU and allocation profile of a run, split into named stages.
+
+    Code inside ``stage(name)`` gets its own cProfile, so time is attributed to
+    the stage that spent it; a nested stage pauses the enclosing one. A sampling
+    thread records the call stack of every thread inside a stage every
+    ``sample_interval`` seconds, for a flamegraph in collapsed-stack format
+    (flamegraph.pl, speedscope, inferno). With ``trace_memory`` each stage also
+    reports memory it allocated and kept, its peak, and the lines responsible;
+    tracemalloc is process-wide, so stages running concurrently share figures.
+
+    ``instrument`` wraps a method of an object so every call runs as a stage.
+    """
+
+    def __init__(
+        self,
+        output_dir: Optional[str] = None,
+        sample_interval: Optional[float] = None,
+        trace_memory: bool = True,
+        top_n: Optional[int] = None
+    ):
+        self.output_dir = Path(output_dir) if output_dir else None
+        self.sample_interval = sample_interval or settings.PROFILE_SAMPLE_INTERVAL_MS / 1000
+        self.trace_memory = trace_memory
+        self.top_n = top_n or settings.PROFILE_TOP_FUNCTIONS
+
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.samples: Counter = Counter()
+        self._stacks: Dict[int, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._patches = []
+        self._sampler = None
+        self._stop = threading.Event()
+        self._started_tracemalloc = False
+        self.wall_seconds = 0.0
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        if self.output_dir is not None:
+            self.write_reports(self.output_dir)
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._started = time.perf_counter()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self.restore()
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self.wall_seconds = time.perf_counter() - self._started
+
+    def instrument(self, obj, method_name: str, stage: str):
+        """Run every call of ``obj.method_name`` as ``stage`` until ``restore``"""
+        method = getattr(obj, method_name)
+
+        @functools.wraps(method)
+        def profiled(*args, **kwargs):
+            with self.stage(stage):
+                return method(*args, **kwargs)
+
+        self._patches.append((obj, method_name, vars(obj).get(method_name)))
+        setattr(obj, method_name, profiled)
+
+    def restore(self):
+        """Undo ``instrument``"""
+        for obj, method_name, previous in reversed(self._patches):
+            if previous is None:
+                delattr(obj, method_name)  # Back to the class's method
+            else:
+                setattr(obj, method_name, previous)
+        self._patches = []
+
+    @contextmanager
+    def stage(self, name: str):
+        thread_id = threading.get_ident()
+        with self._lock:
+            stack = self._stacks.setdefault(thread_id, [])
+        if stack and stack[-1]['profile'] is not None:
+            stack[-1]['profile'].disable()
+
+        entry = {'name': name, 'started': time.perf_counter(), 'profile': None}
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack and 'peak' in stack[-1]:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            entry.update(memory_before=current, peak=current, snapshot=self._snapshot())
+        with self._lock:
+            stack.append(entry)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            entry['profile'] = profile
+        except ValueError:
+            pass  # Another profiler is active (Python 3.12+ allows one); the sampler still sees this stage
+        try:
+            yield
+        finally:
+            if entry['profile'] is not None:
+                profile.disable()
+            # The sampler skips the stage while its figures are collected
+            entry['finishing'] = True
+            self._finish_stage(entry)
+            with self._lock:
+                stack.pop()
+                if not stack:
+                    del self._stacks[thread_id]
+            if stack:
+                if 'peak' in entry and 'peak' in stack[-1]:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], entry['peak'])
+                if stack[-1]['profile'] is not None:
+                    stack[-1]['profile'].enable()
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ])
+
+    def _finish_stage(self, entry: Dict[str, Any]):
+        wall_seconds = time.perf_counter() - entry['started']
+        allocated = peak = 0
+        allocation_sites = Counter()
+        if 'snapshot' in entry and tracemalloc.is_tracing():
+            current, stage_peak = tracemalloc.get_traced_memory()
+            entry['peak'] = max(entry['peak'], stage_peak)
+            allocated = current - entry['memory_before']
+            peak = entry['peak'] - entry['memory_before']
+            for stat in self._snapshot().compare_to(entry['snapshot'], 'lineno'):
+                if stat.size_diff > 0:
+                    frame = stat.traceback[0]
+                    allocation_sites[_location(frame.filename, frame.lineno)] += stat.size_diff
+
+        with self._lock:
+            stats = self.stages.setdefault(entry['name'], {
+                'calls': 0, 'wall_seconds': 0.0, 'allocated_bytes': 0, 'peak_bytes': 0,
+                'allocation_sites': Counter(), 'profile': None
+            })
+            stats['calls'] += 1
+            stats['wall_seconds'] += wall_seconds
+            stats['allocated_bytes'] += allocated
+            stats['peak_bytes'] = max(stats['peak_bytes'], peak)
+            stats['allocation_sites'].update(allocation_sites)
+            if entry['profile'] is not None:
+                if stats['profile'] is None:
+                    stats['profile'] = pstats.Stats(entry['profile'])
+                else:
+                    stats['profile'].add(entry['profile'])
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            frames = sys._current_frames()
+            with self._lock:
+                active = {
+                    thread_id: stack[-1]['name']
+                    for thread_id, stack in self._stacks.items()
+                    if stack and not stack[-1].get('finishing')
+                }
+            for thread_id, stage in active.items():
+                frame = frames.get(thread_id)
+                labels = []
+                while frame is not None:
+                    if frame.f_code.co_filename not in _OWN_FILES:
+                        labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.samples[';'.join([stage] + labels[::-1])] += 1
+
+    def hot_functions(
+        self,
+        stage: Optional[str] = None,
+        project_only: bool = False,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Functions ranked by own (self) time, or by cumulative time with ``project_only``.
+
+        ``project_only`` keeps functions of this code base (``chunk_text``,
+        ``add_documents``...), so time spent inside torch or Chroma counts
+        towards the function of ours that called it.
+        """
+        names = [stage] if stage else list(self.stages)
+        profiles = [self.stages[name]['profile'] for name in names if self.stages.get(name, {}).get('profile')]
+        if not profiles:
+            return []
+        combined = pstats.Stats()
+        combined.add(*profiles)
+
+        functions = []
+        for (filename, line, name), (_, calls, own, cumulative, _) in combined.stats.items():
+            if project_only and (not _is_project_file(filename) or filename == __file__):
+                continue
+            functions.append({
+                'function': _function_label(filename, line, name),
+                'calls': calls,
+                'self_seconds': own,
+                'cumulative_seconds': cumulative
+            })
+        key = 'cumulative_seconds' if project_only else 'self_seconds'
+        functions.sort(key=lambda function: function[key], reverse=True)
+        return functions[:limit or self.top_n]
+
+    def collapsed_stacks(self) -> List[str]:
+        return [f"{stack} {count}" for stack, count in sorted(self.samples.items())]
+
+    def summary(self) -> str:
+        lines = [f"Profiled {self.wall_seconds:.2f}s, {sum(self.samples.values())} stack samples"]
+        for name, stats in sorted(self.stages.items(), key=lambda item: item[1]['wall_seconds'], reverse=True):
+            lines.append("")
+            lines.append(
+                f"[{name}] {stats['calls']} calls, {stats['wall_seconds']:.3f}s wall"
+                + (f", {stats['allocated_bytes'] / 1e6:+.1f} MB kept, {stats['peak_bytes'] / 1e6:.1f} MB peak"
+                   if self.trace_memory else "")
+            )
+            lines.append("  Hottest functions (self time):")
+            for function in self.hot_functions(name):
+                lines.append(f"    {function['self_seconds']:8.3f}s {function['calls']:8d}x  {function['function']}")
+            lines.append("  Our functions (cumulative time):")
+            for function in self.hot_functions(name, project_only=True):
+                lines.append(f"    {function['cumulative_seconds']:8.3f}s {function['calls']:8d}x  {function['function']}")
+            if stats['allocation_sites']:
+                lines.append("  Largest allocations kept:")
+                for site, size in stats['allocation_sites'].most_common(5):
+                    lines.append(f"    {size / 1e6:8.2f} MB  {site}")
+        return "\n".join(lines) + "\n"
+
+    def write_reports(self, output_dir) -> Dict[str, Path]:
+        """Write <stage>.prof (pstats) per stage, the collapsed stacks and the summary"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        paths = {}
+        for name, stats in self.stages.items():
+            if stats['profile'] is not None:
+                path = output_dir / f"{_UNSAFE_FILE_CHARS.sub('_', name)}.prof"
+                stats['profile'].dump_stats(path)
+                paths[name] = path
+
+        paths['collapsed'] = output_dir / COLLAPSED_FILE
+        paths['collapsed'].write_text("\n".join(self.collapsed_stacks()) + "\n", encoding='utf-8')
+        paths['summary'] = output_dir / SUMMARY_FILE
+        paths['summary'].write_text(self.summary(), encoding='utf-8')
+        return paths
@@ -1,30 +1,116 @@
 import re
-from typing import List, Dict, Any
+from bisect import bisect_right
+from typing import List, Dict, Any, Tuple, Iterable, Iterator
 import tiktoken
 
+# Any whitespace run except a lone space, which is already clean and by far the most common
+_WHITESPACE_RUN = re.compile(r'(?: \s|[^\S ])\s*')
+_LEADING_WHITESPACE = re.compile(r'\s*')
+
+def _normalize_whitespace(match: 're.Match') -> str:
+    newlines = match.group().count('\n')
+    if newlines > 1:
+        return '\n\n'  # Paragraph break
+    if newlines == 1:
+        return '\n'
+    return ' '
+
 def clean_text(text: str) -> str:
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'\n+', '\n', text)
-    text = text.strip()
-    return text
+    """Collapse whitespace in a single pass while keeping line and paragraph breaks"""
+    return _WHITESPACE_RUN.sub(_normalize_whitespace, text).strip()
+
+def _stream_split_point(buffer: str) -> int:
+    # Prefer paragraph, then line, then word boundaries; always cut at the start
+    # of a whitespace run so the run is never split between two pieces
+    candidates = (buffer.rfind('\n\n'), buffer.rfind('\n'), _last_whitespace(buffer))
+    for index in candidates:
+        while index > 0 and buffer[index - 1].isspace():
+            index -= 1
+        if index > 0:
+            return index
+    return len(buffer)
+
+def _last_whitespace(text: str) -> int:
+    index = len(text) - 1
+    while index >= 0 and not text[index].isspace():
+        index -= 1
+    return index
+
+def clean_text_stream(pieces: Iterable[str], max_buffer_chars: int = 1024 * 1024) -> Iterator[str]:
+    """Clean text arriving in arbitrary pieces; concatenating the output equals ``clean_text``.
+    
+    Memory stays bounded by ``max_buffer_chars`` plus the size of one piece.
+    """
+    buffer = ""
+    emitted = False
+    
+    def with_separator(segment: str, cleaned: str) -> str:
+        if not emitted:
+            return cleaned
+        leading = _LEADING_WHITESPACE.match(segment).group()
+        return (_WHITESPACE_RUN.sub(_normalize_whitespace, leading) or ' ' if leading else '') + cleaned
+    
+    for piece in pieces:
+        buffer += piece
+        if len(buffer) < max_buffer_chars:
+            continue
+        
+        cut = _stream_split_point(buffer)
+        segment = buffer[:cut]
+        cleaned = clean_text(segment)
+        if not cleaned:
+            continue
+        
+        yield with_separator(segment, cleaned)
+        emitted = True
+        buffer = buffer[cut:]
+    
+    cleaned = clean_text(buffer)
+    if cleaned:
+        yield with_separator(buffer, cleaned)
+
+def count_tokens(text: str) -> int:
+    """Token count with the same encoding the chunker uses"""
+    return len(tiktoken.get_encoding("cl100k_base").encode(text))
+
+def _complete_chars(data: bytes) -> Tuple[str, bytes]:
+    """Decode the whole characters of ``data`` and return the bytes of a trailing partial one.
+    
+    Token boundaries can fall inside a multi-byte UTF-8 character; such a
+    character belongs to the chunk or span in which it ends.
+    """
+    text = data.decode('utf-8', 'ignore')
+    return text, data[len(text.encode('utf-8')):]
 
 def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Dict[str, Any]]:
+    """Token windows of ``text``; each chunk's text is ``text[start_char:end_char]``"""
     encoding = tiktoken.get_encoding("cl100k_base")
     tokens = encoding.encode(text)
     
     chunks = []
     start = 0
+    # Character offsets are tracked incrementally so each token is decoded once more at most
+    start_char = 0
+    offset_token = 0
+    # Leading bytes of a character split by the token boundary at start_char
+    partial = b''
     
     while start < len(tokens):
         end = min(start + chunk_size, len(tokens))
         
         chunk_tokens = tokens[start:end]
-        chunk_text = encoding.decode(chunk_tokens)
+        
+        skipped, partial = _complete_chars(partial + encoding.decode_bytes(tokens[offset_token:start]))
+        start_char += len(skipped)
+        offset_token = start
+        chunk_text, _ = _complete_chars(partial + encoding.decode_bytes(chunk_tokens))
         
         chunks.append({
             'text': chunk_text,
             'start_token': start,
             'end_token': end,
+            'start_char': start_char,
+            'end_char': start_char + len(chunk_text),
             'token_count': len(chunk_tokens)
         })
         
@@ -35,6 +121,59 @@ def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> L
     
     return chunks
 
+def chunk_text_stream(pieces: Iterable[str], chunk_size: int = 1000, chunk_overlap: int = 200) -> Iterator[Dict[str, Any]]:
+    """Same windows as ``chunk_text`` over text arriving in pieces.
+    
+    Only the current window of tokens is kept, so memory is bounded by the chunk
+    size and the piece size instead of the document size.
+    """
+    encoding = tiktoken.get_encoding("cl100k_base")
+    
+    buffer: List[int] = []
+    buffer_start_token = 0
+    buffer_start_char = 0
+    # Leading bytes of a character split by the token boundary at buffer_start_char
+    partial = b''
+    emitted_end = 0
+    
+    def emit(end: int) -> Dict[str, Any]:
+        chunk_tokens = buffer[:end]
+        chunk_text, _ = _complete_chars(partial + encoding.decode_bytes(chunk_tokens))
+        return {
+            'text': chunk_text,
+            'start_token': buffer_start_token,
+            'end_token': buffer_start_token + end,
+            'start_char': buffer_start_char,
+            'end_char': buffer_start_char + len(chunk_text),
+            'token_count': len(chunk_tokens)
+        }
+    
+    for piece in pieces:
+        buffer.extend(encoding.encode(piece))
+        
+        while len(buffer) >= chunk_size:
+            chunk = emit(chunk_size)
+            emitted_end = chunk['end_token']
+            yield chunk
+            
+            # Keep the overlap as the start of the next window
+            step = chunk_size - chunk_overlap
+            skipped, partial = _complete_chars(partial + encoding.decode_bytes(buffer[:step]))
+            buffer_start_char += len(skipped)
+            buffer_start_token += step
+            buffer = buffer[step:]
+    
+    # Like chunk_text, skip a tail that is entirely covered by the previous overlap
+    if buffer and (emitted_end == 0 or buffer_start_token + len(buffer) > emitted_end):
+        yield emit(len(buffer))
+
+def locate_sections(sections: List[Dict[str, int]], start_char: int, end_char: int) -> Tuple[int, int]:
+    """Return the first and last page/section number covered by a character span"""
+    starts = [section['start_char'] for section in sections]
+    first = max(bisect_right(starts, start_char) - 1, 0)
+    last = max(bisect_right(starts, max(end_char - 1, start_char)) - 1, first)
+    return sections[first]['page'], sections[last]['page']
+
 def extract_metadata_from_text(text: str, filename: str) -> Dict[str, Any]:
     lines = text.split('\n')
     first_line = lines[0].strip() if lines else ""
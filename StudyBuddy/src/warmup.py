@@ -0,0 +1,138 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Optional
+
+from config.settings import settings
+
+STATE_PENDING = "pending"
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+# Dummy input for the first encode and query, which pay for lazy torch and index initialization
+WARMUP_TEXT = "What is a binary search tree?"
+
+class WarmUp:
+    """Loads components in background threads so callers wait only for what they use.
+
+    A component's ``loader`` gets the WarmUp itself and asks it for the
+    components it is built from with ``get``, so independent components load
+    in parallel and dependent ones start as soon as their inputs are ready.
+    The optional ``warmer`` runs once on the loaded value (a dummy encode or
+    query) before the component counts as ready; if it fails the component
+    is still used. ``get`` on a component that was never started loads it in
+    the calling thread, so nothing depends on ``start`` having been called.
+    """
+
+    def __init__(self):
+        self._components: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, loader: Callable[["WarmUp"], Any], warmer: Optional[Callable[[Any], Any]] = None):
+        self._components[name] = {
+            'loader': loader,
+            'warmer': warmer,
+            'future': Future(),
+            'state': STATE_PENDING,
+            'seconds': None,
+            'error': None
+        }
+
+    def start(self) -> "WarmUp":
+        """Start loading every component that is not loading yet"""
+        for name in self._components:
+            if self._claim(name):
+                threading.Thread(target=self._load, args=(name,), name=f"warmup-{name}", daemon=True).start()
+        return self
+
+    def _claim(self, name: str) -> bool:
+        with self._lock:
+            component = self._components[name]
+            if component['state'] != STATE_PENDING:
+                return False
+            component['state'] = STATE_LOADING
+            component['started'] = time.perf_counter()
+            return True
+
+    def _load(self, name: str):
+        component = self._components[name]
+        try:
+            value = component['loader'](self)
+            if component['warmer'] is not None:
+                try:
+                    component['warmer'](value)
+                except Exception as e:
+                    print(f"Warm-up of {name} failed (continuing anyway): {e}")
+        except Exception as e:
+            component.update(state=STATE_FAILED, error=str(e), seconds=time.perf_counter() - component['started'])
+            component['future'].set_exception(e)
+            return
+        component.update(state=STATE_READY, seconds=time.perf_counter() - component['started'])
+        component['future'].set_result(value)
+
+    def get(self, name: str, timeout: Optional[float] = None) -> Any:
+        """The loaded component, waiting for it if needed; raises the error its loader raised"""
+        if self._claim(name):
+            self._load(name)
+        return self._components[name]['future'].result(timeout)
+
+    def is_ready(self, name: str) -> bool:
+        return self._components[name]['state'] == STATE_READY
+
+    def all_ready(self) -> bool:
+        return all(component['state'] == STATE_READY for component in self._components.values())
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """State of each component, with its load time once finished or time spent so far"""
+        now = time.perf_counter()
+        status = {}
+        for name, component in self._components.items():
+            seconds = component['seconds']
+            if seconds is None and component['state'] == STATE_LOADING:
+                seconds = now - component['started']
+            status[name] = {'state': component['state'], 'seconds': seconds, 'error': component['error']}
+        return status
+
+# The pipeline's modules are imported inside the loaders: importing them pulls in
+# torch and Chroma, which is most of the start-up time
+def _load_embedding_model(warmup: WarmUp):
+    from src.database.embedding_backends import load_embedding_model
+    return load_embedding_model()
+
+def _load_chroma_client(warmup: WarmUp):
+    from src.database.chroma_config import get_chroma_client
+    return get_chroma_client(settings.CHROMA_PERSIST_DIRECTORY)
+
+def _load_vector_store(warmup: WarmUp):
+    from src.database.sharded_store import create_vector_store
+    return create_vector_store(client=warmup.get('chroma_client'), embedding_model=warmup.get('embedding_model'))
+
+def _load_llm_client(warmup: WarmUp):
+    from src.generation.llm_client import GeminiClient
+    return GeminiClient()
+
+def create_pipeline_warmup() -> WarmUp:
+    """Warm-up of the embedding model, Chroma client, vector store and Gemini client"""
+    warmup = WarmUp()
+    warmup.add('embedding_model', _load_embedding_model, lambda model: model.encode([WARMUP_TEXT]))
+    warmup.add('chroma_client', _load_chroma_client)
+    warmup.add('vector_store', _load_vector_store, lambda store: store.search(WARMUP_TEXT, top_k=1))
+    warmup.add('llm_client', _load_llm_client)
+    return warmup
+
+_pipeline_warmup: Optional[WarmUp] = None
+_pipeline_warmup_lock = threading.Lock()
+
+def start_pipeline_warmup() -> WarmUp:
+    """The process-wide pipeline warm-up, started in the background on the first call.
+
+    With WARMUP_ENABLED=false nothing loads until a component is asked for.
+    """
+    global _pipeline_warmup
+    with _pipeline_warmup_lock:
+        if _pipeline_warmup is None:
+            _pipeline_warmup = create_pipeline_warmup()
+            if settings.WARMUP_ENABLED:
+                _pipeline_warmup.start()
+        return _pipeline_warmup
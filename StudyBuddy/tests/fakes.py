@@ -0,0 +1,76 @@
+"""Stand-ins shared by the tests for components that need a download or an API key"""
+
+import string
+
+import numpy as np
+import tiktoken
+
+# cl100k_base's pre-tokenizer, so text splits into the same pieces before merging
+CL100K_PATTERN = (
+    r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]++[\r\n]*|\s*[\r\n]|\s+(?!\S)|\s+"""
+)
+
+def byte_level_encoding() -> tiktoken.Encoding:
+    """A tiktoken encoding built locally instead of downloading cl100k_base.
+
+    Besides single bytes it only merges pairs of ASCII letters, so every
+    character outside ASCII is split over several tokens, the case in which
+    token boundaries fall inside a character.
+    """
+    ranks = {bytes([byte]): byte for byte in range(256)}
+    for first in string.ascii_lowercase + ' ':
+        for second in string.ascii_lowercase:
+            ranks[(first + second).encode('ascii')] = len(ranks)
+    return tiktoken.Encoding("byte-level-test", pat_str=CL100K_PATTERN, mergeable_ranks=ranks, special_tokens={})
+
+def character_chunks(text, chunk_size=1000, chunk_overlap=200):
+    """Stands in for chunk_text with characters as tokens (tiktoken needs a download)"""
+    size, step = 40, 30
+    return [
+        {'text': text[start:start + size], 'start_char': start, 'end_char': min(start + size, len(text)),
+         'token_count': len(text[start:start + size])}
+        for start in range(0, max(len(text) - (size - step), 1), step)
+    ]
+
+class WordModel:
+    """Bag-of-words vectors, enough to rank chunks that share words with the query"""
+
+    def get_sentence_embedding_dimension(self):
+        return 32
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        vectors = []
+        for text in [texts] if single else texts:
+            vector = np.zeros(32, dtype=np.float32)
+            for word in text.lower().split():
+                vector[sum(map(ord, word)) % 32] += 1
+            vectors.append(vector / max(np.linalg.norm(vector), 1e-9))
+        vectors = np.stack(vectors)
+        return vectors[0] if single else vectors
+
+class BagOfWordsModel:
+    """Hashes words into a small vector so shared words give similar embeddings; counts encode calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        single = isinstance(texts, str)
+        vectors = []
+        for text in [texts] if single else texts:
+            vector = np.zeros(64, dtype=np.float32)
+            for word in text.lower().replace('?', ' ').replace('.', ' ').split():
+                vector[sum(map(ord, word)) % 64] += 1
+            vectors.append(vector)
+        return vectors[0] if single else np.array(vectors)
+
+class FixedDimensionModel:
+    """Stands in for the sentence transformer where nothing is encoded"""
+
+    def __init__(self, dimension=8):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
@@ -0,0 +1,93 @@
+import unittest
+import time
+from pathlib import Path
+import sys
+
+from streamlit.testing.v1 import AppTest
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.ui.chat_view import message_html, recent_conversation
+
+def chat_app():
+    import streamlit as st
+    from src.ui.chat_view import render_chat_history
+    render_chat_history(st.session_state.messages)
+
+def session(turns):
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"Question {i}: how does a binary heap sift down?"})
+        messages.append({"role": "assistant", "content": f"Answer {i}. " + "It swaps the key with its smaller child. " * 20,
+                         "sources": ["heaps.txt"]})
+    return messages
+
+def render_seconds(app: AppTest, runs: int = 3) -> float:
+    """Fastest of a few reruns, after a first run that pays for imports"""
+    app.run()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+class TestChatView(unittest.TestCase):
+    def setUp(self):
+        # AppTest leaves its script as __main__, which spawned processes of later tests would run
+        self.saved = (settings.CHAT_WINDOW_SIZE, sys.modules['__main__'])
+        settings.CHAT_WINDOW_SIZE = 20
+
+    def app(self, messages):
+        app = AppTest.from_function(chat_app)
+        app.session_state.messages = messages
+        return app
+
+    def test_rerun_cost_stays_flat_as_the_session_grows(self):
+        timings = {}
+        for turns in (10, 100, 1000):
+            app = self.app(session(turns))
+            timings[turns] = render_seconds(app)
+            self.assertEqual(len(app.chat_message), min(2 * turns, 20))
+            self.assertEqual(len(app.button), 0 if turns == 10 else 1)
+
+        # Rendering everything would take about 100 times longer for 1000 turns than for 10
+        self.assertLess(timings[1000], 3 * timings[10] + 0.05, timings)
+
+    def test_earlier_messages_load_on_demand(self):
+        messages = session(25)
+        app = self.app(messages)
+        app.run()
+        self.assertEqual(app.button[0].label, "⬆️ Load earlier messages (30 hidden)")
+
+        app.button[0].click().run()
+        self.assertEqual(len(app.chat_message), 40)
+        self.assertIn("Answer 5.", app.chat_message[1].markdown[0].value)
+
+        app.button[0].click().run()
+        self.assertEqual(len(app.chat_message), 50)
+        self.assertEqual(len(app.button), 0)
+
+    def test_html_is_built_once_per_message(self):
+        message = {"role": "assistant", "content": "A heap is a tree.", "sources": ["heaps.txt", "trees.pdf"]}
+        html = message_html(message)
+        self.assertIn('<div class="assistant-message">A heap is a tree.</div>', html)
+        self.assertIn("Sources: heaps.txt, trees.pdf", html)
+
+        message["content"] = "changed"
+        self.assertIs(message_html(message), html)
+
+    def test_recent_conversation_pairs_the_last_turns(self):
+        messages = session(10) + [{"role": "user", "content": "And a min-heap?"}]
+        history = recent_conversation(messages)
+        self.assertEqual([turn["user"] for turn in history],
+                         [f"Question {i}: how does a binary heap sift down?" for i in (7, 8, 9)])
+        self.assertTrue(history[-1]["assistant"].startswith("Answer 9."))
+
+    def tearDown(self):
+        settings.CHAT_WINDOW_SIZE, sys.modules['__main__'] = self.saved
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.retrieval.context_compressor import ContextCompressor, split_sentences, GAP_MARKER
+from src.retrieval.retriever import Retriever
+from src.generation.deadline import MIN_SENTENCE_WORDS
+from tests.fakes import BagOfWordsModel
+
+def word_count(text):
+    return len(text.split())
+
+SORTING = (
+    "Sorting puts items in order. Quicksort picks a pivot element. "
+    "Quicksort partitions the array around the pivot. Office hours are on Friday. "
+    "The library closes at noon. Exams are graded within a week."
+)
+GRAPHS = "BFS explores a graph level by level. DFS follows one path as deep as possible."
+
+def results():
+    return [
+        {'content': SORTING, 'source': "sorting.pdf", 'metadata': {'filename': "sorting.pdf"}},
+        {'content': GRAPHS, 'source': "graphs.txt", 'metadata': {'filename': "graphs.txt"}},
+    ]
+
+class StubStore:
+    def __init__(self):
+        self.embedding_model = BagOfWordsModel()
+
+    def search(self, query, top_k=None, filters=None):
+        return [
+            {'content': result['content'], 'metadata': result['metadata'], 'similarity_score': 0.9 - i / 10, 'rank': i + 1}
+            for i, result in enumerate(results())
+        ]
+
+class TestContextCompression(unittest.TestCase):
+    def test_split_sentences(self):
+        self.assertEqual(
+            split_sentences("Heaps are trees.  Ok.\nA heap keeps\tthe minimum at the root!"),
+            ["Heaps are trees.", "Ok.", "A heap keeps the minimum at the root!"]
+        )
+        self.assertEqual(split_sentences("Heaps are trees. Ok.", min_words=2), ["Heaps are trees."])
+
+    def test_sentences_are_split_and_fragments_dropped(self):
+        # As the extractive fallback splits them
+        self.assertEqual(
+            split_sentences("Heaps are binary trees. Ok.\nA heap keeps the minimum at the root!", min_words=MIN_SENTENCE_WORDS),
+            ["Heaps are binary trees.", "A heap keeps the minimum at the root!"]
+        )
+
+    def test_keeps_best_sentences_with_neighbors_under_budget(self):
+        model = BagOfWordsModel()
+        compressor = ContextCompressor(model, token_budget=20, neighbors=1, token_counter=word_count)
+        compression = compressor.compress("how does quicksort pick a pivot", results())
+
+        self.assertEqual(model.calls, 1)
+        kept = compression['results']
+        self.assertEqual([result['source'] for result in kept], ["sorting.pdf"])
+        self.assertIn("Quicksort picks a pivot element.", kept[0]['content'])
+        self.assertIn("Quicksort partitions the array around the pivot.", kept[0]['content'])
+        self.assertNotIn("library", kept[0]['content'])
+
+        self.assertLessEqual(compression['compressed_tokens'], 20)
+        self.assertEqual(compression['original_tokens'], word_count(SORTING) + word_count(GRAPHS))
+        self.assertEqual(compression['tokens_saved'], compression['original_tokens'] - compression['compressed_tokens'])
+        self.assertGreater(compression['compression_ratio'], 1.5)
+
+    def test_gaps_between_kept_sentences_are_marked(self):
+        compressor = ContextCompressor(BagOfWordsModel(), token_budget=11, neighbors=0, token_counter=word_count)
+        compression = compressor.compress("sorting order and exams graded", results())
+
+        self.assertEqual(
+            compression['results'][0]['content'],
+            "Sorting puts items in order." + GAP_MARKER + "Exams are graded within a week."
+        )
+
+    def test_budget_too_small_keeps_chunks_unchanged(self):
+        compressor = ContextCompressor(BagOfWordsModel(), token_budget=2, token_counter=word_count)
+        compression = compressor.compress("quicksort pivot", results())
+
+        self.assertEqual(compression['results'], results())
+        self.assertEqual(compression['tokens_saved'], 0)
+
+    def test_retriever_packs_compressed_context_and_reports_savings(self):
+        store = StubStore()
+        compressor = ContextCompressor(store.embedding_model, token_budget=20, token_counter=word_count)
+        context_data = Retriever(store, compressor=compressor).get_context_for_query("how does quicksort pick a pivot")
+
+        self.assertIn("Quicksort picks a pivot element.", context_data['context'])
+        self.assertNotIn("DFS", context_data['context'])
+        self.assertEqual(context_data['sources'], ["sorting.pdf"])
+        self.assertGreater(context_data['compression']['tokens_saved'], 0)
+
+        uncompressed = Retriever(store).get_context_for_query("how does quicksort pick a pivot")
+        self.assertIsNone(uncompressed['compression'])
+        self.assertIn("DFS", uncompressed['context'])
+
+if __name__ == '__main__':
+    unittest.main()
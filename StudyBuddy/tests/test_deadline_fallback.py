@@ -0,0 +1,102 @@
+import unittest
+import threading
+import time
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.generation.deadline import DeadlineGenerator, extractive_answer, FALLBACK_DEADLINE, FALLBACK_LLM_ERROR
+from tests.fakes import BagOfWordsModel
+
+class StubLLMClient:
+    """Answers after `delay` seconds, or fails when `error` is set"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.finished = threading.Event()
+
+    def generate_response(self, query, context, conversation_history=None):
+        time.sleep(self.delay)
+        self.finished.set()
+        if self.error:
+            return {'response': "I apologize...", 'success': False, 'error': self.error, 'usage': None}
+        return {'response': f"LLM answer to {query}", 'success': True, 'error': None, 'usage': {'total_tokens': 10}}
+
+RESULTS = [
+    {
+        'content': "Quicksort picks a pivot element. It partitions the array around the pivot value. "
+                   "The course meets every Tuesday afternoon.",
+        'source': "sorting.pdf",
+        'metadata': {'filename': "sorting.pdf"}
+    },
+    {
+        'content': "Merge sort splits the array in half recursively.\nBFS explores the graph level by level.",
+        'source': "graphs.txt",
+        'metadata': {'filename': "graphs.txt"}
+    },
+]
+
+CONTEXT_DATA = {'context': "[Source: sorting.pdf]\n...", 'sources': ["sorting.pdf", "graphs.txt"], 'results': RESULTS}
+
+class TestExtractiveAnswer(unittest.TestCase):
+    def test_best_sentences_come_first_with_sources(self):
+        model = BagOfWordsModel()
+        extract = extractive_answer("how does quicksort pick a pivot", RESULTS, model, max_sentences=2)
+
+        self.assertEqual(model.calls, 1)
+        self.assertEqual(extract['sentences'][0]['text'], "Quicksort picks a pivot element.")
+        self.assertEqual(extract['sentences'][0]['source'], "sorting.pdf")
+        self.assertEqual(len(extract['sentences']), 2)
+        self.assertIn("[Source: sorting.pdf]", extract['answer'])
+
+class TestDeadlineGenerator(unittest.TestCase):
+    def test_fast_llm_answer_is_returned(self):
+        generator = DeadlineGenerator(StubLLMClient(), BagOfWordsModel())
+        result = generator.generate("what is quicksort", CONTEXT_DATA, None, deadline=time.monotonic() + 5)
+
+        self.assertTrue(result['success'])
+        self.assertFalse(result['fallback'])
+        self.assertEqual(result['response'], "LLM answer to what is quicksort")
+
+    def test_slow_llm_falls_back_within_budget_and_late_answer_is_cached(self):
+        client = StubLLMClient(delay=0.5)
+        generator = DeadlineGenerator(client, BagOfWordsModel(), cache_late_answers=True)
+
+        started = time.monotonic()
+        result = generator.generate("how does quicksort pick a pivot", CONTEXT_DATA, None, deadline=started + 0.1)
+
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertTrue(result['success'])
+        self.assertTrue(result['fallback'])
+        self.assertEqual(result['fallback_reason'], FALLBACK_DEADLINE)
+        self.assertIn("Quicksort picks a pivot element.", result['response'])
+
+        self.assertTrue(client.finished.wait(2))
+        time.sleep(0.05)
+        again = generator.generate("How does quicksort pick a pivot ", CONTEXT_DATA, None, deadline=time.monotonic() + 0.1)
+        self.assertFalse(again['fallback'])
+        self.assertTrue(again['cached'])
+        self.assertEqual(again['response'], "LLM answer to how does quicksort pick a pivot")
+
+    def test_expired_budget_skips_the_llm(self):
+        client = StubLLMClient()
+        generator = DeadlineGenerator(client, BagOfWordsModel())
+        result = generator.generate("what is bfs", CONTEXT_DATA, None, deadline=time.monotonic() - 1)
+
+        self.assertTrue(result['fallback'])
+        self.assertFalse(client.finished.is_set())
+
+    def test_llm_error_falls_back(self):
+        generator = DeadlineGenerator(StubLLMClient(error="503 overloaded"), BagOfWordsModel())
+        result = generator.generate("what is bfs", CONTEXT_DATA, None, deadline=time.monotonic() + 5)
+
+        self.assertTrue(result['fallback'])
+        self.assertEqual(result['fallback_reason'], FALLBACK_LLM_ERROR)
+        self.assertEqual(result['error'], "503 overloaded")
+        self.assertIn("BFS explores the graph level by level.", result['response'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import unittest
+import tempfile
+import shutil
+import json
+import random
+from pathlib import Path
+from unittest import mock
+import sys
+
+import chromadb
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+import src.utils.text_processing as text_utils
+import src.ingestion.deduplication as deduplication
+from src.database.vector_store import VectorStore
+from src.ingestion.deduplication import ChunkDeduplicator, simhash, hamming_distance, MAX_HAMMING_DISTANCE
+from tests.fakes import WordModel, character_chunks
+
+SYLLABUS = (
+    "Course policies: attendance is mandatory for all lectures and labs. Late assignments lose ten "
+    "percent per day. Academic integrity violations are reported to the department. Office hours "
+    "are held every Tuesday and Thursday afternoon in the computer science building, room 204. "
+    "Grades are computed from homework, two midterms and a final project presentation. Homework is "
+    "released on Monday and due the following Sunday at midnight through the course portal. Each "
+    "midterm covers the material since the previous exam, and the final project is done in teams of "
+    "three students who present their work during the last week of the semester. Questions about "
+    "grading should be raised with the teaching assistants within one week of receiving feedback. "
+    "Students who need accommodations should contact the disability services office before the "
+    "second week of classes so that arrangements can be made in time for the first quiz. The "
+    "recommended textbook is available in the library reserve section and as an electronic copy."
+)
+
+class TestChunkDeduplicator(unittest.TestCase):
+    def test_simhash_is_stable_for_small_edits(self):
+        edited = SYLLABUS.replace("room 204", "room 210")
+        unrelated = "Dijkstra's algorithm finds shortest paths in graphs with non-negative edge weights."
+
+        self.assertLessEqual(hamming_distance(simhash(SYLLABUS), simhash(edited)), 3)
+        self.assertGreater(hamming_distance(simhash(SYLLABUS), simhash(unrelated)), 10)
+
+    def test_exact_and_near_duplicates_are_detected(self):
+        dedup = ChunkDeduplicator(max_distance=3)
+
+        self.assertIsNone(dedup.check('a', SYLLABUS)[0])
+        # Whitespace and case differences are still an exact match
+        self.assertEqual(dedup.check('b', "  " + SYLLABUS.upper())[0], 'a')
+        self.assertEqual(dedup.check('c', SYLLABUS.replace("room 204", "room 210"))[0], 'a')
+        self.assertIsNone(dedup.check('d', "Binary heaps support insert and extract-min in logarithmic time.")[0])
+
+        self.assertEqual(dedup.stats['exact_duplicates'], 1)
+        self.assertEqual(dedup.stats['near_duplicates'], 1)
+        self.assertEqual(len(dedup), 2)
+
+    def test_removed_chunks_no_longer_match(self):
+        dedup = ChunkDeduplicator()
+        dedup.check('a', SYLLABUS)
+        dedup.remove(['a'])
+
+        self.assertIsNone(dedup.check('b', SYLLABUS)[0])
+
+    def test_every_signature_within_the_distance_is_found(self):
+        rng = random.Random(7)
+        for max_distance in range(MAX_HAMMING_DISTANCE + 1):
+            signatures = {}
+            with mock.patch.object(deduplication, 'simhash', lambda text: signatures[text]):
+                dedup = ChunkDeduplicator(max_distance=max_distance)
+                for i in range(50):
+                    original = rng.getrandbits(64)
+                    near = original
+                    for bit in rng.sample(range(64), max_distance):
+                        near ^= 1 << bit
+                    far = near ^ (1 << next(bit for bit in range(64) if not (original ^ near) >> bit & 1))
+                    signatures.update({f"original {i}": original, f"near {i}": near, f"far {i}": far})
+
+                    self.assertIsNone(dedup.check(f"o{i}", f"original {i}")[0])
+                    self.assertEqual(dedup.check(f"n{i}", f"near {i}")[0], f"o{i}", max_distance)
+                    self.assertIsNone(dedup.check(f"f{i}", f"far {i}")[0])
+                    dedup.remove([f"o{i}", f"f{i}"])
+
+    def test_unsupported_distance_is_rejected(self):
+        for max_distance in (-1, MAX_HAMMING_DISTANCE + 1):
+            with self.assertRaises(ValueError):
+                ChunkDeduplicator(max_distance=max_distance)
+
+HEAPS = "Binary heaps support insert and extract-min in logarithmic time by sifting keys up and down."
+
+def document(filename, text):
+    return {'content': text, 'metadata': {'filename': filename, 'file_path': f"/notes/{filename}", 'last_modified': 1.0}}
+
+class TestVectorStoreDeduplication(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.saved = (text_utils.chunk_text, settings.SIMILARITY_THRESHOLD, settings.DEDUPLICATION_ENABLED)
+        text_utils.chunk_text = character_chunks
+        settings.SIMILARITY_THRESHOLD = -1.0
+        settings.DEDUPLICATION_ENABLED = True
+        self.store = VectorStore(
+            collection_name="dedup",
+            client=chromadb.PersistentClient(path=self.directory),
+            embedding_model=WordModel()
+        )
+        self.syllabus_chunks = len(character_chunks(SYLLABUS))
+
+    def syllabus_metadatas(self):
+        stored = self.store.collection.get(include=['documents', 'metadatas'])
+        return [metadata for document, metadata in zip(stored['documents'], stored['metadatas'])
+                if document in SYLLABUS]
+
+    def test_repeated_chunks_are_stored_once_with_every_source(self):
+        # Within one call and across calls
+        self.store.add_documents([document("a.txt", SYLLABUS), document("b.txt", SYLLABUS), document("heaps.txt", HEAPS)])
+        result = self.store.add_documents([document("c.txt", SYLLABUS)])
+        self.assertEqual(result['chunks_added'], 0)
+        self.assertEqual(self.store.collection.count(), self.syllabus_chunks + len(character_chunks(HEAPS)))
+
+        metadatas = self.syllabus_metadatas()
+        self.assertEqual(len(metadatas), self.syllabus_chunks)
+        for metadata in metadatas:
+            self.assertEqual(metadata['filename'], "a.txt")
+            self.assertEqual(metadata['duplicate_count'], 3)
+            sources = json.loads(metadata['source_files'])
+            self.assertEqual(sorted(sources), ["a.txt", "b.txt", "c.txt"])
+            self.assertEqual(sources['b.txt'], {'file_path': "/notes/b.txt", 'last_modified': 1.0})
+
+    def test_deleting_the_owner_hands_shared_chunks_over(self):
+        self.store.add_documents([document("a.txt", SYLLABUS), document("b.txt", SYLLABUS), document("heaps.txt", HEAPS)])
+
+        self.store.delete_by_filename("a.txt")
+        metadatas = self.syllabus_metadatas()
+        self.assertEqual(len(metadatas), self.syllabus_chunks)
+        for metadata in metadatas:
+            self.assertEqual((metadata['filename'], metadata['file_path']), ("b.txt", "/notes/b.txt"))
+            self.assertEqual(json.loads(metadata['source_files']), {'b.txt': {'file_path': "/notes/b.txt", 'last_modified': 1.0}})
+            self.assertEqual(metadata['duplicate_count'], 1)
+        self.assertEqual(self.store.list_files(), ["b.txt", "heaps.txt"])
+
+        self.store.delete_by_filename("b.txt")
+        self.assertEqual(self.syllabus_metadatas(), [])
+        self.assertEqual(self.store.list_files(), ["heaps.txt"])
+        # The removed chunks no longer count as duplicates
+        self.assertEqual(self.store.add_documents([document("d.txt", SYLLABUS)])['chunks_added'], self.syllabus_chunks)
+
+    def test_deleting_another_source_keeps_the_owner(self):
+        self.store.add_documents([document("a.txt", SYLLABUS)])
+        self.store.add_documents([document("b.txt", SYLLABUS)])
+
+        self.store.delete_by_filename("b.txt")
+        for metadata in self.syllabus_metadatas():
+            self.assertEqual(metadata['filename'], "a.txt")
+            self.assertEqual(sorted(json.loads(metadata['source_files'])), ["a.txt"])
+            self.assertEqual(metadata['duplicate_count'], 1)
+
+    def test_chunks_of_a_failed_batch_are_stored_on_retry(self):
+        model = self.store.embedding_model
+        with mock.patch.object(model, 'encode', side_effect=RuntimeError("Out of memory")):
+            with self.assertRaises(RuntimeError):
+                self.store.add_documents([document("a.txt", SYLLABUS), document("b.txt", SYLLABUS)])
+        self.assertEqual(self.store.collection.count(), 0)
+        self.assertEqual(len(self.store.deduplicator), 0)
+
+        result = self.store.add_documents([document("a.txt", SYLLABUS), document("b.txt", SYLLABUS)])
+        self.assertEqual(result['chunks_added'], self.syllabus_chunks)
+        self.assertEqual(self.store.collection.count(), self.syllabus_chunks)
+        for metadata in self.syllabus_metadatas():
+            self.assertEqual(sorted(json.loads(metadata['source_files'])), ["a.txt", "b.txt"])
+
+    def tearDown(self):
+        text_utils.chunk_text, settings.SIMILARITY_THRESHOLD, settings.DEDUPLICATION_ENABLED = self.saved
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import unittest
+import tempfile
+import shutil
+import random
+from pathlib import Path
+import sys
+
+import chromadb
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+import src.utils.text_processing as text_utils
+from src.database.vector_store import VectorStore
+from src.database.dimension_reduction import EmbeddingProjection, projection_path, get_full_embedding_store
+from tests.fakes import character_chunks, WordModel
+
+def document(filename, text):
+    return {'content': text, 'metadata': {'filename': filename, 'file_path': f"/notes/{filename}", 'last_modified': 0.0}}
+
+TEXTS = {
+    'heaps.txt': "Heaps\nA binary heap keeps the smallest key at the root and sifts down after a pop.",
+    'graphs.txt': "Graphs\nBreadth first search visits vertices level by level using a queue of vertices.",
+    'sorting.txt': "Sorting\nQuicksort partitions the array around a pivot and recurses on both halves of it."
+}
+
+VOCABULARY = ["heap", "graph", "queue", "stack", "tree", "hash", "sort", "merge", "pivot", "vertex",
+              "edge", "root", "leaf", "key", "array", "list", "node", "path", "cycle", "table"]
+
+def varied_text(seed, words=60):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+def low_rank_embeddings(count, dimension=64, rank=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.normal(size=(count, rank)) @ rng.normal(size=(rank, dimension))).astype(np.float32)
+
+class TestEmbeddingProjection(unittest.TestCase):
+    def test_pca_keeps_the_ranking_of_low_rank_embeddings(self):
+        corpus = low_rank_embeddings(300)
+        projection = EmbeddingProjection.fit_pca(corpus, 8)
+        reduced = projection.transform(corpus)
+        self.assertEqual(reduced.shape, (300, 8))
+        np.testing.assert_allclose(np.linalg.norm(reduced, axis=1), 1.0, atol=1e-5)
+
+        # The embeddings span only 8 directions, so cosine similarities are preserved
+        normalized = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+        np.testing.assert_allclose(reduced[:10] @ reduced.T, normalized[:10] @ normalized.T, atol=1e-4)
+
+    def test_saved_projection_transforms_the_same(self):
+        directory = Path(tempfile.mkdtemp())
+        try:
+            corpus = low_rank_embeddings(50)
+            for projection in (EmbeddingProjection.fit_pca(corpus, 16), EmbeddingProjection.truncation(64, 16)):
+                path = directory / f"{projection.method}.npz"
+                projection.save(path)
+                loaded = EmbeddingProjection.load(path)
+                self.assertEqual((loaded.method, loaded.dimension), (projection.method, 16))
+                np.testing.assert_allclose(loaded.transform(corpus), projection.transform(corpus), atol=1e-6)
+            self.assertIsNone(EmbeddingProjection.load(directory / "missing.npz"))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+class TestReducedDimensionStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.saved = (text_utils.chunk_text, settings.SIMILARITY_THRESHOLD, settings.EMBEDDING_REDUCTION,
+                      settings.REDUCED_EMBEDDING_DIMENSION, settings.RESCORE_FULL_DIMENSION, settings.PCA_FIT_SAMPLES)
+        text_utils.chunk_text = character_chunks
+        settings.SIMILARITY_THRESHOLD = -1.0
+        settings.EMBEDDING_REDUCTION = "pca"
+        settings.REDUCED_EMBEDDING_DIMENSION = 8
+        settings.RESCORE_FULL_DIMENSION = True
+        self.client = chromadb.PersistentClient(path=self.directory)
+
+    def store(self, name="reduced"):
+        return VectorStore(collection_name=name, client=self.client, embedding_model=WordModel())
+
+    def test_index_is_reduced_and_rescored_at_full_dimension(self):
+        store = self.store()
+        store.add_documents([document(name, text) for name, text in TEXTS.items()])
+
+        stored = store.collection.get(include=['embeddings'])
+        self.assertEqual(np.asarray(stored['embeddings']).shape[1], 8)
+        self.assertTrue(projection_path(store.persist_directory, "reduced").exists())
+        self.assertEqual(store.get_collection_stats()['embedding_reduction']['dimension'], 8)
+
+        query = "binary heap root"
+        results = store.search(query, top_k=3)
+        self.assertEqual(results[0]['metadata']['filename'], "heaps.txt")
+        # Scores are full-dimension cosine similarities
+        model = WordModel()
+        for result in results:
+            expected = float(model.encode(result['content']) @ model.encode(query))
+            self.assertAlmostEqual(result['similarity_score'], expected, places=2)
+        scores = [result['similarity_score'] for result in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+        # A second store on the same collection uses the saved projection
+        self.assertEqual(
+            [result['content'] for result in self.store().search(query, top_k=3)],
+            [result['content'] for result in results]
+        )
+
+    def test_truncation_and_search_without_rescoring(self):
+        settings.EMBEDDING_REDUCTION = "truncate"
+        settings.RESCORE_FULL_DIMENSION = False
+        store = self.store("truncated")
+        store.add_documents([document(name, text) for name, text in TEXTS.items()])
+
+        self.assertEqual(np.asarray(store.collection.get(include=['embeddings'])['embeddings']).shape[1], 8)
+        self.assertFalse(projection_path(store.persist_directory, "truncated").exists())
+        self.assertEqual(len(store.search("queue of vertices", top_k=2)), 2)
+
+    def test_existing_collection_keeps_its_dimension(self):
+        settings.EMBEDDING_REDUCTION = "none"
+        self.store("full").add_documents([document(name, text) for name, text in TEXTS.items()])
+
+        settings.EMBEDDING_REDUCTION = "pca"
+        store = self.store("full")
+        self.assertIsNone(store._reduction())
+        self.assertEqual(store.search("quicksort partitions the array", top_k=1)[0]['metadata']['filename'], "sorting.txt")
+
+    def test_clearing_drops_the_projection_and_full_embeddings(self):
+        store = self.store()
+        store.add_documents([document(name, text) for name, text in TEXTS.items()])
+        store.clear_collection()
+
+        self.assertFalse(projection_path(store.persist_directory, "reduced").exists())
+        full_embeddings = get_full_embedding_store(store.persist_directory)
+        self.assertEqual(full_embeddings.get("reduced", store.collection.get()['ids'] + ["any"]), {})
+        self.assertEqual(store.search("binary heap", top_k=3), [])
+
+        store.add_documents([document("heaps.txt", TEXTS['heaps.txt'])])
+        self.assertEqual(store.search("binary heap", top_k=1)[0]['metadata']['filename'], "heaps.txt")
+
+    def test_pca_fitted_on_few_chunks_is_fitted_again_as_the_collection_grows(self):
+        settings.PCA_FIT_SAMPLES = 40
+        settings.RESCORE_FULL_DIMENSION = False
+        store = self.store()
+        store.add_documents([document("heaps.txt", TEXTS['heaps.txt'])])
+        self.assertLess(store._get_projection().samples, 8)
+
+        fits = [store._get_projection().samples]
+        for i in range(8):
+            store.add_documents([document(f"notes{i}.txt", varied_text(seed=i))])
+            fits.append(store._get_projection().samples)
+        self.assertEqual(fits, sorted(fits))
+        self.assertLess(len(set(fits)), len(fits))  # Not fitted again on every ingest
+        projection = store._get_projection()
+        self.assertGreaterEqual(projection.samples, 40)
+        self.assertEqual(store.get_collection_stats()['embedding_reduction']['fit_samples'], projection.samples)
+
+        # Full rank now, and chunks indexed under earlier fits were projected again
+        self.assertTrue(np.all(np.linalg.norm(projection.components, axis=1) > 0.5))
+        stored = store.collection.get(include=['documents', 'embeddings'])
+        expected = projection.transform(WordModel().encode(stored['documents']))
+        np.testing.assert_allclose(np.asarray(stored['embeddings']), expected, atol=1e-2)
+        # Kept only until the final fit, since rescoring is off
+        self.assertEqual(get_full_embedding_store(store.persist_directory).count("reduced"), 0)
+
+        store.add_documents([document("more.txt", varied_text(seed=100))])
+        self.assertEqual(store._get_projection().samples, projection.samples)
+
+    def tearDown(self):
+        (text_utils.chunk_text, settings.SIMILARITY_THRESHOLD, settings.EMBEDDING_REDUCTION,
+         settings.REDUCED_EMBEDDING_DIMENSION, settings.RESCORE_FULL_DIMENSION, settings.PCA_FIT_SAMPLES) = self.saved
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
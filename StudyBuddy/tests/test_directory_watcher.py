@@ -0,0 +1,86 @@
+import unittest
+import tempfile
+import shutil
+import os
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.ingestion.directory_watcher import DirectoryWatcher, initial_changes
+
+class TestDirectoryWatcher(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        (self.test_dir / "week1.txt").write_text("Arrays and lists")
+        (self.test_dir / "week2.md").write_text("# Linked lists")
+        (self.test_dir / "notes.bin").write_bytes(b"ignored")
+
+        self.watcher = DirectoryWatcher(self.test_dir, {'.txt', '.md'}, debounce_seconds=5)
+        self.watcher.set_baseline()
+
+    def test_snapshot_only_tracks_supported_files(self):
+        names = sorted(Path(path).name for path in self.watcher.snapshot())
+        self.assertEqual(names, ['week1.txt', 'week2.md'])
+
+    def test_changes_are_debounced_into_one_batch(self):
+        (self.test_dir / "week3.txt").write_text("Stacks")
+        self.assertIsNone(self.watcher.poll(now=100))
+
+        # More files arrive during the burst; still waiting for the directory to settle
+        (self.test_dir / "week4.txt").write_text("Queues")
+        os.remove(self.test_dir / "week2.md")
+        self.assertIsNone(self.watcher.poll(now=103))
+
+        changes = self.watcher.poll(now=109)
+        self.assertEqual([p.name for p in changes['added']], ['week3.txt', 'week4.txt'])
+        self.assertEqual([p.name for p in changes['deleted']], ['week2.md'])
+        self.assertEqual(changes['modified'], [])
+
+        # Nothing new after the batch has been delivered
+        self.assertIsNone(self.watcher.poll(now=120))
+
+    def test_modified_file_detected_by_size_and_mtime(self):
+        target = self.test_dir / "week1.txt"
+        target.write_text("Arrays, lists and dynamic arrays")
+        stat = target.stat()
+        os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        self.watcher.poll(now=0)
+        changes = self.watcher.poll(now=10)
+        self.assertEqual([p.name for p in changes['modified']], ['week1.txt'])
+
+    def test_initial_changes_against_index(self):
+        week1_mtime = (self.test_dir / "week1.txt").stat().st_mtime
+        changes = initial_changes(self.watcher, {
+            str(self.test_dir / "week1.txt"): week1_mtime,
+            str(self.test_dir / "old.pdf"): 0.0
+        })
+
+        self.assertEqual([p.name for p in changes['added']], ['week2.md'])
+        self.assertEqual(changes['modified'], [])
+        self.assertEqual(changes['deleted'], [self.test_dir / "old.pdf"])
+
+    def test_initial_changes_ignore_files_indexed_from_elsewhere(self):
+        (self.test_dir / "week2").mkdir()
+        (self.test_dir / "week2" / "week1.txt").write_text("Array exercises")
+        week1_mtime = (self.test_dir / "week1.txt").stat().st_mtime
+        outside = Path(tempfile.gettempdir()) / "uploads" / "syllabus.pdf"
+
+        changes = initial_changes(self.watcher, {
+            str(self.test_dir / "week1.txt"): week1_mtime,
+            str(outside): 0.0,
+            str(self.test_dir) + "-old/week2.md": 0.0
+        })
+
+        # The same name in a subfolder is a different file, not the indexed one
+        self.assertEqual(changes['added'], [self.test_dir / "week2" / "week1.txt", self.test_dir / "week2.md"])
+        self.assertEqual(changes['modified'], [])
+        self.assertEqual(changes['deleted'], [])
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from unittest import mock
+import sys
+
+import chromadb
+from docx import Document
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+import src.utils.text_processing as text_utils
+from src.database.vector_store import VectorStore
+from src.ingestion.document_processor import DocumentProcessor
+from src.utils.text_processing import chunk_text, chunk_text_stream, locate_sections
+from tests.fakes import WordModel, byte_level_encoding
+
+def write_pdf(path: Path, pages):
+    """A minimal PDF with one Helvetica text page per entry (no PDF writer with text support is installed)"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            b" ".join(b"%d 0 R" % (4 + 2 * i) for i in range(len(pages))), len(pages)
+        ),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    for i, text in enumerate(pages):
+        lines = " ".join(f"({line}) Tj 0 -16 Td" for line in text.split("\n"))
+        stream = f"BT /F1 12 Tf 72 720 Td {lines} ET".encode('latin-1')
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (5 + 2 * i))
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(data)
+
+PAGES = [
+    "Heaps\nA binary heap keeps the smallest key at the root.\nSift down swaps a key with its smaller child.",
+    "",
+    "Graphs\nBreadth first search visits vertices with a queue.",
+    "Sorting\nMerge sort splits the list and merges the sorted halves."
+]
+
+class TestDocumentSections(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.processor = DocumentProcessor(use_cache=False)
+        self.saved = (settings.PDF_PARALLEL_WORKERS, settings.PDF_PARALLEL_PAGE_THRESHOLD)
+
+    def read(self, doc):
+        """The text of a streamed document; its sections are complete once the stream is"""
+        self.assertIsNone(doc['content'])
+        doc['content'] = "".join(doc['content_stream']())
+        return doc
+
+    def assert_sections_slice_the_content(self, doc, expected):
+        self.assertEqual([section['page'] for section in doc['sections']], list(expected))
+        for section in doc['sections']:
+            self.assertEqual(doc['content'][section['start_char']:section['end_char']], expected[section['page']])
+        # Sections are joined by single newlines
+        self.assertEqual(doc['content'], "\n".join(expected.values()))
+
+    def test_pdf_pages_are_numbered_and_empty_pages_skipped(self):
+        path = self.test_dir / "notes.pdf"
+        write_pdf(path, PAGES)
+
+        pages = list(self.processor.iter_sections(path))
+        self.assertEqual([number for number, _ in pages], [1, 2, 3, 4])
+        self.assertEqual(pages[1][1], "")
+
+        doc = self.read(self.processor.process_file(path))
+        self.assert_sections_slice_the_content(doc, {1: PAGES[0], 3: PAGES[2], 4: PAGES[3]})
+        self.assertEqual(doc['metadata']['title'], "Heaps")
+
+    def test_parallel_pdf_extraction_keeps_page_order(self):
+        path = self.test_dir / "notes.pdf"
+        write_pdf(path, PAGES * 3)
+        serial = list(self.processor.iter_sections(path))
+
+        settings.PDF_PARALLEL_WORKERS = 2
+        settings.PDF_PARALLEL_PAGE_THRESHOLD = 1
+        self.assertEqual(list(self.processor.iter_sections(path)), serial)
+        self.assertEqual([number for number, _ in serial], list(range(1, 13)))
+
+    def test_docx_is_split_at_headings(self):
+        document = Document()
+        document.add_paragraph("Lecture 3 notes")
+        document.add_heading("Heaps", level=1)
+        document.add_paragraph("A binary heap keeps the smallest key at the root.")
+        document.add_heading("Graphs", level=2)
+        document.add_paragraph("Breadth first search visits vertices with a queue.")
+        path = self.test_dir / "notes.docx"
+        document.save(path)
+
+        doc = self.read(self.processor.process_file(path))
+        self.assert_sections_slice_the_content(doc, {
+            1: "Lecture 3 notes",
+            2: "Heaps\nA binary heap keeps the smallest key at the root.",
+            3: "Graphs\nBreadth first search visits vertices with a queue."
+        })
+
+    def test_chunk_pages_cover_the_chunk_text(self):
+        path = self.test_dir / "notes.pdf"
+        write_pdf(path, PAGES)
+        doc = self.read(self.processor.process_file(path))
+        pages = {section['page']: section for section in doc['sections']}
+
+        with mock.patch.object(text_utils.tiktoken, 'get_encoding', lambda name: byte_level_encoding()):
+            chunks = chunk_text(doc['content'], 12, 3)
+        self.assertGreater(len(chunks), 5)
+
+        spanned = set()
+        for chunk in chunks:
+            first, last = locate_sections(doc['sections'], chunk['start_char'], chunk['end_char'])
+            self.assertLessEqual(pages[first]['start_char'], chunk['start_char'] + 1)
+            self.assertGreaterEqual(pages[last]['end_char'] + 1, chunk['end_char'])
+            spanned.update((first, last))
+        self.assertEqual(spanned, {1, 3, 4})
+
+    def test_chunks_are_produced_before_the_last_page_is_extracted(self):
+        path = self.test_dir / "notes.pdf"
+        write_pdf(path, PAGES * 5)
+        doc = self.processor.process_file(path)
+
+        with mock.patch.object(text_utils.tiktoken, 'get_encoding', lambda name: byte_level_encoding()):
+            chunks = chunk_text_stream(doc['content_stream'](), 12, 3)
+            first = next(chunks)
+            # The sections of the text chunked so far are already known
+            self.assertLess(len(doc['sections']), 15)
+            self.assertEqual(locate_sections(doc['sections'], first['start_char'], first['end_char']), (1, 1))
+            streamed = [first] + list(chunks)
+            self.assertEqual(len(doc['sections']), 15)
+
+            whole = self.read(DocumentProcessor(use_cache=False).process_file(path))
+            self.assertEqual(doc['sections'], whole['sections'])
+            self.assertEqual([chunk['text'] for chunk in streamed],
+                             [whole['content'][chunk['start_char']:chunk['end_char']] for chunk in streamed])
+
+    def test_stored_chunks_carry_the_pages_of_a_streamed_pdf(self):
+        path = self.test_dir / "notes.pdf"
+        write_pdf(path, PAGES)
+        store = VectorStore(
+            collection_name="sections",
+            client=chromadb.PersistentClient(path=str(self.test_dir / "index")),
+            embedding_model=WordModel()
+        )
+        saved = (settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+        settings.CHUNK_SIZE, settings.CHUNK_OVERLAP = 12, 3
+        try:
+            with mock.patch.object(text_utils.tiktoken, 'get_encoding', lambda name: byte_level_encoding()):
+                store.add_documents([self.processor.process_file(path)])
+        finally:
+            settings.CHUNK_SIZE, settings.CHUNK_OVERLAP = saved
+
+        stored = store.collection.get(include=['documents', 'metadatas'])
+        pages = {metadata['chunk_index']: (metadata['page_start'], metadata['page_end'])
+                 for metadata in stored['metadatas']}
+        self.assertEqual(pages[0], (1, 1))
+        self.assertEqual(pages[max(pages)], (4, 4))
+        for document, metadata in zip(stored['documents'], stored['metadatas']):
+            spanned = "\n".join(PAGES[page - 1] for page in range(metadata['page_start'], metadata['page_end'] + 1) if PAGES[page - 1])
+            # A chunk may end or start on the newline between two pages
+            self.assertIn(document.strip("\n"), spanned)
+
+    def test_streamed_text_is_cached_for_the_next_extraction(self):
+        path = self.test_dir / "notes.pdf"
+        write_pdf(path, PAGES)
+        processor = DocumentProcessor(use_cache=True, cache_directory=str(self.test_dir / "cache"))
+        streamed = self.read(processor.process_file(path))
+
+        with mock.patch.object(processor, 'iter_sections', side_effect=AssertionError("extracted again")):
+            cached = processor.process_file(path)
+        self.assertEqual(cached['content'], streamed['content'])
+        self.assertEqual(cached['sections'], streamed['sections'])
+        self.assertEqual(cached['metadata']['content_hash'], streamed['metadata']['content_hash'])
+
+    def tearDown(self):
+        settings.PDF_PARALLEL_WORKERS, settings.PDF_PARALLEL_PAGE_THRESHOLD = self.saved
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from unittest import mock
+import sys
+
+import chromadb
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+import src.utils.text_processing as text_utils
+from src.database.vector_store import VectorStore
+from src.database.document_store import DocumentStore, BLOCK_CHARS
+from tests.fakes import byte_level_encoding, character_chunks, WordModel
+
+def document(filename, text):
+    return {'content': text, 'metadata': {
+        'filename': filename, 'file_path': f"/notes/{filename}", 'title': filename.split('.')[0].title(),
+        'first_line': text.split('\n')[0], 'last_modified': 0.0
+    }}
+
+class TestDocumentStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.text = ''.join(f"line {i} of the lecture notes\n" for i in range(8000))
+        self.assertGreater(len(self.text), 2 * BLOCK_CHARS)
+
+    def test_slices_across_blocks_match_the_text(self):
+        store = DocumentStore(f"{self.directory}/documents.sqlite3", compress=True)
+        store.put("doc", "kb", self.text, {'filename': "notes.txt", 'title': "Notes"})
+
+        for start, end in [(0, 50), (BLOCK_CHARS - 20, BLOCK_CHARS + 20), (len(self.text) - 10, len(self.text))]:
+            self.assertEqual(store.get_text("doc", start, end), self.text[start:end])
+        self.assertIsNone(store.get_text("missing", 0, 10))
+        self.assertEqual(store.get_metadata(["doc", "missing"]), {'doc': {'title': "Notes"}})
+
+        stats = store.stats()
+        self.assertEqual(stats['characters'], len(self.text))
+        self.assertLess(stats['stored_bytes'], len(self.text) / 4)
+
+    def test_streamed_text_is_readable_once_flushed(self):
+        store = DocumentStore(f"{self.directory}/documents.sqlite3", compress=False)
+        writer = store.open_document("doc", "kb")
+        writer.write(self.text[:100])
+        self.assertIsNone(store.get_text("doc", 0, 10))
+
+        store.flush_pending()
+        self.assertEqual(store.get_text("doc", 0, 100), self.text[:100])
+        writer.write(self.text[100:])
+        writer.close({'filename': "notes.txt"})
+        self.assertEqual(store.get_text("doc", 90, 200), self.text[90:200])
+        self.assertEqual(store.document_ids("kb", "notes.txt"), ["doc"])
+
+        store.delete(["doc"])
+        self.assertIsNone(store.get_text("doc", 90, 200))
+        self.assertEqual(store.stats()['documents'], 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+class TestOffsetChunkStorage(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.saved = (text_utils.chunk_text, settings.OFFSET_CHUNK_STORAGE, settings.SIMILARITY_THRESHOLD)
+        text_utils.chunk_text = character_chunks
+        settings.OFFSET_CHUNK_STORAGE = True
+        settings.SIMILARITY_THRESHOLD = -1.0
+
+        self.store = VectorStore(
+            collection_name="offset-storage",
+            client=chromadb.PersistentClient(path=self.directory),
+            embedding_model=WordModel()
+        )
+        self.texts = {
+            'heaps.txt': "Heaps\nA binary heap keeps the smallest key at the root and sifts down after a pop.",
+            'graphs.txt': "Graphs\nBreadth first search visits vertices level by level using a queue of vertices."
+        }
+        self.store.add_documents([document(name, text) for name, text in self.texts.items()])
+
+    def test_chunks_keep_offsets_and_text_is_read_back(self):
+        stored = self.store.collection.get(include=['documents', 'metadatas'])
+        self.assertTrue(all(doc is None for doc in stored['documents']))
+        self.assertTrue(all('title' not in metadata for metadata in stored['metadatas']))
+
+        results = self.store.search("binary heap root", top_k=3)
+        top = results[0]
+        self.assertEqual(top['metadata']['filename'], "heaps.txt")
+        self.assertEqual(top['metadata']['title'], "Heaps")
+        text = self.texts['heaps.txt']
+        self.assertEqual(top['content'], text[top['metadata']['start_char']:top['metadata']['end_char']])
+
+    def test_contains_filter_checks_the_read_back_text(self):
+        results = self.store.search("vertices", top_k=2, filters={'contains': "queue"})
+        self.assertTrue(results)
+        self.assertTrue(all("queue" in result['content'] for result in results))
+
+    def test_deleting_a_file_drops_its_text(self):
+        self.store.delete_by_filename("heaps.txt")
+        self.assertEqual(self.store.document_store.document_ids("offset-storage"),
+                         self.store.document_store.document_ids("offset-storage", "graphs.txt"))
+        self.assertEqual(self.store.search("binary heap", top_k=5)[0]['metadata']['filename'], "graphs.txt")
+
+        self.store.clear_collection()
+        self.assertEqual(self.store.document_store.document_ids("offset-storage"), [])
+
+    def tearDown(self):
+        text_utils.chunk_text, settings.OFFSET_CHUNK_STORAGE, settings.SIMILARITY_THRESHOLD = self.saved
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+class TestOffsetStorageOfMultiByteText(unittest.TestCase):
+    """Offsets from the real chunker, whose token boundaries fall inside non-ASCII characters"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.saved = (settings.OFFSET_CHUNK_STORAGE, settings.SIMILARITY_THRESHOLD, settings.CHUNK_SIZE,
+                      settings.CHUNK_OVERLAP, settings.DEDUPLICATION_ENABLED)
+        settings.OFFSET_CHUNK_STORAGE = True
+        settings.SIMILARITY_THRESHOLD = -1.0
+        settings.CHUNK_SIZE, settings.CHUNK_OVERLAP = 24, 6
+        settings.DEDUPLICATION_ENABLED = False
+        patcher = mock.patch.object(text_utils.tiktoken, 'get_encoding', lambda name: byte_level_encoding())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_read_back_text_is_the_chunk_text(self):
+        store = VectorStore(
+            collection_name="multi-byte",
+            client=chromadb.PersistentClient(path=self.directory),
+            embedding_model=WordModel()
+        )
+        text = ("Struktur data 数据结构 menyimpan kunci — une clé «héritée» 🙂 dans un tas binaire. "
+                "Пирамида хранит наименьший ключ в корне; 日本語のテキストも同じ。") * 3
+        store.add_documents([document("tas.txt", text)])
+
+        expected = [chunk['text'] for chunk in text_utils.chunk_text(text, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)]
+        stored = store.collection.get(include=['documents', 'metadatas'])
+        self.assertTrue(all(doc is None for doc in stored['documents']))
+        order = sorted(range(len(stored['ids'])), key=lambda i: stored['metadatas'][i]['chunk_index'])
+        texts = store.materialize([stored['documents'][i] for i in order], [stored['metadatas'][i] for i in order])
+        self.assertEqual(texts, expected)
+
+        for result in store.search("наименьший ключ", top_k=3):
+            metadata = result['metadata']
+            self.assertEqual(result['content'], text[metadata['start_char']:metadata['end_char']])
+
+    def tearDown(self):
+        (settings.OFFSET_CHUNK_STORAGE, settings.SIMILARITY_THRESHOLD, settings.CHUNK_SIZE,
+         settings.CHUNK_OVERLAP, settings.DEDUPLICATION_ENABLED) = self.saved
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
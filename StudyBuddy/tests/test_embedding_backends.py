@@ -0,0 +1,107 @@
+import unittest
+import importlib.util
+import tempfile
+import shutil
+from pathlib import Path
+from unittest import mock
+import sys
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.database.embedding_backends as embedding_backends
+from src.database.embedding_backends import (
+    load_embedding_model, OnnxEmbeddingModel, BACKEND_ONNX, BACKEND_ONNX_INT8, onnx_model_path
+)
+
+VOCABULARY = (
+    "[PAD] [UNK] [CLS] [SEP] [MASK] the a is of and to in heap tree graph sort binary search node edge "
+    "queue stack pivot root child vertex"
+).split() + list("bcdefghijklmnopqrstuvwxyz") + [f"##{c}" for c in "abcdefghijklmnopqrstuvwxyz"]
+
+SENTENCES = [
+    "the heap is a binary tree",
+    "search a graph",
+    "the pivot of a sort and the root of a tree in a binary search tree",
+    "queue",
+    "an unknown word: zebra"
+]
+
+def save_tiny_model(directory: Path, pooling_mode: str = 'mean'):
+    """A randomly initialised two-layer BERT saved as a sentence-transformers model (no download)"""
+    import torch
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+    from sentence_transformers import SentenceTransformer, models
+
+    raw = directory / "raw"
+    raw.mkdir(parents=True)
+    (raw / "vocab.txt").write_text("\n".join(VOCABULARY), encoding='utf-8')
+    tokenizer = BertTokenizerFast(vocab_file=str(raw / "vocab.txt"))
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=len(VOCABULARY), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=64, max_position_embeddings=64)
+    BertModel(config).save_pretrained(str(raw))
+    tokenizer.save_pretrained(str(raw))
+
+    transformer = models.Transformer(str(raw), max_seq_length=16)
+    model = SentenceTransformer(modules=[transformer, models.Pooling(32, pooling_mode), models.Normalize()], device='cpu')
+    model.save(str(directory / "model"))
+    return model
+
+class TestOnnxPackages(unittest.TestCase):
+    def test_missing_onnx_is_reported_before_downloading(self):
+        find_spec = importlib.util.find_spec
+        directory = tempfile.mkdtemp()
+        try:
+            with mock.patch.object(embedding_backends.importlib.util, 'find_spec',
+                                   lambda name, *args: None if name == "onnx" else find_spec(name, *args)), \
+                    mock.patch.object(embedding_backends, 'save_model_locally') as save_model_locally:
+                with self.assertRaisesRegex(ImportError, "need onnx; install them"):
+                    load_embedding_model(BACKEND_ONNX_INT8, directory)
+            save_model_locally.assert_not_called()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+@unittest.skipUnless(importlib.util.find_spec("onnx"), "exporting needs the onnx package")
+class TestOnnxEmbeddingBackend(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = Path(tempfile.mkdtemp())
+        cls.torch_model = save_tiny_model(cls.directory)
+        cls.model_directory = str(cls.directory / "model")
+        cls.expected = cls.torch_model.encode(SENTENCES)
+
+    def test_onnx_embeddings_match_pytorch(self):
+        model = load_embedding_model(BACKEND_ONNX, self.model_directory)
+        self.assertIsInstance(model, OnnxEmbeddingModel)
+        self.assertTrue(onnx_model_path(self.model_directory).exists())
+
+        embeddings = model.encode(SENTENCES, batch_size=2)
+        self.assertEqual(embeddings.shape, self.expected.shape)
+        np.testing.assert_allclose(embeddings, self.expected, atol=1e-4)
+        # Truncated to max_seq_length like the PyTorch model
+        np.testing.assert_allclose(model.encode(SENTENCES[2] * 5), self.torch_model.encode(SENTENCES[2] * 5), atol=1e-4)
+        self.assertEqual(model.encode("queue").shape, (32,))
+        self.assertEqual(model.get_sentence_embedding_dimension(), 32)
+
+    def test_int8_embeddings_stay_close(self):
+        model = load_embedding_model(BACKEND_ONNX_INT8, self.model_directory)
+        self.assertTrue(onnx_model_path(self.model_directory, quantized=True).exists())
+
+        embeddings = model.encode(SENTENCES)
+        cosines = np.sum(embeddings * self.expected, axis=1)
+        self.assertGreater(cosines.min(), 0.95)
+        np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-5)
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            load_embedding_model("tensorrt", self.model_directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+import sys
+
+import chromadb
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+import src.utils.text_processing as text_utils
+from src.database.vector_store import VectorStore
+from src.database.embedding_cache import EmbeddingCache
+from tests.fakes import character_chunks
+
+class CountingModel:
+    """Bag-of-words vectors that counts the texts it is asked to embed"""
+
+    embedding_model_id = "counting-model"
+
+    def __init__(self):
+        self.encoded = 0
+
+    def get_sentence_embedding_dimension(self):
+        return 16
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        self.encoded += len(batch)
+        vectors = np.zeros((len(batch), 16), dtype=np.float32)
+        for row, text in enumerate(batch):
+            for word in text.lower().split():
+                vectors[row, sum(map(ord, word)) % 16] += 1
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9, None)
+        return vectors[0] if single else vectors
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def test_hits_survive_reopening_and_ignore_whitespace(self):
+        cache = EmbeddingCache(self.directory, "model-a", 4, max_size_mb=1)
+        cache.put(["a binary heap"], np.array([[1, 2, 3, 4]], dtype=np.float32))
+
+        reopened = EmbeddingCache(self.directory, "model-a", 4, max_size_mb=1)
+        vectors = reopened.get(["a  binary\nheap ", "a linked list"])
+        np.testing.assert_array_equal(vectors[0], [1, 2, 3, 4])
+        self.assertIsNone(vectors[1])
+        self.assertEqual((reopened.hits, reopened.misses), (1, 1))
+        self.assertEqual(reopened.get_stats()['hit_rate'], 0.5)
+
+        # Same files, another model: the model is part of the key
+        self.assertEqual(EmbeddingCache(self.directory, "model-b", 4, max_size_mb=1).get(["a binary heap"]), [None])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = EmbeddingCache(self.directory, "model-a", 4, max_size_mb=0.001)
+        self.assertLess(cache.capacity, 50)
+        cache.put(["kept"], np.ones((1, 4)))
+        for i in range(3 * cache.capacity):
+            cache.get(["kept"])
+            cache.put([f"text {i}"], np.full((1, 4), i))
+
+        self.assertLessEqual(cache.get_stats()['entries'], cache.capacity)
+        self.assertIsNotNone(cache.get(["kept"])[0])
+        self.assertIsNone(cache.get(["text 0"])[0])
+        np.testing.assert_array_equal(cache.get([f"text {3 * cache.capacity - 1}"])[0], np.full(4, 3 * cache.capacity - 1))
+
+    def test_encode_sends_only_misses_to_the_model(self):
+        cache = EmbeddingCache(self.directory, "counting-model", 16, max_size_mb=1)
+        model = CountingModel()
+        first = cache.encode(["heap", "graph", "heap"], model.encode)
+        self.assertEqual(model.encoded, 2)
+
+        second = cache.encode(["graph", "tree", "heap"], model.encode)
+        self.assertEqual(model.encoded, 3)
+        np.testing.assert_array_equal(second[0], first[1])
+        np.testing.assert_array_equal(second[2], first[0])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+class TestVectorStoreEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.saved = (text_utils.chunk_text, settings.SIMILARITY_THRESHOLD, settings.DEDUPLICATION_ENABLED,
+                      settings.EMBEDDING_CACHE_ENABLED, settings.EMBEDDING_CACHE_DIRECTORY)
+        text_utils.chunk_text = character_chunks
+        settings.SIMILARITY_THRESHOLD = -1.0
+        settings.DEDUPLICATION_ENABLED = False
+        settings.EMBEDDING_CACHE_ENABLED = True
+        settings.EMBEDDING_CACHE_DIRECTORY = f"{self.directory}/cache"
+
+    def test_reindexing_after_clear_reuses_embeddings(self):
+        model = CountingModel()
+        store = VectorStore(
+            collection_name="cached-embeddings",
+            client=chromadb.PersistentClient(path=f"{self.directory}/index"),
+            embedding_model=model
+        )
+        documents = [{'content': "A binary heap keeps the smallest key at the root and sifts down after a pop.",
+                      'metadata': {'filename': "heaps.txt", 'file_path': "/notes/heaps.txt", 'last_modified': 0.0}}]
+
+        first = store.add_documents(documents)
+        encoded = model.encoded
+        self.assertEqual(first['embedding_cache']['hits'], 0)
+
+        store.clear_collection()
+        second = store.add_documents(documents)
+        self.assertEqual(model.encoded, encoded)
+        self.assertEqual(second['embedding_cache']['hit_rate'], 1.0)
+        self.assertEqual(store.get_collection_stats()['total_chunks'], first['chunks_added'])
+        self.assertEqual(store.search("binary heap", top_k=1)[0]['metadata']['filename'], "heaps.txt")
+
+    def tearDown(self):
+        (text_utils.chunk_text, settings.SIMILARITY_THRESHOLD, settings.DEDUPLICATION_ENABLED,
+         settings.EMBEDDING_CACHE_ENABLED, settings.EMBEDDING_CACHE_DIRECTORY) = self.saved
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import tempfile
+import shutil
+import time
+import os
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.ingestion.document_processor import DocumentProcessor
+from src.ingestion.extraction_cache import ExtractionCache
+
+class TestExtractionCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.cache_dir = Path(tempfile.mkdtemp())
+
+    def test_process_file_reuses_cached_extraction(self):
+        test_file = self.test_dir / "lecture.txt"
+        test_file.write_text("Binary search halves the search space on every step.")
+
+        processor = DocumentProcessor(use_cache=True, cache_directory=str(self.cache_dir))
+        first = processor.process_file(test_file)
+
+        # A second processor must not need to parse the file again
+        processor = DocumentProcessor(use_cache=True, cache_directory=str(self.cache_dir))
+        processor._extract_text = lambda file_path: self.fail("file was parsed again")
+        second = processor.process_file(test_file)
+
+        self.assertEqual(first['content'], second['content'])
+        self.assertEqual(second['metadata']['content_hash'], first['metadata']['content_hash'])
+        self.assertEqual(processor.extraction_cache.get_stats()['hits'], 1)
+
+    def test_renamed_file_hits_cache(self):
+        original = self.test_dir / "week1.txt"
+        original.write_text("Hash tables trade memory for constant time lookups.")
+        processor = DocumentProcessor(use_cache=True, cache_directory=str(self.cache_dir))
+        processor.process_file(original)
+
+        renamed = self.test_dir / "week1-copy.txt"
+        shutil.copy(original, renamed)
+        doc = processor.process_file(renamed)
+
+        self.assertEqual(doc['metadata']['filename'], 'week1-copy.txt')
+        self.assertEqual(processor.extraction_cache.hits, 1)
+
+    def test_eviction_keeps_size_bounded(self):
+        cache = ExtractionCache(str(self.cache_dir), max_size_mb=0.05)
+        for i in range(20):
+            # Random-looking text so gzip cannot shrink entries to nothing
+            cache.put(f"key{i:02d}", {'content': os.urandom(4096).hex()})
+            time.sleep(0.01)
+
+        stats = cache.get_stats()
+        self.assertLessEqual(stats['size_bytes'], cache.max_size_bytes)
+        self.assertIsNone(cache.get("key00"))
+        self.assertIsNotNone(cache.get("key19"))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
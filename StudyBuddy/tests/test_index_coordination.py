@@ -0,0 +1,194 @@
+import unittest
+import multiprocessing
+import tempfile
+import shutil
+import threading
+from pathlib import Path
+from unittest import mock
+import sys
+
+import chromadb
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database.index_coordination import IndexCoordinator, get_coordinator
+from src.database.vector_store import VectorStore
+
+COLLECTION = "coordinated"
+BATCHES_PER_WRITER = 15
+BATCH_SIZE = 4
+
+class ConstantModel:
+    """Every text gets the same direction, so every stored chunk matches every query"""
+
+    def encode(self, texts):
+        if isinstance(texts, str):
+            return np.ones(8, dtype=np.float32)
+        return np.ones((len(texts), 8), dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 8
+
+def _open(path):
+    client = chromadb.PersistentClient(path=path)
+    return client, client.get_or_create_collection(COLLECTION, metadata={"hnsw:space": "cosine"})
+
+def write_batches(path, writer, count):
+    """Writer process: add small batches one at a time under the writer lock"""
+    client, collection = _open(path)
+    coordinator = get_coordinator(client)
+    for batch in range(count):
+        ids = [f"{writer}-{batch}-{i}" for i in range(BATCH_SIZE)]
+        with coordinator.writing(client):
+            # Slightly different vectors, all close to the query
+            collection.add(ids=ids, documents=ids, embeddings=[[1.0] * 7 + [i / 10] for i in range(len(ids))])
+
+def read_until_done(path, writers_done, results):
+    """Reader process: query continuously and record how many chunks each query found"""
+    client, collection = _open(path)
+    coordinator = get_coordinator(client)
+    seen = []
+    try:
+        while True:
+            finished = writers_done.is_set()
+            with coordinator.reading(client):
+                found = collection.query(query_embeddings=[[1.0] * 8], n_results=1000, include=[])
+            seen.append(len(found['ids'][0]))
+            if finished:
+                break
+        results.put(('ok', seen))
+    except Exception as e:
+        results.put(('error', repr(e)))
+
+class TestIndexCoordinator(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def test_write_lock_is_reentrant_and_bumps_generation_once(self):
+        coordinator = IndexCoordinator(self.temp_dir, lock_timeout=1)
+        client = chromadb.PersistentClient(path=self.temp_dir)
+
+        with coordinator.writing(client):
+            with coordinator.writing(client):
+                pass
+            self.assertEqual(coordinator.read_generation(), 0)
+        self.assertEqual(coordinator.read_generation(), 1)
+
+    def test_second_writer_times_out_while_lock_is_held(self):
+        client = chromadb.PersistentClient(path=self.temp_dir)
+        holder = IndexCoordinator(self.temp_dir)
+        # A separate coordinator has its own lock file handle, like another process
+        waiter = IndexCoordinator(self.temp_dir, lock_timeout=0.2)
+
+        with holder.writing(client):
+            with self.assertRaises(TimeoutError):
+                with waiter.writing(client):
+                    pass
+        with waiter.writing(client):
+            pass
+
+    def test_vector_store_sees_chunks_written_by_another_process(self):
+        client = chromadb.PersistentClient(path=self.temp_dir)
+        store = VectorStore(collection_name=COLLECTION, client=client, embedding_model=ConstantModel())
+        self.assertEqual(store.search("anything", top_k=100), [])
+
+        context = multiprocessing.get_context('spawn')
+        writer = context.Process(target=write_batches, args=(self.temp_dir, "w", 2))
+        writer.start()
+        writer.join(60)
+
+        self.assertEqual(len(store.search("anything", top_k=100)), 2 * BATCH_SIZE)
+        self.assertEqual(store.coordinator.reloads, 1)
+
+    def test_concurrent_readers_and_writers(self):
+        client, collection = _open(self.temp_dir)
+        context = multiprocessing.get_context('spawn')
+        writers_done = context.Event()
+        results = context.Queue()
+
+        readers = [context.Process(target=read_until_done, args=(self.temp_dir, writers_done, results)) for _ in range(2)]
+        writers = [context.Process(target=write_batches, args=(self.temp_dir, f"w{n}", BATCHES_PER_WRITER)) for n in range(2)]
+        for process in readers + writers:
+            process.start()
+        for process in writers:
+            process.join(120)
+            self.assertEqual(process.exitcode, 0)
+        writers_done.set()
+
+        total = 2 * BATCHES_PER_WRITER * BATCH_SIZE
+        for _ in readers:
+            status, seen = results.get(timeout=120)
+            self.assertEqual(status, 'ok', seen)
+            # Never goes back to an older generation, and ends up at the latest one
+            self.assertEqual(seen, sorted(seen))
+            self.assertEqual(seen[-1], total)
+        for process in readers:
+            process.join(60)
+
+        # Loaded from disk again: nothing one writer persisted was overwritten by the other
+        with get_coordinator(client).reading(client):
+            found = collection.query(query_embeddings=[[1.0] * 8], n_results=1000, include=[])
+        self.assertEqual(len(found['ids'][0]), total)
+
+    def test_reload_waits_for_running_queries(self):
+        client = chromadb.PersistentClient(path=self.temp_dir)
+        coordinator = IndexCoordinator(self.temp_dir)
+        other_process = IndexCoordinator(self.temp_dir)
+        query_running, release_query = threading.Event(), threading.Event()
+
+        def long_query():
+            with coordinator.reading(client):
+                query_running.set()
+                release_query.wait(5)
+
+        thread = threading.Thread(target=long_query)
+        thread.start()
+        query_running.wait(5)
+        with other_process.writing(client):
+            pass
+
+        def short_query():
+            with coordinator.reading(client):
+                pass
+
+        reader = threading.Thread(target=short_query)
+        reader.start()
+        reader.join(0.2)
+        self.assertTrue(reader.is_alive())
+        self.assertEqual(coordinator.reloads, 0)
+
+        release_query.set()
+        thread.join(5)
+        reader.join(5)
+        self.assertEqual(coordinator.reloads, 1)
+
+    def test_reload_refuses_other_chromadb_versions(self):
+        client, collection = _open(self.temp_dir)
+        coordinator = IndexCoordinator(self.temp_dir)
+
+        with mock.patch.object(chromadb, '__version__', '0.6.3'):
+            # Nothing to reload while this process is the only writer
+            with coordinator.writing(client):
+                collection.add(ids=["a"], documents=["a"], embeddings=[[1.0] * 8])
+            with coordinator.reading(client):
+                pass
+
+            with IndexCoordinator(self.temp_dir).writing(client):
+                pass
+            for _ in range(2):
+                with self.assertRaisesRegex(RuntimeError, "only supported on chromadb 0.5.18"):
+                    with coordinator.reading(client):
+                        pass
+        self.assertEqual(coordinator.reloads, 0)
+
+        with coordinator.reading(client):
+            pass
+        self.assertEqual(coordinator.reloads, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
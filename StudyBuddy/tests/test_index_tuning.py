@@ -0,0 +1,81 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+import sys
+
+import chromadb
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database.vector_store import VectorStore
+from src.database.index_tuning import (
+    exact_top_k, evaluate_hnsw_grid, recommend_parameters, load_stored_embeddings, split_queries
+)
+from tests.fakes import FixedDimensionModel
+
+class TestHNSWTuning(unittest.TestCase):
+    def setUp(self):
+        self.persist_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(1)
+        self.embeddings = rng.normal(size=(400, 16)).astype(np.float32)
+
+    def make_store(self):
+        store = VectorStore(client=chromadb.PersistentClient(path=self.persist_dir), embedding_model=FixedDimensionModel(16))
+        store.collection.add(
+            ids=[f"chunk-{i}" for i in range(len(self.embeddings))],
+            documents=[f"chunk {i}" for i in range(len(self.embeddings))],
+            metadatas=[{'filename': "notes.txt", 'chunk_index': i} for i in range(len(self.embeddings))],
+            embeddings=self.embeddings.tolist()
+        )
+        return store
+
+    def test_rebuild_applies_parameters_and_keeps_chunks(self):
+        store = self.make_store()
+        before = store.collection.query(query_embeddings=[self.embeddings[3].tolist()], n_results=1)
+
+        result = store.rebuild_collection(m=8, construction_ef=40, search_ef=64)
+
+        self.assertEqual(result['chunks_copied'], 400)
+        self.assertEqual(store.index_parameters()['hnsw:M'], 8)
+        self.assertEqual(store.index_parameters()['hnsw:search_ef'], 64)
+        self.assertEqual(store.collection.count(), 400)
+        after = store.collection.query(query_embeddings=[self.embeddings[3].tolist()], n_results=1)
+        self.assertEqual(after['ids'], before['ids'])
+        self.assertEqual(
+            [collection.name for collection in store.client.list_collections()],
+            [store.collection_name]
+        )
+
+    def test_exact_top_k_matches_sorted_cosine(self):
+        queries = self.embeddings[:5]
+        neighbours = exact_top_k(self.embeddings, queries, k=3)
+
+        normalized = self.embeddings / np.linalg.norm(self.embeddings, axis=1, keepdims=True)
+        scores = normalized[:5] @ normalized.T
+        np.testing.assert_array_equal(neighbours, np.argsort(-scores, axis=1)[:, :3])
+
+    def test_grid_reports_recall_and_latency(self):
+        store = self.make_store()
+        corpus, queries = split_queries(load_stored_embeddings(store), num_queries=20)
+        self.assertEqual((len(corpus), len(queries)), (380, 20))
+
+        results = evaluate_hnsw_grid(corpus, queries, k=5, m_values=[4, 16], search_ef_values=[5, 200])
+        self.assertEqual(len(results), 4)
+        for result in results:
+            self.assertGreaterEqual(result['p95_ms'], result['p50_ms'])
+
+        # A search_ef covering the whole corpus is effectively exhaustive
+        exhaustive = [result for result in results if result['M'] == 16 and result['search_ef'] == 200][0]
+        self.assertGreaterEqual(exhaustive['recall'], 0.99)
+
+        best = recommend_parameters(results, target_recall=0.99)
+        self.assertGreaterEqual(best['recall'], 0.99)
+
+    def tearDown(self):
+        shutil.rmtree(self.persist_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
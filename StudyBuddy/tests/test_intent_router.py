@@ -0,0 +1,45 @@
+import unittest
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.retrieval.intent_router import IntentRouter, INTENT_SMALL_TALK, INTENT_KNOWLEDGE
+from tests.fakes import BagOfWordsModel
+
+class TestIntentRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = IntentRouter()
+
+    def test_greetings_are_small_talk(self):
+        for message in ["hi", "Hello!", "good morning", "thank you so much", "apa kabar?", "hey there", ""]:
+            self.assertEqual(self.router.route(message)['intent'], INTENT_SMALL_TALK, message)
+
+    def test_phrases_only_match_whole_words(self):
+        for message in ["Is this graph bipartite?", "Explain the history of sorting algorithms", "which chapter covers hashing"]:
+            self.assertEqual(self.router.route(message)['intent'], INTENT_KNOWLEDGE, message)
+
+    def test_greeting_followed_by_question_is_retrieved(self):
+        for message in ["hi, can you explain quicksort?", "thanks, what is a heap", "How are you supposed to pick a pivot?"]:
+            self.assertEqual(self.router.route(message)['intent'], INTENT_KNOWLEDGE, message)
+
+    def test_embedding_classifier_only_runs_for_short_unmatched_messages(self):
+        model = BagOfWordsModel()
+        router = IntentRouter(embedding_model=model, min_similarity=0.5)
+
+        self.assertEqual(router.route("hello")['method'], 'lexical')
+        self.assertEqual(model.calls, 0)
+
+        result = router.route("nice to meet you")
+        self.assertEqual(result, {'intent': INTENT_SMALL_TALK, 'method': 'embedding', 'score': result['score']})
+        self.assertEqual(router.route("explain binary search")['intent'], INTENT_KNOWLEDGE)
+        # Prototypes are encoded once, in a single batch
+        self.assertEqual(model.calls, 3)
+
+        calls = model.calls
+        router.route("please explain in detail how the partition step of quicksort works")
+        self.assertEqual(model.calls, calls)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import tempfile
+import shutil
+import threading
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.ingestion.document_processor import DocumentProcessor
+from src.ingestion.job_queue import (
+    IngestionJobQueue, load_job_states, request_job_cancellation,
+    JOB_COMPLETED, JOB_CANCELLED
+)
+
+class RecordingVectorStore:
+    """Collects added documents instead of embedding them"""
+
+    def __init__(self, block_event=None):
+        self.files = {}
+        self.block_event = block_event
+
+    def add_documents(self, documents, progress_callback=None, checkpoint_callback=None):
+        if self.block_event is not None:
+            self.block_event.wait(5)
+        for doc in documents:
+            self.files[doc['metadata']['filename']] = doc
+        if progress_callback:
+            progress_callback(len(documents))
+        if checkpoint_callback:
+            checkpoint_callback({doc['metadata']['file_path']: 1 for doc in documents})
+        return {'documents_added': len(documents), 'chunks_added': len(documents)}
+
+    def delete_by_filename(self, filename):
+        self.files.pop(filename, None)
+
+    def list_files(self):
+        return sorted(self.files)
+
+class TestIngestionJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.jobs_dir = tempfile.mkdtemp()
+        for i in range(3):
+            (Path(self.test_dir) / f"notes{i}.txt").write_text(f"Lecture {i} covers sorting algorithms.")
+
+    def test_job_completes_and_reports_progress(self):
+        store = RecordingVectorStore()
+        job_queue = IngestionJobQueue(DocumentProcessor(use_cache=False), store, jobs_directory=self.jobs_dir)
+
+        job = job_queue.submit(self.test_dir)
+        job_queue.wait(job.job_id, timeout=10)
+
+        state = job.to_dict()
+        self.assertEqual(state['status'], JOB_COMPLETED)
+        self.assertEqual(state['files_done'], 3)
+        self.assertEqual(state['chunks_done'], 3)
+        self.assertEqual(state['progress']['fraction'], 1.0)
+        self.assertEqual(store.list_files(), ['notes0.txt', 'notes1.txt', 'notes2.txt'])
+
+        persisted = load_job_states(self.jobs_dir)
+        self.assertEqual(persisted[0]['job_id'], job.job_id)
+        self.assertEqual(persisted[0]['status'], JOB_COMPLETED)
+
+    def test_replace_existing_drops_removed_files(self):
+        store = RecordingVectorStore()
+        store.files['old.txt'] = {}
+        job_queue = IngestionJobQueue(DocumentProcessor(use_cache=False), store, jobs_directory=self.jobs_dir)
+
+        job = job_queue.submit(self.test_dir, replace_existing=True)
+        job_queue.wait(job.job_id, timeout=10)
+
+        self.assertNotIn('old.txt', store.list_files())
+
+    def test_cancel_stops_at_file_boundary(self):
+        block = threading.Event()
+        store = RecordingVectorStore(block_event=block)
+        job_queue = IngestionJobQueue(DocumentProcessor(use_cache=False), store, jobs_directory=self.jobs_dir)
+
+        job = job_queue.submit(self.test_dir)
+        self.assertTrue(request_job_cancellation(job.job_id, self.jobs_dir))
+        block.set()
+        job_queue.wait(job.job_id, timeout=10)
+
+        self.assertEqual(job.status, JOB_CANCELLED)
+        self.assertLess(job.files_done, 3)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+        shutil.rmtree(self.jobs_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
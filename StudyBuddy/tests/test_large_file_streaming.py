@@ -0,0 +1,89 @@
+import unittest
+import tempfile
+import shutil
+import random
+import tracemalloc
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.ingestion.document_processor import DocumentProcessor
+from src.utils.text_processing import clean_text, clean_text_stream
+
+class TestLargeFileStreaming(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.processor = DocumentProcessor(use_cache=False)
+        self.original_threshold = settings.LARGE_FILE_THRESHOLD_MB
+        self.original_block = settings.STREAM_BLOCK_KB
+
+    def test_clean_text_keeps_paragraphs(self):
+        text = "Title\r\n\r\n  First  paragraph\nwraps\there.\n\n\n\nSecond paragraph.  "
+        self.assertEqual(clean_text(text), "Title\n\nFirst paragraph\nwraps here.\n\nSecond paragraph.")
+
+    def test_stream_cleaning_matches_whole_text_cleaning(self):
+        rng = random.Random(42)
+        for _ in range(200):
+            text = "".join(rng.choice(['algo', 'rithm', ' ', '\n', '\n\n', '\t', '  ', '\r\n']) for _ in range(300))
+            pieces, i = [], 0
+            while i < len(text):
+                step = rng.randint(1, 25)
+                pieces.append(text[i:i + step])
+                i += step
+            streamed = "".join(clean_text_stream(pieces, max_buffer_chars=rng.randint(1, 60)))
+            self.assertEqual(streamed, clean_text(text))
+
+    def test_large_text_file_uses_stream(self):
+        paragraph = "Dynamic programming stores   answers to subproblems.\nIt avoids recomputation.\n\n"
+        test_file = self.test_dir / "dump.txt"
+        test_file.write_text(paragraph * 2000)
+
+        settings.LARGE_FILE_THRESHOLD_MB = 0.01
+        settings.STREAM_BLOCK_KB = 4
+        doc = self.processor.process_file(test_file)
+
+        self.assertIsNone(doc['content'])
+        self.assertTrue(doc['metadata']['streamed'])
+        self.assertEqual(doc['metadata']['title'], "Dynamic programming stores answers to subproblems.")
+        self.assertEqual("".join(doc['content_stream']()), clean_text(test_file.read_text()))
+
+    def test_large_html_file_streams_text(self):
+        body = "<p>Graphs have <b>vertices</b> &amp; edges.</p><script>var x = 1;</script>" * 500
+        test_file = self.test_dir / "archive.html"
+        test_file.write_text(f"<html><head><title>t</title></head><body>{body}</body></html>")
+
+        settings.LARGE_FILE_THRESHOLD_MB = 0.01
+        settings.STREAM_BLOCK_KB = 1
+        text = "".join(self.processor.iter_cleaned_text(test_file))
+
+        self.assertTrue(text.startswith("Graphs have vertices & edges.\n\nGraphs"))
+        self.assertNotIn("var x", text)
+
+    def test_memory_is_bounded_by_block_size(self):
+        test_file = self.test_dir / "huge.txt"
+        line = "Quicksort partitions the array around a pivot element.\n"
+        with open(test_file, 'w') as f:
+            for _ in range(150000):  # ~8 MB
+                f.write(line)
+
+        settings.STREAM_BLOCK_KB = 64
+        tracemalloc.start()
+        total = 0
+        for piece in self.processor.iter_cleaned_text(test_file):
+            total += len(piece)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertGreater(total, 8_000_000)
+        self.assertLess(peak, 2 * 1024 * 1024)
+
+    def tearDown(self):
+        settings.LARGE_FILE_THRESHOLD_MB = self.original_threshold
+        settings.STREAM_BLOCK_KB = self.original_block
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import unittest
+import tempfile
+import shutil
+import io
+from contextlib import redirect_stdout
+from pathlib import Path
+import sys
+
+import chromadb
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+import src.utils.text_processing as text_utils
+import src.database.embedding_backends as embedding_backends
+from src.database.vector_store import VectorStore
+from src.database.embedding_backends import MODEL_KEY
+from src.database.model_migration import ModelMigration, migration_collection_name, STATE_COMPLETED, STATE_CANCELLED
+from tests.fakes import character_chunks
+
+class NamedWordModel:
+    """Bag-of-words vectors whose width and word positions depend on the model name"""
+
+    def __init__(self, name, dimension, on_encode=None):
+        self.embedding_model_name = name
+        self.dimension = dimension
+        self.on_encode = on_encode
+        self.encoded = 0
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        if not single:
+            self.encoded += len(batch)
+            if self.on_encode is not None:
+                self.on_encode(self.encoded)
+        vectors = np.zeros((len(batch), self.dimension), dtype=np.float32)
+        for row, text in enumerate(batch):
+            for word in text.lower().split():
+                vectors[row, sum(map(ord, self.embedding_model_name + word)) % self.dimension] += 1
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9, None)
+        return vectors[0] if single else vectors
+
+def document(filename, text):
+    return {'content': text, 'metadata': {'filename': filename, 'file_path': f"/notes/{filename}", 'last_modified': 0.0}}
+
+TEXTS = {
+    'heaps.txt': "Heaps\nA binary heap keeps the smallest key at the root and sifts down after a pop.",
+    'graphs.txt': "Graphs\nBreadth first search visits vertices level by level using a queue of vertices.",
+    'sorting.txt': "Sorting\nQuicksort partitions the array around a pivot and recurses on both halves of it."
+}
+
+class TestModelMigration(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.saved = (text_utils.chunk_text, settings.SIMILARITY_THRESHOLD, settings.DEDUPLICATION_ENABLED,
+                      settings.EMBEDDING_CACHE_ENABLED, dict(embedding_backends._models))
+        text_utils.chunk_text = character_chunks
+        settings.SIMILARITY_THRESHOLD = -1.0
+        settings.DEDUPLICATION_ENABLED = False
+        settings.EMBEDDING_CACHE_ENABLED = False
+        self.client = chromadb.PersistentClient(path=self.directory)
+        self.old_model = NamedWordModel("model-a", 16)
+        self.new_model = NamedWordModel("model-b", 24)
+        # Stores that find a collection embedded with model-b load it from the registry
+        embedding_backends._models["model-b"] = self.new_model
+
+    def store(self, documents=()):
+        store = VectorStore(collection_name="notes", client=self.client, embedding_model=self.old_model)
+        if documents:
+            store.add_documents([document(name, TEXTS[name]) for name in documents])
+        return store
+
+    def migration(self, store, **kwargs):
+        return ModelMigration(store, "model-b", embedding_model=self.new_model, batch_size=2, pause_seconds=0, **kwargs)
+
+    def test_collection_switches_to_the_new_model(self):
+        store = self.store(TEXTS)
+        chunks = store.collection.count()
+
+        status = self.migration(store).run()
+        self.assertEqual(status['state'], STATE_COMPLETED)
+        self.assertEqual(status['chunks_embedded'], chunks)
+        self.assertIs(store.embedding_model, self.new_model)
+        self.assertEqual(store.collection.metadata[MODEL_KEY], "model-b")
+        self.assertEqual(np.asarray(store.collection.get(include=['embeddings'])['embeddings']).shape, (chunks, 24))
+        self.assertNotIn(migration_collection_name("notes"), [collection.name for collection in self.client.list_collections()])
+        self.assertEqual(store.search("binary heap root", top_k=1)[0]['metadata']['filename'], "heaps.txt")
+
+        # A store opened with the old model follows the collection
+        with redirect_stdout(io.StringIO()) as output:
+            other = self.store()
+        self.assertIs(other.embedding_model, self.new_model)
+        self.assertIn("model-b", output.getvalue())
+
+    def test_changes_made_while_migrating_are_carried_over(self):
+        store = self.store(['heaps.txt', 'graphs.txt'])
+
+        def change_collection(encoded):
+            if encoded == 2:
+                store.add_documents([document('sorting.txt', TEXTS['sorting.txt'])])
+                store.delete_by_filename('graphs.txt')
+        self.new_model.on_encode = change_collection
+
+        status = self.migration(store).run()
+        self.assertEqual(status['state'], STATE_COMPLETED)
+        self.assertEqual(sorted(store.list_files()), ['heaps.txt', 'sorting.txt'])
+        self.assertEqual(store.search("quicksort partitions the array", top_k=1)[0]['metadata']['filename'], "sorting.txt")
+        # Every stored vector is the new model's
+        self.assertEqual(np.asarray(store.collection.get(include=['embeddings'])['embeddings']).shape[1], 24)
+
+    def test_cancelled_migration_keeps_the_old_model_and_resumes(self):
+        store = self.store(TEXTS)
+        chunks = store.collection.count()
+        migration = self.migration(store)
+        self.new_model.on_encode = lambda encoded: migration.cancel()
+
+        self.assertEqual(migration.run()['state'], STATE_CANCELLED)
+        self.assertIs(store.embedding_model, self.old_model)
+        self.assertEqual(store.search("binary heap root", top_k=1)[0]['metadata']['filename'], "heaps.txt")
+
+        self.new_model.on_encode = None
+        status = self.migration(store).run()
+        self.assertEqual(status['state'], STATE_COMPLETED)
+        self.assertEqual(status['chunks_skipped'], 2)
+        self.assertEqual(status['chunks_embedded'], chunks - 2)
+
+    def test_collection_built_with_another_model_is_reported(self):
+        legacy = self.client.create_collection(name="notes", metadata={"hnsw:space": "cosine"})
+        legacy.add(ids=["chunk"], documents=["a binary heap"], embeddings=[[0.5] * 8], metadatas=[{'filename': "heaps.txt"}])
+
+        with redirect_stdout(io.StringIO()) as output:
+            self.store()
+        self.assertIn("8-dimension vectors", output.getvalue())
+
+    def tearDown(self):
+        (text_utils.chunk_text, settings.SIMILARITY_THRESHOLD, settings.DEDUPLICATION_ENABLED,
+         settings.EMBEDDING_CACHE_ENABLED, models) = self.saved
+        embedding_backends._models.clear()
+        embedding_backends._models.update(models)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
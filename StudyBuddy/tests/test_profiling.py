@@ -0,0 +1,107 @@
+import unittest
+import tempfile
+import shutil
+import time
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.profiling import Profiler, COLLAPSED_FILE, SUMMARY_FILE
+
+def busy_tokenize(seconds):
+    """Stands in for chunk_text: pure Python work for about ``seconds``"""
+    words = 0
+    until = time.perf_counter() + seconds
+    while time.perf_counter() < until:
+        words += len("a few words to split".split())
+    return words
+
+class FakeStore:
+    def __init__(self):
+        self.kept = []
+
+    def add_documents(self, documents):
+        busy_tokenize(0.15)
+        # Memory that stays allocated after the call
+        self.kept.append([str(i) * 10 for i in range(20000)])
+        return len(documents)
+
+class FakePipeline:
+    def __init__(self):
+        self.vector_store = FakeStore()
+
+    def ingest(self, documents):
+        busy_tokenize(0.05)
+        return self.vector_store.add_documents(documents)
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def profile_ingest(self, **options):
+        pipeline = FakePipeline()
+        profiler = Profiler(self.output_dir, sample_interval=0.002, **options)
+        profiler.instrument(pipeline, 'ingest', 'ingest')
+        profiler.instrument(pipeline.vector_store, 'add_documents', 'indexing')
+        with profiler:
+            self.assertEqual(pipeline.ingest(["doc"]), 1)
+        return pipeline, profiler
+
+    def test_time_is_attributed_to_the_innermost_stage(self):
+        pipeline, profiler = self.profile_ingest(trace_memory=False)
+
+        self.assertEqual(profiler.stages['indexing']['calls'], 1)
+        indexing = profiler.hot_functions('indexing', project_only=True)
+        ingest = profiler.hot_functions('ingest', project_only=True)
+        self.assertEqual(indexing[0]['function'].split()[0], 'add_documents')
+        self.assertIn('busy_tokenize', [function['function'].split()[0] for function in indexing])
+        # The enclosing stage is paused while the nested one runs
+        self.assertNotIn('add_documents', [function['function'].split()[0] for function in ingest])
+        self.assertGreater(indexing[0]['cumulative_seconds'], ingest[0]['cumulative_seconds'])
+
+        # Instrumentation is removed again
+        self.assertNotIn('ingest', vars(pipeline))
+        self.assertNotIn('add_documents', vars(pipeline.vector_store))
+
+    def test_project_functions_only_lists_our_code(self):
+        _, profiler = self.profile_ingest(trace_memory=False)
+
+        everything = [function['function'] for function in profiler.hot_functions(limit=100)]
+        ours = [function['function'] for function in profiler.hot_functions(project_only=True, limit=100)]
+        self.assertTrue(any('perf_counter' in function for function in everything))
+        self.assertTrue(all('tests/test_profiling.py' in function for function in ours))
+
+    def test_collapsed_stacks_start_with_the_stage(self):
+        _, profiler = self.profile_ingest(trace_memory=False)
+
+        lines = (Path(self.output_dir) / COLLAPSED_FILE).read_text().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertIn(stack.split(';')[0], ('ingest', 'indexing'))
+            self.assertGreater(int(count), 0)
+        self.assertTrue(any(
+            line.startswith('indexing;') and 'FakeStore.add_documents;' in line and 'busy_tokenize' in line
+            for line in lines
+        ))
+
+    def test_memory_kept_by_a_stage_is_reported(self):
+        _, profiler = self.profile_ingest()
+
+        indexing = profiler.stages['indexing']
+        self.assertGreater(indexing['allocated_bytes'], 500000)
+        self.assertGreaterEqual(indexing['peak_bytes'], indexing['allocated_bytes'])
+        site, _ = indexing['allocation_sites'].most_common(1)[0]
+        self.assertTrue(site.startswith('tests/test_profiling.py:'))
+
+        summary = (Path(self.output_dir) / SUMMARY_FILE).read_text()
+        self.assertIn('[indexing] 1 calls', summary)
+        self.assertTrue((Path(self.output_dir) / 'indexing.prof').exists())
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from pathlib import Path
+import sys
+
+from google.api_core import exceptions as google_exceptions
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+import src.generation.llm_client as llm_client
+from src.generation.llm_client import GeminiClient, PromptPrefixCache, min_cached_tokens
+
+def count_tokens(text):
+    return len(text.split())
+
+class StubModel:
+    """Answers every prompt, counting words as tokens like Gemini's usage metadata"""
+
+    def __init__(self, backend, cached_prompt=None):
+        self.backend = backend
+        self.cached_prompt = cached_prompt
+
+    def generate_content(self, prompt, generation_config=None):
+        if self.cached_prompt is not None and self.backend.fail_cached_requests:
+            self.backend.fail_cached_requests -= 1
+            raise RuntimeError("cached content not found")
+        self.backend.sent.append(prompt)
+        cached_tokens = count_tokens(self.cached_prompt) if self.cached_prompt else 0
+        prompt_tokens = cached_tokens + count_tokens(prompt)
+        return SimpleNamespace(
+            text="An answer",
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=prompt_tokens,
+                cached_content_token_count=cached_tokens,
+                candidates_token_count=2,
+                total_token_count=prompt_tokens + 2
+            )
+        )
+
+class StubBackend:
+    """Local stand-in for the Gemini API, with cached content that can be made unavailable"""
+
+    model_name = "gemini-2.5-flash"
+
+    def __init__(self, caching=True):
+        self.caching = caching
+        self.fail_cached_requests = 0
+        self.unavailable = 0
+        self.counted = 0
+        self.created = []
+        self.extended = 0
+        self.sent = []
+
+    def model(self):
+        return StubModel(self)
+
+    def count_tokens(self, text):
+        self.counted += 1
+        return count_tokens(text)
+
+    def create_cached_content(self, system_prompt, ttl_seconds):
+        self.created.append(system_prompt)
+        if not self.caching:
+            raise google_exceptions.InvalidArgument("Model gemini-1.5-flash does not support createCachedContent")
+        if self.unavailable:
+            self.unavailable -= 1
+            raise google_exceptions.ServiceUnavailable("The service is currently unavailable")
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}", system_prompt=system_prompt)
+
+    def extend_cached_content(self, cached_content, ttl_seconds):
+        self.extended += 1
+
+    def cached_model(self, cached_content):
+        return StubModel(self, cached_content.system_prompt)
+
+class TestPromptPrefixCache(unittest.TestCase):
+    def setUp(self):
+        self.saved = (settings.PROMPT_CACHE_ENABLED, settings.PROMPT_CACHE_RETRY_SECONDS, settings.PROMPT_CACHE_MIN_TOKENS)
+        settings.PROMPT_CACHE_ENABLED = True
+        settings.PROMPT_CACHE_RETRY_SECONDS = 600
+        # The persona prompt has about 270 words; the stub counts words as tokens
+        settings.PROMPT_CACHE_MIN_TOKENS = 100
+
+    def test_system_prompt_is_cached_once_and_only_the_request_is_sent(self):
+        backend = StubBackend()
+        client = GeminiClient(backend=backend)
+        system_prompt = client._create_system_prompt()
+
+        for question in ("What is a heap?", "What is a graph?"):
+            result = client.generate_response(question, "[Source: notes.txt]\nA heap is a tree.")
+            self.assertTrue(result['success'])
+        self.assertEqual(backend.created, [system_prompt])
+        self.assertTrue(all("Kamu adalah StudyBuddy" not in prompt for prompt in backend.sent))
+
+        usage = result['usage']
+        self.assertEqual(usage['cached_prompt_tokens'], count_tokens(system_prompt))
+        self.assertEqual(usage['uncached_prompt_tokens'], count_tokens(backend.sent[-1]))
+        self.assertEqual(usage['prompt_tokens'], usage['cached_prompt_tokens'] + usage['uncached_prompt_tokens'])
+
+    def test_full_prompt_is_sent_when_caching_is_unsupported(self):
+        backend = StubBackend(caching=False)
+        client = GeminiClient(backend=backend)
+
+        for question in ("What is a heap?", "What is a graph?"):
+            result = client.generate_response(question, "A heap is a tree.")
+            self.assertTrue(result['success'])
+            self.assertIn("Kamu adalah StudyBuddy", backend.sent[-1])
+            self.assertEqual(result['usage']['cached_prompt_tokens'], 0)
+            self.assertEqual(result['usage']['uncached_prompt_tokens'], result['usage']['prompt_tokens'])
+        self.assertIn("does not support", client.prompt_cache.disabled_reason)
+
+        # The same request would fail the same way, so it is not retried even after the delay
+        with mock.patch.object(llm_client, 'time', SimpleNamespace(time=lambda: 10 ** 10)):
+            self.assertIsNone(client.prompt_cache.model())
+        self.assertEqual(len(backend.created), 1)
+
+    def test_prompt_below_the_model_minimum_is_never_cached(self):
+        settings.PROMPT_CACHE_MIN_TOKENS = 0
+        backend = StubBackend()
+        client = GeminiClient(backend=backend)
+        self.assertEqual(client.prompt_cache.min_tokens, 1024)
+
+        for question in ("What is a heap?", "What is a graph?"):
+            result = client.generate_response(question, "A heap is a tree.")
+            self.assertTrue(result['success'])
+            self.assertIn("Kamu adalah StudyBuddy", backend.sent[-1])
+        self.assertEqual((backend.counted, backend.created), (1, []))
+        self.assertIn("below the 1024", client.prompt_cache.disabled_reason)
+
+    def test_prompt_shorter_than_the_minimum_is_not_counted(self):
+        settings.PROMPT_CACHE_MIN_TOKENS = 0
+        backend = StubBackend()
+        backend.model_name = "gemini-2.5-pro"
+        client = GeminiClient(backend=backend)
+
+        result = client.generate_response("What is a heap?", "A heap is a tree.")
+        self.assertTrue(result['success'])
+        self.assertEqual((backend.counted, backend.created), (0, []))
+        self.assertIn("too short for the 4096", client.prompt_cache.disabled_reason)
+
+    def test_transient_failure_is_retried_after_the_delay(self):
+        backend = StubBackend()
+        backend.unavailable = 1
+        clock = SimpleNamespace(time=lambda: now)
+        with mock.patch.object(llm_client, 'time', clock):
+            cache = PromptPrefixCache(backend, "You are StudyBuddy.", retry_seconds=10, min_tokens=1)
+            now = 1000.0
+            self.assertIsNone(cache.model())
+            now = 1005.0
+            self.assertIsNone(cache.model())
+            self.assertEqual(len(backend.created), 1)
+
+            now = 1011.0
+            self.assertIsNotNone(cache.model())
+        self.assertEqual((len(backend.created), backend.counted), (2, 1))
+        self.assertIsNone(cache.disabled_reason)
+
+    def test_minimum_cached_tokens_by_model(self):
+        settings.PROMPT_CACHE_MIN_TOKENS = 0
+        self.assertEqual(min_cached_tokens("gemini-1.5-flash"), 32768)
+        self.assertEqual(min_cached_tokens("models/gemini-1.5-pro-002"), 32768)
+        self.assertEqual(min_cached_tokens("gemini-2.5-flash-lite"), 1024)
+        self.assertEqual(min_cached_tokens("gemini-2.5-pro"), 4096)
+        settings.PROMPT_CACHE_MIN_TOKENS = 500
+        self.assertEqual(min_cached_tokens("gemini-1.5-flash"), 500)
+
+    def test_failed_cached_request_is_sent_in_full(self):
+        backend = StubBackend()
+        backend.fail_cached_requests = 1
+        client = GeminiClient(backend=backend)
+
+        result = client.generate_response("What is a heap?", "A heap is a tree.")
+        self.assertTrue(result['success'])
+        self.assertIn("Kamu adalah StudyBuddy", backend.sent[-1])
+        self.assertEqual(result['usage']['cached_prompt_tokens'], 0)
+
+    def test_ttl_is_extended_while_in_use_and_content_recreated_after_expiry(self):
+        backend = StubBackend()
+        clock = SimpleNamespace(time=lambda: now)
+        with mock.patch.object(llm_client, 'time', clock):
+            cache = PromptPrefixCache(backend, "You are StudyBuddy.", ttl_seconds=100, retry_seconds=10, min_tokens=1)
+            now = 1000.0
+            self.assertIsNotNone(cache.model())
+            now = 1050.0
+            cache.model()
+            self.assertEqual((len(backend.created), backend.extended), (1, 0))
+
+            now = 1090.0  # Less than a fifth of the TTL left
+            cache.model()
+            self.assertEqual((len(backend.created), backend.extended), (1, 1))
+
+            now = 1200.0  # Unused past its extended expiry
+            self.assertIsNotNone(cache.model())
+            self.assertEqual(len(backend.created), 2)
+
+    def tearDown(self):
+        settings.PROMPT_CACHE_ENABLED, settings.PROMPT_CACHE_RETRY_SECONDS, settings.PROMPT_CACHE_MIN_TOKENS = self.saved
+
+if __name__ == '__main__':
+    unittest.main()
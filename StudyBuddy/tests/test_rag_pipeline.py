@@ -8,8 +8,22 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
 from src.rag_pipeline import RAGPipeline
+from src.ingestion.document_processor import DocumentProcessor
 from config.settings import settings
 
+class RecordingStore:
+    """Records the calls apply_file_changes makes to the vector store"""
+
+    def __init__(self):
+        self.deleted = []
+        self.added = []
+
+    def delete_by_filename(self, filename):
+        self.deleted.append(filename)
+
+    def add_documents(self, documents):
+        self.added.extend(document['metadata']['filename'] for document in documents)
+
 class TestRAGPipeline(unittest.TestCase):
     def setUp(self):
         # Skip tests if no API key is provided
@@ -89,5 +103,32 @@ class TestRAGPipeline(unittest.TestCase):
             except:
                 pass
 
+class TestApplyFileChanges(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        # Only the document processor and the store are used, so no API key is needed
+        self.rag = RAGPipeline.__new__(RAGPipeline)
+        self.rag.document_processor = DocumentProcessor(use_cache=False)
+        self.rag.vector_store = RecordingStore()
+
+    def test_modified_file_that_fails_extraction_keeps_its_chunks(self):
+        added = self.test_dir / "new.txt"
+        added.write_text("Dijkstra's algorithm finds shortest paths.")
+        modified = self.test_dir / "heaps.txt"
+        modified.write_text("A binary heap keeps the smallest key at the root.")
+        broken = self.test_dir / "graphs.pdf"
+        broken.write_bytes(b"not a pdf")
+        deleted = self.test_dir / "old.txt"
+
+        result = self.rag.apply_file_changes({'added': [added], 'modified': [modified, broken], 'deleted': [deleted]})
+        self.assertTrue(result['success'])
+        self.assertEqual(result['failed'], ["graphs.pdf"])
+        self.assertEqual(self.rag.vector_store.deleted, ["heaps.txt", "old.txt"])
+        self.assertEqual(self.rag.vector_store.added, ["new.txt", "heaps.txt"])
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,144 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.ingestion.document_processor import DocumentProcessor
+from src.ingestion.ingest_journal import (
+    IngestJournal, ingest_file_checkpointed, FILE_DONE, FILE_FAILED, FILE_QUARANTINED
+)
+
+class Crash(BaseException):
+    """Stands in for the process dying (OOM, kill); not caught like an ordinary error"""
+
+class ChunkingVectorStore:
+    """Stores one chunk per line under stable ids, in batches of two, like VectorStore.add_documents"""
+
+    def __init__(self, crash_after_batches=None):
+        self.chunks = {}
+        self.crash_after_batches = crash_after_batches
+        self.batches_written = 0
+
+    def add_documents(self, documents, progress_callback=None, checkpoint_callback=None):
+        added = 0
+        for doc in documents:
+            lines = doc['content'].split('\n')
+            file_path = doc['metadata']['file_path']
+            for start in range(doc.get('resume_from_chunk', 0), len(lines), 2):
+                for i in range(start, min(start + 2, len(lines))):
+                    self.chunks[f"{doc['chunk_id_prefix']}-{i:06d}"] = (doc['metadata']['filename'], lines[i])
+                    added += 1
+                self.batches_written += 1
+                if self.batches_written == self.crash_after_batches:
+                    # Written to the store, but the process dies before the checkpoint
+                    raise Crash()
+                if checkpoint_callback:
+                    checkpoint_callback({file_path: min(start + 2, len(lines))})
+        return {'documents_added': len(documents), 'chunks_added': added}
+
+    def delete_by_filename(self, filename):
+        self.chunks = {key: value for key, value in self.chunks.items() if value[0] != filename}
+
+    def stored(self):
+        return sorted(self.chunks.values())
+
+class PoisonProcessor(DocumentProcessor):
+    """Crashes the process whenever it parses the poison file"""
+
+    def process_file(self, file_path):
+        if file_path.name == "poison.txt":
+            raise Crash()
+        return super().process_file(file_path)
+
+class TestResumableIngestion(unittest.TestCase):
+    def setUp(self):
+        self.documents_dir = Path(tempfile.mkdtemp())
+        self.journal_dir = tempfile.mkdtemp()
+        for name in ["a.txt", "b.txt", "c.txt"]:
+            (self.documents_dir / name).write_text("\n".join(f"{name} line {i}" for i in range(7)))
+        self.processor = DocumentProcessor(use_cache=False)
+
+    def run_ingest(self, store, resume, processor=None):
+        journal = IngestJournal(str(self.documents_dir), self.journal_dir)
+        journal.start(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, resume=resume)
+        outcomes = {}
+        for file_path in (processor or self.processor).list_supported_files(self.documents_dir):
+            outcomes[file_path.name] = ingest_file_checkpointed(journal, processor or self.processor, store, file_path)
+        return outcomes
+
+    def expected_chunks(self):
+        store = ChunkingVectorStore()
+        self.run_ingest(store, resume=False)
+        return store.stored()
+
+    def test_resume_after_crash_has_no_duplicate_or_missing_chunks(self):
+        expected = self.expected_chunks()
+
+        # a.txt takes 4 batches; the crash hits b.txt after its first checkpoint plus one unrecorded batch
+        store = ChunkingVectorStore(crash_after_batches=6)
+        with self.assertRaises(Crash):
+            self.run_ingest(store, resume=False)
+
+        journal = IngestJournal(str(self.documents_dir), self.journal_dir)
+        self.assertEqual(journal.state(self.documents_dir / "a.txt")['status'], FILE_DONE)
+        self.assertEqual(journal.state(self.documents_dir / "b.txt")['chunks_committed'], 2)
+
+        store.crash_after_batches = None
+        store.batches_written = 0
+        outcomes = self.run_ingest(store, resume=True)
+
+        self.assertTrue(outcomes["a.txt"]['skipped'])
+        self.assertEqual(outcomes["b.txt"]['chunks_added'], 5)
+        self.assertEqual(store.batches_written, 3 + 4)
+        self.assertEqual(store.stored(), expected)
+
+    def test_torn_last_journal_line_is_ignored(self):
+        self.run_ingest(ChunkingVectorStore(), resume=False)
+        journal = IngestJournal(str(self.documents_dir), self.journal_dir)
+        with open(journal.path, 'a', encoding='utf-8') as f:
+            f.write('{"event": "file_sta')
+
+        reloaded = IngestJournal(str(self.documents_dir), self.journal_dir)
+        self.assertEqual(reloaded.state(self.documents_dir / "c.txt")['status'], FILE_DONE)
+
+    def test_changed_file_is_ingested_again_from_scratch(self):
+        store = ChunkingVectorStore()
+        self.run_ingest(store, resume=False)
+        (self.documents_dir / "a.txt").write_text("rewritten first line\nrewritten second line")
+
+        outcomes = self.run_ingest(store, resume=True)
+
+        self.assertFalse(outcomes["a.txt"]['skipped'])
+        self.assertTrue(outcomes["b.txt"]['skipped'])
+        self.assertEqual([text for name, text in store.stored() if name == "a.txt"], ["rewritten first line", "rewritten second line"])
+
+    def test_poison_file_is_quarantined_after_repeated_failures(self):
+        (self.documents_dir / "poison.txt").write_text("this file takes the parser down")
+        # Sorts after the poison file, so only the final run reaches it
+        (self.documents_dir / "unreadable.txt").write_text("")
+        processor = PoisonProcessor(use_cache=False)
+        store = ChunkingVectorStore()
+
+        for _ in range(settings.INGEST_MAX_ATTEMPTS):
+            with self.assertRaises(Crash):
+                self.run_ingest(store, resume=True, processor=processor)
+
+        outcomes = self.run_ingest(store, resume=True, processor=processor)
+
+        self.assertEqual(outcomes["poison.txt"]['status'], FILE_QUARANTINED)
+        self.assertEqual(outcomes["unreadable.txt"]['status'], FILE_FAILED)
+        self.assertEqual(outcomes["c.txt"]['status'], FILE_DONE)
+        journal = IngestJournal(str(self.documents_dir), self.journal_dir)
+        self.assertEqual(journal.quarantined_files(), ["poison.txt"])
+
+    def tearDown(self):
+        shutil.rmtree(self.documents_dir, ignore_errors=True)
+        shutil.rmtree(self.journal_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import json
+import tempfile
+import os
+from pathlib import Path
+import sys
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.retrieval.evaluation import (
+    CachingEmbeddingModel, score_ranking, pareto_front, recommend_configuration, load_labeled_questions
+)
+
+class CountingModel:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+def result(filename, score=0.9, other_sources=()):
+    metadata = {'filename': filename}
+    if other_sources:
+        sources = {name: {} for name in (filename,) + tuple(other_sources)}
+        metadata.update(duplicate_count=len(sources), source_files=json.dumps(sources))
+    return {'metadata': metadata, 'similarity_score': score}
+
+def config(**values):
+    return {'recall': 0.5, 'mrr': 0.5, 'p95_ms': 10.0, 'index_bytes': 1000, **values}
+
+class TestRetrievalEvaluation(unittest.TestCase):
+    def test_identical_texts_are_embedded_once(self):
+        model = CountingModel()
+        cached = CachingEmbeddingModel(model)
+
+        first = cached.encode(["heap", "graph", "heap"])
+        second = cached.encode(["graph", "sorting"])
+
+        self.assertEqual(model.encoded, ["heap", "graph", "sorting"])
+        self.assertEqual((cached.misses, cached.hits), (3, 2))
+        np.testing.assert_array_equal(first[1], second[0])
+        self.assertEqual(cached.encode("heap").shape, (2,))
+
+    def test_recall_and_reciprocal_rank(self):
+        ranked = [result("intro.pdf"), result("heaps.pdf"), result("notes.txt", other_sources=["trees.pdf"])]
+
+        score = score_ranking(ranked, ["heaps.pdf", "trees.pdf", "graphs.pdf"])
+        self.assertAlmostEqual(score['recall'], 2 / 3)
+        self.assertEqual(score['reciprocal_rank'], 0.5)
+        self.assertEqual(score_ranking([], ["heaps.pdf"]), {'recall': 0.0, 'reciprocal_rank': 0.0})
+
+    def test_pareto_front_drops_dominated_configurations(self):
+        accurate = config(recall=0.9, p95_ms=20.0)
+        fast = config(recall=0.6, p95_ms=5.0)
+        dominated = config(recall=0.6, p95_ms=25.0)
+        small = config(recall=0.6, p95_ms=25.0, index_bytes=10)
+
+        front = pareto_front([accurate, fast, dominated, small])
+        self.assertEqual(front, [accurate, fast, small])
+        self.assertIs(recommend_configuration([accurate, fast, dominated]), accurate)
+
+    def test_load_labeled_questions_from_json_lines(self):
+        handle, path = tempfile.mkstemp(suffix=".jsonl")
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            f.write('{"question": "What is a heap?", "relevant_files": ["heaps.pdf"]}\n\n')
+            f.write('{"question": "What is BFS?", "relevant_files": ["graphs.pdf"]}\n')
+        try:
+            self.assertEqual([question['question'] for question in load_labeled_questions(path)],
+                             ["What is a heap?", "What is BFS?"])
+        finally:
+            os.remove(path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import tempfile
+import shutil
+from datetime import datetime
+from pathlib import Path
+import sys
+
+import chromadb
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.database.vector_store import VectorStore, build_search_filters
+
+class ConstantModel:
+    """Every text gets the same embedding, so only the filters decide what is returned"""
+
+    def encode(self, text):
+        return np.ones(4, dtype=np.float32) / 2
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+class TestSearchFilters(unittest.TestCase):
+    def setUp(self):
+        self.persist_dir = tempfile.mkdtemp()
+        self.original_threshold = settings.SIMILARITY_THRESHOLD
+        settings.SIMILARITY_THRESHOLD = -1.0
+
+        self.store = VectorStore(client=chromadb.PersistentClient(path=self.persist_dir), embedding_model=ConstantModel())
+        chunks = [
+            ("sorting.pdf", ".pdf", 1000.0, "Quicksort picks a pivot"),
+            ("sorting.pdf", ".pdf", 1000.0, "Merge sort splits the array"),
+            ("graphs.txt", ".txt", 2000.0, "BFS visits neighbours first"),
+            ("trees.docx", ".docx", 3000.0, "A heap is a complete binary tree"),
+        ]
+        self.store.collection.add(
+            ids=[f"chunk-{i}" for i in range(len(chunks))],
+            documents=[text for _, _, _, text in chunks],
+            metadatas=[
+                {'filename': filename, 'file_extension': extension, 'last_modified': modified}
+                for filename, extension, modified, _ in chunks
+            ],
+            embeddings=[[0.5, 0.5, 0.5, 0.5]] * len(chunks)
+        )
+
+    def search_files(self, filters):
+        return sorted(result['metadata']['filename'] for result in self.store.search("anything", top_k=10, filters=filters))
+
+    def test_filters_translate_to_chroma_clauses(self):
+        self.assertEqual(build_search_filters(None), (None, None))
+        self.assertEqual(
+            build_search_filters({'file_extensions': ['PDF']}),
+            ({'file_extension': {'$in': ['.pdf']}}, None)
+        )
+        where, where_document = build_search_filters({
+            'filenames': ['a.pdf'],
+            'modified_after': datetime.fromtimestamp(100),
+            'contains': 'pivot'
+        })
+        self.assertEqual(where, {'$and': [{'filename': {'$in': ['a.pdf']}}, {'last_modified': {'$gte': 100.0}}]})
+        self.assertEqual(where_document, {'$contains': 'pivot'})
+
+        with self.assertRaises(ValueError):
+            build_search_filters({'author': 'me'})
+
+    def test_search_is_restricted_inside_the_index(self):
+        self.assertEqual(len(self.search_files(None)), 4)
+        self.assertEqual(self.search_files({'filenames': ['graphs.txt']}), ['graphs.txt'])
+        self.assertEqual(self.search_files({'file_extensions': ['pdf', '.docx']}), ['sorting.pdf', 'sorting.pdf', 'trees.docx'])
+        self.assertEqual(self.search_files({'modified_after': 1500, 'modified_before': 2500}), ['graphs.txt'])
+        self.assertEqual(self.search_files({'filenames': ['sorting.pdf'], 'contains': 'pivot'}), ['sorting.pdf'])
+        self.assertEqual(self.search_files({'filenames': ['missing.pdf']}), [])
+
+    def tearDown(self):
+        settings.SIMILARITY_THRESHOLD = self.original_threshold
+        shutil.rmtree(self.persist_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
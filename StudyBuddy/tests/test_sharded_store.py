@@ -0,0 +1,154 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from unittest import mock
+import sys
+
+import chromadb
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+import src.database.sharded_store as sharded_store
+from src.database.chroma_config import segment_internals_supported
+from src.database.sharded_store import ShardedVectorStore, shard_collection_name, DEFAULT_SHARD
+
+class KeywordModel:
+    """Embeds text as counts of a few keywords instead of loading a transformer"""
+
+    KEYWORDS = ['sorting', 'graph', 'recursion', 'matrix']
+
+    def encode(self, text):
+        words = text.lower().split()
+        vector = np.array([words.count(keyword) for keyword in self.KEYWORDS], dtype=np.float32) + 0.01
+        return vector / np.linalg.norm(vector)
+
+    def get_sentence_embedding_dimension(self):
+        return len(self.KEYWORDS)
+
+class TestShardedVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.persist_dir = tempfile.mkdtemp()
+        self.documents_dir = tempfile.mkdtemp()
+        self.client = chromadb.PersistentClient(path=self.persist_dir)
+        self.model = KeywordModel()
+        self.original_threshold = settings.SIMILARITY_THRESHOLD
+        settings.SIMILARITY_THRESHOLD = -1.0
+
+    def make_store(self, max_open_shards=8):
+        return ShardedVectorStore(
+            max_open_shards=max_open_shards,
+            search_workers=2,
+            documents_root=self.documents_dir,
+            client=self.client,
+            embedding_model=self.model
+        )
+
+    def add_chunks(self, store, shard, texts):
+        collection = store.get_shard(shard).collection
+        collection.add(
+            ids=[f"{shard}-{i}" for i in range(len(texts))],
+            documents=texts,
+            embeddings=[self.model.encode(text).tolist() for text in texts],
+            metadatas=[{'filename': f"{shard}.txt", 'shard': shard} for _ in texts]
+        )
+
+    def test_collection_names_are_valid_and_distinct(self):
+        self.assertEqual(shard_collection_name(DEFAULT_SHARD), settings.COLLECTION_NAME)
+        names = {shard_collection_name(shard) for shard in ["Data Structures", "data-structures", "x" * 200]}
+        self.assertEqual(len(names), 3)
+        for name in names:
+            self.assertLessEqual(len(name), 63)
+            self.assertTrue(name[0].isalnum() and name[-1].isalnum())
+
+    def test_documents_are_routed_by_course_directory(self):
+        store = self.make_store()
+        course_file = Path(self.documents_dir) / "algorithms" / "week1" / "notes.txt"
+        root_file = Path(self.documents_dir) / "notes.txt"
+
+        self.assertEqual(store.route({'metadata': {'file_path': str(course_file)}}), "algorithms")
+        self.assertEqual(store.route({'metadata': {'file_path': str(root_file)}}), DEFAULT_SHARD)
+        self.assertEqual(store.route({'metadata': {'file_path': "/elsewhere/graphs/a.txt"}}), "graphs")
+        self.assertEqual(store.route({'metadata': {'file_path': str(course_file), 'shard': "pinned"}}), "pinned")
+
+    def test_fan_out_merges_top_k_across_shards(self):
+        store = self.make_store()
+        self.add_chunks(store, "algorithms", ["sorting sorting arrays", "recursion basics"])
+        self.add_chunks(store, "graphs", ["graph traversal", "sorting graph edges"])
+
+        self.assertEqual(store.list_shards(), ["algorithms", "graphs"])
+
+        results = store.search("sorting", top_k=2)
+        self.assertEqual([result['content'] for result in results], ["sorting sorting arrays", "sorting graph edges"])
+        self.assertEqual([result['shard'] for result in results], ["algorithms", "graphs"])
+        self.assertEqual([result['rank'] for result in results], [1, 2])
+
+        subset = store.search("sorting", top_k=2, shards=["graphs"])
+        self.assertTrue(all(result['shard'] == "graphs" for result in subset))
+
+        # Unknown shards are skipped rather than created
+        self.assertEqual(store.search("sorting", shards=["missing"]), [])
+        self.assertNotIn("missing", store.list_shards())
+
+    def test_configured_embedding_model_is_loaded_when_none_is_passed(self):
+        with mock.patch.object(sharded_store, 'load_embedding_model', return_value=self.model) as load:
+            store = ShardedVectorStore(documents_root=self.documents_dir, client=self.client)
+        load.assert_called_once_with()
+        self.assertIs(store.embedding_model, self.model)
+        self.assertIs(store.get_shard("algorithms").embedding_model, self.model)
+
+    def test_open_shards_are_bounded_by_lru(self):
+        store = self.make_store(max_open_shards=2)
+        for shard in ["a-course", "b-course", "c-course"]:
+            self.add_chunks(store, shard, [f"{shard} matrix"])
+
+        self.assertEqual(store.open_shards(), ["b-course", "c-course"])
+
+        store.get_shard("b-course")
+        store.get_shard("a-course")
+        self.assertEqual(store.open_shards(), ["b-course", "a-course"])
+        self.assertEqual(store.shards_closed, 2)
+
+        # Closed shards are reopened transparently for searches
+        results = store.search("matrix", top_k=3)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(len(store.open_shards()), 2)
+        self.assertEqual(store.get_collection_stats()['shards'], {'a-course': 1, 'b-course': 1, 'c-course': 1})
+
+    @unittest.skipUnless(segment_internals_supported(), "segments are released on the pinned chromadb only")
+    def test_closed_shards_release_their_index(self):
+        from chromadb.segment import SegmentManager
+        from chromadb.types import SegmentScope
+        loaded = self.client._system.instance(SegmentManager).segment_cache[SegmentScope.VECTOR].cache
+
+        def loaded_shards():
+            return sorted(shard for shard in store.list_shards()
+                          if self.client.get_collection(shard_collection_name(shard)).id in loaded)
+
+        store = self.make_store(max_open_shards=2)
+        for shard in ["a-course", "b-course", "c-course"]:
+            self.add_chunks(store, shard, [f"{shard} matrix"])
+        self.assertEqual(loaded_shards(), ["b-course", "c-course"])
+
+        # A search over more shards than stay open loads them all, then releases the closed ones
+        self.assertEqual(len(store.search("matrix", top_k=3)), 3)
+        self.assertEqual(loaded_shards(), sorted(store.open_shards()))
+
+        # Released shards are read from disk again, with writes made while they were closed
+        store.get_shard("a-course").collection.add(
+            ids=["a-course-late"], documents=["a-course matrix"],
+            embeddings=[self.model.encode("a-course matrix").tolist()], metadatas=[{'filename': "late.txt"}]
+        )
+        self.assertEqual(len(store.search("matrix", top_k=10)), 4)
+        self.assertLessEqual(len(loaded_shards()), 2)
+
+    def tearDown(self):
+        settings.SIMILARITY_THRESHOLD = self.original_threshold
+        shutil.rmtree(self.persist_dir, ignore_errors=True)
+        shutil.rmtree(self.documents_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
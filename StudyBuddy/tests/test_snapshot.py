@@ -0,0 +1,212 @@
+import unittest
+import tempfile
+import shutil
+import gzip
+from pathlib import Path
+from unittest import mock
+import sys
+
+import chromadb
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.database.vector_store import VectorStore
+from src.database.sharded_store import ShardedVectorStore
+from tests.fakes import FixedDimensionModel
+import src.database.snapshot as snapshot
+from src.database.embedding_backends import MODEL_KEY
+from src.database.snapshot import (
+    export_index, import_index, verify_snapshot, import_collection_name, EMBEDDINGS_FILE, CHUNKS_FILE
+)
+
+def named_model(name, dimension=8):
+    """A model that, like a loaded one, records its name on the collections it creates"""
+    model = FixedDimensionModel(dimension)
+    model.embedding_model_name = name
+    return model
+
+class TestIndexSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.source_dir = tempfile.mkdtemp()
+        self.target_dir = tempfile.mkdtemp()
+        self.snapshot_dir = Path(tempfile.mkdtemp()) / "snapshot"
+
+        self.source = VectorStore(
+            client=chromadb.PersistentClient(path=self.source_dir),
+            embedding_model=FixedDimensionModel()
+        )
+        rng = np.random.default_rng(0)
+        self.embeddings = rng.normal(size=(25, 8)).astype(np.float32)
+        self.source.collection.add(
+            ids=[f"chunk-{i}" for i in range(25)],
+            documents=[f"Chunk {i} about binary search trees" for i in range(25)],
+            metadatas=[{'filename': f"notes{i % 3}.txt", 'chunk_index': i} for i in range(25)],
+            embeddings=self.embeddings.tolist()
+        )
+
+    def make_target(self, dimension=8):
+        return VectorStore(
+            client=chromadb.PersistentClient(path=self.target_dir),
+            embedding_model=FixedDimensionModel(dimension)
+        )
+
+    def test_round_trip_without_re_embedding(self):
+        exported = export_index(self.source, str(self.snapshot_dir))
+        self.assertTrue(exported['success'], exported['error'])
+        self.assertEqual(exported['chunks_exported'], 25)
+        self.assertTrue(verify_snapshot(str(self.snapshot_dir))['valid'])
+
+        target = self.make_target()
+        imported = import_index(target, str(self.snapshot_dir))
+        self.assertTrue(imported['success'], imported['error'])
+        self.assertEqual(target.collection.count(), 25)
+
+        restored = target.collection.get(ids=["chunk-7"], include=['documents', 'metadatas', 'embeddings'])
+        self.assertEqual(restored['documents'][0], "Chunk 7 about binary search trees")
+        self.assertEqual(restored['metadatas'][0], {'filename': "notes1.txt", 'chunk_index': 7})
+        np.testing.assert_allclose(restored['embeddings'][0], self.embeddings[7], rtol=1e-6)
+
+    def test_float16_snapshot_is_smaller(self):
+        export_index(self.source, str(self.snapshot_dir / "f32"))
+        export_index(self.source, str(self.snapshot_dir / "f16"), dtype="float16")
+
+        f32 = np.load(self.snapshot_dir / "f32" / EMBEDDINGS_FILE)
+        f16 = np.load(self.snapshot_dir / "f16" / EMBEDDINGS_FILE)
+        self.assertEqual(f16.dtype, np.float16)
+        self.assertLess(f16.nbytes, f32.nbytes)
+        np.testing.assert_allclose(f16.astype(np.float32), f32, atol=1e-2)
+
+    def test_corrupted_snapshot_is_rejected(self):
+        export_index(self.source, str(self.snapshot_dir))
+        with open(self.snapshot_dir / CHUNKS_FILE, 'ab') as f:
+            f.write(b"garbage")
+
+        verification = verify_snapshot(str(self.snapshot_dir))
+        self.assertFalse(verification['valid'])
+        self.assertIn(f"Checksum mismatch for {CHUNKS_FILE}", verification['errors'])
+
+        target = self.make_target()
+        self.assertFalse(import_index(target, str(self.snapshot_dir))['success'])
+        self.assertEqual(target.collection.count(), 0)
+
+    def make_populated_target(self):
+        target = self.make_target()
+        target.collection.add(
+            ids=["old-0", "old-1"],
+            documents=["Old chunk about heaps", "Old chunk about graphs"],
+            metadatas=[{'filename': "old.txt", 'chunk_index': 0}, {'filename': "old.txt", 'chunk_index': 1}],
+            embeddings=np.ones((2, 8), dtype=np.float32).tolist()
+        )
+        return target
+
+    def assert_untouched(self, target):
+        self.assertEqual(sorted(target.collection.get()['ids']), ["old-0", "old-1"])
+        names = [getattr(collection, 'name', collection) for collection in target.client.list_collections()]
+        self.assertNotIn(import_collection_name(target.collection_name), names)
+
+    def test_import_replaces_existing_chunks(self):
+        export_index(self.source, str(self.snapshot_dir))
+        target = self.make_populated_target()
+
+        imported = import_index(target, str(self.snapshot_dir))
+        self.assertTrue(imported['success'], imported['error'])
+        ids = target.collection.get()['ids']
+        self.assertEqual(len(ids), 25)
+        self.assertNotIn("old-0", ids)
+
+    def test_failed_import_leaves_the_index_as_it_was(self):
+        export_index(self.source, str(self.snapshot_dir))
+        target = self.make_populated_target()
+        batches = list(snapshot._iter_snapshot_batches(self.snapshot_dir, 10))
+
+        def failing_batches(snapshot_dir, batch_size):
+            yield from batches[:2]
+            raise OSError("Disk read error")
+
+        with mock.patch.object(snapshot, '_iter_snapshot_batches', failing_batches):
+            result = import_index(target, str(self.snapshot_dir))
+        self.assertFalse(result['success'])
+        self.assertIn("Disk read error", result['error'])
+        self.assert_untouched(target)
+
+    def test_truncated_snapshot_does_not_replace_the_index(self):
+        export_index(self.source, str(self.snapshot_dir))
+        with gzip.open(self.snapshot_dir / CHUNKS_FILE, 'rt', encoding='utf-8') as f:
+            lines = f.readlines()
+        with gzip.open(self.snapshot_dir / CHUNKS_FILE, 'wt', encoding='utf-8') as f:
+            f.writelines(lines[:20])
+
+        target = self.make_populated_target()
+        result = import_index(target, str(self.snapshot_dir), verify=False)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['chunks_imported'], 0)
+        self.assert_untouched(target)
+
+    def test_sharded_import_replaces_every_shard(self):
+        store = ShardedVectorStore(
+            client=chromadb.PersistentClient(path=self.target_dir),
+            embedding_model=FixedDimensionModel(),
+            documents_root=self.target_dir
+        )
+        for shard in ("algorithms", "databases"):
+            store.get_shard(shard).collection.add(
+                ids=[f"{shard}-0"], documents=[f"Old {shard} chunk"],
+                metadatas=[{'filename': f"{shard}.txt"}], embeddings=[[1.0] * 8]
+            )
+        exported = export_index(store, str(self.snapshot_dir / "sharded"))
+        self.assertEqual(exported['chunks_exported'], 2)
+        store.get_shard("algorithms").collection.add(
+            ids=["algorithms-1"], documents=["Added after the export"],
+            metadatas=[{'filename': "algorithms.txt"}], embeddings=[[1.0] * 8]
+        )
+        store.get_shard("compilers").collection.add(
+            ids=["compilers-0"], documents=["Shard missing from the snapshot"],
+            metadatas=[{'filename': "compilers.txt"}], embeddings=[[1.0] * 8]
+        )
+
+        imported = import_index(store, str(self.snapshot_dir / "sharded"))
+        self.assertTrue(imported['success'], imported['error'])
+        self.assertEqual(store.list_shards(), ["algorithms", "databases"])
+        self.assertEqual(store.get_shard("algorithms").collection.get()['ids'], ["algorithms-0"])
+        self.assertEqual(store.get_shard("databases").collection.get()['ids'], ["databases-0"])
+
+    def test_dimension_mismatch_is_rejected(self):
+        export_index(self.source, str(self.snapshot_dir))
+        result = import_index(self.make_target(dimension=16), str(self.snapshot_dir))
+        self.assertFalse(result['success'])
+        self.assertIn(settings.EMBEDDING_MODEL, result['error'])
+
+    def test_snapshot_records_the_model_of_the_collection(self):
+        # Migrated to another model while EMBEDDING_MODEL still names the old one
+        client = chromadb.PersistentClient(path=self.source_dir)
+        migrated = VectorStore(collection_name="migrated", client=client, embedding_model=named_model("paraphrase-mpnet"))
+        migrated.collection.add(ids=["chunk-0"], documents=["Heaps"], metadatas=[{'filename': "heaps.txt"}], embeddings=[[1.0] * 8])
+        export_index(migrated, str(self.snapshot_dir))
+        self.assertEqual(verify_snapshot(str(self.snapshot_dir))['manifest']['embedding_model'], "paraphrase-mpnet")
+
+        target = self.make_target()
+        result = import_index(target, str(self.snapshot_dir))
+        self.assertFalse(result['success'])
+        self.assertIn("paraphrase-mpnet", result['error'])
+        self.assertIn(settings.EMBEDDING_MODEL, result['error'])
+        self.assertEqual(target.collection.count(), 0)
+
+        target = VectorStore(
+            collection_name="migrated",
+            client=chromadb.PersistentClient(path=self.target_dir),
+            embedding_model=named_model("paraphrase-mpnet")
+        )
+        self.assertTrue(import_index(target, str(self.snapshot_dir))['success'])
+        self.assertEqual(target.collection.metadata[MODEL_KEY], "paraphrase-mpnet")
+        self.assertEqual(target.collection.get()['ids'], ["chunk-0"])
+
+    def tearDown(self):
+        shutil.rmtree(self.source_dir, ignore_errors=True)
+        shutil.rmtree(self.target_dir, ignore_errors=True)
+        shutil.rmtree(self.snapshot_dir.parent, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import random
+from unittest import mock
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.utils.text_processing as text_utils
+from src.utils.text_processing import chunk_text, chunk_text_stream, locate_sections
+from tests.fakes import byte_level_encoding
+
+WORDS = ["héllo", "数据结构", "🙂🙃", "Привет", "algorithm", "é", "ג", "日本語のテキスト", "𝔘𝔫𝔦", "the heap"]
+
+def mixed_script_text(length=1200, seed=1):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(length))[:length]
+
+class TestChunkOffsets(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(text_utils.tiktoken, 'get_encoding', lambda name: byte_level_encoding())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_offsets_slice_the_chunk_text_out_of_multi_byte_text(self):
+        text = mixed_script_text()
+        chunks = chunk_text(text, 50, 10)
+
+        self.assertGreater(len(chunks), 30)
+        for chunk in chunks:
+            self.assertEqual(text[chunk['start_char']:chunk['end_char']], chunk['text'])
+            self.assertNotIn('�', chunk['text'])
+        self.assertEqual(chunks[0]['start_char'], 0)
+        self.assertEqual(chunks[-1]['end_char'], len(text))
+        # Overlapping windows leave no gaps
+        for previous, chunk in zip(chunks, chunks[1:]):
+            self.assertLessEqual(chunk['start_char'], previous['end_char'])
+
+    def test_streamed_chunks_match_whole_text_chunks(self):
+        text = mixed_script_text()
+        expected = chunk_text(text, 50, 10)
+
+        self.assertEqual(list(chunk_text_stream([text], 50, 10)), expected)
+        # Pieces split before spaces tokenize the same way as the whole text
+        words = text.split(" ")
+        for words_per_piece in (1, 7, 100):
+            pieces = [" ".join(words[i:i + words_per_piece]) for i in range(0, len(words), words_per_piece)]
+            pieces = pieces[:1] + [" " + piece for piece in pieces[1:]]
+            self.assertEqual("".join(pieces), text)
+            self.assertEqual(list(chunk_text_stream(pieces, 50, 10)), expected, words_per_piece)
+
+    def test_streamed_chunks_of_empty_pieces(self):
+        self.assertEqual(list(chunk_text_stream(["", ""], 50, 10)), [])
+
+class TestLocateSections(unittest.TestCase):
+    # Pages 1, 2 and 4 joined by newlines; page 3 had no text
+    SECTIONS = [
+        {'page': 1, 'start_char': 0, 'end_char': 10},
+        {'page': 2, 'start_char': 11, 'end_char': 20},
+        {'page': 4, 'start_char': 21, 'end_char': 30}
+    ]
+
+    def test_span_inside_one_section(self):
+        self.assertEqual(locate_sections(self.SECTIONS, 2, 8), (1, 1))
+        self.assertEqual(locate_sections(self.SECTIONS, 21, 30), (4, 4))
+
+    def test_span_ending_at_a_section_end_stays_in_that_section(self):
+        self.assertEqual(locate_sections(self.SECTIONS, 0, 10), (1, 1))
+        # The separating newline belongs to the page before it
+        self.assertEqual(locate_sections(self.SECTIONS, 0, 11), (1, 1))
+        self.assertEqual(locate_sections(self.SECTIONS, 0, 12), (1, 2))
+
+    def test_span_starting_at_a_section_start(self):
+        self.assertEqual(locate_sections(self.SECTIONS, 11, 15), (2, 2))
+        self.assertEqual(locate_sections(self.SECTIONS, 10, 15), (1, 2))
+
+    def test_span_across_several_sections(self):
+        self.assertEqual(locate_sections(self.SECTIONS, 5, 25), (1, 4))
+
+    def test_empty_span_is_located_at_its_start(self):
+        self.assertEqual(locate_sections(self.SECTIONS, 11, 11), (2, 2))
+        self.assertEqual(locate_sections(self.SECTIONS, 30, 30), (4, 4))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import threading
+import time
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.warmup import WarmUp, STATE_READY, STATE_FAILED, STATE_LOADING, STATE_PENDING
+
+def slow(value, seconds):
+    def load(warmup):
+        time.sleep(seconds)
+        return value
+    return load
+
+class TestWarmUp(unittest.TestCase):
+    def test_components_load_in_parallel(self):
+        warmup = WarmUp()
+        warmup.add('model', slow("model", 0.3))
+        warmup.add('client', slow("client", 0.3))
+        warmup.add('store', lambda w: (w.get('model'), w.get('client')))
+
+        started = time.perf_counter()
+        warmup.start()
+        self.assertEqual(warmup.get('store'), ("model", "client"))
+        self.assertLess(time.perf_counter() - started, 0.55)
+        self.assertTrue(warmup.all_ready())
+
+    def test_get_waits_only_for_the_component_asked_for(self):
+        release = threading.Event()
+        warmup = WarmUp()
+        warmup.add('model', lambda w: release.wait(5))
+        warmup.add('llm', slow("llm", 0.0))
+        warmup.start()
+
+        self.assertEqual(warmup.get('llm', timeout=1), "llm")
+        self.assertEqual(warmup.status()['model']['state'], STATE_LOADING)
+        self.assertFalse(warmup.is_ready('model'))
+        release.set()
+        self.assertTrue(warmup.get('model', timeout=1))
+
+    def test_warmer_runs_before_the_component_is_ready(self):
+        warmed = []
+        warmup = WarmUp()
+        warmup.add('model', slow("model", 0.0), warmed.append)
+        warmup.add('broken_warmer', slow("store", 0.0), lambda value: 1 / 0)
+        warmup.start()
+
+        self.assertEqual(warmup.get('model'), "model")
+        self.assertEqual(warmed, ["model"])
+        # A failed warm-up still leaves a usable component
+        self.assertEqual(warmup.get('broken_warmer'), "store")
+
+    def test_a_failed_load_is_reported_and_raised(self):
+        def missing_key(warmup):
+            raise ValueError("GEMINI_API_KEY is required")
+
+        warmup = WarmUp()
+        warmup.add('llm', missing_key)
+        warmup.start()
+
+        with self.assertRaises(ValueError):
+            warmup.get('llm')
+        self.assertEqual(warmup.status()['llm']['state'], STATE_FAILED)
+        self.assertIn("GEMINI_API_KEY", warmup.status()['llm']['error'])
+
+    def test_without_start_a_component_loads_when_asked_for(self):
+        calls = []
+        warmup = WarmUp()
+        warmup.add('model', lambda w: calls.append(threading.current_thread()) or "model")
+
+        self.assertEqual(warmup.status()['model']['state'], STATE_PENDING)
+        self.assertEqual(warmup.get('model'), "model")
+        self.assertEqual(warmup.get('model'), "model")
+        self.assertEqual(calls, [threading.current_thread()])
+        self.assertEqual(warmup.status()['model']['state'], STATE_READY)
+
+if __name__ == '__main__':
+    unittest.main()